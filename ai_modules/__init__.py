@@ -3,14 +3,18 @@ AI增强模块
 提供AI驱动的市场分析、策略进化和预测功能
 """
 
-from .ai_enhancer import AIEnhancer
-from .market_analyzer import MarketAnalyzer
-from .strategy_evolver import StrategyEvolver
-from .price_predictor import PricePredictor
+from utils.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'AIEnhancer': '.ai_enhancer',
+    'MarketAnalyzer': '.market_analyzer',
+    'StrategyEvolver': '.strategy_evolver',
+    'PricePredictor': '.price_predictor'
+})
 
 __all__ = [
     'AIEnhancer',
     'MarketAnalyzer', 
     'StrategyEvolver',
     'PricePredictor'
-] 
\ No newline at end of file
+]
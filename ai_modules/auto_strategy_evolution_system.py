@@ -10,8 +10,6 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import logging
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 import threading
 import time
@@ -25,6 +23,10 @@ from .strategy_evolver import StrategyEvolver
 from .ai_enhancer import AIEnhancer
 from .daily_review_ai import DailyReviewAI
 from .strategy_backtest_engine import StrategyBacktestEngine, BacktestResult
+from utils.journaled_state import JournaledState
+from utils.latency_metrics import timed, start_metrics_server_from_env
+from utils.runtime_profiler import install_runtime_profiler
+from utils.startup_profiler import startup_profiler
 
 @dataclass
 class EvolutionConfig:
@@ -73,12 +75,17 @@ class AutoStrategyEvolutionSystem:
         self.logger = logging.getLogger(__name__)
         self.config = config or EvolutionConfig()
         
-        # 初始化组件
-        self.evolution_tracker = StrategyEvolutionTracker()
-        self.strategy_evolver = StrategyEvolver()
-        self.ai_enhancer = AIEnhancer()
-        self.daily_review_ai = DailyReviewAI()
-        self.backtest_engine = StrategyBacktestEngine()
+        # 初始化组件（STARTUP_PROFILE=1 时记录各组件初始化耗时）
+        with startup_profiler.component('evolution_tracker'):
+            self.evolution_tracker = StrategyEvolutionTracker()
+        with startup_profiler.component('strategy_evolver'):
+            self.strategy_evolver = StrategyEvolver()
+        with startup_profiler.component('ai_enhancer'):
+            self.ai_enhancer = AIEnhancer()
+        with startup_profiler.component('daily_review_ai'):
+            self.daily_review_ai = DailyReviewAI()
+        with startup_profiler.component('backtest_engine'):
+            self.backtest_engine = StrategyBacktestEngine()
         
         # 进化状态
         self.evolution_state = {
@@ -96,6 +103,8 @@ class AutoStrategyEvolutionSystem:
         self.models_dir = "models/evolution"
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.models_dir, exist_ok=True)
+        self.state_journal = JournaledState(os.path.join(self.data_dir, "evolution_state.json"),
+                                            append_only=('evolution_history',))
         
         # 自动进化线程
         self.evolution_thread = None
@@ -115,16 +124,19 @@ class AutoStrategyEvolutionSystem:
             
             # 初始化AI组件
             try:
-                self.ai_enhancer.initialize()
-                self.strategy_evolver.initialize()
+                with startup_profiler.component('ai_components.initialize'):
+                    self.ai_enhancer.initialize()
+                    self.strategy_evolver.initialize()
             except Exception as e:
                 self.logger.warning(f"⚠️ AI组件初始化失败: {e}")
             
             # 加载现有进化数据
-            self._load_evolution_state()
+            with startup_profiler.component('load_evolution_state'):
+                self._load_evolution_state()
             
             # 初始化策略种群
-            self._initialize_strategy_population()
+            with startup_profiler.component('strategy_population'):
+                self._initialize_strategy_population()
             
             # 初始化性能指标
             if not self.evolution_state['performance_metrics']:
@@ -143,22 +155,18 @@ class AutoStrategyEvolutionSystem:
             raise
     
     def _load_evolution_state(self):
-        """加载进化状态"""
-        state_file = os.path.join(self.data_dir, "evolution_state.json")
-        if os.path.exists(state_file):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    self.evolution_state.update(json.load(f))
+        """加载进化状态（快照 + 追加日志重放）"""
+        try:
+            self.evolution_state.update(self.state_journal.load())
+            if self.state_journal.snapshot_path.exists():
                 self.logger.info("✅ 进化状态已加载")
-            except Exception as e:
-                self.logger.warning(f"⚠️ 加载进化状态失败: {e}")
+        except Exception as e:
+            self.logger.warning(f"⚠️ 加载进化状态失败: {e}")
     
     def _save_evolution_state(self):
-        """保存进化状态"""
+        """保存进化状态（只追加变更，定期合并快照）"""
         try:
-            state_file = os.path.join(self.data_dir, "evolution_state.json")
-            with open(state_file, 'w', encoding='utf-8') as f:
-                json.dump(self.evolution_state, f, ensure_ascii=False, indent=2, default=str)
+            self.state_journal.save(self.evolution_state)
         except Exception as e:
             self.logger.error(f"❌ 保存进化状态失败: {e}")
     
@@ -246,6 +254,13 @@ class AutoStrategyEvolutionSystem:
             self.evolution_thread = threading.Thread(target=self._evolution_loop, daemon=True)
             self.evolution_thread.start()
             
+            # 运行中可通过信号/本地套接字开启剖析，无需重启
+            install_runtime_profiler('auto_evolution')
+            
+            # 设置了 METRICS_PORT 时导出延迟指标
+            if start_metrics_server_from_env():
+                self.logger.info(f"📈 延迟指标: http://127.0.0.1:{os.getenv('METRICS_PORT')}/metrics")
+            
             self.logger.info("🚀 全自动策略进化系统已启动")
             return True
             
@@ -344,6 +359,7 @@ class AutoStrategyEvolutionSystem:
         self.logger.debug("✅ 系统运行正常，无需进化")
         return False
     
+    @timed('evolution.generation')
     def _evolve_strategies(self):
         """进化策略"""
         try:
@@ -452,6 +468,7 @@ class AutoStrategyEvolutionSystem:
         
         return new_strategies
     
+    @timed('evolution.evaluate')
     def _evaluate_strategies(self):
         """评估策略性能"""
         try:
@@ -465,6 +482,7 @@ class AutoStrategyEvolutionSystem:
                 return
             
             evaluated_count = 0
+            generation_results = []
             for strategy in self.evolution_state['active_strategies']:
                 try:
                     # 使用真实回测评估策略性能
@@ -485,8 +503,7 @@ class AutoStrategyEvolutionSystem:
                     strategy['fitness'] = self._calculate_fitness(strategy['performance'])
                     strategy['last_updated'] = datetime.now().isoformat()
                     
-                    # 保存回测结果
-                    self.backtest_engine.save_backtest_result(strategy['name'], backtest_result)
+                    generation_results.append((strategy, backtest_result))
                     
                     evaluated_count += 1
                     
@@ -497,6 +514,9 @@ class AutoStrategyEvolutionSystem:
                     strategy['fitness'] = self._calculate_fitness(strategy['performance'])
                     strategy['last_updated'] = datetime.now().isoformat()
             
+            # 整代回测结果一次写入结果存储
+            self.backtest_engine.save_backtest_results(generation_results, self.evolution_state['current_generation'])
+            
             # 更新进化状态
             fitness_scores = [s['fitness'] for s in self.evolution_state['active_strategies']]
             self.evolution_state['best_fitness'] = max(fitness_scores) if fitness_scores else 0.0
@@ -8,9 +8,10 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import logging
-import json
-import os
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+from data.results_store import ResultsStore, get_shared_results_store
+from utils.latency_metrics import timed
 
 @dataclass
 class BacktestResult:
@@ -29,11 +30,11 @@ class BacktestResult:
 class StrategyBacktestEngine:
     """策略回测引擎"""
     
-    def __init__(self):
+    def __init__(self, results_store: Optional[ResultsStore] = None):
         self.logger = logging.getLogger(__name__)
-        self.data_dir = "data/backtest"
-        os.makedirs(self.data_dir, exist_ok=True)
+        self.results_store = results_store or get_shared_results_store()
         
+    @timed('backtest.backtest_strategy')
     def backtest_strategy(self, strategy: Dict[str, Any], 
                          market_data: pd.DataFrame,
                          initial_capital: float = 10000.0) -> BacktestResult:
@@ -419,55 +420,55 @@ class StrategyBacktestEngine:
             sortino_ratio=0.0
         )
     
-    def save_backtest_result(self, strategy_name: str, result: BacktestResult):
+    def _result_record(self, strategy_name: str, result: BacktestResult, **extra) -> Dict[str, Any]:
+        """回测结果转换为结果存储的记录"""
+        record = {'strategy_name': strategy_name, 'timestamp': datetime.now().isoformat()}
+        record.update(asdict(result))
+        record.update({k: v for k, v in extra.items() if v is not None})
+        return record
+    
+    def save_backtest_result(self, strategy_name: str, result: BacktestResult,
+                             generation: Optional[int] = None, fitness: Optional[float] = None,
+                             parameters: Optional[Dict[str, Any]] = None):
         """保存回测结果"""
         try:
-            result_file = os.path.join(self.data_dir, f"{strategy_name}_backtest_result.json")
-            result_dict = {
-                'strategy_name': strategy_name,
-                'timestamp': datetime.now().isoformat(),
-                'total_return': result.total_return,
-                'sharpe_ratio': result.sharpe_ratio,
-                'max_drawdown': result.max_drawdown,
-                'win_rate': result.win_rate,
-                'profit_factor': result.profit_factor,
-                'total_trades': result.total_trades,
-                'avg_trade_duration': result.avg_trade_duration,
-                'volatility': result.volatility,
-                'calmar_ratio': result.calmar_ratio,
-                'sortino_ratio': result.sortino_ratio
-            }
-            
-            with open(result_file, 'w', encoding='utf-8') as f:
-                json.dump(result_dict, f, ensure_ascii=False, indent=2)
-            
-            self.logger.info(f"✅ 回测结果已保存: {result_file}")
+            self.results_store.add_result(
+                self._result_record(strategy_name, result, fitness=fitness, parameters=parameters),
+                generation
+            )
+            self.logger.info(f"✅ 回测结果已保存: {strategy_name}")
             
         except Exception as e:
             self.logger.error(f"❌ 保存回测结果失败: {e}")
     
+    def save_backtest_results(self, results: List[Tuple[Dict[str, Any], BacktestResult]], generation: int):
+        """
+        在一个事务中保存一代策略的回测结果
+        
+        Args:
+            results: (策略配置, 回测结果) 列表，策略配置中的 fitness/id/parameters 一并保存
+            generation: 代数
+        """
+        try:
+            records = [
+                self._result_record(strategy['name'], result, fitness=strategy.get('fitness'),
+                                    strategy_id=strategy.get('id'), parameters=strategy.get('parameters'))
+                for strategy, result in results
+            ]
+            saved = self.results_store.add_results(records, generation)
+            self.logger.info(f"✅ 第 {generation} 代回测结果已保存: {saved} 条")
+            
+        except Exception as e:
+            self.logger.error(f"❌ 批量保存回测结果失败: {e}")
+    
     def load_backtest_result(self, strategy_name: str) -> Optional[BacktestResult]:
-        """加载回测结果"""
+        """加载策略最近一次的回测结果"""
         try:
-            result_file = os.path.join(self.data_dir, f"{strategy_name}_backtest_result.json")
-            if os.path.exists(result_file):
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    result_dict = json.load(f)
-                
-                return BacktestResult(
-                    total_return=result_dict['total_return'],
-                    sharpe_ratio=result_dict['sharpe_ratio'],
-                    max_drawdown=result_dict['max_drawdown'],
-                    win_rate=result_dict['win_rate'],
-                    profit_factor=result_dict['profit_factor'],
-                    total_trades=result_dict['total_trades'],
-                    avg_trade_duration=result_dict['avg_trade_duration'],
-                    volatility=result_dict['volatility'],
-                    calmar_ratio=result_dict['calmar_ratio'],
-                    sortino_ratio=result_dict['sortino_ratio']
-                )
-            
-            return None
+            record = self.results_store.latest_for_strategy(strategy_name)
+            if record is None:
+                return None
+            
+            return BacktestResult(**{name: record[name] for name in BacktestResult.__dataclass_fields__})
             
         except Exception as e:
             self.logger.error(f"❌ 加载回测结果失败: {e}")
@@ -3,24 +3,36 @@
 记录和分析策略的长期进化路径
 """
 
-import json
 import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import logging
-import matplotlib.pyplot as plt
-import seaborn as sns
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
+from utils.journaled_state import JournaledState, atomic_write_text
+
+CHART_NAMES = ['cumulative_returns', 'performance_trends', 'strategy_score', 'risk_metrics']
+
+
 class StrategyEvolutionTracker:
     """
     策略进化跟踪器
     记录和分析策略的长期进化路径
     """
     
-    def __init__(self):
+    def __init__(self, background_charts: bool = False):
+        """
+        初始化进化跟踪器
+        
+        Args:
+            background_charts: 记录复盘后是否在后台线程刷新图表（默认在请求时才渲染）
+        """
         self.logger = logging.getLogger(__name__)
         self.evolution_data_file = "data/strategy_evolution.json"
         self.performance_history_file = "data/performance_history.json"
@@ -30,43 +42,61 @@ class StrategyEvolutionTracker:
         os.makedirs("data", exist_ok=True)
         os.makedirs(self.evolution_charts_dir, exist_ok=True)
         
+        # 历史数据只追加：快照 + 变更日志
+        self.evolution_journal = JournaledState(
+            self.evolution_data_file,
+            append_only=('evolution_history', 'strategy_versions', 'parameter_changes',
+                         'performance_trends', 'optimization_milestones')
+        )
+        self.performance_journal = JournaledState(
+            self.performance_history_file,
+            append_only=('daily_performance', 'weekly_performance', 'monthly_performance',
+                         'cumulative_returns', 'risk_metrics')
+        )
+        
+        # 图表按需渲染并按数据哈希缓存；background_charts 为 True 时每次复盘后在后台刷新
+        self.background_charts = background_charts
+        # _chart_lock 在整个渲染期间持有；_submit_lock 只保护后台任务的提交，提交不等待渲染
+        self._chart_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._chart_executor: Optional[ThreadPoolExecutor] = None
+        self._chart_future: Optional[Future] = None
+        self.charts_rendered = 0
+        self.chart_cache_hits = 0
+        
         # 初始化数据
         self.evolution_data = self._load_evolution_data()
         self.performance_history = self._load_performance_history()
     
     def _load_evolution_data(self) -> Dict:
         """加载进化数据"""
-        if os.path.exists(self.evolution_data_file):
-            try:
-                with open(self.evolution_data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.logger.error(f"加载进化数据失败: {e}")
-        
-        return {
+        default = {
             'evolution_history': [],
             'strategy_versions': [],
             'parameter_changes': [],
             'performance_trends': [],
             'optimization_milestones': []
         }
+        try:
+            return self.evolution_journal.load(default)
+        except Exception as e:
+            self.logger.error(f"加载进化数据失败: {e}")
+            return default
     
     def _load_performance_history(self) -> Dict:
         """加载性能历史"""
-        if os.path.exists(self.performance_history_file):
-            try:
-                with open(self.performance_history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.logger.error(f"加载性能历史失败: {e}")
-        
-        return {
+        default = {
             'daily_performance': [],
             'weekly_performance': [],
             'monthly_performance': [],
             'cumulative_returns': [],
             'risk_metrics': []
         }
+        try:
+            return self.performance_journal.load(default)
+        except Exception as e:
+            self.logger.error(f"加载性能历史失败: {e}")
+            return default
     
     def record_daily_review(self, review_data: Dict):
         """记录每日复盘数据"""
@@ -88,8 +118,9 @@ class StrategyEvolutionTracker:
             self._save_evolution_data()
             self._save_performance_history()
             
-            # 生成可视化图表
-            self._generate_evolution_charts()
+            # 图表在 get_chart / get_evolution_charts 请求时按需渲染
+            if self.background_charts:
+                self.render_charts_async()
             
             self.logger.info("✅ 每日复盘数据已记录到进化跟踪器")
             
@@ -203,84 +234,153 @@ class StrategyEvolutionTracker:
             return 'stable'
     
     def _save_evolution_data(self):
-        """保存进化数据"""
+        """保存进化数据（只追加新增记录）"""
         try:
-            with open(self.evolution_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.evolution_data, f, ensure_ascii=False, indent=2, default=str)
+            self.evolution_journal.save(self.evolution_data)
         except Exception as e:
             self.logger.error(f"保存进化数据失败: {e}")
     
     def _save_performance_history(self):
-        """保存性能历史"""
+        """保存性能历史（只追加新增记录）"""
         try:
-            with open(self.performance_history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.performance_history, f, ensure_ascii=False, indent=2, default=str)
+            self.performance_journal.save(self.performance_history)
         except Exception as e:
             self.logger.error(f"保存性能历史失败: {e}")
     
-    def _generate_evolution_charts(self):
-        """生成进化图表"""
-        try:
-            # 设置中文字体
-            plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS']
-            plt.rcParams['axes.unicode_minus'] = False
-            
-            # 生成累积收益图
-            self._generate_cumulative_returns_chart()
-            
-            # 生成性能趋势图
-            self._generate_performance_trends_chart()
-            
-            # 生成策略评分图
-            self._generate_strategy_score_chart()
-            
-            # 生成风险指标图
-            self._generate_risk_metrics_chart()
-            
-            self.logger.info("✅ 进化图表已生成")
-            
-        except Exception as e:
-            self.logger.error(f"生成进化图表失败: {e}")
-    
-    def _generate_cumulative_returns_chart(self):
-        """生成累积收益图"""
+    def _chart_series(self) -> Dict[str, Optional[Dict[str, list]]]:
+        """各图表依赖的数据序列（数据不足时为 None）"""
         cumulative_returns = self.performance_history.get('cumulative_returns', [])
-        if not cumulative_returns:
-            return
+        daily_performance = self.performance_history.get('daily_performance', [])
+        evolution_history = self.evolution_data.get('evolution_history', [])
+        risk_metrics = self.performance_history.get('risk_metrics', [])
+        recent_data = daily_performance[-30:]  # 最近30天
         
-        dates = [r['date'] for r in cumulative_returns]
-        returns = [r['cumulative_return'] for r in cumulative_returns]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(dates, returns, marker='o', linewidth=2, markersize=4)
-        plt.title('策略累积收益进化路径', fontsize=16, fontweight='bold')
-        plt.xlabel('日期', fontsize=12)
-        plt.ylabel('累积收益率 (%)', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        # 保存图表
-        chart_path = os.path.join(self.evolution_charts_dir, 'cumulative_returns.png')
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        return {
+            'cumulative_returns': {
+                'dates': [r['date'] for r in cumulative_returns],
+                'returns': [r['cumulative_return'] for r in cumulative_returns]
+            } if cumulative_returns else None,
+            'performance_trends': {
+                'dates': [p['date'] for p in recent_data],
+                'returns': [p['daily_return'] * 100 for p in recent_data],  # 转换为百分比
+                'win_rates': [p['win_rate'] * 100 for p in recent_data]
+            } if len(daily_performance) >= 7 else None,
+            'strategy_score': {
+                'dates': [h['date'] for h in evolution_history],
+                'scores': [h.get('overall_score', 0) for h in evolution_history]
+            } if evolution_history else None,
+            'risk_metrics': {
+                'dates': [m['date'] for m in risk_metrics],
+                'sharpe_ratios': [m['metrics']['sharpe_ratio'] for m in risk_metrics],
+                'volatilities': [m['metrics']['volatility'] * 100 for m in risk_metrics],
+                'max_drawdowns': [m['metrics']['max_drawdown'] * 100 for m in risk_metrics]
+            } if risk_metrics else None
+        }
     
-    def _generate_performance_trends_chart(self):
-        """生成性能趋势图"""
-        daily_performance = self.performance_history.get('daily_performance', [])
-        if len(daily_performance) < 7:
-            return
+    def get_chart(self, name: str) -> Optional[str]:
+        """
+        获取图表文件路径，数据与上次渲染时相同则直接返回已有文件，否则重新渲染
         
-        # 获取最近30天数据
-        recent_data = daily_performance[-30:]
-        dates = [p['date'] for p in recent_data]
-        returns = [p['daily_return'] * 100 for p in recent_data]  # 转换为百分比
-        win_rates = [p['win_rate'] * 100 for p in recent_data]  # 转换为百分比
+        Args:
+            name: 图表名（cumulative_returns / performance_trends / strategy_score / risk_metrics）
         
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+        Returns:
+            PNG 路径，数据不足时返回 None
+        """
+        series = self._chart_series().get(name)
+        if series is None:
+            return None
+        
+        chart_path = os.path.join(self.evolution_charts_dir, f'{name}.png')
+        digest = hashlib.sha1(json.dumps(series, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        
+        with self._chart_lock:
+            manifest = self._load_chart_manifest()
+            if manifest.get(name) == digest and os.path.exists(chart_path):
+                self.chart_cache_hits += 1
+                return chart_path
+            
+            getattr(self, f'_render_{name}_chart')(series, chart_path)
+            manifest[name] = digest
+            atomic_write_text(os.path.join(self.evolution_charts_dir, 'charts.json'), json.dumps(manifest))
+            self.charts_rendered += 1
+            return chart_path
+    
+    def get_evolution_charts(self) -> Dict[str, str]:
+        """获取全部进化图表（按需渲染），返回 图表名 -> PNG 路径"""
+        charts = {}
+        for name in CHART_NAMES:
+            try:
+                path = self.get_chart(name)
+                if path:
+                    charts[name] = path
+            except Exception as e:
+                self.logger.error(f"生成图表 {name} 失败: {e}")
+        return charts
+    
+    def render_charts_async(self) -> Future:
+        """
+        在后台线程刷新全部图表；已有刷新任务在排队时直接返回该任务
+        
+        Returns:
+            完成后结果为 get_evolution_charts() 的 Future
+        """
+        with self._submit_lock:
+            if self._chart_future is not None and not self._chart_future.running() and not self._chart_future.done():
+                return self._chart_future
+            if self._chart_executor is None:
+                self._chart_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='evolution-charts')
+            self._chart_future = self._chart_executor.submit(self.get_evolution_charts)
+            return self._chart_future
+    
+    def _load_chart_manifest(self) -> Dict[str, str]:
+        manifest_path = os.path.join(self.evolution_charts_dir, 'charts.json')
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def _new_figure(nrows: int, height: float):
+        """创建不依赖 pyplot 的图表（渲染时才导入 matplotlib，可在后台线程使用）"""
+        from matplotlib import rcParams
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        
+        # 设置中文字体
+        rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS']
+        rcParams['axes.unicode_minus'] = False
+        
+        fig = Figure(figsize=(12, height))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(nrows, 1)
+        return fig, axes
+    
+    @staticmethod
+    def _save_figure(fig, axes, chart_path: str):
+        axes.tick_params(axis='x', rotation=45)
+        fig.tight_layout()
+        fig.savefig(chart_path, dpi=300, bbox_inches='tight')
+    
+    def _render_cumulative_returns_chart(self, series: Dict[str, list], chart_path: str):
+        """生成累积收益图"""
+        fig, ax = self._new_figure(1, 6)
+        ax.plot(series['dates'], series['returns'], marker='o', linewidth=2, markersize=4)
+        ax.set_title('策略累积收益进化路径', fontsize=16, fontweight='bold')
+        ax.set_xlabel('日期', fontsize=12)
+        ax.set_ylabel('累积收益率 (%)', fontsize=12)
+        ax.grid(True, alpha=0.3)
+        self._save_figure(fig, ax, chart_path)
+    
+    def _render_performance_trends_chart(self, series: Dict[str, list], chart_path: str):
+        """生成性能趋势图"""
+        fig, (ax1, ax2) = self._new_figure(2, 10)
         
         # 日收益率图
-        ax1.plot(dates, returns, marker='o', linewidth=2, color='#2E86AB')
+        ax1.plot(series['dates'], series['returns'], marker='o', linewidth=2, color='#2E86AB')
         ax1.set_title('日收益率趋势', fontsize=14, fontweight='bold')
         ax1.set_ylabel('日收益率 (%)', fontsize=12)
         ax1.grid(True, alpha=0.3)
@@ -289,7 +389,7 @@ class StrategyEvolutionTracker:
         ax1.legend()
         
         # 胜率图
-        ax2.plot(dates, win_rates, marker='s', linewidth=2, color='#A23B72')
+        ax2.plot(series['dates'], series['win_rates'], marker='s', linewidth=2, color='#A23B72')
         ax2.set_title('胜率趋势', fontsize=14, fontweight='bold')
         ax2.set_xlabel('日期', fontsize=12)
         ax2.set_ylabel('胜率 (%)', fontsize=12)
@@ -297,55 +397,27 @@ class StrategyEvolutionTracker:
         ax2.axhline(y=60, color='orange', linestyle='--', alpha=0.7, label='目标胜率(60%)')
         ax2.legend()
         
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        # 保存图表
-        chart_path = os.path.join(self.evolution_charts_dir, 'performance_trends.png')
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, ax2, chart_path)
     
-    def _generate_strategy_score_chart(self):
+    def _render_strategy_score_chart(self, series: Dict[str, list], chart_path: str):
         """生成策略评分图"""
-        evolution_history = self.evolution_data.get('evolution_history', [])
-        if not evolution_history:
-            return
-        
-        dates = [h['date'] for h in evolution_history]
-        scores = [h.get('overall_score', 0) for h in evolution_history]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(dates, scores, marker='o', linewidth=2, color='#F18F01')
-        plt.title('策略综合评分进化', fontsize=16, fontweight='bold')
-        plt.xlabel('日期', fontsize=12)
-        plt.ylabel('综合评分', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.axhline(y=80, color='green', linestyle='--', alpha=0.7, label='优秀(80)')
-        plt.axhline(y=60, color='orange', linestyle='--', alpha=0.7, label='良好(60)')
-        plt.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        # 保存图表
-        chart_path = os.path.join(self.evolution_charts_dir, 'strategy_score.png')
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig, ax = self._new_figure(1, 6)
+        ax.plot(series['dates'], series['scores'], marker='o', linewidth=2, color='#F18F01')
+        ax.set_title('策略综合评分进化', fontsize=16, fontweight='bold')
+        ax.set_xlabel('日期', fontsize=12)
+        ax.set_ylabel('综合评分', fontsize=12)
+        ax.grid(True, alpha=0.3)
+        ax.axhline(y=80, color='green', linestyle='--', alpha=0.7, label='优秀(80)')
+        ax.axhline(y=60, color='orange', linestyle='--', alpha=0.7, label='良好(60)')
+        ax.legend()
+        self._save_figure(fig, ax, chart_path)
     
-    def _generate_risk_metrics_chart(self):
+    def _render_risk_metrics_chart(self, series: Dict[str, list], chart_path: str):
         """生成风险指标图"""
-        risk_metrics = self.performance_history.get('risk_metrics', [])
-        if not risk_metrics:
-            return
-        
-        dates = [m['date'] for m in risk_metrics]
-        sharpe_ratios = [m['metrics']['sharpe_ratio'] for m in risk_metrics]
-        volatilities = [m['metrics']['volatility'] * 100 for m in risk_metrics]  # 转换为百分比
-        max_drawdowns = [m['metrics']['max_drawdown'] * 100 for m in risk_metrics]  # 转换为百分比
-        
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 12))
+        fig, (ax1, ax2, ax3) = self._new_figure(3, 12)
         
         # 夏普比率
-        ax1.plot(dates, sharpe_ratios, marker='o', linewidth=2, color='#C73E1D')
+        ax1.plot(series['dates'], series['sharpe_ratios'], marker='o', linewidth=2, color='#C73E1D')
         ax1.set_title('夏普比率趋势', fontsize=14, fontweight='bold')
         ax1.set_ylabel('夏普比率', fontsize=12)
         ax1.grid(True, alpha=0.3)
@@ -353,13 +425,13 @@ class StrategyEvolutionTracker:
         ax1.legend()
         
         # 波动率
-        ax2.plot(dates, volatilities, marker='s', linewidth=2, color='#3E92CC')
+        ax2.plot(series['dates'], series['volatilities'], marker='s', linewidth=2, color='#3E92CC')
         ax2.set_title('波动率趋势', fontsize=14, fontweight='bold')
         ax2.set_ylabel('波动率 (%)', fontsize=12)
         ax2.grid(True, alpha=0.3)
         
         # 最大回撤
-        ax3.plot(dates, max_drawdowns, marker='^', linewidth=2, color='#FF6B6B')
+        ax3.plot(series['dates'], series['max_drawdowns'], marker='^', linewidth=2, color='#FF6B6B')
         ax3.set_title('最大回撤趋势', fontsize=14, fontweight='bold')
         ax3.set_xlabel('日期', fontsize=12)
         ax3.set_ylabel('最大回撤 (%)', fontsize=12)
@@ -367,13 +439,7 @@ class StrategyEvolutionTracker:
         ax3.axhline(y=10, color='red', linestyle='--', alpha=0.7, label='警戒线(10%)')
         ax3.legend()
         
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        # 保存图表
-        chart_path = os.path.join(self.evolution_charts_dir, 'risk_metrics.png')
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, ax3, chart_path)
     
     def get_evolution_summary(self) -> Dict:
         """获取进化总结"""
@@ -490,6 +556,9 @@ class StrategyEvolutionTracker:
         try:
             summary = self.get_evolution_summary()
             
+            # 报告引用的图表按需渲染
+            self.get_evolution_charts()
+            
             # 生成HTML报告
             html_content = self._generate_html_report(summary)
             
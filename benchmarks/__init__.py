@@ -0,0 +1,4 @@
+"""
+性能基准模块
+提供本地模拟交易所与各组件的延迟/吞吐基准脚本
+"""
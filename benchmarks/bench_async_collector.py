@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+采集器延迟/吞吐基准
+对比同步 MarketDataCollector（逐个阻塞请求）与 AsyncMarketDataCollector（共享连接池并发）
+在本地模拟交易所上的表现
+
+用法:
+    python benchmarks/bench_async_collector.py --symbols 50 --rounds 3 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import ccxt
+
+from benchmarks.mock_exchange import MockExchangeServer
+from data.market_data_collector import MarketDataCollector
+from data.async_market_data_collector import AsyncMarketDataCollector, SyncMarketDataCollector
+
+
+def summarize(name: str, latencies: List[float], elapsed: float) -> Dict:
+    """汇总延迟分位数与吞吐"""
+    arr = np.asarray(latencies) * 1000
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(float(np.percentile(arr, 50)), 2),
+        'p99_ms': round(float(np.percentile(arr, 99)), 2)
+    }
+
+
+def bench_sync(server: MockExchangeServer, symbols: List[str], rounds: int) -> Dict:
+    """同步采集器：逐个请求"""
+    collector = MarketDataCollector()
+    collector.exchanges['binance'] = ccxt.binance(server.ccxt_config())
+    collector.fetch_ticker('binance', symbols[0])  # 预热：加载市场
+    
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for symbol in symbols:
+            t0 = time.perf_counter()
+            collector.fetch_ticker('binance', symbol)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    collector.cleanup()
+    return summarize('sync_sequential', latencies, elapsed)
+
+
+async def _bench_async(server: MockExchangeServer, symbols: List[str], rounds: int,
+                       limit_per_host: int) -> Dict:
+    collector = AsyncMarketDataCollector(
+        exchange_overrides={'binance': server.ccxt_config()},
+        limit_per_host=limit_per_host
+    )
+    await collector.fetch_ticker('binance', symbols[0])  # 预热：加载市场、建立连接
+    
+    latencies = []
+    
+    async def timed(symbol):
+        t0 = time.perf_counter()
+        await collector.fetch_ticker('binance', symbol)
+        latencies.append(time.perf_counter() - t0)
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(timed(s) for s in symbols))
+    elapsed = time.perf_counter() - start
+    await collector.close()
+    return summarize(f'async_pooled_{limit_per_host}', latencies, elapsed)
+
+
+def bench_async(server: MockExchangeServer, symbols: List[str], rounds: int,
+                limit_per_host: int) -> Dict:
+    """异步采集器：共享连接池并发"""
+    return asyncio.run(_bench_async(server, symbols, rounds, limit_per_host))
+
+
+def bench_facade(server: MockExchangeServer, symbols: List[str], rounds: int) -> List[Dict]:
+    """同步外观：逐个调用与批量并发"""
+    facade = SyncMarketDataCollector(exchange_overrides={'binance': server.ccxt_config()})
+    facade.fetch_ticker('binance', symbols[0])
+    
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for symbol in symbols:
+            t0 = time.perf_counter()
+            facade.fetch_ticker('binance', symbol)
+            latencies.append(time.perf_counter() - t0)
+    sequential = summarize('facade_sequential', latencies, time.perf_counter() - start)
+    
+    pairs = [('binance', s) for s in symbols]
+    batch_latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        facade.fetch_many_tickers(pairs)
+        batch_latencies.extend([time.perf_counter() - t0] * len(pairs))
+    batch = summarize('facade_batch', batch_latencies, time.perf_counter() - start)
+    
+    facade.cleanup()
+    return [sequential, batch]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集器延迟/吞吐基准')
+    parser.add_argument('--symbols', type=int, default=50, help='交易对数量')
+    parser.add_argument('--rounds', type=int, default=3, help='每种模式的轮数')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='模拟交易所延迟')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='模拟交易所抖动')
+    parser.add_argument('--limit-per-host', type=int, default=20, help='异步连接池单主机并发')
+    parser.add_argument('--output', type=str, default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+    
+    symbols = [f"SYM{i}/USDT" for i in range(args.symbols)]
+    
+    with MockExchangeServer(symbols=symbols, latency_ms=args.latency_ms,
+                            jitter_ms=args.jitter_ms) as server:
+        results = [
+            bench_sync(server, symbols, args.rounds),
+            bench_async(server, symbols, args.rounds, args.limit_per_host),
+            *bench_facade(server, symbols, args.rounds)
+        ]
+    
+    print(f"{'mode':<22}{'requests':>10}{'elapsed(s)':>12}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for r in results:
+        print(f"{r['name']:<22}{r['requests']:>10}{r['elapsed_s']:>12}{r['throughput_rps']:>10}"
+              f"{r['p50_ms']:>10}{r['p99_ms']:>10}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
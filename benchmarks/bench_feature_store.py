@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+特征存储读取延迟基准
+1000 个交易对 × 50 个特征，测量最新快照、历史时间点快照、单向量与 as-of 对齐读取的 p50/p99，
+以及单根K线增量更新指标的耗时
+
+用法:
+    python benchmarks/bench_feature_store.py --symbols 1000 --features 50 --bars 500
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from data.feature_store import FeatureStore, TIMEFRAME_MS
+from benchmarks.bench_models import synthetic_ohlcv
+
+
+def measure(name: str, func: Callable, runs: int) -> Dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    arr = np.asarray(samples) * 1000
+    return {
+        'name': name,
+        'runs': runs,
+        'p50_ms': round(float(np.percentile(arr, 50)), 4),
+        'p99_ms': round(float(np.percentile(arr, 99)), 4)
+    }
+
+
+def build_store(store: FeatureStore, n_symbols: int, n_features: int, n_bars: int, seed: int = 0):
+    """写入合成特征：每个交易对 n_bars 行 × n_features 列"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp('2024-01-01').value // 1_000_000 + np.arange(n_bars) * TIMEFRAME_MS['1m']
+    names = [f'f{i:02d}' for i in range(n_features)]
+    for s in range(n_symbols):
+        values = rng.normal(size=(n_features, n_bars))
+        store.append('bench', f'SYM{s:04d}/USDT', '1m', timestamps, dict(zip(names, values)))
+    return names, timestamps
+
+
+def main():
+    parser = argparse.ArgumentParser(description='特征存储读取延迟基准')
+    parser.add_argument('--symbols', type=int, default=1000)
+    parser.add_argument('--features', type=int, default=50)
+    parser.add_argument('--bars', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--output', type=str, default=None, help='结果输出JSON文件')
+    args = parser.parse_args()
+    
+    store = FeatureStore()
+    start = time.perf_counter()
+    names, timestamps = build_store(store, args.symbols, args.features, args.bars)
+    build_seconds = time.perf_counter() - start
+    
+    pairs = [('bench', f'SYM{s:04d}/USDT') for s in range(args.symbols)]
+    rng = np.random.default_rng(1)
+    as_of_points = timestamps[rng.integers(10, args.bars, args.runs)] + TIMEFRAME_MS['1m']
+    as_of_iter = iter(np.resize(as_of_points, args.runs * 2))
+    
+    results = [
+        measure(f'snapshot_latest_{args.symbols}x{args.features}',
+                lambda: store.get_snapshot(pairs, '1m', names), args.runs),
+        measure(f'snapshot_as_of_{args.symbols}x{args.features}',
+                lambda: store.get_snapshot(pairs, '1m', names, as_of=int(next(as_of_iter))), args.runs),
+        measure('vector_as_of',
+                lambda: store.get_vector('bench', pairs[0][1], '1m', as_of=int(as_of_points[0]),
+                                         features=names), args.runs),
+        measure(f'as_of_join_{args.bars}_points',
+                lambda: store.as_of_join('bench', pairs[0][1], '1m', timestamps, names), args.runs)
+    ]
+    
+    # 单根K线增量更新（含全部指标）与现有整窗重算的对比
+    from utils.technical_indicators import TechnicalIndicators
+    ohlcv = synthetic_ohlcv(args.bars + args.runs)
+    indicator_store = FeatureStore()
+    now = ohlcv['timestamp'].iloc[-1] + pd.Timedelta('1min')
+    indicator_store.update_from_ohlcv('bench', 'BTC/USDT', '1m', ohlcv.iloc[:args.bars], now=now)
+    candles = iter(range(args.bars, args.bars + args.runs))
+    results.append(measure('incremental_update_1_candle',
+                           lambda: indicator_store.update_from_ohlcv(
+                               'bench', 'BTC/USDT', '1m', ohlcv.iloc[next(candles):][:1], now=now),
+                           args.runs))
+    results.append(measure('recompute_100_bars',
+                           lambda: TechnicalIndicators.calculate_all_indicators(ohlcv.tail(100)), args.runs))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_store = FeatureStore(tmp)
+        build_store(disk_store, min(args.symbols, 100), args.features, args.bars)
+        start = time.perf_counter()
+        disk_store.flush()
+        flush_seconds = time.perf_counter() - start
+        reopened = FeatureStore(tmp)
+        start = time.perf_counter()
+        reopened.get_snapshot(pairs[:100], '1m', names)
+        load_seconds = time.perf_counter() - start
+    
+    report = {
+        'benchmark': 'feature_store',
+        'symbols': args.symbols,
+        'features': args.features,
+        'bars': args.bars,
+        'build_seconds': round(build_seconds, 3),
+        'flush_100_tables_seconds': round(flush_seconds, 3),
+        'cold_load_100_tables_seconds': round(load_seconds, 3),
+        'store': store.get_statistics(),
+        'results': results
+    }
+    
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
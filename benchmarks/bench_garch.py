@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+GARCH 拟合基准
+测量 10万条收益率的冷启动拟合耗时、新增一条收益率后的热启动重估耗时，以及多交易对逐个热启动拟合耗时
+
+用法:
+    python benchmarks/bench_garch.py --n-obs 100000 --symbols 50
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.garch_model import GARCHModel, fit_garch
+
+
+def simulate_garch(n: int, omega: float = 2e-6, alpha: float = 0.08, beta: float = 0.9,
+                   seed: int = 0) -> np.ndarray:
+    """模拟 GARCH(1,1) 收益率"""
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal(n)
+    returns = np.empty(n)
+    sigma2 = omega / (1 - alpha - beta)
+    eps = 0.0
+    for t in range(n):
+        sigma2 = omega + alpha * eps * eps + beta * sigma2
+        eps = np.sqrt(sigma2) * shocks[t]
+        returns[t] = eps
+    return returns
+
+
+def timed(func, repeat: int = 5) -> Dict:
+    """多次运行取中位数"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return {'median_ms': round(float(np.median(times)) * 1000, 2), 'result': result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GARCH 拟合基准')
+    parser.add_argument('--n-obs', type=int, default=100_000, help='单序列收益率数量')
+    parser.add_argument('--symbols', type=int, default=50, help='批量拟合的交易对数量')
+    parser.add_argument('--batch-obs', type=int, default=5000, help='批量拟合中每个交易对的收益率数量')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    parser.add_argument('--output', type=str, default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+    
+    returns = simulate_garch(args.n_obs + args.repeat)
+    history, arrivals = returns[:args.n_obs], returns[args.n_obs:]
+    
+    cold = timed(lambda: fit_garch(history), args.repeat)
+    
+    model = GARCHModel({'p': 1, 'q': 1, 'rolling_window': args.n_obs})
+    model.train(history)
+    arrivals_iter = iter(arrivals)
+    warm = timed(lambda: model.update(next(arrivals_iter)), args.repeat)
+    
+    batch = {f"SYM{i}/USDT": simulate_garch(args.batch_obs, seed=i + 1) for i in range(args.symbols)}
+    batch_cold = timed(lambda: {s: fit_garch(r) for s, r in batch.items()}, 1)
+    batch_model = GARCHModel({'p': 1, 'q': 1})
+    batch_first = timed(lambda: batch_model.fit_symbols(batch), 1)
+    batch_refit = timed(lambda: batch_model.fit_symbols(batch), 1)
+    
+    results = [
+        {'name': f'cold_fit_{args.n_obs}', 'median_ms': cold['median_ms'],
+         'iterations': cold['result']['iterations'],
+         'alpha': cold['result']['alpha'], 'beta': cold['result']['beta']},
+        {'name': 'warm_refit_one_return', 'median_ms': warm['median_ms'],
+         'iterations': warm['result']['iterations']},
+        {'name': f'batch_cold_{args.symbols}x{args.batch_obs}', 'median_ms': batch_cold['median_ms']},
+        {'name': f'batch_first_{args.symbols}x{args.batch_obs}', 'median_ms': batch_first['median_ms']},
+        {'name': f'batch_refit_{args.symbols}x{args.batch_obs}', 'median_ms': batch_refit['median_ms']}
+    ]
+    
+    print(f"{'case':<32}{'median(ms)':>12}")
+    for r in results:
+        print(f"{r['name']:<32}{r['median_ms']:>12}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
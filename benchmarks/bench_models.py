@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+LSTM / Transformer CPU 基准
+在合成 OHLCV 数据上测量训练吞吐（样本/秒）与推理延迟（p50/p99）
+
+用法:
+    python benchmarks/bench_models.py --bars 5000 --epochs 2 --threads 1
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.lstm_model import LSTMModel
+from models.transformer_model import TransformerModel
+
+
+def synthetic_ohlcv(n_bars: int, seed: int = 0) -> pd.DataFrame:
+    """生成合成 1分钟 OHLCV：带周期成分的几何随机游走"""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0, 0.001, n_bars) + 0.0005 * np.sin(np.arange(n_bars) / 240)
+    close = 100 * np.exp(np.cumsum(log_returns))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.0008, n_bars)) * close
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n_bars, freq='1min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.lognormal(3, 1, n_bars)
+    })
+
+
+def latency_stats(name: str, samples: List[float]) -> Dict:
+    arr = np.asarray(samples) * 1000
+    return {
+        'name': name,
+        'p50_ms': round(float(np.percentile(arr, 50)), 3),
+        'p99_ms': round(float(np.percentile(arr, 99)), 3)
+    }
+
+
+def bench_model(name: str, model, data: pd.DataFrame, sequence_length: int,
+                epochs: int, latency_runs: int) -> List[Dict]:
+    """训练吞吐与单样本/批量推理延迟"""
+    X, y = model.prepare_data(data, sequence_length)
+    split = int(len(X) * 0.8)
+    
+    model.config.update({'epochs': epochs, 'early_stopping_patience': 0})
+    start = time.perf_counter()
+    result = model.train(X[:split], y[:split], X[split:], y[split:])
+    elapsed = time.perf_counter() - start
+    trained = split * result['history']['epochs_run']
+    
+    single, batch = [], []
+    for i in range(latency_runs):
+        index = split + i % (len(X) - split - 64)
+        t0 = time.perf_counter()
+        model.predict(X[index:index + 1])
+        single.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        model.predict(X[index:index + 64])
+        batch.append(time.perf_counter() - t0)
+    
+    return [
+        {'name': f'{name}_train', 'samples': trained, 'elapsed_s': round(elapsed, 3),
+         'samples_per_sec': round(trained / elapsed, 1),
+         'final_val_loss': result['history']['val_loss'][-1]},
+        latency_stats(f'{name}_predict_1', single),
+        latency_stats(f'{name}_predict_64', batch)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LSTM / Transformer CPU 基准')
+    parser.add_argument('--bars', type=int, default=5000, help='合成K线数量')
+    parser.add_argument('--sequence-length', type=int, default=60, help='序列长度')
+    parser.add_argument('--epochs', type=int, default=2, help='训练轮数')
+    parser.add_argument('--threads', type=int, default=None, help='BLAS线程数')
+    parser.add_argument('--latency-runs', type=int, default=200, help='推理延迟采样次数')
+    parser.add_argument('--output', type=str, default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+    
+    data = synthetic_ohlcv(args.bars)
+    features = ['open', 'high', 'low', 'close', 'volume']
+    common = {'feature_columns': features, 'target_column': 'close',
+              'num_threads': args.threads, 'seed': 42}
+    
+    lstm = LSTMModel({**common, 'hidden_layers': [64, 32], 'dropout_rate': 0.1, 'batch_size': 64})
+    transformer = TransformerModel({**common, 'd_model': 64, 'n_heads': 4, 'n_layers': 2, 'd_ff': 128,
+                                    'dropout': 0.1, 'learning_rate': 0.0005, 'batch_size': 64,
+                                    'max_sequence_length': args.sequence_length})
+    
+    results = []
+    results += bench_model('lstm', lstm, data, args.sequence_length, args.epochs, args.latency_runs)
+    results += bench_model('transformer', transformer, data, args.sequence_length, args.epochs, args.latency_runs)
+    
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+冷启动基准
+在新的解释器进程中重复导入入口模块/脚本，记录导入耗时与总耗时的中位数
+
+用法:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --targets models web.data_bridge --output startup.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.startup_profiler import profile_startup
+
+DEFAULT_TARGETS = [
+    'utils.logging_manager',
+    'ai_modules',
+    'models',
+    'data',
+    'data.data_manager',
+    'utils.multi_timeframe_collector',
+    'web.data_bridge',
+    'ai_modules.auto_strategy_evolution_system',
+    'start_auto_evolution_system.py',
+    'run_high_frequency_trading.py'
+]
+
+
+def bench_target(target: str, repeat: int, top: int) -> Dict:
+    """重复冷启动一个目标，返回中位数与最慢模块"""
+    runs = []
+    for _ in range(repeat):
+        try:
+            runs.append(profile_startup(str(project_root / target) if target.endswith('.py') else target, top=top))
+        except RuntimeError as e:
+            return {'target': target, 'error': str(e).splitlines()[-1]}
+    
+    return {
+        'target': target,
+        'wall_ms_median': round(statistics.median(r['wall_ms'] for r in runs), 2),
+        'import_ms_median': round(statistics.median(r['total_import_ms'] for r in runs), 2),
+        'modules_imported': runs[-1]['modules_imported'],
+        'slowest_modules': runs[-1]['slowest_modules']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入口模块冷启动基准')
+    parser.add_argument('--targets', nargs='+', default=DEFAULT_TARGETS, help='模块名或 .py 脚本（相对项目根目录）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个目标的冷启动次数')
+    parser.add_argument('--top', type=int, default=5, help='记录的最慢模块数')
+    parser.add_argument('--output', type=str, default=None, help='结果输出JSON文件')
+    args = parser.parse_args()
+    
+    results: List[Dict] = []
+    print(f"{'target':<48} {'wall ms':>10} {'import ms':>10} {'modules':>8}")
+    for target in args.targets:
+        result = bench_target(target, args.repeat, args.top)
+        results.append(result)
+        if 'error' in result:
+            print(f"{target:<48} ❌ {result['error']}")
+        else:
+            print(f"{target:<48} {result['wall_ms_median']:>10.1f} {result['import_ms_median']:>10.1f} "
+                  f"{result['modules_imported']:>8}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results},
+                      f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
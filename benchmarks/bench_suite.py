@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+性能基准套件
+在 10k/100k/1M 根合成 OHLCV 上测量回测、技术指标、各策略信号生成、套利扫描、序列构造与一代完整进化，
+结果连同提交号与环境信息保存为 JSON，可与之前的结果对比发现性能回退
+
+用法:
+    python benchmarks/bench_suite.py                                  # 全部基准，结果写入 benchmarks/results/
+    python benchmarks/bench_suite.py --sizes 10000 --only backtest indicators
+    python benchmarks/bench_suite.py --compare benchmarks/results/suite_20240101_120000_abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 回测结果写入内存库，不污染 data/results.db
+os.environ.setdefault('RESULTS_DB_PATH', ':memory:')
+
+from benchmarks.bench_models import synthetic_ohlcv
+from data.feature_store import TIMEFRAME_MS
+from utils.timeframe_resampler import aggregate_ohlcv
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = project_root / 'benchmarks' / 'results'
+
+
+def measure(func: Callable[[], object], repeat: int, budget: float) -> Dict:
+    """
+    计时：先运行一次（预热，同时记录首次耗时），再在时间预算内最多重复 repeat 次
+    
+    Args:
+        func: 被测函数
+        repeat: 最多重复次数
+        budget: 重复阶段的时间预算（秒）
+    
+    Returns:
+        {'first_ms', 'median_ms', 'min_ms', 'runs'}
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (not samples or time.perf_counter() < deadline):
+        if first > budget and not samples:
+            break
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    
+    timings = samples or [first]
+    return {
+        'first_ms': round(first * 1000, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'runs': len(timings)
+    }
+
+
+def ohlcv_fixture(n_bars: int) -> pd.DataFrame:
+    """以时间为索引的合成 1 分钟K线"""
+    return synthetic_ohlcv(n_bars).set_index('timestamp')
+
+
+def multi_timeframe_market_data(df: pd.DataFrame) -> Dict:
+    """把 1 分钟K线聚合为各时间框架指标，构造 MultiTimeframeStrategy 所需的增强版市场数据"""
+    from utils.technical_indicators import TechnicalIndicators
+    
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy()
+    timeframes = {}
+    for timeframe in ('15m', '1h', '4h'):
+        bucket_times, aggregated, _ = aggregate_ohlcv(timestamps, values, TIMEFRAME_MS[timeframe])
+        frame = pd.DataFrame(aggregated, columns=['open', 'high', 'low', 'close', 'volume'],
+                             index=pd.to_datetime(bucket_times, unit='ms'))
+        timeframes[timeframe] = {'indicators': TechnicalIndicators.calculate_all_indicators(frame)}
+    return {'timeframes': timeframes}
+
+
+class SyntheticTickerCollector:
+    """返回合成行情的采集器，代替交易所请求"""
+    
+    def __init__(self, symbols: List[str], exchanges: List[str], seed: int = 0):
+        rng = np.random.default_rng(seed)
+        base = rng.lognormal(3, 2, len(symbols))
+        self.tickers = {}
+        for exchange in exchanges:
+            # 约 5% 的交易对在某个交易所偏离 1% 以上，产生可报告的套利机会
+            deviation = np.where(rng.random(len(symbols)) < 0.05, rng.normal(0, 0.015, len(symbols)),
+                                 rng.normal(0, 0.0005, len(symbols)))
+            for symbol, price in zip(symbols, base * (1 + deviation)):
+                self.tickers[(exchange, symbol)] = {'last': float(price), 'baseVolume': float(rng.lognormal(12, 1))}
+    
+    def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict]:
+        return self.tickers.get((exchange_name, symbol))
+
+
+def bench_backtest(df: pd.DataFrame, repeat: int, budget: float) -> List[Dict]:
+    from ai_modules.strategy_backtest_engine import StrategyBacktestEngine
+    
+    engine = StrategyBacktestEngine()
+    strategies = {
+        'trend_following': {'name': 'bench_trend_following', 'type': 'trend_following',
+                            'parameters': {'ma_short': 12, 'ma_long': 26}},
+        'mean_reversion': {'name': 'bench_mean_reversion', 'type': 'mean_reversion',
+                           'parameters': {'rsi_period': 14, 'bb_period': 20, 'bb_std': 2.0}}
+    }
+    return [
+        {'name': f'backtest.{label}', **measure(lambda s=strategy: engine.backtest_strategy(s, df), repeat, budget)}
+        for label, strategy in strategies.items()
+    ]
+
+
+def bench_indicators(df: pd.DataFrame, repeat: int, budget: float) -> List[Dict]:
+    from utils.technical_indicators import TechnicalIndicators
+    
+    return [{'name': 'indicators.calculate_all_indicators',
+             **measure(lambda: TechnicalIndicators.calculate_all_indicators(df), repeat, budget)}]
+
+
+def bench_strategies(df: pd.DataFrame, repeat: int, budget: float) -> List[Dict]:
+    from strategies import (AIEnhancedStrategy, BollingerStrategy, MACDStrategy, MACrossoverStrategy,
+                            RSIStrategy)
+    from strategies.high_frequency_strategy import HighFrequencyStrategy
+    from strategies.multi_timeframe_strategy import MultiTimeframeStrategy
+    
+    market_data = {'close': df['close'].tolist(), 'high': df['high'].tolist(),
+                   'low': df['low'].tolist(), 'volume': df['volume'].tolist()}
+    results = []
+    for strategy in (MACrossoverStrategy(), RSIStrategy(), MACDStrategy(), BollingerStrategy(), AIEnhancedStrategy()):
+        name = f'strategy.{type(strategy).__name__}.generate_signals'
+        # 策略内部异常会被捕获为 “错误: ...” 的无信号结果，计时的只是异常路径，不计入结果
+        reason = str(strategy.generate_signals(market_data).get('reason', ''))
+        if reason.startswith('错误'):
+            results.append({'name': name, 'failed': reason, 'first_ms': None, 'median_ms': None,
+                            'min_ms': None, 'runs': 0})
+            continue
+        results.append({'name': name, **measure(lambda s=strategy: s.generate_signals(market_data), repeat, budget)})
+    
+    mtf_data = multi_timeframe_market_data(df)
+    mtf = MultiTimeframeStrategy()
+    results.append({'name': 'strategy.MultiTimeframeStrategy.generate_signals',
+                    **measure(lambda: mtf.generate_signals(mtf_data), repeat, budget)})
+    
+    hf = HighFrequencyStrategy()
+    results.append({'name': 'strategy.HighFrequencyStrategy.should_long',
+                    **measure(lambda: hf.should_long(df), repeat, budget)})
+    results.append({'name': 'strategy.HighFrequencyStrategy.should_short',
+                    **measure(lambda: hf.should_short(df), repeat, budget)})
+    return results
+
+
+def bench_sequences(df: pd.DataFrame, repeat: int, budget: float) -> List[Dict]:
+    from utils.data_processor import DataProcessor
+    
+    processor = DataProcessor()
+    return [{'name': 'data_processor.create_sequences',
+             **measure(lambda: processor.create_sequences(df, 60), repeat, budget)}]
+
+
+def bench_scanner(n_symbols: int, repeat: int, budget: float) -> List[Dict]:
+    from utils.arbitrage_scanner import ArbitrageScanner
+    
+    symbols = [f'SYM{i}/USDT' for i in range(n_symbols)]
+    exchanges = ['binance', 'okx', 'bitget']
+    scanner = ArbitrageScanner(SyntheticTickerCollector(symbols, exchanges))
+    return [{'name': 'arbitrage_scanner.scan_all_symbols', 'symbols': n_symbols,
+             **measure(lambda: scanner.scan_all_symbols(symbols, exchanges), repeat, budget)}]
+
+
+def bench_evolution_generation(n_bars: int, repeat: int, budget: float) -> List[Dict]:
+    """一代完整进化：选择/交叉/变异 + 整个种群回测评估 + 状态更新"""
+    from ai_modules.auto_strategy_evolution_system import AutoStrategyEvolutionSystem
+    
+    system = AutoStrategyEvolutionSystem()
+    system.market_data_cache = synthetic_ohlcv(n_bars, seed=1).set_index('timestamp')
+    system.last_market_data_update = datetime.now()
+    
+    def generation():
+        system._evolve_strategies()
+        system._evaluate_strategies()
+        system._update_evolution_state()
+    
+    return [{'name': 'evolution.generation', 'bars': n_bars,
+             'population': system.config.population_size, **measure(generation, repeat, budget)}]
+
+
+SIZED_BENCHMARKS = {
+    'backtest': bench_backtest,
+    'indicators': bench_indicators,
+    'strategies': bench_strategies,
+    'sequences': bench_sequences
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    与基线结果对比
+    
+    Args:
+        current: 本次结果
+        baseline: 基线结果
+        threshold: median 变慢超过该倍数视为回退
+    
+    Returns:
+        回退的基准列表（任一方运行失败的基准不参与对比）
+    """
+    def key(result):
+        return result['name'], result.get('bars'), result.get('symbols')
+    
+    previous = {key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\n📊 对比基线 {baseline.get('commit')} ({baseline.get('timestamp')})")
+    for result in current['results']:
+        old = previous.get(key(result))
+        if old is None or not old['median_ms'] or result.get('failed') or old.get('failed'):
+            continue
+        ratio = result['median_ms'] / old['median_ms']
+        flag = '🔴' if ratio > threshold else ('🟢' if ratio < 1 / threshold else '  ')
+        label = f"{result['name']} [{result.get('bars') or result.get('symbols')}]"
+        print(f"{flag} {label:<70} {old['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} ms  x{ratio:.2f}")
+        if ratio > threshold:
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能基准套件')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help='K线数量')
+    parser.add_argument('--only', nargs='+', default=None,
+                        choices=list(SIZED_BENCHMARKS) + ['scanner', 'evolution'], help='只运行部分基准')
+    parser.add_argument('--repeat', type=int, default=5, help='每项最多重复次数（不含预热）')
+    parser.add_argument('--budget', type=float, default=20.0, help='每项重复阶段的时间预算（秒）')
+    parser.add_argument('--scanner-symbols', nargs='+', type=int, default=[100, 1000], help='套利扫描的交易对数量')
+    parser.add_argument('--evolution-bars', type=int, default=2000, help='进化评估使用的K线数量')
+    parser.add_argument('--output', type=str, default=None, help='结果JSON路径，默认写入 benchmarks/results/')
+    parser.add_argument('--compare', type=str, default=None, help='对比的基线结果JSON')
+    parser.add_argument('--threshold', type=float, default=1.2, help='判定回退的变慢倍数')
+    args = parser.parse_args()
+    
+    selected = args.only or list(SIZED_BENCHMARKS) + ['scanner', 'evolution']
+    results: List[Dict] = []
+    
+    def report(new_results: List[Dict], size_label: str):
+        for result in new_results:
+            if result.get('failed'):
+                print(f"{result['name']:<58} {size_label:>10} ❌ {result['failed']}")
+                continue
+            print(f"{result['name']:<58} {size_label:>10} {result['median_ms']:>12.3f} ms "
+                  f"(min {result['min_ms']:.3f}, runs {result['runs']})")
+        results.extend(new_results)
+    
+    # 进化系统会在工作目录下创建 data/、models/ 子目录，放到临时目录中
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        
+        for n_bars in args.sizes:
+            df = ohlcv_fixture(n_bars)
+            for name in selected:
+                if name in SIZED_BENCHMARKS:
+                    report([{**r, 'bars': n_bars} for r in SIZED_BENCHMARKS[name](df, args.repeat, args.budget)],
+                           f'{n_bars} bars')
+        
+        if 'scanner' in selected:
+            for n_symbols in args.scanner_symbols:
+                report(bench_scanner(n_symbols, args.repeat, args.budget), f'{n_symbols} syms')
+        
+        if 'evolution' in selected:
+            report(bench_evolution_generation(args.evolution_bars, args.repeat, args.budget),
+                   f'{args.evolution_bars} bars')
+        
+        os.chdir(project_root)
+    
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {'sizes': args.sizes, 'repeat': args.repeat, 'budget': args.budget},
+        'results': results
+    }
+    
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 结果已保存: {output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(run, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n🔴 {len(regressions)} 项性能回退")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+多时间框架读取延迟基准：阻塞刷新 vs 旧值返回+后台刷新 vs 收盘调度刷新
+模拟交易所每次 REST 请求有固定延迟，周期缩短为数秒以便在短时间内跨越多个“收盘”时刻，
+统计策略循环读取 get_multi_timeframe_data 的 p50/p99/p99.9/最大延迟
+
+用法:
+    python benchmarks/bench_swr.py --symbols 20 --period 2 --duration 12 --latency-ms 50
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from data.feature_store import FeatureStore
+from utils.multi_timeframe_collector import MultiTimeframeCollector
+from benchmarks.bench_models import synthetic_ohlcv
+
+
+class SlowCollector:
+    """固定延迟的模拟行情源"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.frame = synthetic_ohlcv(100)
+        self.requests = 0
+        self._lock = threading.Lock()
+    
+    def fetch_ohlcv(self, exchange: str, symbol: str, timeframe: str, limit: int):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+        return self.frame.tail(limit)
+
+
+def run_mode(mode: str, args) -> Dict:
+    source = SlowCollector(args.latency_ms / 1000)
+    collector = MultiTimeframeCollector(source, feature_store=FeatureStore(), derive_timeframes=False,
+                                        stale_while_revalidate=mode != 'blocking')
+    collector.timeframe_seconds = {'1m': args.period}
+    collector.cache_expiry['1m'] = args.period
+    collector.refresh_delay = 0.1
+    collector.refresh_grace = 0.5
+    if mode == 'scheduler':
+        collector.start_refresh_scheduler(max_workers=args.symbols)
+    
+    symbols = [f'SYM{i:03d}/USDT' for i in range(args.symbols)]
+    for symbol in symbols:
+        collector.get_multi_timeframe_data('bench', symbol, ['1m'])
+    
+    latencies: List[float] = []
+    lock = threading.Lock()
+    deadline = time.time() + args.duration
+    
+    def reader(symbol: str):
+        samples = []
+        while time.time() < deadline:
+            start = time.perf_counter()
+            collector.get_multi_timeframe_data('bench', symbol, ['1m'])
+            samples.append(time.perf_counter() - start)
+            time.sleep(args.interval_ms / 1000)
+        with lock:
+            latencies.extend(samples)
+    
+    threads = [threading.Thread(target=reader, args=(s,)) for s in symbols]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    collector.stop_refresh_scheduler()
+    
+    arr = np.asarray(latencies) * 1000
+    return {
+        'mode': mode,
+        'reads': len(arr),
+        'p50_ms': round(float(np.percentile(arr, 50)), 4),
+        'p99_ms': round(float(np.percentile(arr, 99)), 4),
+        'p999_ms': round(float(np.percentile(arr, 99.9)), 4),
+        'max_ms': round(float(arr.max()), 4),
+        'rest_requests': source.requests,
+        'stale_hits': collector.cache.stale_hits
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多时间框架读取延迟基准')
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--period', type=float, default=2.0, help='模拟K线周期（秒）')
+    parser.add_argument('--duration', type=float, default=12.0, help='每种模式运行时间（秒）')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='模拟REST请求延迟')
+    parser.add_argument('--interval-ms', type=float, default=100.0, help='策略循环读取间隔')
+    parser.add_argument('--modes', type=str, default='blocking,swr,scheduler')
+    parser.add_argument('--output', type=str, default=None, help='结果输出JSON文件')
+    args = parser.parse_args()
+    
+    report = {
+        'benchmark': 'multi_timeframe_swr',
+        'symbols': args.symbols,
+        'period_seconds': args.period,
+        'latency_ms': args.latency_ms,
+        'results': [run_mode(mode, args) for mode in args.modes.split(',')]
+    }
+    
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
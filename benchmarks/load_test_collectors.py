@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+采集器压测
+在本地模拟交易所（benchmarks/mock_exchange.py）上用多个线程持续调用
+MarketDataCollector / MultiExchangePriceCollector / DerivativesDataCollector / RealTimeDataManager，
+并直接订阅模拟交易所的 WebSocket 行情，测量请求吞吐、调用延迟与端到端新鲜度
+（消费方拿到某个价格时，距模拟交易所发布该价格过了多久）
+
+用法:
+    python benchmarks/load_test_collectors.py --duration 10 --workers 8
+    python benchmarks/load_test_collectors.py --scenarios market_data --rate-limit 50 --ban-after 20 --failure-rate 0.02
+    python benchmarks/load_test_collectors.py --recording data/journal/prices --latency-ms 30 --jitter-ms 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import aiohttp
+import ccxt
+
+from benchmarks.mock_exchange import MockExchangeServer, default_symbols, load_price_recording
+
+SCENARIOS = ['market_data', 'multi_exchange', 'derivatives', 'realtime', 'websocket']
+
+# RealTimeDataManager._update_price_data 刷新的交易对
+REALTIME_SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'SOL/USDT']
+
+
+def percentile_ms(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+def summarize(name: str, run: Dict, server_delta: Counter) -> Dict:
+    """汇总吞吐、延迟分位数、新鲜度分位数与模拟交易所侧的状态码"""
+    elapsed = run['elapsed']
+    requests = server_delta.get('requests', 0)
+    return {
+        'name': name,
+        'ops': run['ops'],
+        'errors': run['errors'],
+        'elapsed_s': round(elapsed, 3),
+        'ops_per_s': round(run['ops'] / elapsed, 1) if elapsed > 0 else 0.0,
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 1) if elapsed > 0 else 0.0,
+        'http_429': server_delta.get('429', 0),
+        'http_418': server_delta.get('418', 0),
+        'http_503': server_delta.get('503', 0),
+        'latency_p50_ms': percentile_ms(run['latencies'], 50),
+        'latency_p99_ms': percentile_ms(run['latencies'], 99),
+        'freshness_p50_ms': percentile_ms(run['freshness'], 50),
+        'freshness_p95_ms': percentile_ms(run['freshness'], 95),
+        'freshness_p99_ms': percentile_ms(run['freshness'], 99),
+        'freshness_max_ms': round(max(run['freshness']) * 1000, 2) if run['freshness'] else None,
+        **run.get('extra', {})
+    }
+
+
+def run_load(duration: float, workers: int, op: Callable[[random.Random], Optional[List[float]]],
+             seed: int = 0) -> Dict:
+    """
+    多线程持续执行 op 直到 duration 结束
+    
+    Args:
+        duration: 压测时长（秒）
+        workers: 线程数
+        op: 单次操作，返回本次观察到的新鲜度样本（秒），None 表示失败
+        seed: 随机种子
+    
+    Returns:
+        {'ops', 'errors', 'latencies', 'freshness', 'elapsed'}
+    """
+    lock = threading.Lock()
+    result = {'ops': 0, 'errors': 0, 'latencies': [], 'freshness': []}
+    deadline = time.perf_counter() + duration
+    
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            samples = op(rng)
+            latency = time.perf_counter() - t0
+            with lock:
+                result['ops'] += 1
+                result['latencies'].append(latency)
+                if samples is None:
+                    result['errors'] += 1
+                else:
+                    result['freshness'].extend(samples)
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), name=f'load-{i}') for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def freshness(server: MockExchangeServer, venue: str, symbol: str, value: Optional[float],
+              kind: str = 'last') -> List[float]:
+    """消费方当前看到的价格距其发布的时间（秒），无法对应到发布记录时不产生样本"""
+    published = server.served_at(venue, symbol, value, kind)
+    return [] if published is None else [time.time() - published]
+
+
+def attach_mock_exchanges(collector, server: MockExchangeServer, venues: List[str], client_throttle: bool):
+    """
+    把采集器的交易所连接替换为指向模拟交易所的 ccxt 实例
+    
+    先走采集器自己的 initialize_exchange 以保留其限频配置（rate_limits），再替换连接；
+    预热请求应在 server.faults_suspended() 中进行。
+    """
+    for venue in venues:
+        collector.initialize_exchange(venue)
+        exchange = ccxt.binance(server.ccxt_config(venue))
+        exchange.load_markets()
+        collector.exchanges[venue] = exchange
+    if not client_throttle:
+        collector.rate_limits.clear()
+
+
+def scenario_market_data(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    """MarketDataCollector：ticker / K线 / 订单簿随机混合"""
+    from data.market_data_collector import MarketDataCollector
+    
+    collector = MarketDataCollector()
+    with server.faults_suspended():
+        attach_mock_exchanges(collector, server, server.venues, args.client_throttle)
+    
+    def op(rng: random.Random) -> Optional[List[float]]:
+        venue = rng.choice(server.venues)
+        symbol = rng.choice(symbols)
+        kind = rng.choice(args.market_ops)
+        if kind == 'ticker':
+            ticker = collector.fetch_ticker(venue, symbol)
+            return None if ticker is None else freshness(server, venue, symbol, ticker['last'])
+        if kind == 'ohlcv':
+            return None if collector.fetch_ohlcv(venue, symbol, '1m', limit=100) is None else []
+        return None if collector.fetch_order_book(venue, symbol, 20) is None else []
+    
+    return run_load(args.duration, args.workers, op, args.seed)
+
+
+def scenario_multi_exchange(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    """MultiExchangePriceCollector.fetch_all_prices：逐个交易所取价，新鲜度反映跨所快照的时间差"""
+    from data.multi_exchange_price_collector import MultiExchangePriceCollector
+    
+    collector = MultiExchangePriceCollector()
+    collector.supported_exchanges = list(server.venues)
+    with server.faults_suspended():
+        attach_mock_exchanges(collector, server, server.venues, args.client_throttle)
+    
+    def op(rng: random.Random) -> Optional[List[float]]:
+        symbol = rng.choice(symbols)
+        data = collector.fetch_all_prices(symbol)
+        if data['exchange_count'] < len(server.venues):
+            return None
+        samples = []
+        for price in data['prices']:
+            samples.extend(freshness(server, price['exchange'], symbol, price['last']))
+        return samples
+    
+    return run_load(args.duration, args.workers, op, args.seed)
+
+
+def scenario_derivatives(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    """DerivativesDataCollector.get_batch_derivatives_data：新鲜度按资金费率中的标记价格计算"""
+    from data.market_data_collector import MarketDataCollector
+    from utils.derivatives_collector import DerivativesDataCollector
+    
+    base_collector = MarketDataCollector()
+    with server.faults_suspended():
+        attach_mock_exchanges(base_collector, server, server.venues, args.client_throttle)
+    collector = DerivativesDataCollector(base_collector)
+    if args.derivatives_ttl is not None:
+        collector.cache_expiry = {metric: args.derivatives_ttl for metric in collector.cache_expiry}
+    
+    def op(rng: random.Random) -> Optional[List[float]]:
+        batch = rng.sample(symbols, min(args.derivatives_batch, len(symbols)))
+        pairs = [(venue, symbol) for venue in server.venues for symbol in batch]
+        results = collector.get_batch_derivatives_data(pairs, include_history=args.derivatives_history)
+        if len(results) < len(pairs):
+            return None
+        samples = []
+        for venue, symbol in pairs:
+            funding = results[f"{venue}_{symbol}"].get('funding_rate') or {}
+            samples.extend(freshness(server, venue, symbol, funding.get('mark_price'), 'mark'))
+        return samples
+    
+    return run_load(args.duration, args.workers, op, args.seed)
+
+
+def scenario_realtime(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    """RealTimeDataManager：后台按间隔刷新价格缓存，读取方并发读取，新鲜度含缓存滞后"""
+    from web.real_time_data_manager import RealTimeDataManager
+    
+    manager = RealTimeDataManager()
+    manager.exchanges = {}
+    with server.faults_suspended():
+        for venue in server.venues:
+            exchange = ccxt.binance(server.ccxt_config(venue))
+            exchange.load_markets()
+            manager.exchanges[venue] = exchange
+    
+    stop = threading.Event()
+    
+    def refresh():
+        while not stop.is_set():
+            manager._update_price_data()
+            stop.wait(args.realtime_interval)
+    
+    refresher = threading.Thread(target=refresh, name='realtime-refresh', daemon=True)
+    refresher.start()
+    
+    def op(rng: random.Random) -> Optional[List[float]]:
+        venue = rng.choice(server.venues)
+        symbol = rng.choice(REALTIME_SYMBOLS)
+        data = manager.get_price_data(symbol, venue)
+        return None if data is None else freshness(server, venue, symbol, data['last'])
+    
+    try:
+        return run_load(args.duration, args.workers, op, args.seed)
+    finally:
+        stop.set()
+        refresher.join(timeout=30)
+
+
+async def _websocket_load(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    result = {'ops': 0, 'errors': 0, 'latencies': [], 'freshness': [], 'extra': {'reconnects': 0}}
+    deadline = time.perf_counter() + args.duration
+    streams = [f"{symbol.replace('/', '').lower()}@ticker" for symbol in symbols]
+    
+    async def client(index: int, session: aiohttp.ClientSession):
+        venue = server.venues[index % len(server.venues)]
+        while time.perf_counter() < deadline:
+            try:
+                async with session.ws_connect(server.ws_url(venue)) as ws:
+                    await ws.send_json({'method': 'SUBSCRIBE', 'params': streams, 'id': index})
+                    while time.perf_counter() < deadline:
+                        try:
+                            msg = await ws.receive(timeout=max(0.01, deadline - time.perf_counter()))
+                        except asyncio.TimeoutError:
+                            break
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        received = time.time()
+                        event = json.loads(msg.data)
+                        if 'E' in event:
+                            result['ops'] += 1
+                            result['freshness'].append(received - event['E'] / 1000)
+                if time.perf_counter() < deadline:
+                    result['extra']['reconnects'] += 1
+            except aiohttp.ClientError:
+                result['errors'] += 1
+                await asyncio.sleep(0.1)
+    
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(i, session) for i in range(args.ws_clients)))
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def scenario_websocket(server: MockExchangeServer, args, symbols: List[str]) -> Dict:
+    """行情推送：多个客户端订阅全部交易对的 ticker 流，ops 为收到的消息数"""
+    return asyncio.run(_websocket_load(server, args, symbols))
+
+
+SCENARIO_RUNNERS = {
+    'market_data': scenario_market_data,
+    'multi_exchange': scenario_multi_exchange,
+    'derivatives': scenario_derivatives,
+    'realtime': scenario_realtime,
+    'websocket': scenario_websocket
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集器压测')
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS, help='压测场景')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个场景的时长（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='并发线程数')
+    parser.add_argument('--venues', nargs='+', default=['binance', 'okx', 'bitget'], help='模拟的交易所')
+    parser.add_argument('--symbols', type=int, default=20, help='交易对数量（前10个为主流交易对）')
+    parser.add_argument('--recording', type=str, default=None,
+                        help='价格日志目录，使用录制行情（交易所与交易对取自录制数据）')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='模拟交易所延迟')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='模拟交易所抖动')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='模拟交易所每秒请求上限（每个交易所），0为不限')
+    parser.add_argument('--ban-after', type=int, default=0, help='60秒内累计多少次429后封禁（418），0为不封禁')
+    parser.add_argument('--ban-seconds', type=float, default=10.0, help='封禁时长（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='请求返回503 / 推送断开的概率')
+    parser.add_argument('--ws-interval-ms', type=float, default=100.0, help='推送间隔（毫秒）')
+    parser.add_argument('--ws-clients', type=int, default=4, help='推送客户端数')
+    parser.add_argument('--market-ops', nargs='+', default=['ticker', 'ohlcv', 'order_book'],
+                        choices=['ticker', 'ohlcv', 'order_book'], help='market_data 场景的操作')
+    parser.add_argument('--derivatives-batch', type=int, default=5, help='derivatives 场景每次批量的交易对数')
+    parser.add_argument('--derivatives-ttl', type=float, default=None,
+                        help='覆盖衍生品缓存TTL（秒），0表示每次都请求；默认使用采集器自身配置')
+    parser.add_argument('--derivatives-history', action='store_true', help='derivatives 场景包含历史与指标')
+    parser.add_argument('--realtime-interval', type=float, default=1.0,
+                        help='realtime 场景的刷新间隔（秒），与 RealTimeDataManager 数据线程一致')
+    parser.add_argument('--no-client-throttle', dest='client_throttle', action='store_false',
+                        help='关闭采集器自身的请求间隔限制，测量原始吞吐')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--verbose', action='store_true', help='保留采集器日志输出')
+    parser.add_argument('--output', type=str, default=None, help='结果JSON输出路径')
+    args = parser.parse_args()
+    
+    recording = load_price_recording(args.recording) if args.recording else None
+    output = Path(args.output).resolve() if args.output else None
+    server = MockExchangeServer(
+        symbols=None if recording is not None else default_symbols(args.symbols),
+        venues=None if recording is not None else args.venues,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed,
+        rate_limit=args.rate_limit, ban_after=args.ban_after, ban_seconds=args.ban_seconds,
+        failure_rate=args.failure_rate, ws_interval_ms=args.ws_interval_ms, recording=recording
+    )
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    
+    results = []
+    # 采集器会在工作目录下创建 data/ 子目录，放到临时目录中
+    with tempfile.TemporaryDirectory() as workdir, server:
+        os.chdir(workdir)
+        for name in args.scenarios:
+            server.reset_rate_limits()
+            before = Counter(server.stats)
+            with contextlib.ExitStack() as stack:
+                # 衍生品采集器用 print 输出错误，压测时与日志一起屏蔽
+                if not args.verbose:
+                    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+                run = SCENARIO_RUNNERS[name](server, args, server.symbols)
+            results.append(summarize(name, run, Counter(server.stats) - before))
+        os.chdir(project_root)
+    
+    print(f"{'scenario':<16}{'ops/s':>10}{'req/s':>10}{'errors':>8}{'429':>6}{'418':>6}{'503':>6}"
+          f"{'lat p50':>10}{'lat p99':>10}{'fresh p50':>11}{'fresh p99':>11}{'fresh max':>11}")
+    for r in results:
+        print(f"{r['name']:<16}{r['ops_per_s']:>10}{r['requests_per_s']:>10}{r['errors']:>8}"
+              f"{r['http_429']:>6}{r['http_418']:>6}{r['http_503']:>6}"
+              f"{str(r['latency_p50_ms']):>10}{str(r['latency_p99_ms']):>10}"
+              f"{str(r['freshness_p50_ms']):>11}{str(r['freshness_p99_ms']):>11}{str(r['freshness_max_ms']):>11}")
+    
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
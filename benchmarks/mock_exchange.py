@@ -0,0 +1,745 @@
+"""
+本地模拟交易所服务（HTTP + WebSocket）
+以 Binance 现货与U本位合约的 REST / 行情推送格式提供合成或录制的行情：
+ticker、K线、订单簿、成交、资金费率、持仓量。
+
+每个模拟交易所挂在 /<venue>/ 前缀下（根路径对应第一个交易所），ccxt.binance 通过
+ccxt_config(venue) 指向对应前缀即可使用；可配置延迟、抖动、限频（429 / 418 封禁）与故障率，
+供采集器基准与压测离线使用。served_at() 返回某个价格被发布的时间，用于计算端到端新鲜度。
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from aiohttp import WSCloseCode, WSMsgType, web
+
+# 主流交易对（与 MultiExchangePriceCollector / RealTimeDataManager 使用的一致）
+MAJOR_SYMBOLS = [
+    'BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'ADA/USDT', 'SOL/USDT',
+    'XRP/USDT', 'DOT/USDT', 'DOGE/USDT', 'AVAX/USDT', 'MATIC/USDT'
+]
+
+PERIOD_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+FUNDING_INTERVAL_MS = 8 * 3_600_000
+
+
+def default_symbols(count: int = 100) -> List[str]:
+    """主流交易对 + SYMn/USDT 补足到 count 个"""
+    symbols = MAJOR_SYMBOLS[:count]
+    return symbols + [f"SYM{i}/USDT" for i in range(len(symbols), count)]
+
+
+def period_ms(period: str) -> int:
+    """'1m' / '4h' / '1d' -> 毫秒"""
+    return int(period[:-1]) * PERIOD_UNITS_MS[period[-1]]
+
+
+def load_price_recording(journal_dir: Union[str, Path], start=None, end=None):
+    """
+    读取 MultiExchangePriceCollector 写入的价格日志，作为模拟交易所的录制行情
+    
+    Args:
+        journal_dir: 价格日志目录（默认 data/journal/prices）
+        start: 起始时间
+        end: 结束时间
+    
+    Returns:
+        DataFrame（timestamp, exchange, symbol, last, ...）
+    """
+    from data.record_journal import PRICE_SCHEMA, RecordJournal
+    
+    if not Path(journal_dir).is_dir():
+        raise FileNotFoundError(f"价格日志目录不存在: {journal_dir}")
+    return RecordJournal(journal_dir, PRICE_SCHEMA).read_frame(start, end)
+
+
+class MockExchangeServer:
+    """Binance兼容的本地模拟交易所（后台线程运行）"""
+    
+    def __init__(self, symbols: Optional[List[str]] = None, host: str = '127.0.0.1',
+                 port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 seed: int = 42, venues: Optional[List[str]] = None,
+                 rate_limit: float = 0.0, ban_after: int = 0, ban_seconds: float = 60.0,
+                 failure_rate: float = 0.0, ws_interval_ms: float = 100.0,
+                 recording=None):
+        """
+        初始化模拟交易所
+        
+        Args:
+            symbols: 交易对列表，默认为主流交易对加 SYMn/USDT 共100个（有录制数据时取录制中的交易对）
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            latency_ms: 每个请求 / 每批推送的固定延迟（毫秒）
+            jitter_ms: 随机抖动上限（毫秒）
+            seed: 随机种子
+            venues: 模拟的交易所名称，默认 ['binance']（有录制数据时取录制中的交易所）
+            rate_limit: 每个交易所每秒允许的请求数，超出返回429，0表示不限
+            ban_after: 60秒内累计多少次429后封禁（返回418），0表示不封禁
+            ban_seconds: 封禁时长（秒）
+            failure_rate: 请求返回503 / 推送连接被断开的概率
+            ws_interval_ms: WebSocket 推送间隔（毫秒）
+            recording: 录制行情 DataFrame（timestamp, exchange, symbol, last），见 load_price_recording
+        """
+        if recording is not None and len(recording):
+            symbols = symbols or sorted(recording['symbol'].unique())
+            venues = venues or sorted(recording['exchange'].unique())
+        
+        self.symbols = symbols or default_symbols()
+        self.venues = venues or ['binance']
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.ban_after = ban_after
+        self.ban_seconds = ban_seconds
+        self.failure_rate = failure_rate
+        self.ws_interval_ms = ws_interval_ms
+        self.random = random.Random(seed)
+        
+        # 交易所市场id（BTCUSDT） -> 统一symbol
+        self.markets = {s.replace('/', ''): s for s in self.symbols}
+        self.base_prices = {
+            market_id: 10 ** self.random.uniform(-2, 4) for market_id in self.markets
+        }
+        self.base_open_interest = {
+            market_id: 10 ** self.random.uniform(3, 6) for market_id in self.markets
+        }
+        self.phases = {
+            market_id: (zlib.crc32(market_id.encode()) % 1000) / 1000 * 2 * math.pi
+            for market_id in self.markets
+        }
+        # 各交易所相对价差（±0.1%），第一个交易所为基准
+        self.venue_bias = {
+            venue: 1.0 if i == 0 else 1 + self.random.uniform(-0.001, 0.001)
+            for i, venue in enumerate(self.venues)
+        }
+        
+        # 录制行情：(venue, 市场id) -> (时间戳秒, 价格)，从服务启动起循环回放
+        self._recorded: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._record_start = 0.0
+        self._record_span = 1.0
+        self._clock_start = time.time()
+        if recording is not None and len(recording):
+            self._load_recording(recording)
+        
+        # 已发布的价格：(venue, 市场id, 类型) -> [(价格, 发布时间)]
+        self._served: Dict[Tuple[str, str, str], deque] = defaultdict(lambda: deque(maxlen=256))
+        self._served_lock = threading.Lock()
+        
+        # 限频状态：venue -> 令牌桶
+        self._throttle = {}
+        self.reset_rate_limits()
+        
+        # 统计
+        self.request_count = 0
+        self.stats = Counter()
+        
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+    
+    def _load_recording(self, recording):
+        """按 (交易所, 交易对) 整理录制行情"""
+        times = recording['timestamp'].values.astype('datetime64[ms]').astype(np.int64) / 1000
+        self._record_start = float(times.min())
+        self._record_span = max(float(times.max()) - self._record_start, 1.0)
+        for (venue, symbol), group in recording.assign(_t=times).groupby(['exchange', 'symbol']):
+            group = group.sort_values('_t')
+            self._recorded[(venue, symbol.replace('/', ''))] = (
+                group['_t'].to_numpy(dtype=float), group['last'].to_numpy(dtype=float)
+            )
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    def venue_url(self, venue: Optional[str] = None) -> str:
+        """交易所的REST基础地址"""
+        return f"{self.base_url}/{venue}" if venue else self.base_url
+    
+    def ws_url(self, venue: Optional[str] = None, futures: bool = False) -> str:
+        """
+        交易所的行情推送地址
+        
+        ccxt.pro 按地址中是否含 /stream 区分现货与合约（对应 stream / fstream 域名），这里用路径模拟
+        """
+        return self.venue_url(venue).replace('http://', 'ws://', 1) + ('/fstream/ws' if futures else '/stream/ws')
+    
+    def ccxt_config(self, venue: Optional[str] = None) -> Dict:
+        """
+        指向本服务的ccxt binance配置（ccxt.pro.binance 同样适用）
+        
+        Args:
+            venue: 模拟交易所名称，None 表示根路径（第一个交易所）
+        """
+        base = self.venue_url(venue)
+        ws = self.ws_url(venue)
+        fws = self.ws_url(venue, futures=True)
+        return {
+            'urls': {'api': {
+                'public': f"{base}/api/v3",
+                'fapiPublic': f"{base}/fapi/v1",
+                'fapiPublicV2': f"{base}/fapi/v2",
+                'fapiPublicV3': f"{base}/fapi/v3",
+                'fapiData': f"{base}/futures/data",
+                'ws': {'spot': ws, 'margin': ws, 'future': fws}
+            }},
+            'options': {'fetchMarkets': {'types': ['spot', 'linear']}},
+            'enableRateLimit': False
+        }
+    
+    def reset_rate_limits(self):
+        """清空各交易所的限频与封禁状态"""
+        self._throttle = {
+            venue: {'tokens': self.rate_limit, 'updated': time.monotonic(), 'violations': deque(), 'banned_until': 0.0}
+            for venue in self.venues
+        }
+    
+    @contextlib.contextmanager
+    def faults_suspended(self):
+        """暂停限频与故障注入（如压测前加载市场的预热阶段）"""
+        saved = self.rate_limit, self.failure_rate
+        self.rate_limit, self.failure_rate = 0.0, 0.0
+        try:
+            yield self
+        finally:
+            self.rate_limit, self.failure_rate = saved
+    
+    def _price(self, venue: str, market_id: str, t: Optional[float] = None) -> float:
+        """价格：有录制数据时按录制回放，否则为确定性的合成价格（随时间缓慢波动）"""
+        t = time.time() if t is None else t
+        recorded = self._recorded.get((venue, market_id))
+        if recorded is not None:
+            times, prices = recorded
+            replay_t = self._record_start + (t - self._clock_start) % self._record_span
+            return float(np.interp(replay_t, times, prices))
+        base = self.base_prices[market_id] * self.venue_bias[venue]
+        return base * (1 + 0.01 * math.sin(t / 60 + self.phases[market_id]))
+    
+    def _funding_rate(self, market_id: str, t: float) -> float:
+        return 0.0001 + 0.0003 * math.sin(t / 28800 + self.phases[market_id])
+    
+    def _open_interest(self, venue: str, market_id: str, t: float) -> float:
+        base = self.base_open_interest[market_id] * self.venue_bias[venue]
+        return base * (1 + 0.05 * math.sin(t / 3600 + self.phases[market_id]))
+    
+    def _publish(self, venue: str, market_id: str, kind: str, value: float, t: float) -> str:
+        """格式化价格并登记发布时间"""
+        text = f"{value:.8f}"
+        with self._served_lock:
+            self._served[(venue, market_id, kind)].append((float(text), t))
+        return text
+    
+    def served_at(self, venue: str, symbol: str, value: float, kind: str = 'last') -> Optional[float]:
+        """
+        查询某个价格的发布时间
+        
+        Args:
+            venue: 交易所
+            symbol: 统一symbol（BTC/USDT、BTC/USDT:USDT）或市场id
+            value: 采集器拿到的价格
+            kind: 'last'（ticker / 推送成交价）或 'mark'（标记价格）
+        
+        Returns:
+            发布时间（time.time()），最近未发布过该价格时返回None
+        """
+        if value is None:
+            return None
+        market_id = symbol.split(':')[0].replace('/', '')
+        with self._served_lock:
+            served = list(self._served.get((venue, market_id, kind), ()))
+        for price, t in reversed(served):
+            if abs(price - value) <= abs(value) * 1e-12:
+                return t
+        return None
+    
+    async def _sleep_latency(self):
+        """模拟网络与撮合延迟"""
+        delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+    
+    @staticmethod
+    def _error(status: int, code: int, msg: str, retry_after: Optional[float] = None) -> web.Response:
+        headers = {'Retry-After': str(max(1, math.ceil(retry_after)))} if retry_after else None
+        return web.json_response({'code': code, 'msg': msg}, status=status, headers=headers)
+    
+    def _check_rate_limit(self, venue: str) -> Optional[web.Response]:
+        """令牌桶限频：超出返回429，60秒内累计 ban_after 次429后封禁并返回418"""
+        if self.rate_limit <= 0:
+            return None
+        state = self._throttle[venue]
+        now = time.monotonic()
+        if now < state['banned_until']:
+            return self._error(418, -1003, 'Way too many requests; IP banned.', state['banned_until'] - now)
+        
+        state['tokens'] = min(self.rate_limit, state['tokens'] + (now - state['updated']) * self.rate_limit)
+        state['updated'] = now
+        if state['tokens'] >= 1:
+            state['tokens'] -= 1
+            return None
+        
+        violations = state['violations']
+        violations.append(now)
+        while violations[0] < now - 60:
+            violations.popleft()
+        if self.ban_after and len(violations) >= self.ban_after:
+            violations.clear()
+            state['banned_until'] = now + self.ban_seconds
+            return self._error(418, -1003, 'Way too many requests; IP banned.', self.ban_seconds)
+        return self._error(429, -1003, 'Too many requests.', 1)
+    
+    def _venue(self, request) -> str:
+        venue = request.match_info.get('venue', self.venues[0])
+        if venue not in self.venues:
+            raise web.HTTPNotFound()
+        return venue
+    
+    def _market(self, request) -> Optional[str]:
+        market_id = request.query.get('symbol')
+        return market_id if market_id in self.markets else None
+    
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """所有请求统一经过：延迟、限频、故障注入与统计"""
+        venue = self._venue(request)
+        self.request_count += 1
+        self.stats['requests'] += 1
+        
+        response = self._check_rate_limit(venue)
+        if response is None and self.failure_rate and self.random.random() < self.failure_rate:
+            response = self._error(503, -1001, 'Internal error; unable to process your request. Please try again.')
+        if response is not None:
+            self.stats[str(response.status)] += 1
+            await self._sleep_latency()
+            return response
+        
+        if request.headers.get('Upgrade', '').lower() != 'websocket':
+            await self._sleep_latency()
+        response = await handler(request)
+        self.stats[str(response.status)] += 1
+        return response
+    
+    # ---------------- 现货 REST ----------------
+    
+    def _ticker(self, venue: str, market_id: str) -> Dict:
+        now = time.time()
+        now_ms = int(now * 1000)
+        last = self._price(venue, market_id, now)
+        spread = last * 0.0002
+        last_text = self._publish(venue, market_id, 'last', last, now)
+        return {
+            'symbol': market_id,
+            'priceChange': '0', 'priceChangePercent': '0',
+            'weightedAvgPrice': last_text, 'prevClosePrice': last_text,
+            'lastPrice': last_text, 'lastQty': '1',
+            'bidPrice': f"{last - spread:.8f}", 'bidQty': '10',
+            'askPrice': f"{last + spread:.8f}", 'askQty': '10',
+            'openPrice': last_text, 'highPrice': f"{last * 1.01:.8f}",
+            'lowPrice': f"{last * 0.99:.8f}", 'volume': '100000',
+            'quoteVolume': f"{last * 100000:.2f}",
+            'openTime': now_ms - 86400000, 'closeTime': now_ms,
+            'firstId': 1, 'lastId': 1000, 'count': 1000
+        }
+    
+    @staticmethod
+    def _filters() -> List[Dict]:
+        return [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001',
+             'maxPrice': '1000000', 'tickSize': '0.00000001'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00001',
+             'maxQty': '9000000', 'stepSize': '0.00001'}
+        ]
+    
+    async def exchange_info(self, request):
+        symbols = []
+        for market_id, symbol in self.markets.items():
+            base, quote = symbol.split('/')
+            symbols.append({
+                'symbol': market_id, 'status': 'TRADING',
+                'baseAsset': base, 'baseAssetPrecision': 8,
+                'quoteAsset': quote, 'quotePrecision': 8, 'quoteAssetPrecision': 8,
+                'orderTypes': ['LIMIT', 'MARKET'],
+                'isSpotTradingAllowed': True, 'isMarginTradingAllowed': False,
+                'permissions': ['SPOT'],
+                'filters': self._filters()
+            })
+        return web.json_response({
+            'timezone': 'UTC', 'serverTime': int(time.time() * 1000),
+            'rateLimits': [], 'exchangeFilters': [], 'symbols': symbols
+        })
+    
+    async def ticker_24hr(self, request):
+        venue = self._venue(request)
+        if 'symbol' in request.query:
+            market_id = self._market(request)
+            if market_id is None:
+                return self._error(400, -1121, 'Invalid symbol.')
+            return web.json_response(self._ticker(venue, market_id))
+        return web.json_response([self._ticker(venue, m) for m in self.markets])
+    
+    async def klines(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        
+        limit = min(int(request.query.get('limit', 500)), 1000)
+        step_ms = period_ms(request.query.get('interval', '1m'))
+        now_ms = int(time.time() * 1000)
+        if 'startTime' in request.query:
+            first = int(request.query['startTime']) // step_ms * step_ms
+            open_times = [t for t in range(first, first + limit * step_ms, step_ms) if t <= now_ms]
+        else:
+            end = now_ms // step_ms * step_ms
+            open_times = [end - (limit - 1 - i) * step_ms for i in range(limit)]
+        
+        rows = []
+        for open_time in open_times:
+            price = self._price(venue, market_id, open_time / 1000)
+            rows.append([
+                open_time, f"{price:.8f}", f"{price * 1.001:.8f}", f"{price * 0.999:.8f}",
+                f"{price:.8f}", '100', open_time + step_ms - 1, f"{price * 100:.2f}",
+                10, '50', f"{price * 50:.2f}", '0'
+            ])
+        return web.json_response(rows)
+    
+    def _book_levels(self, venue: str, market_id: str, limit: int) -> Tuple[List, List]:
+        price = self._price(venue, market_id)
+        tick = price * 0.0001
+        bids = [[f"{price - (i + 1) * tick:.8f}", '1.0'] for i in range(limit)]
+        asks = [[f"{price + (i + 1) * tick:.8f}", '1.0'] for i in range(limit)]
+        return bids, asks
+    
+    async def depth(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        
+        bids, asks = self._book_levels(venue, market_id, int(request.query.get('limit', 20)))
+        return web.json_response({'lastUpdateId': int(time.time() * 1000), 'bids': bids, 'asks': asks})
+    
+    async def agg_trades(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        
+        limit = int(request.query.get('limit', 100))
+        now_ms = int(time.time() * 1000)
+        price = self._price(venue, market_id)
+        return web.json_response([
+            {'a': now_ms + i, 'p': f"{price:.8f}", 'q': '0.1',
+             'f': now_ms + i, 'l': now_ms + i, 'T': now_ms - i * 100,
+             'm': bool(i % 2), 'M': True}
+            for i in range(limit)
+        ])
+    
+    # ---------------- U本位合约 REST ----------------
+    
+    async def futures_exchange_info(self, request):
+        symbols = []
+        for market_id, symbol in self.markets.items():
+            base, quote = symbol.split('/')
+            symbols.append({
+                'symbol': market_id, 'pair': market_id, 'contractType': 'PERPETUAL',
+                'deliveryDate': 4133404800000, 'onboardDate': 1569398400000, 'status': 'TRADING',
+                'baseAsset': base, 'quoteAsset': quote, 'marginAsset': quote,
+                'pricePrecision': 8, 'quantityPrecision': 5, 'baseAssetPrecision': 8, 'quotePrecision': 8,
+                'underlyingType': 'COIN', 'settlePlan': 0, 'triggerProtect': '0.0500',
+                'filters': self._filters(), 'orderTypes': ['LIMIT', 'MARKET'], 'timeInForce': ['GTC']
+            })
+        return web.json_response({
+            'timezone': 'UTC', 'serverTime': int(time.time() * 1000),
+            'rateLimits': [], 'exchangeFilters': [], 'assets': [], 'symbols': symbols
+        })
+    
+    def _premium_index(self, venue: str, market_id: str) -> Dict:
+        now = time.time()
+        index = self._price(venue, market_id, now)
+        next_funding = (int(now * 1000) // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS
+        return {
+            'symbol': market_id,
+            'markPrice': self._publish(venue, market_id, 'mark', index * 1.0002, now),
+            'indexPrice': f"{index:.8f}", 'estimatedSettlePrice': f"{index:.8f}",
+            'lastFundingRate': f"{self._funding_rate(market_id, now):.8f}",
+            'interestRate': '0.00010000', 'nextFundingTime': next_funding,
+            'time': int(now * 1000)
+        }
+    
+    async def premium_index(self, request):
+        venue = self._venue(request)
+        if 'symbol' in request.query:
+            market_id = self._market(request)
+            if market_id is None:
+                return self._error(400, -1121, 'Invalid symbol.')
+            return web.json_response(self._premium_index(venue, market_id))
+        return web.json_response([self._premium_index(venue, m) for m in self.markets])
+    
+    async def open_interest(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        now = time.time()
+        return web.json_response({
+            'symbol': market_id, 'openInterest': f"{self._open_interest(venue, market_id, now):.3f}",
+            'time': int(now * 1000)
+        })
+    
+    @staticmethod
+    def _history_times(request, step_ms: int, default_limit: int, max_limit: int) -> List[int]:
+        """按 startTime / endTime / limit 生成历史数据点的时间"""
+        limit = min(int(request.query.get('limit', default_limit)), max_limit)
+        now_ms = int(time.time() * 1000)
+        end = min(int(request.query.get('endTime', now_ms)), now_ms) // step_ms * step_ms
+        if 'startTime' in request.query:
+            first = -(-int(request.query['startTime']) // step_ms) * step_ms
+            return [t for t in range(first, end + 1, step_ms)][:limit]
+        return [end - (limit - 1 - i) * step_ms for i in range(limit)]
+    
+    async def open_interest_hist(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        
+        rows = []
+        for t in self._history_times(request, period_ms(request.query.get('period', '5m')), 30, 500):
+            amount = self._open_interest(venue, market_id, t / 1000)
+            rows.append({
+                'symbol': market_id, 'sumOpenInterest': f"{amount:.8f}",
+                'sumOpenInterestValue': f"{amount * self._price(venue, market_id, t / 1000):.8f}",
+                'timestamp': t
+            })
+        return web.json_response(rows)
+    
+    async def funding_rate_history(self, request):
+        venue = self._venue(request)
+        market_id = self._market(request)
+        if market_id is None:
+            return self._error(400, -1121, 'Invalid symbol.')
+        
+        return web.json_response([
+            {'symbol': market_id, 'fundingTime': t,
+             'fundingRate': f"{self._funding_rate(market_id, t / 1000):.8f}",
+             'markPrice': f"{self._price(venue, market_id, t / 1000):.8f}"}
+            for t in self._history_times(request, FUNDING_INTERVAL_MS, 100, 1000)
+        ])
+    
+    # ---------------- 行情推送 ----------------
+    
+    def _parse_stream(self, stream: str) -> Optional[Tuple[str, str]]:
+        """'btcusdt@ticker' -> ('BTCUSDT', 'ticker')，不支持的流返回None"""
+        parts = stream.split('@')
+        if len(parts) < 2 or parts[0].upper() not in self.markets:
+            return None
+        channel = parts[1]
+        if channel in ('ticker', 'miniTicker', 'bookTicker', 'aggTrade', 'trade', 'markPrice') \
+                or channel.startswith('kline_') or channel.startswith('depth'):
+            return parts[0].upper(), channel
+        return None
+    
+    def _stream_event(self, venue: str, stream: str, now: float, books: Dict) -> Dict:
+        """生成单个流的推送消息"""
+        market_id, channel = self._parse_stream(stream)
+        now_ms = int(now * 1000)
+        last = self._price(venue, market_id, now)
+        
+        if channel in ('ticker', 'miniTicker'):
+            ticker = self._ticker(venue, market_id)
+            event = {'e': '24hrTicker' if channel == 'ticker' else '24hrMiniTicker', 'E': now_ms,
+                     's': market_id, 'c': ticker['lastPrice'], 'o': ticker['openPrice'],
+                     'h': ticker['highPrice'], 'l': ticker['lowPrice'], 'v': ticker['volume'],
+                     'q': ticker['quoteVolume']}
+            if channel == 'ticker':
+                event.update({'p': '0', 'P': '0', 'w': ticker['weightedAvgPrice'], 'x': ticker['prevClosePrice'],
+                              'Q': '1', 'b': ticker['bidPrice'], 'B': '10', 'a': ticker['askPrice'], 'A': '10',
+                              'O': ticker['openTime'], 'C': ticker['closeTime'], 'F': 1, 'L': 1000, 'n': 1000})
+            return event
+        if channel == 'bookTicker':
+            spread = last * 0.0002
+            return {'e': 'bookTicker', 'u': now_ms, 'E': now_ms, 'T': now_ms, 's': market_id,
+                    'b': f"{last - spread:.8f}", 'B': '10', 'a': f"{last + spread:.8f}", 'A': '10'}
+        if channel in ('aggTrade', 'trade'):
+            price = self._publish(venue, market_id, 'last', last, now)
+            if channel == 'aggTrade':
+                return {'e': 'aggTrade', 'E': now_ms, 's': market_id, 'a': now_ms, 'p': price, 'q': '0.1',
+                        'f': now_ms, 'l': now_ms, 'T': now_ms, 'm': False, 'M': True}
+            return {'e': 'trade', 'E': now_ms, 's': market_id, 't': now_ms, 'p': price, 'q': '0.1',
+                    'T': now_ms, 'm': False, 'M': True}
+        if channel == 'markPrice':
+            premium = self._premium_index(venue, market_id)
+            return {'e': 'markPriceUpdate', 'E': now_ms, 's': market_id, 'p': premium['markPrice'],
+                    'i': premium['indexPrice'], 'P': premium['estimatedSettlePrice'],
+                    'r': premium['lastFundingRate'], 'T': premium['nextFundingTime']}
+        if channel.startswith('kline_'):
+            interval = channel[len('kline_'):]
+            step_ms = period_ms(interval)
+            open_time = now_ms // step_ms * step_ms
+            open_price = self._price(venue, market_id, open_time / 1000)
+            close = self._publish(venue, market_id, 'last', last, now)
+            return {'e': 'kline', 'E': now_ms, 's': market_id, 'k': {
+                't': open_time, 'T': open_time + step_ms - 1, 's': market_id, 'i': interval,
+                'f': 1, 'L': 100, 'o': f"{open_price:.8f}", 'c': close,
+                'h': f"{max(open_price, last) * 1.0005:.8f}", 'l': f"{min(open_price, last) * 0.9995:.8f}",
+                'v': '100', 'n': 100, 'x': False, 'q': f"{last * 100:.2f}", 'V': '50',
+                'Q': f"{last * 50:.2f}", 'B': '0'}}
+        
+        # 订单簿：depth5/10/20 为部分快照，depth / depth@100ms 为增量（只维护前20档，含已移除价位的0数量）
+        levels = channel[len('depth'):]
+        if levels:
+            bids, asks = self._book_levels(venue, market_id, int(levels))
+            return {'lastUpdateId': now_ms, 'E': now_ms, 'bids': bids, 'asks': asks}
+        
+        bids, asks = self._book_levels(venue, market_id, 20)
+        previous = books.get(stream, {'u': 0, 'bids': set(), 'asks': set()})
+        new_bids = {price for price, _ in bids}
+        new_asks = {price for price, _ in asks}
+        event = {'e': 'depthUpdate', 'E': now_ms, 's': market_id, 'U': previous['u'] + 1, 'u': now_ms,
+                 'b': bids + [[price, '0'] for price in previous['bids'] - new_bids],
+                 'a': asks + [[price, '0'] for price in previous['asks'] - new_asks]}
+        books[stream] = {'u': now_ms, 'bids': new_bids, 'asks': new_asks}
+        return event
+    
+    async def _push(self, ws: web.WebSocketResponse, venue: str, streams: set):
+        """按推送间隔发送所有已订阅流"""
+        loop = asyncio.get_running_loop()
+        books: Dict[str, Dict] = {}
+        while not ws.closed:
+            started = loop.time()
+            if streams:
+                if self.failure_rate and self.random.random() < self.failure_rate:
+                    self.stats['ws_dropped'] += 1
+                    await ws.close(code=WSCloseCode.INTERNAL_ERROR, message=b'mock failure')
+                    return
+                now = time.time()
+                events = [self._stream_event(venue, stream, now, books) for stream in list(streams)]
+                await self._sleep_latency()
+                for event in events:
+                    await ws.send_str(json.dumps(event))
+                self.stats['ws_messages'] += len(events)
+            await asyncio.sleep(max(0.0, self.ws_interval_ms / 1000 - (loop.time() - started)))
+    
+    async def websocket(self, request):
+        """Binance 原始流：.../ws/<stream> 直接订阅，或连接后发送 SUBSCRIBE / UNSUBSCRIBE / LIST_SUBSCRIPTIONS"""
+        venue = self._venue(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.stats['ws_connections'] += 1
+        
+        streams = set()
+        initial = request.match_info.get('stream', '')
+        if self._parse_stream(initial):
+            streams.add(initial)
+        pusher = asyncio.ensure_future(self._push(ws, venue, streams))
+        
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    payload = json.loads(msg.data)
+                except ValueError:
+                    await ws.send_json({'error': {'code': 2, 'msg': 'Invalid JSON'}})
+                    continue
+                
+                method = payload.get('method')
+                params = payload.get('params') or []
+                reply = {'result': None, 'id': payload.get('id')}
+                if method == 'SUBSCRIBE':
+                    invalid = [s for s in params if self._parse_stream(s) is None]
+                    if invalid:
+                        reply = {'error': {'code': 2, 'msg': f"Invalid request: unknown stream {invalid[0]}"},
+                                 'id': payload.get('id')}
+                    else:
+                        streams.update(params)
+                elif method == 'UNSUBSCRIBE':
+                    streams.difference_update(params)
+                elif method == 'LIST_SUBSCRIPTIONS':
+                    reply['result'] = sorted(streams)
+                else:
+                    reply = {'error': {'code': 1, 'msg': f"Unknown method {method}"}, 'id': payload.get('id')}
+                await ws.send_json(reply)
+        finally:
+            pusher.cancel()
+        return ws
+    
+    def _make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        routes = [
+            ('/api/v3/exchangeInfo', self.exchange_info),
+            ('/api/v3/ticker/24hr', self.ticker_24hr),
+            ('/api/v3/klines', self.klines),
+            ('/api/v3/depth', self.depth),
+            ('/api/v3/aggTrades', self.agg_trades),
+            ('/fapi/v1/exchangeInfo', self.futures_exchange_info),
+            ('/fapi/v1/ticker/24hr', self.ticker_24hr),
+            ('/fapi/v1/klines', self.klines),
+            ('/fapi/v1/depth', self.depth),
+            ('/fapi/v1/premiumIndex', self.premium_index),
+            ('/fapi/v1/openInterest', self.open_interest),
+            ('/fapi/v1/fundingRate', self.funding_rate_history),
+            ('/futures/data/openInterestHist', self.open_interest_hist),
+            ('/stream/ws', self.websocket),
+            ('/stream/ws/{stream}', self.websocket),
+            ('/fstream/ws', self.websocket),
+            ('/fstream/ws/{stream}', self.websocket)
+        ]
+        # 根路径对应第一个交易所，/<venue>/... 对应指定交易所
+        for prefix in ('', '/{venue}'):
+            for path, handler in routes:
+                app.router.add_get(prefix + path, handler)
+        return app
+    
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        
+        async def start():
+            self._runner = web.AppRunner(self._make_app(), access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            # 端口为0时取实际分配的端口
+            self.port = site._server.sockets[0].getsockname()[1]
+        
+        self._loop.run_until_complete(start())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+    
+    def start(self) -> str:
+        """在后台线程启动服务，返回基础URL"""
+        self._thread = threading.Thread(target=self._run, name='mock-exchange', daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self.base_url
+    
+    def stop(self):
+        """停止服务"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
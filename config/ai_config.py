@@ -71,6 +71,17 @@ class AIConfig:
         'update_frequency': 3600  # 秒
     }
     
+    # 在线学习配置（K线收盘时增量更新，影子模式下同时运行批量重训模型对比精度）
+    ONLINE_LEARNING_CONFIG = {
+        'enabled': os.getenv('ONLINE_LEARNING', 'false').lower() == 'true',
+        'model_type': 'sgd',  # sgd, forest
+        'n_lags': 10,
+        'shadow': os.getenv('ONLINE_LEARNING_SHADOW', 'false').lower() == 'true',
+        'batch_retrain_every': 500,
+        'batch_window': 5000,  # 影子批量模型训练使用的最近K线数
+        'timeframes': ['1m', '5m', '15m', '1h']
+    }
+    
     # 模型存储路径
     MODEL_PATHS = {
         'lstm': 'models/lstm/',
@@ -129,6 +140,11 @@ class AIConfig:
         """获取情感分析配置"""
         return cls.SENTIMENT_CONFIG.copy()
     
+    @classmethod
+    def get_online_learning_config(cls) -> Dict[str, Any]:
+        """获取在线学习配置"""
+        return cls.ONLINE_LEARNING_CONFIG.copy()
+    
     @classmethod
     def get_model_paths(cls) -> Dict[str, str]:
         """获取模型存储路径"""
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+旧版数据文件转换脚本
+把 data/signals/trading_signals_*.json 与 data/prices/prices_*.json 导入按天分段的二进制日志
+（data/journal/signals、data/journal/prices）
+
+用法:
+    python convert_legacy_journals.py            # 导入并保留旧文件
+    python convert_legacy_journals.py --remove   # 导入后删除旧文件
+"""
+
+import argparse
+
+from data.data_manager import DataManager
+from data.multi_exchange_price_collector import MultiExchangePriceCollector
+
+
+def main():
+    parser = argparse.ArgumentParser(description='旧版信号/价格 JSON 文件转换为分段日志')
+    parser.add_argument('--remove', action='store_true', help='导入成功后删除旧文件')
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print("📦 转换旧版数据文件")
+    print("=" * 70)
+    
+    signals = DataManager().convert_legacy_signal_files(remove=args.remove)
+    print(f"✅ 交易信号: {signals} 条")
+    
+    prices = MultiExchangePriceCollector().convert_legacy_price_files(remove=args.remove)
+    print(f"✅ 价格记录: {prices} 条")
+
+
+if __name__ == '__main__':
+    main()
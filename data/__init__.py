@@ -2,10 +2,14 @@
 数据管理模块
 """
 
-from .data_manager import DataManager
-from .market_data_collector import MarketDataCollector
+from utils.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'DataManager': '.data_manager',
+    'MarketDataCollector': '.market_data_collector'
+})
 
 __all__ = [
     'DataManager',
     'MarketDataCollector'
-] 
\ No newline at end of file
+]
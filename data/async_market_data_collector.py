@@ -0,0 +1,422 @@
+"""
+异步市场数据收集器
+基于 ccxt.async_support，每个交易所共享一个 aiohttp 连接池（keep-alive、DNS缓存、
+单主机并发上限），并提供同步外观类供现有同步调用方直接使用
+"""
+
+import asyncio
+import ssl
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+import ccxt.async_support as ccxt_async
+import pandas as pd
+
+from data.market_recorder import get_market_recorder
+from utils.logging_manager import LoggerMixin
+from utils.latency_metrics import timed
+from config.exchange_config import ExchangeConfig
+
+
+class AsyncMarketDataCollector(LoggerMixin):
+    """异步市场数据收集器"""
+    
+    def __init__(self, exchange_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                 pool_size: int = 100, limit_per_host: int = 20,
+                 keepalive_timeout: float = 60.0, dns_cache_ttl: int = 300):
+        """
+        初始化异步市场数据收集器
+        
+        Args:
+            exchange_overrides: 按交易所覆盖的ccxt配置（如指向本地模拟交易所的urls）
+            pool_size: 每个交易所连接池的总连接数上限
+            limit_per_host: 每个主机的并发连接上限。aiohttp不支持HTTP/1.1管线化，
+                同一连接上请求串行复用，并发度由此参数控制
+            keepalive_timeout: 空闲连接保活时间（秒）
+            dns_cache_ttl: DNS解析结果缓存时间（秒）
+        """
+        self.exchange_overrides = exchange_overrides or {}
+        self.pool_size = pool_size
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        
+        self.exchanges: Dict[str, Any] = {}
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._init_lock: Optional[asyncio.Lock] = None
+        # MARKET_RECORDER=1 时录制看到的行情，供 data.market_replay 回放
+        self.recorder = get_market_recorder()
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """创建带连接池的会话（必须在事件循环中调用）"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            enable_cleanup_closed=True,
+            ssl=ssl.create_default_context()
+        )
+        return aiohttp.ClientSession(connector=connector)
+    
+    async def initialize_exchange(self, exchange_name: str) -> bool:
+        """
+        初始化交易所连接（同一交易所只创建一次实例和连接池）
+        
+        Args:
+            exchange_name: 交易所名称
+        
+        Returns:
+            是否初始化成功
+        """
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        
+        async with self._init_lock:
+            if exchange_name in self.exchanges:
+                return True
+            
+            try:
+                if exchange_name not in ExchangeConfig.SUPPORTED_EXCHANGES:
+                    self.logger.error(f"❌ 不支持的交易所: {exchange_name}")
+                    return False
+                
+                config = ExchangeConfig.get_exchange_config(exchange_name)
+                session = self._create_session()
+                
+                exchange_config = {
+                    'apiKey': config.get('api_key', ''),
+                    'secret': config.get('secret_key', ''),
+                    'password': config.get('passphrase', ''),
+                    'sandbox': config.get('sandbox', False),
+                    'enableRateLimit': True,
+                    'timeout': config.get('timeout', 30) * 1000,
+                    # 传入外部会话后ccxt不会自行创建/关闭连接
+                    'session': session
+                }
+                exchange_config.update(self.exchange_overrides.get(exchange_name, {}))
+                
+                exchange_class = getattr(ccxt_async, exchange_name)
+                self.exchanges[exchange_name] = exchange_class(exchange_config)
+                self.sessions[exchange_name] = session
+                
+                self.logger.info(f"✅ 异步交易所 {exchange_name} 初始化成功")
+                return True
+                
+            except Exception as e:
+                self.logger.error(f"❌ 初始化异步交易所 {exchange_name} 失败: {e}")
+                return False
+    
+    async def _get_exchange(self, exchange_name: str):
+        """获取（必要时初始化）交易所实例"""
+        if exchange_name not in self.exchanges:
+            if not await self.initialize_exchange(exchange_name):
+                return None
+        return self.exchanges[exchange_name]
+    
+    @timed('market_data.fetch_ohlcv', none_is_error=True, collector='async')
+    async def fetch_ohlcv(self, exchange_name: str, symbol: str,
+                          timeframe: str = '1h', limit: int = 1000) -> Optional[pd.DataFrame]:
+        """
+        获取OHLCV数据
+        
+        Args:
+            exchange_name: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            limit: 数据条数限制
+        
+        Returns:
+            OHLCV数据
+        """
+        try:
+            exchange = await self._get_exchange(exchange_name)
+            if exchange is None:
+                return None
+            
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            
+            if not ohlcv:
+                self.logger.warning(f"⚠️ 未获取到 {exchange_name} {symbol} 的数据")
+                return None
+            
+            if self.recorder is not None:
+                self.recorder.record_ohlcv(exchange_name, symbol, timeframe, ohlcv)
+            
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            return df
+            
+        except Exception as e:
+            self.logger.error(f"❌ 获取 {exchange_name} {symbol} 数据失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_ticker', none_is_error=True, collector='async')
+    async def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        获取当前价格信息
+        
+        Args:
+            exchange_name: 交易所名称
+            symbol: 交易对
+        
+        Returns:
+            价格信息
+        """
+        try:
+            exchange = await self._get_exchange(exchange_name)
+            if exchange is None:
+                return None
+            
+            ticker = await exchange.fetch_ticker(symbol)
+            
+            result = {
+                'symbol': symbol,
+                'exchange': exchange_name,
+                'last': ticker['last'],
+                'bid': ticker['bid'],
+                'ask': ticker['ask'],
+                'high': ticker['high'],
+                'low': ticker['low'],
+                'volume': ticker['baseVolume'],
+                'timestamp': datetime.now().isoformat()
+            }
+            if self.recorder is not None:
+                self.recorder.record_ticker(exchange_name, symbol, result)
+            return result
+            
+        except ccxt_async.NetworkError as e:
+            self.logger.error(f"❌ {exchange_name} 网络错误: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"❌ 获取 {exchange_name} {symbol} 价格信息失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_tickers', none_is_error=True, collector='async')
+    async def fetch_tickers(self, exchange_name: str,
+                            symbols: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        批量获取行情，一次请求
+        
+        Args:
+            exchange_name: 交易所名称
+            symbols: 交易对列表，None表示全部
+        
+        Returns:
+            {symbol: ccxt ticker} 字典
+        """
+        try:
+            exchange = await self._get_exchange(exchange_name)
+            if exchange is None:
+                return None
+            tickers = await exchange.fetch_tickers(symbols)
+            if tickers and self.recorder is not None:
+                self.recorder.record_tickers(exchange_name, tickers)
+            return tickers
+            
+        except Exception as e:
+            self.logger.error(f"❌ 批量获取 {exchange_name} 行情失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_order_book', none_is_error=True, collector='async')
+    async def fetch_order_book(self, exchange_name: str, symbol: str,
+                               limit: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        获取订单簿
+        
+        Args:
+            exchange_name: 交易所名称
+            symbol: 交易对
+            limit: 深度限制
+        
+        Returns:
+            订单簿数据
+        """
+        try:
+            exchange = await self._get_exchange(exchange_name)
+            if exchange is None:
+                return None
+            
+            order_book = await exchange.fetch_order_book(symbol, limit)
+            if self.recorder is not None:
+                self.recorder.record_order_book(exchange_name, symbol, order_book['bids'], order_book['asks'])
+            
+            return {
+                'symbol': symbol,
+                'exchange': exchange_name,
+                'bids': order_book['bids'],
+                'asks': order_book['asks'],
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            self.logger.error(f"❌ 获取 {exchange_name} {symbol} 订单簿失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_recent_trades', none_is_error=True, collector='async')
+    async def fetch_recent_trades(self, exchange_name: str, symbol: str,
+                                  limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取最近交易
+        
+        Args:
+            exchange_name: 交易所名称
+            symbol: 交易对
+            limit: 交易数量限制
+        
+        Returns:
+            最近交易列表
+        """
+        try:
+            exchange = await self._get_exchange(exchange_name)
+            if exchange is None:
+                return None
+            
+            trades = await exchange.fetch_trades(symbol, limit=limit)
+            
+            return [
+                {
+                    'id': trade['id'],
+                    'timestamp': datetime.fromtimestamp(trade['timestamp'] / 1000).isoformat(),
+                    'price': trade['price'],
+                    'amount': trade['amount'],
+                    'side': trade['side'],
+                    'cost': trade['cost']
+                }
+                for trade in trades
+            ]
+            
+        except Exception as e:
+            self.logger.error(f"❌ 获取 {exchange_name} {symbol} 最近交易失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_many_tickers', collector='async')
+    async def fetch_many_tickers(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[Dict]]:
+        """
+        并发获取多个 (exchange, symbol) 的行情，共用各交易所连接池
+        
+        Args:
+            pairs: [(exchange, symbol), ...]
+        
+        Returns:
+            {(exchange, symbol): 价格信息}
+        """
+        results = await asyncio.gather(*(self.fetch_ticker(ex, sym) for ex, sym in pairs))
+        return dict(zip(pairs, results))
+    
+    @timed('market_data.fetch_many_ohlcv', collector='async')
+    async def fetch_many_ohlcv(self, requests: List[Tuple[str, str, str]],
+                               limit: int = 1000) -> Dict[Tuple[str, str, str], Optional[pd.DataFrame]]:
+        """
+        并发获取多个 (exchange, symbol, timeframe) 的OHLCV
+        
+        Args:
+            requests: [(exchange, symbol, timeframe), ...]
+            limit: 数据条数限制
+        
+        Returns:
+            {(exchange, symbol, timeframe): OHLCV数据}
+        """
+        results = await asyncio.gather(*(
+            self.fetch_ohlcv(ex, sym, tf, limit) for ex, sym, tf in requests
+        ))
+        return dict(zip(requests, results))
+    
+    async def close(self):
+        """关闭交易所实例与连接池"""
+        for exchange_name, exchange in self.exchanges.items():
+            try:
+                await exchange.close()
+            except Exception as e:
+                self.logger.warning(f"⚠️ 关闭 {exchange_name} 连接时出错: {e}")
+        
+        for session in self.sessions.values():
+            await session.close()
+        
+        self.exchanges.clear()
+        self.sessions.clear()
+
+
+class SyncMarketDataCollector(LoggerMixin):
+    """
+    AsyncMarketDataCollector 的同步外观
+    
+    在后台线程运行专用事件循环，方法签名与 MarketDataCollector 的 fetch_* 一致，
+    现有同步调用方可直接替换，同时所有调用共享同一组连接池。
+    """
+    
+    def __init__(self, request_timeout: float = 60.0, **collector_kwargs):
+        """
+        初始化同步外观
+        
+        Args:
+            request_timeout: 等待单次调用结果的超时（秒）
+            **collector_kwargs: 传给 AsyncMarketDataCollector 的参数
+        """
+        self.request_timeout = request_timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='market-data-loop', daemon=True)
+        self._thread.start()
+        self.async_collector = AsyncMarketDataCollector(**collector_kwargs)
+    
+    def _run(self, coro):
+        """在后台事件循环中执行协程并等待结果"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout=self.request_timeout)
+    
+    @property
+    def exchanges(self) -> Dict[str, Any]:
+        return self.async_collector.exchanges
+    
+    def initialize_exchange(self, exchange_name: str) -> bool:
+        return self._run(self.async_collector.initialize_exchange(exchange_name))
+    
+    def fetch_ohlcv(self, exchange_name: str, symbol: str,
+                    timeframe: str = '1h', limit: int = 1000) -> Optional[pd.DataFrame]:
+        return self._run(self.async_collector.fetch_ohlcv(exchange_name, symbol, timeframe, limit))
+    
+    def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
+        return self._run(self.async_collector.fetch_ticker(exchange_name, symbol))
+    
+    def fetch_tickers(self, exchange_name: str,
+                      symbols: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        return self._run(self.async_collector.fetch_tickers(exchange_name, symbols))
+    
+    def fetch_order_book(self, exchange_name: str, symbol: str,
+                         limit: int = 20) -> Optional[Dict[str, Any]]:
+        return self._run(self.async_collector.fetch_order_book(exchange_name, symbol, limit))
+    
+    def fetch_recent_trades(self, exchange_name: str, symbol: str,
+                            limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        return self._run(self.async_collector.fetch_recent_trades(exchange_name, symbol, limit))
+    
+    def fetch_many_tickers(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[Dict]]:
+        return self._run(self.async_collector.fetch_many_tickers(pairs))
+    
+    def fetch_many_ohlcv(self, requests: List[Tuple[str, str, str]],
+                         limit: int = 1000) -> Dict[Tuple[str, str, str], Optional[pd.DataFrame]]:
+        return self._run(self.async_collector.fetch_many_ohlcv(requests, limit))
+    
+    def cleanup(self):
+        """关闭连接池并停止后台事件循环"""
+        try:
+            self._run(self.async_collector.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+# 进程级共享实例（按需创建），各模块共用同一组连接池
+_shared_collector: Optional[SyncMarketDataCollector] = None
+_shared_lock = threading.Lock()
+
+def get_shared_market_data_collector() -> SyncMarketDataCollector:
+    """获取进程级共享的同步外观实例"""
+    global _shared_collector
+    with _shared_lock:
+        if _shared_collector is None:
+            _shared_collector = SyncMarketDataCollector()
+        return _shared_collector
@@ -6,13 +6,16 @@ import os
 import json
 import pickle
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
 from utils.logging_manager import LoggerMixin
+from utils.ttl_cache import TTLCache
+from data.record_journal import RecordJournal, SIGNAL_SCHEMA, get_journal, import_json_files
 from config.database_config import DatabaseConfig
+from models.weight_store import save_weights, load_weights, weights_path
 
 class DataManager(LoggerMixin):
     """数据管理器"""
@@ -22,9 +25,9 @@ class DataManager(LoggerMixin):
         self.data_dir = Path('data')
         self.data_dir.mkdir(exist_ok=True)
         
-        # 数据缓存
-        self.cache = {}
-        self.cache_expiry = {}
+        # 数据缓存（1小时过期，按条目数与内存上限淘汰）
+        self.cache = TTLCache('data_manager.market_data', max_entries=256,
+                              max_bytes=256 * 1024 * 1024, ttl=3600)
         
     def save_market_data(self, exchange: str, symbol: str, 
                         timeframe: str, data: pd.DataFrame) -> bool:
@@ -52,8 +55,7 @@ class DataManager(LoggerMixin):
             
             # 更新缓存
             cache_key = f"{exchange}_{symbol}_{timeframe}"
-            self.cache[cache_key] = data
-            self.cache_expiry[cache_key] = datetime.now() + timedelta(hours=1)
+            self.cache.set(cache_key, data)
             
             self.logger.info(f"✅ 市场数据已保存: {filename}")
             return True
@@ -82,14 +84,12 @@ class DataManager(LoggerMixin):
             
             # 检查缓存
             cache_key = f"{exchange}_{symbol}_{timeframe}"
-            if cache_key in self.cache:
-                cache_time = self.cache_expiry.get(cache_key)
-                if cache_time and datetime.now() < cache_time:
-                    data = self.cache[cache_key]
-                    if days:
-                        start_date = datetime.now() - timedelta(days=days)
-                        data = data[data['timestamp'] >= start_date]
-                    return data
+            data = self.cache.get(cache_key)
+            if data is not None:
+                if days:
+                    start_date = datetime.now() - timedelta(days=days)
+                    data = data[data['timestamp'] >= start_date]
+                return data
             
             # 从文件加载
             if filepath.exists():
@@ -102,8 +102,7 @@ class DataManager(LoggerMixin):
                     data = data[data['timestamp'] >= start_date]
                 
                 # 更新缓存
-                self.cache[cache_key] = data
-                self.cache_expiry[cache_key] = datetime.now() + timedelta(hours=1)
+                self.cache.set(cache_key, data)
                 
                 self.logger.info(f"✅ 市场数据已加载: {filename}")
                 return data
@@ -115,6 +114,11 @@ class DataManager(LoggerMixin):
             self.logger.error(f"❌ 加载市场数据失败: {e}")
             return None
     
+    @property
+    def signal_journal(self) -> RecordJournal:
+        """交易信号日志（按天分段的二进制记录）"""
+        return get_journal(self.data_dir / 'journal' / 'signals', SIGNAL_SCHEMA)
+    
     def save_trading_signals(self, signals: List[Dict[str, Any]]) -> bool:
         """
         保存交易信号
@@ -126,18 +130,8 @@ class DataManager(LoggerMixin):
             是否保存成功
         """
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"trading_signals_{timestamp}.json"
-            filepath = self.data_dir / 'signals' / filename
-            
-            # 创建目录
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 保存信号
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(signals, f, ensure_ascii=False, indent=2, default=str)
-            
-            self.logger.info(f"✅ 交易信号已保存: {filename}")
+            saved = self.signal_journal.append_many(signals)
+            self.logger.info(f"✅ 交易信号已保存: {saved} 条")
             return True
             
         except Exception as e:
@@ -155,29 +149,8 @@ class DataManager(LoggerMixin):
             交易信号列表
         """
         try:
-            signals_dir = self.data_dir / 'signals'
-            if not signals_dir.exists():
-                return []
-            
-            signals = []
             start_date = datetime.now() - timedelta(days=days)
-            
-            for filepath in signals_dir.glob('trading_signals_*.json'):
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        file_signals = json.load(f)
-                    
-                    # 过滤时间范围
-                    filtered_signals = []
-                    for signal in file_signals:
-                        signal_time = datetime.fromisoformat(signal['timestamp'])
-                        if signal_time >= start_date:
-                            filtered_signals.append(signal)
-                    
-                    signals.extend(filtered_signals)
-                    
-                except Exception as e:
-                    self.logger.warning(f"⚠️ 加载信号文件失败: {filepath}, 错误: {e}")
+            signals = self.signal_journal.read(start=start_date)
             
             self.logger.info(f"✅ 加载了 {len(signals)} 个交易信号")
             return signals
@@ -186,6 +159,21 @@ class DataManager(LoggerMixin):
             self.logger.error(f"❌ 加载交易信号失败: {e}")
             return []
     
+    def convert_legacy_signal_files(self, remove: bool = False) -> int:
+        """
+        把旧版 signals/trading_signals_*.json 导入交易信号日志
+        
+        Args:
+            remove: 导入后是否删除旧文件
+        
+        Returns:
+            导入的信号数
+        """
+        files = sorted((self.data_dir / 'signals').glob('trading_signals_*.json'))
+        imported = import_json_files(self.signal_journal, files, lambda signals: signals, remove)
+        self.logger.info(f"✅ 已导入 {len(files)} 个旧版信号文件，共 {imported} 个信号")
+        return imported
+    
     def save_ai_model(self, model_name: str, model_data: Any, 
                      model_type: str = 'lstm') -> bool:
         """
@@ -203,34 +191,40 @@ class DataManager(LoggerMixin):
             model_dir = self.data_dir / 'models' / model_type
             model_dir.mkdir(parents=True, exist_ok=True)
             
-            filepath = model_dir / f"{model_name}.pkl"
-            
-            with open(filepath, 'wb') as f:
-                pickle.dump(model_data, f)
+            manifest = save_weights(weights_path(model_dir, model_name), model_data,
+                                    metadata={'model_name': model_name, 'model_type': model_type})
             
-            self.logger.info(f"✅ AI模型已保存: {model_name}")
+            self.logger.info(f"✅ AI模型已保存: {model_name} (v{manifest['version']})")
             return True
             
         except Exception as e:
             self.logger.error(f"❌ 保存AI模型失败: {e}")
             return False
     
-    def load_ai_model(self, model_name: str, model_type: str = 'lstm') -> Optional[Any]:
+    def load_ai_model(self, model_name: str, model_type: str = 'lstm',
+                      mmap: Union[bool, str] = True) -> Optional[Any]:
         """
         加载AI模型
         
         Args:
             model_name: 模型名称
             model_type: 模型类型
+            mmap: 权重容器的内存映射方式：True 写时复制，'r' 只读映射，False 读入内存
             
         Returns:
             AI模型
         """
         try:
             model_dir = self.data_dir / 'models' / model_type
+            weights_dir = weights_path(model_dir, model_name)
             filepath = model_dir / f"{model_name}.pkl"
             
-            if filepath.exists():
+            if weights_dir.exists():
+                model = load_weights(weights_dir, mmap=mmap)
+                
+                self.logger.info(f"✅ AI模型已加载: {model_name}")
+                return model
+            elif filepath.exists():
                 with open(filepath, 'rb') as f:
                     model = pickle.load(f)
                 
@@ -293,10 +287,11 @@ class DataManager(LoggerMixin):
         if market_data_dir.exists():
             info['market_data_files'] = [f.name for f in market_data_dir.glob('*.csv')]
         
-        # 信号文件
+        # 信号文件（日志分段与尚未转换的旧版文件）
+        info['signal_files'] = [f"journal/signals/{day}.bin" for day in self.signal_journal.segments()]
         signals_dir = self.data_dir / 'signals'
         if signals_dir.exists():
-            info['signal_files'] = [f.name for f in signals_dir.glob('*.json')]
+            info['signal_files'].extend(f.name for f in signals_dir.glob('*.json'))
         
         # 模型文件
         models_dir = self.data_dir / 'models'
@@ -336,6 +331,9 @@ class DataManager(LoggerMixin):
                         filepath.unlink()
                         cleaned_files += 1
             
+            # 清理信号日志中过期的日分段
+            cleaned_files += self.signal_journal.drop_before(cutoff_date)
+            
             # 清理性能指标文件
             performance_dir = self.data_dir / 'performance'
             if performance_dir.exists():
@@ -0,0 +1,668 @@
+"""
+特征存储
+按 (交易所, 交易对, 时间框架) 以列式保存完整的 OHLCV 与技术指标列，K线收盘时增量追加，
+并按时间点提供特征向量/矩阵：某时刻只能读到在该时刻之前已收盘的K线，避免前视偏差。
+
+磁盘结构（root 不为空时，共享实例默认为 data/features，可用环境变量 FEATURE_STORE_DIR 指定，设为空串只存内存）:
+    <root>/<exchange>/<symbol>/<timeframe>/
+        meta.json           列名、时间框架、已提交行数
+        timestamp.bin       K线开盘时间（毫秒，小端 int64）
+        <column>.bin        每列一个小端 float64 文件
+
+新收盘的K线只续写到列文件末尾，meta.json 的行数最后原子替换，作为提交点：
+写入中途失败时文件尾部多出的数据在读取时被忽略，下次写入时截掉。
+K线收盘更新时距上次落盘超过 flush_interval 秒即写盘，进程退出时写出剩余数据。
+内存中每张表只保留最后 max_rows 行（更早的行已在列文件中，加载时也只读尾部），
+早于内存首行的时刻查询不到数据。
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.logging_manager import LoggerMixin
+
+TIMEFRAME_MS = {
+    '1s': 1_000,
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000
+}
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 与 TechnicalIndicators.calculate_all_indicators 同名同口径的指标列
+# （ema12/ema26 为 MACD 的递推状态，一并保存）
+INDICATOR_COLUMNS = [
+    'ema12', 'ema20', 'ema26', 'ema50',
+    'macd', 'macd_signal', 'macd_hist',
+    'rsi7', 'rsi14',
+    'bb_upper', 'bb_middle', 'bb_lower',
+    'atr14', 'volume_avg'
+]
+
+# calculate_all_indicators 返回的指标（另有 current_price 与 volume）
+CURRENT_INDICATOR_KEYS = [
+    'ema20', 'ema50', 'macd', 'macd_signal', 'rsi7', 'rsi14',
+    'bb_upper', 'bb_middle', 'bb_lower', 'atr14', 'volume_avg'
+]
+
+DEFAULT_ROOT = 'data/features'
+
+# 每张表在内存中保留的行数（1m K线约两周），更早的行只在列文件中
+DEFAULT_MAX_ROWS = 20_000
+
+# 增量计算所需的历史行数（最长滚动窗口 + 1）
+INDICATOR_LOOKBACK = 21
+
+TimeLike = Union[int, float, datetime, pd.Timestamp, np.datetime64, None]
+
+
+def to_milliseconds(value: TimeLike) -> int:
+    """时间转换为毫秒时间戳，None 表示当前时间"""
+    if value is None:
+        return int(time.time() * 1000)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, float):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def _timestamps_ms(values: Any) -> np.ndarray:
+    """把 DataFrame 的时间戳列转换为毫秒 int64 数组"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ms]').astype(np.int64)
+    return values.astype(np.int64)
+
+
+def _ema(values: np.ndarray, span: int, previous: float) -> np.ndarray:
+    """adjust=False 的指数均线递推，previous 为上一行的均线值（无历史时为 nan）"""
+    # scipy 导入约 1 秒，只在计算特征时才需要
+    from scipy.signal import lfilter
+    
+    alpha = 2.0 / (span + 1)
+    if np.isnan(previous):
+        previous = values[0]
+    result, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * previous])
+    return result
+
+
+def _rolling(values: np.ndarray, window: int, n_new: int, func: str = 'mean') -> np.ndarray:
+    """对拼接后序列的最后 n_new 个位置计算滚动均值/标准差，窗口不满或含 nan 时为 nan"""
+    padded = np.concatenate([np.full(window - 1, np.nan), values])
+    windows = sliding_window_view(padded, window)[-n_new:]
+    if func == 'std':
+        return windows.std(axis=1, ddof=1)
+    return windows.mean(axis=1)
+
+
+def compute_indicator_columns(tail: Dict[str, np.ndarray], new: Dict[str, np.ndarray],
+                              from_origin: bool) -> Dict[str, np.ndarray]:
+    """
+    增量计算新K线的指标列
+    
+    滚动类指标使用存储中的最近 INDICATOR_LOOKBACK 行原始数据，EMA 类指标从上一行的
+    指标值继续递推，结果与在完整历史上调用 TechnicalIndicators 一致。
+    
+    Args:
+        tail: 存储中最近若干行的列数据（可为空）
+        new: 新K线的 OHLCV 列
+        from_origin: tail 是否从该序列的第一行开始（历史不足 INDICATOR_LOOKBACK 行）
+    
+    Returns:
+        新K线对应的指标列
+    """
+    n_new = len(new['close'])
+    n_tail = len(tail.get('close', ()))
+    
+    def joined(column: str) -> np.ndarray:
+        if n_tail:
+            return np.concatenate([tail[column], new[column]])
+        return new[column]
+    
+    def last(column: str) -> float:
+        return float(tail[column][-1]) if n_tail else np.nan
+    
+    close = joined('close')
+    high = joined('high')
+    low = joined('low')
+    volume = joined('volume')
+    columns: Dict[str, np.ndarray] = {}
+    
+    for span in (12, 20, 26, 50):
+        columns[f'ema{span}'] = _ema(new['close'], span, last(f'ema{span}'))
+    
+    columns['macd'] = columns['ema12'] - columns['ema26']
+    columns['macd_signal'] = _ema(columns['macd'], 9, last('macd_signal'))
+    columns['macd_hist'] = columns['macd'] - columns['macd_signal']
+    
+    # 与 pandas 口径一致：序列首行差分为 nan，where 后计为 0；
+    # 拼接序列不是从首行开始时，首个差分缺少前值，置为 nan 且不会落入新K线的窗口
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if not from_origin:
+        gain[0] = loss[0] = np.nan
+    for period in (7, 14):
+        avg_gain = _rolling(gain, period, n_new)
+        avg_loss = _rolling(loss, period, n_new)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[f'rsi{period}'] = 100 - 100 / (1 + avg_gain / avg_loss)
+    
+    middle = _rolling(close, 20, n_new)
+    std = _rolling(close, 20, n_new, 'std')
+    columns['bb_upper'] = middle + 2.0 * std
+    columns['bb_middle'] = middle
+    columns['bb_lower'] = middle - 2.0 * std
+    
+    previous_close = np.r_[np.nan, close[:-1]]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    if not from_origin:
+        true_range[0] = np.nan
+    columns['atr14'] = _rolling(true_range, 14, n_new)
+    columns['volume_avg'] = _rolling(volume, 20, n_new)
+    
+    return columns
+
+
+class FeatureTable:
+    """单个 (交易所, 交易对, 时间框架) 的列式特征表"""
+    
+    def __init__(self, columns: Sequence[str], timeframe_ms: int, capacity: int = 256, max_rows: Optional[int] = None):
+        self.columns = list(columns)
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        self.timeframe_ms = timeframe_ms
+        self.size = 0
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        # 按列连续存储：values[列, 行]
+        self.values = np.empty((len(self.columns), capacity), dtype=np.float64)
+        self._index_cache: Dict[Tuple[str, ...], np.ndarray] = {}
+        # 内存保留的最大行数（None 表示不限），超出 1/4 后一次裁到 max_rows，搬移开销均摊为常数
+        self.max_rows = max_rows
+        # 内存第 0 行在列文件中的行号（更早的行已从内存裁掉）
+        self.offset = 0
+        # 已写入磁盘的行数（列文件中的行号）
+        self.persisted = 0
+    
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self.timestamps[self.size - 1]) if self.size else None
+    
+    def _reserve(self, rows: int):
+        capacity = self.timestamps.shape[0]
+        if self.size + rows <= capacity:
+            return
+        new_capacity = max(capacity * 2, self.size + rows)
+        timestamps = np.empty(new_capacity, dtype=np.int64)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        values = np.empty((len(self.columns), new_capacity), dtype=np.float64)
+        values[:, :self.size] = self.values[:, :self.size]
+        self.timestamps, self.values = timestamps, values
+    
+    def append(self, timestamps: np.ndarray, columns: Dict[str, np.ndarray]) -> int:
+        """追加行（时间戳须严格递增且晚于已有数据），缺失的列填 nan，返回追加行数"""
+        rows = len(timestamps)
+        if rows == 0:
+            return 0
+        self._reserve(rows)
+        end = self.size + rows
+        self.timestamps[self.size:end] = timestamps
+        for name, i in self.column_index.items():
+            if name in columns:
+                self.values[i, self.size:end] = columns[name]
+            else:
+                self.values[i, self.size:end] = np.nan
+        self.size = end
+        return rows
+    
+    def trim(self, persisted_only: bool) -> int:
+        """
+        超出 max_rows 较多时丢弃内存中最早的行
+        
+        Args:
+            persisted_only: 只丢弃已写入磁盘的行（有持久化目录时）
+        
+        Returns:
+            丢弃的行数
+        """
+        if self.max_rows is None or self.size <= self.max_rows + self.max_rows // 4:
+            return 0
+        drop = self.size - self.max_rows
+        if persisted_only:
+            drop = min(drop, self.persisted - self.offset)
+        if drop <= 0:
+            return 0
+        keep = self.size - drop
+        self.timestamps[:keep] = self.timestamps[drop:self.size]
+        self.values[:, :keep] = self.values[:, drop:self.size]
+        self.size = keep
+        self.offset += drop
+        return drop
+    
+    def tail(self, rows: int, columns: Iterable[str]) -> Dict[str, np.ndarray]:
+        start = max(0, self.size - rows)
+        return {name: self.values[self.column_index[name], start:self.size] for name in columns}
+    
+    def feature_indices(self, features: Optional[Sequence[str]]) -> np.ndarray:
+        if features is None:
+            return np.arange(len(self.columns))
+        key = tuple(features)
+        indices = self._index_cache.get(key)
+        if indices is None:
+            indices = np.array([self.column_index[name] for name in key], dtype=np.intp)
+            self._index_cache[key] = indices
+        return indices
+    
+    def row_as_of(self, as_of_ms: Optional[int]) -> int:
+        """as_of 时刻已收盘的最后一行下标，-1 表示没有"""
+        if as_of_ms is None:
+            return self.size - 1
+        # 开盘时间 + 周期 <= as_of 的K线才已收盘
+        return int(np.searchsorted(self.timestamps[:self.size], as_of_ms - self.timeframe_ms, side='right')) - 1
+    
+    def save(self, directory: Path, timeframe: str) -> int:
+        """把上次保存之后追加的行续写到各列文件末尾，最后替换 meta.json 提交行数，返回写入行数"""
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        total = self.offset + self.size
+        
+        def append(name: str, array: np.ndarray):
+            filepath = directory / f'{name}.bin'
+            itemsize = array.dtype.itemsize
+            on_disk = filepath.stat().st_size // itemsize if filepath.exists() else 0
+            offset = min(self.persisted, on_disk)
+            if offset < self.offset:
+                raise OSError(f"{filepath} 只有 {on_disk} 行，内存中的数据从第 {self.offset} 行开始")
+            with open(filepath, 'r+b' if offset else 'wb') as f:
+                # 截掉上次未提交的尾部
+                f.truncate(offset * itemsize)
+                f.seek(offset * itemsize)
+                f.write(array[offset - self.offset:self.size].tobytes())
+        
+        written = total - self.persisted
+        append('timestamp', self.timestamps.astype('<i8', copy=False))
+        for name, i in self.column_index.items():
+            append(name, self.values[i].astype('<f8', copy=False))
+        
+        meta = {'columns': self.columns, 'timeframe': timeframe, 'rows': total}
+        tmp_path = directory / '.meta.json.tmp'
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False))
+        os.replace(tmp_path, directory / 'meta.json')
+        self.persisted = total
+        return written
+    
+    @classmethod
+    def load(cls, directory: Path, max_rows: Optional[int] = None) -> 'FeatureTable':
+        """读取已提交的行，max_rows 不为 None 时只读最后 max_rows 行"""
+        meta = json.loads((directory / 'meta.json').read_text())
+        total = meta['rows']
+        start = max(0, total - max_rows) if max_rows is not None else 0
+        rows = total - start
+        table = cls(meta['columns'], TIMEFRAME_MS[meta['timeframe']], capacity=max(rows * 2, 256),
+                    max_rows=max_rows)
+        table.timestamps[:rows] = np.fromfile(directory / 'timestamp.bin', dtype='<i8', count=rows, offset=start * 8)
+        for name, i in table.column_index.items():
+            table.values[i, :rows] = np.fromfile(directory / f'{name}.bin', dtype='<f8', count=rows, offset=start * 8)
+        table.size = rows
+        table.offset = start
+        table.persisted = total
+        return table
+
+
+class FeatureStore(LoggerMixin):
+    """特征存储"""
+    
+    def __init__(self, root: Optional[str] = None, flush_interval: float = 60.0,
+                 max_rows: Optional[int] = DEFAULT_MAX_ROWS):
+        """
+        初始化特征存储
+        
+        Args:
+            root: 持久化目录，None 表示仅在内存中保存
+            flush_interval: K线收盘更新时距上次落盘超过该秒数即写盘
+            max_rows: 每张表在内存中保留的最大行数（不少于指标续算需要的 INDICATOR_LOOKBACK），None 表示不限
+        """
+        self.root = Path(root) if root else None
+        self.flush_interval = flush_interval
+        self.max_rows = max(max_rows, INDICATOR_LOOKBACK) if max_rows is not None else None
+        self.tables: Dict[Tuple[str, str, str], FeatureTable] = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+        if self.root is not None:
+            atexit.register(self.flush)
+        
+        # 统计
+        self.rows_appended = 0
+        self.update_time = 0.0
+    
+    @staticmethod
+    def _safe_name(name: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+    
+    def _table_dir(self, key: Tuple[str, str, str]) -> Path:
+        exchange, symbol, timeframe = key
+        return self.root / self._safe_name(exchange) / self._safe_name(symbol) / timeframe
+    
+    def _get_table(self, key: Tuple[str, str, str]) -> Optional[FeatureTable]:
+        table = self.tables.get(key)
+        if table is None and self.root is not None:
+            directory = self._table_dir(key)
+            if (directory / 'meta.json').exists():
+                table = FeatureTable.load(directory, self.max_rows)
+                self.tables[key] = table
+        return table
+    
+    def append(self, exchange: str, symbol: str, timeframe: str,
+               timestamps: Sequence[int], columns: Dict[str, Sequence[float]]) -> int:
+        """
+        追加任意特征列（不计算指标），早于或等于已有最后时间戳的行会被忽略
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            timestamps: K线开盘时间（毫秒）
+            columns: 列名到数值的映射，首次写入时确定表的列
+        
+        Returns:
+            实际追加的行数
+        """
+        key = (exchange, symbol, timeframe)
+        timestamps = _timestamps_ms(timestamps)
+        with self._lock:
+            table = self._get_table(key)
+            if table is None:
+                table = FeatureTable(list(columns), TIMEFRAME_MS[timeframe], max_rows=self.max_rows)
+                self.tables[key] = table
+            if table.size:
+                keep = timestamps > table.last_timestamp
+                timestamps = timestamps[keep]
+                columns = {name: np.asarray(v, dtype=np.float64)[keep] for name, v in columns.items()}
+            added = table.append(timestamps, columns)
+            if added:
+                self._dirty.add(key)
+                self.rows_appended += added
+                self._maybe_flush()
+                table.trim(persisted_only=self.root is not None)
+            return added
+    
+    def update_from_ohlcv(self, exchange: str, symbol: str, timeframe: str,
+                          df: pd.DataFrame, now: TimeLike = None) -> int:
+        """
+        用 OHLCV 数据增量更新：只追加新的已收盘K线，并续算指标列
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            df: 含 timestamp/open/high/low/close/volume 列的数据
+            now: 判断K线是否收盘的当前时间，None 表示系统时间
+        
+        Returns:
+            新追加的K线数量
+        """
+        if df is None or df.empty:
+            return 0
+        
+        start = time.perf_counter()
+        key = (exchange, symbol, timeframe)
+        timeframe_ms = TIMEFRAME_MS[timeframe]
+        timestamps = _timestamps_ms(df['timestamp'].values)
+        closed = timestamps + timeframe_ms <= to_milliseconds(now)
+        
+        with self._lock:
+            table = self._get_table(key)
+            if table is None:
+                table = FeatureTable(OHLCV_COLUMNS + INDICATOR_COLUMNS, timeframe_ms, max_rows=self.max_rows)
+                self.tables[key] = table
+            if table.size:
+                closed &= timestamps > table.last_timestamp
+            if not closed.any():
+                return 0
+            
+            new = {name: df[name].to_numpy(dtype=np.float64)[closed] for name in OHLCV_COLUMNS}
+            tail = table.tail(INDICATOR_LOOKBACK, table.columns)
+            new.update(compute_indicator_columns(tail, new, from_origin=table.offset == 0 and
+                                                 table.size <= INDICATOR_LOOKBACK))
+            added = table.append(timestamps[closed], new)
+            
+            self._dirty.add(key)
+            self.rows_appended += added
+            self.update_time += time.perf_counter() - start
+            self._maybe_flush()
+            table.trim(persisted_only=self.root is not None)
+            return added
+    
+    def get_vector(self, exchange: str, symbol: str, timeframe: str,
+                   as_of: TimeLike = None, features: Optional[Sequence[str]] = None) -> Optional[np.ndarray]:
+        """
+        获取某一时刻的特征向量
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            as_of: 观察时刻，None 表示最新已收盘K线
+            features: 特征列，None 表示全部
+        
+        Returns:
+            特征向量；该时刻尚无已收盘K线时返回 None
+        """
+        with self._lock:
+            table = self._get_table((exchange, symbol, timeframe))
+            if table is None:
+                return None
+            row = table.row_as_of(None if as_of is None else to_milliseconds(as_of))
+            if row < 0:
+                return None
+            return table.values[table.feature_indices(features), row]
+    
+    def get_snapshot(self, pairs: Sequence[Tuple[str, str]], timeframe: str,
+                     features: Sequence[str], as_of: TimeLike = None) -> np.ndarray:
+        """
+        获取多个交易对在同一时刻的特征矩阵
+        
+        Args:
+            pairs: 交易对列表 [(exchange, symbol), ...]
+            timeframe: 时间框架
+            features: 特征列
+            as_of: 观察时刻，None 表示各自最新已收盘K线
+        
+        Returns:
+            (交易对数, 特征数) 矩阵，缺失数据的行为 nan
+        """
+        as_of_ms = None if as_of is None else to_milliseconds(as_of)
+        matrix = np.full((len(pairs), len(features)), np.nan)
+        with self._lock:
+            for i, (exchange, symbol) in enumerate(pairs):
+                table = self._get_table((exchange, symbol, timeframe))
+                if table is None:
+                    continue
+                row = table.row_as_of(as_of_ms)
+                if row >= 0:
+                    matrix[i] = table.values[table.feature_indices(features), row]
+        return matrix
+    
+    def as_of_join(self, exchange: str, symbol: str, timeframe: str,
+                   timestamps: Sequence[TimeLike], features: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        按一组观察时刻取特征（用于回测/训练样本对齐），每行只使用该时刻已收盘的K线
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            timestamps: 观察时刻序列
+            features: 特征列，None 表示全部
+        
+        Returns:
+            (时刻数, 特征数) 矩阵，尚无数据的时刻为 nan
+        """
+        as_of_ms = np.array([to_milliseconds(t) for t in timestamps], dtype=np.int64)
+        with self._lock:
+            table = self._get_table((exchange, symbol, timeframe))
+            n_features = len(features) if features is not None else (len(table.columns) if table else 0)
+            result = np.full((len(as_of_ms), n_features), np.nan)
+            if table is None or table.size == 0:
+                return result
+            rows = np.searchsorted(table.timestamps[:table.size], as_of_ms - table.timeframe_ms,
+                                   side='right') - 1
+            valid = rows >= 0
+            result[valid] = table.values[table.feature_indices(features)][:, rows[valid]].T
+        return result
+    
+    def get_frame(self, exchange: str, symbol: str, timeframe: str,
+                  start: TimeLike = None, end: TimeLike = None,
+                  features: Optional[Sequence[str]] = None, rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        获取一段时间内的特征表
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            start: 起始开盘时间（含）
+            end: 观察截止时刻，只返回此前已收盘的K线
+            features: 特征列，None 表示全部
+            rows: 只取范围内最后若干行，None 表示全部
+        
+        Returns:
+            以 timestamp 为索引的 DataFrame
+        """
+        with self._lock:
+            table = self._get_table((exchange, symbol, timeframe))
+            if table is None:
+                return pd.DataFrame()
+            timestamps = table.timestamps[:table.size]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, to_milliseconds(start)))
+            hi = table.row_as_of(None if end is None else to_milliseconds(end)) + 1
+            if rows is not None:
+                lo = max(lo, hi - rows)
+            names = table.columns if features is None else list(features)
+            data = table.values[table.feature_indices(features), lo:hi].T.copy()
+            index = pd.to_datetime(timestamps[lo:hi], unit='ms')
+        return pd.DataFrame(data, index=pd.Index(index, name='timestamp'), columns=names)
+    
+    def get_latest_indicators(self, exchange: str, symbol: str, timeframe: str) -> Dict[str, float]:
+        """最新已收盘K线的指标字典（键名与 calculate_all_indicators 一致）"""
+        with self._lock:
+            table = self._get_table((exchange, symbol, timeframe))
+            if table is None or table.size == 0:
+                return {}
+            row = table.values[:, table.size - 1]
+            return {name: float(row[i]) for name, i in table.column_index.items()}
+    
+    def get_current_indicators(self, exchange: str, symbol: str, timeframe: str,
+                               df: pd.DataFrame) -> Dict[str, float]:
+        """
+        最新一根K线（通常尚未收盘）的指标字典，键名与 calculate_all_indicators 一致
+        
+        已收盘的K线直接读存储，存储之后的K线在存储尾部之上续算一次，不写入存储，
+        调用前应先用 update_from_ohlcv 写入已收盘部分。
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            df: 含 timestamp/open/high/low/close/volume 列的数据，最后一行为当前K线
+        
+        Returns:
+            指标字典；存储中尚无该序列时返回空字典
+        """
+        if df is None or df.empty:
+            return {}
+        
+        with self._lock:
+            table = self._get_table((exchange, symbol, timeframe))
+            if table is None or table.size == 0:
+                return {}
+            pending = _timestamps_ms(df['timestamp'].values) > table.last_timestamp
+            if pending.any():
+                new = {name: df[name].to_numpy(dtype=np.float64)[pending] for name in OHLCV_COLUMNS}
+                tail = table.tail(INDICATOR_LOOKBACK, table.columns)
+                columns = compute_indicator_columns(tail, new, from_origin=table.offset == 0 and
+                                                    table.size <= INDICATOR_LOOKBACK)
+                columns.update(new)
+                values = {name: float(column[-1]) for name, column in columns.items()}
+            else:
+                row = table.values[:, table.size - 1]
+                values = {name: float(row[i]) for name, i in table.column_index.items()}
+        
+        indicators = {'current_price': values['close']}
+        indicators.update((name, values[name]) for name in CURRENT_INDICATOR_KEYS)
+        indicators['volume'] = values['volume']
+        return indicators
+    
+    def _maybe_flush(self):
+        """距上次落盘超过 flush_interval 时写盘（调用方持有锁）"""
+        if self.root is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self) -> int:
+        """把有变更的表的新行续写到磁盘，返回写入的表数量"""
+        if self.root is None:
+            return 0
+        rows = 0
+        with self._lock:
+            self._last_flush = time.monotonic()
+            dirty = list(self._dirty)
+            for key in dirty:
+                try:
+                    rows += self.tables[key].save(self._table_dir(key), key[2])
+                    self._dirty.discard(key)
+                except OSError as e:
+                    self.logger.error(f"❌ 写入特征表 {key} 失败: {e}")
+        if rows:
+            self.logger.debug(f"💾 特征存储已写入 {len(dirty)} 张表，{rows} 行")
+        return len(dirty)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取存储统计"""
+        with self._lock:
+            rows = sum(t.size for t in self.tables.values())
+            nbytes = sum(t.values.nbytes + t.timestamps.nbytes for t in self.tables.values())
+            return {
+                'tables': len(self.tables),
+                'rows': rows,
+                'memory_bytes': nbytes,
+                'dirty_tables': len(self._dirty),
+                'rows_appended': self.rows_appended,
+                'avg_update_ms': self.update_time / max(1, self.rows_appended) * 1000
+            }
+
+
+_shared_store: Optional[FeatureStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_feature_store() -> FeatureStore:
+    """
+    获取进程级共享的特征存储
+    持久化目录默认 data/features（环境变量 FEATURE_STORE_DIR 可覆盖），
+    内存行数上限默认 DEFAULT_MAX_ROWS（环境变量 FEATURE_STORE_MAX_ROWS 可覆盖，0 表示不限）
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            max_rows = int(os.getenv('FEATURE_STORE_MAX_ROWS', DEFAULT_MAX_ROWS)) or None
+            _shared_store = FeatureStore(os.getenv('FEATURE_STORE_DIR', DEFAULT_ROOT) or None, max_rows=max_rows)
+        return _shared_store
@@ -9,7 +9,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import time
 
+from data.market_recorder import get_market_recorder
 from utils.logging_manager import LoggerMixin
+from utils.latency_metrics import timed
 from config.exchange_config import ExchangeConfig
 
 class MarketDataCollector(LoggerMixin):
@@ -20,6 +22,8 @@ class MarketDataCollector(LoggerMixin):
         self.exchanges = {}
         self.rate_limits = {}
         self.last_request_time = {}
+        # MARKET_RECORDER=1 时录制看到的行情，供 data.market_replay 回放
+        self.recorder = get_market_recorder()
         
     def initialize_exchange(self, exchange_name: str) -> bool:
         """
@@ -83,6 +87,7 @@ class MarketDataCollector(LoggerMixin):
             
             self.last_request_time[exchange_name] = time.time()
     
+    @timed('market_data.fetch_ohlcv', none_is_error=True)
     def fetch_ohlcv(self, exchange_name: str, symbol: str, 
                     timeframe: str = '1h', limit: int = 1000) -> Optional[pd.DataFrame]:
         """
@@ -114,6 +119,9 @@ class MarketDataCollector(LoggerMixin):
                 self.logger.warning(f"⚠️ 未获取到 {exchange_name} {symbol} 的数据")
                 return None
             
+            if self.recorder is not None:
+                self.recorder.record_ohlcv(exchange_name, symbol, timeframe, ohlcv)
+            
             # 转换为DataFrame
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
@@ -125,6 +133,7 @@ class MarketDataCollector(LoggerMixin):
             self.logger.error(f"❌ 获取 {exchange_name} {symbol} 数据失败: {e}")
             return None
     
+    @timed('market_data.fetch_ticker', none_is_error=True)
     def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
         """
         获取当前价格信息
@@ -147,7 +156,7 @@ class MarketDataCollector(LoggerMixin):
             exchange = self.exchanges[exchange_name]
             ticker = exchange.fetch_ticker(symbol)
             
-            return {
+            result = {
                 'symbol': symbol,
                 'exchange': exchange_name,
                 'last': ticker['last'],
@@ -158,6 +167,9 @@ class MarketDataCollector(LoggerMixin):
                 'volume': ticker['baseVolume'],
                 'timestamp': datetime.now().isoformat()
             }
+            if self.recorder is not None:
+                self.recorder.record_ticker(exchange_name, symbol, result)
+            return result
 
         except ccxt.AuthenticationError as e:
             self.logger.error(f"❌ {exchange_name} 认证失败 (API Key可能无效或权限不足): {e}")
@@ -172,6 +184,38 @@ class MarketDataCollector(LoggerMixin):
             self.logger.error(f"❌ 获取 {exchange_name} {symbol} 价格信息时发生未知错误: {e}")
             return None
     
+    @timed('market_data.fetch_tickers', none_is_error=True)
+    def fetch_tickers(self, exchange_name: str,
+                      symbols: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        批量获取交易所全部（或指定）交易对的行情，一次请求
+        
+        Args:
+            exchange_name: 交易所名称
+            symbols: 交易对列表，None表示全部
+        
+        Returns:
+            {symbol: ccxt ticker} 字典
+        """
+        try:
+            if exchange_name not in self.exchanges:
+                if not self.initialize_exchange(exchange_name):
+                    return None
+            
+            # 遵守速率限制
+            self._respect_rate_limit(exchange_name)
+            
+            exchange = self.exchanges[exchange_name]
+            tickers = exchange.fetch_tickers(symbols)
+            if tickers and self.recorder is not None:
+                self.recorder.record_tickers(exchange_name, tickers)
+            return tickers
+            
+        except Exception as e:
+            self.logger.error(f"❌ 批量获取 {exchange_name} 行情失败: {e}")
+            return None
+    
+    @timed('market_data.fetch_order_book', none_is_error=True)
     def fetch_order_book(self, exchange_name: str, symbol: str, 
                         limit: int = 20) -> Optional[Dict[str, Any]]:
         """
@@ -195,6 +239,8 @@ class MarketDataCollector(LoggerMixin):
             
             exchange = self.exchanges[exchange_name]
             order_book = exchange.fetch_order_book(symbol, limit)
+            if self.recorder is not None:
+                self.recorder.record_order_book(exchange_name, symbol, order_book['bids'], order_book['asks'])
             
             return {
                 'symbol': symbol,
@@ -208,6 +254,7 @@ class MarketDataCollector(LoggerMixin):
             self.logger.error(f"❌ 获取 {exchange_name} {symbol} 订单簿失败: {e}")
             return None
     
+    @timed('market_data.fetch_recent_trades', none_is_error=True)
     def fetch_recent_trades(self, exchange_name: str, symbol: str, 
                            limit: int = 100) -> Optional[List[Dict[str, Any]]]:
         """
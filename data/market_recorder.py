@@ -0,0 +1,287 @@
+"""
+行情录制
+把收集器看到的行情（ticker、K线、订单簿、资金费率、持仓量）写入按天分段的二进制记录日志，
+供 data.market_replay 回放（回放使用 ticks/candles/books）。
+
+磁盘结构（<root> 默认为 data/journal/market）:
+    <root>/ticks/          逐笔 ticker，时间戳为收到的时间
+    <root>/candles/        已收盘的K线，时间戳为开盘时间，同一 (交易所, 交易对, 周期) 只追加新K线
+    <root>/books/          订单簿快照，时间戳为收到的时间，每边固定 BOOK_DEPTH 档
+    <root>/funding/        资金费率，时间戳为收到的时间
+    <root>/open_interest/  持仓量，时间戳为收到的时间
+
+设置环境变量 MARKET_RECORDER=1 后以下收集器自动录制从交易所收到的数据（命中缓存的不重复录制），
+目录可用 MARKET_RECORDER_DIR 指定：
+    MarketDataCollector / AsyncMarketDataCollector   ticker、K线、订单簿
+    MultiExchangePriceCollector                      ticker
+    RealTimeDataManager                              ticker
+    DerivativesDataCollector                         资金费率、持仓量
+写入先进入内存缓冲，满 flush_records 条或距上次落盘超过
+flush_interval 秒时批量追加，进程退出时写出剩余数据。
+"""
+
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from data.feature_store import TIMEFRAME_MS
+from data.record_journal import PRICE_SCHEMA, RecordJournal, get_journal
+from utils import clock
+from utils.logging_manager import LoggerMixin
+
+BOOK_DEPTH = 10
+
+# ticker 与多交易所逐笔价格同结构
+TICK_SCHEMA = PRICE_SCHEMA
+
+CANDLE_SCHEMA = [
+    ('exchange', 'category'),
+    ('symbol', 'category'),
+    ('timeframe', 'category'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8')
+]
+
+BOOK_SCHEMA = [('exchange', 'category'), ('symbol', 'category')] + [
+    (f'{side}_{field}_{level}', 'f8')
+    for side in ('bid', 'ask') for level in range(BOOK_DEPTH) for field in ('px', 'qty')
+]
+
+FUNDING_SCHEMA = [
+    ('exchange', 'category'),
+    ('symbol', 'category'),
+    ('funding_rate', 'f8'),
+    ('mark_price', 'f8'),
+    ('index_price', 'f8'),
+    ('next_funding_time', 'i8')
+]
+
+OPEN_INTEREST_SCHEMA = [
+    ('exchange', 'category'),
+    ('symbol', 'category'),
+    ('open_interest', 'f8'),
+    ('open_interest_value', 'f8')
+]
+
+DEFAULT_ROOT = 'data/journal/market'
+
+
+def open_market_journals(root: Union[str, Path]) -> Dict[str, RecordJournal]:
+    """打开（或创建）录制目录下的各个记录日志"""
+    root = Path(root)
+    return {
+        'ticks': get_journal(root / 'ticks', TICK_SCHEMA),
+        'candles': get_journal(root / 'candles', CANDLE_SCHEMA),
+        'books': get_journal(root / 'books', BOOK_SCHEMA),
+        'funding': get_journal(root / 'funding', FUNDING_SCHEMA),
+        'open_interest': get_journal(root / 'open_interest', OPEN_INTEREST_SCHEMA)
+    }
+
+
+class MarketDataRecorder(LoggerMixin):
+    """行情录制器"""
+    
+    def __init__(self, root: Union[str, Path] = DEFAULT_ROOT,
+                 flush_records: int = 256, flush_interval: float = 1.0):
+        """
+        初始化行情录制器
+        
+        Args:
+            root: 录制目录
+            flush_records: 缓冲达到该条数时落盘
+            flush_interval: 距上次落盘超过该秒数时落盘
+        """
+        self.root = Path(root)
+        self.journals = open_market_journals(self.root)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in self.journals}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        # (交易所, 交易对, 周期) -> 已录制的最后一根K线开盘时间
+        self._last_candle: Dict[Tuple[str, str, str], int] = {}
+        
+        self.recorded = {kind: 0 for kind in self.journals}
+        atexit.register(self.flush)
+    
+    def _add(self, kind: str, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        with self._lock:
+            self._buffers[kind].extend(records)
+            self._buffered += len(records)
+            self.recorded[kind] += len(records)
+            due = (self._buffered >= self.flush_records or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """把缓冲的记录写入日志"""
+        with self._lock:
+            buffers = {kind: records for kind, records in self._buffers.items() if records}
+            self._buffers = {kind: [] for kind in self.journals}
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+        for kind, records in buffers.items():
+            try:
+                self.journals[kind].append_many(records)
+            except Exception as e:
+                self.logger.error(f"❌ 写入行情录制 {kind} 失败: {e}")
+    
+    def record_ticker(self, exchange: str, symbol: str, ticker: Dict[str, Any]):
+        """
+        录制一条 ticker
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            ticker: 含 last/bid/ask/high/low 与 volume（或 ccxt 的 baseVolume）的行情
+        """
+        self.record_tickers(exchange, {symbol: ticker})
+    
+    def record_tickers(self, exchange: str, tickers: Dict[str, Dict[str, Any]]):
+        """录制一批 ticker（{symbol: ticker}，如 fetch_tickers 的结果）"""
+        received = int(clock.time() * 1000)
+        records = []
+        for symbol, ticker in tickers.items():
+            bid, ask = ticker.get('bid'), ticker.get('ask')
+            records.append({
+                'timestamp': received,
+                'exchange': exchange,
+                'symbol': symbol,
+                'last': ticker.get('last'),
+                'bid': bid,
+                'ask': ask,
+                'high': ticker.get('high'),
+                'low': ticker.get('low'),
+                'volume': ticker.get('volume', ticker.get('baseVolume')),
+                'spread': ask - bid if bid is not None and ask is not None else None
+            })
+        self._add('ticks', records)
+    
+    def record_ohlcv(self, exchange: str, symbol: str, timeframe: str, ohlcv: Sequence[Sequence[float]]):
+        """
+        录制 ccxt fetch_ohlcv 的原始结果，只追加已收盘且未录制过的K线
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            ohlcv: [[开盘时间毫秒, open, high, low, close, volume], ...]，升序
+        """
+        if not ohlcv:
+            return
+        key = (exchange, symbol, timeframe)
+        timeframe_ms = TIMEFRAME_MS.get(timeframe)
+        now_ms = int(clock.time() * 1000)
+        last = self._last_candle.get(key, -1)
+        
+        records = []
+        for i, row in enumerate(ohlcv):
+            open_time = int(row[0])
+            if open_time <= last:
+                continue
+            # 未知周期时按 ccxt 惯例把最后一根视为未收盘
+            closed = open_time + timeframe_ms <= now_ms if timeframe_ms else i < len(ohlcv) - 1
+            if not closed:
+                break
+            records.append({
+                'timestamp': open_time,
+                'exchange': exchange,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'open': row[1],
+                'high': row[2],
+                'low': row[3],
+                'close': row[4],
+                'volume': row[5]
+            })
+        if records:
+            self._last_candle[key] = records[-1]['timestamp']
+            self._add('candles', records)
+    
+    def record_order_book(self, exchange: str, symbol: str,
+                          bids: Sequence[Sequence[float]], asks: Sequence[Sequence[float]]):
+        """
+        录制订单簿快照（每边最多 BOOK_DEPTH 档，不足的档位记为缺失）
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            bids: [[价格, 数量], ...]，价格从高到低
+            asks: [[价格, 数量], ...]，价格从低到高
+        """
+        record = {'timestamp': int(clock.time() * 1000), 'exchange': exchange, 'symbol': symbol}
+        for side, levels in (('bid', bids), ('ask', asks)):
+            for level, entry in enumerate(levels[:BOOK_DEPTH]):
+                record[f'{side}_px_{level}'] = entry[0]
+                record[f'{side}_qty_{level}'] = entry[1]
+        self._add('books', [record])
+    
+    def record_funding_rates(self, rates: Iterable[Dict[str, Any]]):
+        """
+        录制资金费率
+        
+        Args:
+            rates: DerivativesDataCollector 格式的资金费率（含 exchange/symbol/current/mark_price/
+                index_price/next_funding_time）
+        """
+        received = int(clock.time() * 1000)
+        self._add('funding', [{
+            'timestamp': received,
+            'exchange': rate.get('exchange'),
+            'symbol': rate.get('symbol'),
+            'funding_rate': rate.get('current'),
+            'mark_price': rate.get('mark_price'),
+            'index_price': rate.get('index_price'),
+            'next_funding_time': rate.get('next_funding_time')
+        } for rate in rates])
+    
+    def record_open_interest(self, items: Iterable[Dict[str, Any]]):
+        """
+        录制持仓量
+        
+        Args:
+            items: DerivativesDataCollector 格式的持仓量（含 exchange/symbol/current/value）
+        """
+        received = int(clock.time() * 1000)
+        self._add('open_interest', [{
+            'timestamp': received,
+            'exchange': item.get('exchange'),
+            'symbol': item.get('symbol'),
+            'open_interest': item.get('current'),
+            'open_interest_value': item.get('value')
+        } for item in items])
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取录制统计"""
+        return {
+            'root': str(self.root),
+            'recorded': dict(self.recorded),
+            'buffered': self._buffered
+        }
+
+
+_recorder: Optional[MarketDataRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_market_recorder() -> Optional[MarketDataRecorder]:
+    """MARKET_RECORDER=1 时返回进程内共享的录制器，否则返回 None"""
+    global _recorder
+    if os.getenv('MARKET_RECORDER', '0') in ('', '0'):
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = MarketDataRecorder(os.getenv('MARKET_RECORDER_DIR', DEFAULT_ROOT))
+            _recorder.logger.info(f"⏺️ 行情录制已开启: {_recorder.root}")
+        return _recorder
@@ -0,0 +1,606 @@
+"""
+行情回放
+把 data.market_recorder 录制的行情按模拟时钟回放给交易系统和策略：
+回放引擎按固定步长推进 utils.clock 的模拟时钟，每一步调用一次驱动（HighFrequencyTradingSystem.run_cycle
+或策略的 generate_signals），驱动通过 ReplayMarketDataCollector 取数，只能看到模拟时间之前已经收到的数据。
+可以按 N 倍速回放（与实盘节奏一致地复现问题），也可以不等待全速回放（测量策略吞吐）。
+同一份录制、同样的参数，回放得到的交易/信号完全相同，结果附带摘要便于比对。
+
+K线请求按录制中能整除的最大周期现场聚合：录制了 1s K线时，fetch_ohlcv('1m') 返回已收盘的分钟K线
+加上由已收盘秒K线聚合出的当前未收盘分钟K线，与实盘请求看到的一致。
+
+用法:
+    python -m data.market_replay                                           # 全速回放 data/journal/market
+    python -m data.market_replay --speed 60 --start 2024-01-01T09:00 --end 2024-01-01T10:00
+    python -m data.market_replay --driver strategy --strategy RSIStrategy --output replay.json
+    python -m data.market_replay --workers 8                                # 按交易对分给 8 个进程全速回放
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data.feature_store import TIMEFRAME_MS, TimeLike, to_milliseconds
+from data.market_recorder import BOOK_DEPTH, DEFAULT_ROOT, open_market_journals
+from utils import clock
+from utils.clock import SimulatedClock, use_clock
+from utils.logging_manager import LoggerMixin
+from utils.timeframe_resampler import OHLCV_COLUMNS, aggregate_ohlcv
+
+TICK_COLUMNS = ['last', 'bid', 'ask', 'high', 'low', 'volume']
+BOOK_COLUMNS = [f'{side}_{field}_{level}'
+                for side in ('bid', 'ask') for level in range(BOOK_DEPTH) for field in ('px', 'qty')]
+
+
+def _series(frame: pd.DataFrame, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """按时间排序并去重（同一时间戳保留最后录制的一条）"""
+    timestamps = frame['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+    values = frame[columns].to_numpy(dtype=np.float64)
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, values = timestamps[order], values[order]
+    keep = np.r_[timestamps[1:] != timestamps[:-1], True]
+    return timestamps[keep], values[keep]
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class MarketReplay(LoggerMixin):
+    """录制行情的内存索引，按时间点查询当时可见的数据"""
+    
+    def __init__(self, root: Union[str, Path] = DEFAULT_ROOT, start: TimeLike = None, end: TimeLike = None,
+                 exchanges: Optional[Sequence[str]] = None, symbols: Optional[Sequence[str]] = None,
+                 warmup: float = 7200):
+        """
+        载入录制数据
+        
+        Args:
+            root: 录制目录
+            start: 回放起始时间，None 表示录制的开头
+            end: 回放结束时间（不含），None 表示录制的结尾
+            exchanges: 只载入这些交易所
+            symbols: 只载入这些交易对
+            warmup: 起始时间之前额外载入的K线秒数，供策略计算指标
+        """
+        self.root = Path(root)
+        if not self.root.exists():
+            raise FileNotFoundError(f"录制目录不存在: {self.root}")
+        journals = open_market_journals(self.root)
+        start_ms = to_milliseconds(start) if start is not None else None
+        end_ms = to_milliseconds(end) if end is not None else None
+        
+        def load(kind: str, from_ms: Optional[int]) -> pd.DataFrame:
+            frame = journals[kind].read_frame(from_ms, end_ms)
+            if exchanges is not None:
+                frame = frame[frame['exchange'].isin(exchanges)]
+            if symbols is not None:
+                frame = frame[frame['symbol'].isin(symbols)]
+            return frame
+        
+        # (交易所, 交易对) -> {周期毫秒: (开盘时间, OHLCV)}
+        self.candles: Dict[Tuple[str, str], Dict[int, Tuple[np.ndarray, np.ndarray]]] = {}
+        frame = load('candles', start_ms - int(warmup * 1000) if start_ms is not None else None)
+        for (exchange, symbol, timeframe), group in frame.groupby(['exchange', 'symbol', 'timeframe'], sort=True):
+            if timeframe not in TIMEFRAME_MS:
+                self.logger.warning(f"⚠️ 跳过未知周期的K线: {exchange} {symbol} {timeframe}")
+                continue
+            self.candles.setdefault((exchange, symbol), {})[TIMEFRAME_MS[timeframe]] = _series(group, OHLCV_COLUMNS)
+        
+        # (交易所, 交易对) -> (收到时间, 数值)
+        self.ticks = {key: _series(group, TICK_COLUMNS)
+                      for key, group in load('ticks', start_ms).groupby(['exchange', 'symbol'], sort=True)}
+        self.books = {key: _series(group, BOOK_COLUMNS)
+                      for key, group in load('books', start_ms).groupby(['exchange', 'symbol'], sort=True)}
+        
+        # 回放时间范围：数据可见的最早/最晚时刻（K线在收盘时可见）
+        firsts, lasts = [], []
+        for series in self.candles.values():
+            for timeframe_ms, (timestamps, _) in series.items():
+                firsts.append(timestamps[0] + timeframe_ms)
+                lasts.append(timestamps[-1] + timeframe_ms)
+        for timestamps, _ in list(self.ticks.values()) + list(self.books.values()):
+            firsts.append(timestamps[0])
+            lasts.append(timestamps[-1])
+        if not firsts:
+            raise ValueError(f"录制目录 {self.root} 在指定范围内没有数据")
+        self.start_ms = max(min(firsts), start_ms) if start_ms is not None else int(min(firsts))
+        self.end_ms = min(max(lasts) + 1, end_ms) if end_ms is not None else int(max(lasts)) + 1
+        
+        self._bases: Dict[Tuple[str, str, int], Optional[int]] = {}
+        self.logger.info(f"📼 载入录制 {self.root}: {len(self.keys())} 个交易对, "
+                         f"{sum(len(ts) for s in self.candles.values() for ts, _ in s.values())} 根K线, "
+                         f"{sum(len(ts) for ts, _ in self.ticks.values())} 条ticker, "
+                         f"{sum(len(ts) for ts, _ in self.books.values())} 个订单簿快照")
+    
+    def keys(self) -> List[Tuple[str, str]]:
+        """录制中出现的 (交易所, 交易对)"""
+        return sorted(set(self.candles) | set(self.ticks) | set(self.books))
+    
+    def exchanges(self) -> List[str]:
+        return sorted({exchange for exchange, _ in self.keys()})
+    
+    def symbols(self) -> List[str]:
+        return sorted({symbol for _, symbol in self.keys()})
+    
+    def _base(self, exchange: str, symbol: str, timeframe_ms: int) -> Optional[int]:
+        """能整除目标周期的最大录制周期（聚合的行数最少）"""
+        key = (exchange, symbol, timeframe_ms)
+        if key not in self._bases:
+            recorded = self.candles.get((exchange, symbol), {})
+            divisors = [base for base in recorded if timeframe_ms % base == 0]
+            self._bases[key] = max(divisors) if divisors else None
+        return self._bases[key]
+    
+    def ohlcv(self, exchange: str, symbol: str, timeframe: str, limit: int,
+              now_ms: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        now_ms 时刻请求K线能得到的结果
+        
+        Returns:
+            (开盘时间, (n, 5) OHLCV)，最后一根可能是未收盘的K线；没有可用的录制周期时返回 None
+        """
+        timeframe_ms = TIMEFRAME_MS.get(timeframe)
+        base_ms = self._base(exchange, symbol, timeframe_ms) if timeframe_ms else None
+        if base_ms is None:
+            return None
+        timestamps, values = self.candles[(exchange, symbol)][base_ms]
+        end = np.searchsorted(timestamps, now_ms - base_ms, side='right')
+        if base_ms == timeframe_ms:
+            start = max(end - limit, 0)
+            return timestamps[start:end], values[start:end]
+        
+        first_bucket = now_ms - now_ms % timeframe_ms - (limit - 1) * timeframe_ms
+        start = np.searchsorted(timestamps, first_bucket, side='left')
+        buckets, aggregated, _ = aggregate_ohlcv(timestamps[start:end], values[start:end], timeframe_ms)
+        return buckets[-limit:], aggregated[-limit:]
+    
+    def ticker(self, exchange: str, symbol: str, now_ms: int) -> Optional[Tuple[int, np.ndarray]]:
+        """now_ms 时刻最近收到的 ticker：(收到时间, last/bid/ask/high/low/volume)"""
+        return self._latest(self.ticks, exchange, symbol, now_ms)
+    
+    def order_book(self, exchange: str, symbol: str, now_ms: int) -> Optional[Tuple[int, np.ndarray]]:
+        """now_ms 时刻最近收到的订单簿快照：(收到时间, BOOK_COLUMNS 数值)"""
+        return self._latest(self.books, exchange, symbol, now_ms)
+    
+    @staticmethod
+    def _latest(store: Dict, exchange: str, symbol: str, now_ms: int) -> Optional[Tuple[int, np.ndarray]]:
+        series = store.get((exchange, symbol))
+        if series is None:
+            return None
+        timestamps, values = series
+        position = np.searchsorted(timestamps, now_ms, side='right') - 1
+        if position < 0:
+            return None
+        return int(timestamps[position]), values[position]
+
+
+class ReplayMarketDataCollector(LoggerMixin):
+    """与 MarketDataCollector 接口一致的回放数据源，返回模拟时钟当前时刻可见的数据"""
+    
+    def __init__(self, replay: MarketReplay, sim_clock: SimulatedClock):
+        """
+        初始化回放数据源
+        
+        Args:
+            replay: 录制行情索引
+            sim_clock: 回放引擎推进的模拟时钟
+        """
+        self.replay = replay
+        self.clock = sim_clock
+        self.recorder = None
+        self.requests = 0
+    
+    @property
+    def exchanges(self) -> Dict[str, Any]:
+        return {exchange: None for exchange in self.replay.exchanges()}
+    
+    def initialize_exchange(self, exchange_name: str) -> bool:
+        return exchange_name in self.replay.exchanges()
+    
+    def fetch_ohlcv(self, exchange_name: str, symbol: str,
+                    timeframe: str = '1h', limit: int = 1000) -> Optional[pd.DataFrame]:
+        """获取OHLCV数据（同 MarketDataCollector.fetch_ohlcv）"""
+        self.requests += 1
+        result = self.replay.ohlcv(exchange_name, symbol, timeframe, limit, self.clock.ms)
+        if result is None or len(result[0]) == 0:
+            return None
+        timestamps, values = result
+        columns = {'timestamp': timestamps.astype('datetime64[ms]').astype('datetime64[ns]')}
+        columns.update(zip(OHLCV_COLUMNS, values.T))
+        return pd.DataFrame(columns)
+    
+    def _ticker(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
+        latest = self.replay.ticker(exchange_name, symbol, self.clock.ms)
+        if latest is None:
+            return None
+        received, values = latest
+        ticker = {name: _none_if_nan(value) for name, value in zip(TICK_COLUMNS, values)}
+        ticker.update(symbol=symbol, exchange=exchange_name,
+                      timestamp=clock.utc_datetime(received).isoformat())
+        return ticker
+    
+    def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
+        """获取当前价格信息（同 MarketDataCollector.fetch_ticker）"""
+        self.requests += 1
+        return self._ticker(exchange_name, symbol)
+    
+    def fetch_tickers(self, exchange_name: str,
+                      symbols: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """批量获取行情（ccxt ticker 格式，同 MarketDataCollector.fetch_tickers）"""
+        self.requests += 1
+        tickers = {}
+        for symbol in symbols or [s for e, s in self.replay.ticks if e == exchange_name]:
+            ticker = self._ticker(exchange_name, symbol)
+            if ticker is not None:
+                ticker['baseVolume'] = ticker.pop('volume')
+                tickers[symbol] = ticker
+        return tickers
+    
+    def fetch_order_book(self, exchange_name: str, symbol: str,
+                         limit: int = 20) -> Optional[Dict[str, Any]]:
+        """获取订单簿（同 MarketDataCollector.fetch_order_book，最多 BOOK_DEPTH 档）"""
+        self.requests += 1
+        latest = self.replay.order_book(exchange_name, symbol, self.clock.ms)
+        if latest is None:
+            return None
+        received, values = latest
+        levels = values.reshape(2, BOOK_DEPTH, 2)
+        bids, asks = ([[float(px), float(qty)] for px, qty in side[:limit] if not np.isnan(px)] for side in levels)
+        return {
+            'symbol': symbol,
+            'exchange': exchange_name,
+            'bids': bids,
+            'asks': asks,
+            'timestamp': clock.utc_datetime(received).isoformat()
+        }
+    
+    def fetch_recent_trades(self, exchange_name: str, symbol: str, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """录制中没有逐笔成交"""
+        return None
+    
+    def cleanup(self):
+        pass
+
+
+def result_digest(items: List[Dict[str, Any]]) -> str:
+    """交易/信号列表的摘要，两次回放的摘要相同即结果相同"""
+    payload = json.dumps(items, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class TradingSystemDriver:
+    """每一步执行一轮 HighFrequencyTradingSystem.run_cycle"""
+    
+    def __init__(self, system=None, exchanges: Optional[Sequence[str]] = None,
+                 pairs: Optional[Sequence[str]] = None, log_level: Optional[str] = None):
+        """
+        Args:
+            system: 交易系统实例，None 表示在模拟时钟下新建
+            exchanges: 交易的交易所，None 表示录制中的全部
+            pairs: 交易对，None 表示录制中的全部
+            log_level: 新建交易系统后设置的根日志级别（交易系统初始化时会把根日志设为 INFO）
+        """
+        self.system = system
+        self.log_level = log_level
+        self.exchanges = list(exchanges) if exchanges else None
+        self.pairs = list(pairs) if pairs else None
+    
+    def setup(self, collector: ReplayMarketDataCollector):
+        if self.system is None:
+            # 交易系统的日志写入 logs/
+            os.makedirs('logs', exist_ok=True)
+            from run_high_frequency_trading import HighFrequencyTradingSystem
+            self.system = HighFrequencyTradingSystem()
+            if self.log_level:
+                logging.getLogger().setLevel(self.log_level)
+        self.system.market_data_collector = collector
+        self.system.config['exchanges'] = self.exchanges or collector.replay.exchanges()
+        self.system.config['trading_pairs'] = self.pairs or collector.replay.symbols()
+        self.system.trading_active = True
+    
+    def step(self) -> int:
+        """执行一轮，返回处理的 (交易所, 交易对) 数"""
+        self.system.run_cycle()
+        return len(self.system.config['exchanges']) * len(self.system.config['trading_pairs'])
+    
+    @property
+    def finished(self) -> bool:
+        # 触发日止损后交易系统停止
+        return not self.system.trading_active
+    
+    @property
+    def results(self) -> List[Dict[str, Any]]:
+        return self.system.daily_trades
+    
+    @staticmethod
+    def summarize(trades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            'driver': 'trading_system',
+            'trades': len(trades),
+            'long': sum(1 for trade in trades if trade['direction'] == 'LONG'),
+            'short': sum(1 for trade in trades if trade['direction'] == 'SHORT'),
+            'digest': result_digest(trades)
+        }
+
+
+class StrategyDriver:
+    """每一步对每个 (交易所, 交易对) 调用一次策略的 generate_signals"""
+    
+    def __init__(self, strategy, timeframe: str = '1m', limit: int = 100,
+                 exchanges: Optional[Sequence[str]] = None, pairs: Optional[Sequence[str]] = None):
+        """
+        Args:
+            strategy: 策略实例（strategies 中 generate_signals(market_data) 接口的策略）
+            timeframe: 请求的K线周期
+            limit: 每次请求的K线数
+            exchanges: 交易所，None 表示录制中的全部
+            pairs: 交易对，None 表示录制中的全部
+        """
+        self.strategy = strategy
+        self.timeframe = timeframe
+        self.limit = limit
+        self.exchanges = list(exchanges) if exchanges else None
+        self.pairs = list(pairs) if pairs else None
+        self.signals: List[Dict[str, Any]] = []
+        self.finished = False
+    
+    def setup(self, collector: ReplayMarketDataCollector):
+        self.collector = collector
+        self.keys = [(exchange, pair)
+                     for exchange in self.exchanges or collector.replay.exchanges()
+                     for pair in self.pairs or collector.replay.symbols()]
+    
+    def step(self) -> int:
+        for exchange, pair in self.keys:
+            df = self.collector.fetch_ohlcv(exchange, pair, self.timeframe, self.limit)
+            if df is None:
+                continue
+            market_data = {column: df[column].tolist() for column in OHLCV_COLUMNS}
+            signal = self.strategy.generate_signals(market_data)
+            if signal.get('action', 'hold') != 'hold':
+                # 策略自带的时间戳取自系统时钟，换成模拟时间以保证结果可复现
+                self.signals.append({**signal, 'timestamp': clock.now().isoformat(),
+                                     'exchange': exchange, 'symbol': pair})
+        return len(self.keys)
+    
+    @property
+    def results(self) -> List[Dict[str, Any]]:
+        return self.signals
+    
+    def summarize(self, signals: List[Dict[str, Any]]) -> Dict[str, Any]:
+        actions = {}
+        for signal in signals:
+            actions[signal['action']] = actions.get(signal['action'], 0) + 1
+        return {
+            'driver': f'strategy.{type(self.strategy).__name__}',
+            'signals': len(signals),
+            'actions': actions,
+            'digest': result_digest(signals)
+        }
+
+
+class ReplayEngine(LoggerMixin):
+    """按模拟时钟回放录制行情"""
+    
+    def __init__(self, replay: MarketReplay, step: float = 10.0, speed: float = 0.0):
+        """
+        初始化回放引擎
+        
+        Args:
+            replay: 录制行情索引
+            step: 模拟时钟每步前进的秒数（实盘交易循环为 10 秒）
+            speed: 回放倍速，如 60 表示 1 分钟行情用 1 秒回放；0 表示不等待，全速回放
+        """
+        self.replay = replay
+        self.step_ms = int(step * 1000)
+        self.speed = speed
+        if self.step_ms <= 0:
+            raise ValueError("回放步长必须大于 0")
+    
+    def run(self, driver) -> Dict[str, Any]:
+        """
+        回放整个时间范围
+        
+        Args:
+            driver: 驱动，提供 setup(collector)、step() -> 处理的交易对数、finished、results 与 summarize(results)
+        
+        Returns:
+            回放统计与驱动结果
+        """
+        sim_clock = SimulatedClock(self.replay.start_ms)
+        collector = ReplayMarketDataCollector(self.replay, sim_clock)
+        step_seconds = []
+        pair_steps = 0
+        
+        with use_clock(sim_clock):
+            driver.setup(collector)
+            self.logger.info(f"▶️ 开始回放: {sim_clock.now()} -> "
+                             f"{clock.utc_datetime(self.replay.end_ms)}, "
+                             f"步长 {self.step_ms / 1000:g}s, " + (f"{self.speed:g}x" if self.speed else "全速"))
+            
+            started = time.perf_counter()
+            for now_ms in range(self.replay.start_ms + self.step_ms, self.replay.end_ms, self.step_ms):
+                sim_clock.advance_to(now_ms)
+                if self.speed:
+                    delay = started + (now_ms - self.replay.start_ms) / 1000 / self.speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                
+                step_started = time.perf_counter()
+                pair_steps += driver.step()
+                step_seconds.append(time.perf_counter() - step_started)
+                if driver.finished:
+                    self.logger.warning(f"⏹️ 驱动在 {sim_clock.now()} 停止，回放提前结束")
+                    break
+            wall = time.perf_counter() - started
+        
+        simulated = (sim_clock.ms - self.replay.start_ms) / 1000
+        busy = sum(step_seconds)
+        durations = np.array(step_seconds) * 1000 if step_seconds else np.zeros(1)
+        stats = {
+            'start': clock.utc_datetime(self.replay.start_ms).isoformat(),
+            'end': sim_clock.now().isoformat(),
+            'step_seconds': self.step_ms / 1000,
+            'speed': self.speed,
+            'steps': len(step_seconds),
+            'pair_steps': pair_steps,
+            'simulated_seconds': simulated,
+            'wall_seconds': wall,
+            'speedup': simulated / wall if wall else None,
+            'pair_steps_per_second': pair_steps / busy if busy else None,
+            'step_ms': {
+                'p50': float(np.percentile(durations, 50)),
+                'p99': float(np.percentile(durations, 99)),
+                'max': float(durations.max())
+            },
+            'requests': collector.requests,
+            **driver.summarize(driver.results)
+        }
+        self.logger.info(f"✅ 回放完成: {stats['steps']} 步 / {pair_steps} 交易对步, 用时 {wall:.1f}s "
+                         f"({stats['speedup'] or 0:.0f}x), 结果摘要 {stats['digest']}")
+        return stats
+
+
+def build_driver(driver: str = 'trading_system', strategy: str = 'RSIStrategy', timeframe: str = '1m',
+                 limit: int = 100, exchanges: Optional[Sequence[str]] = None,
+                 pairs: Optional[Sequence[str]] = None, log_level: Optional[str] = None):
+    """按名称创建驱动：'trading_system' 或 'strategy'（strategy 为 strategies 中的类名）"""
+    if driver == 'strategy':
+        instance = getattr(importlib.import_module('strategies'), strategy)()
+        return StrategyDriver(instance, timeframe, limit, exchanges, pairs)
+    return TradingSystemDriver(exchanges=exchanges, pairs=pairs, log_level=log_level)
+
+
+def _replay_partition(options: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """子进程：只载入并回放一部分交易对"""
+    logging.getLogger().setLevel(options['driver_options'].get('log_level') or 'WARNING')
+    replay = MarketReplay(options['root'], options['start'], options['end'],
+                          options['exchanges'], options['pairs'])
+    driver = build_driver(exchanges=options['exchanges'], pairs=options['pairs'], **options['driver_options'])
+    stats = ReplayEngine(replay, options['step']).run(driver)
+    return stats, driver.results
+
+
+def run_partitioned(root: Union[str, Path], workers: int, start: TimeLike = None, end: TimeLike = None,
+                    exchanges: Optional[Sequence[str]] = None, pairs: Optional[Sequence[str]] = None,
+                    step: float = 10.0, **driver_options) -> Dict[str, Any]:
+    """
+    按交易对分给多个进程全速回放，合并后的结果与单进程回放相同
+    
+    只适用于各交易对互不影响的驱动：高频交易系统每轮为每个交易对新建策略、
+    风控只看 daily_pnl（模拟成交不产生盈亏），满足这一条件；有跨交易对状态的策略应单进程回放。
+    
+    Args:
+        root: 录制目录
+        workers: 进程数
+        start, end, exchanges, pairs, step: 同 MarketReplay / ReplayEngine
+        driver_options: 传给 build_driver 的参数
+    
+    Returns:
+        合并后的回放统计（吞吐按总墙钟时间计算）
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    replay = MarketReplay(root, start, end, exchanges, pairs)
+    exchanges = list(exchanges) if exchanges else replay.exchanges()
+    pairs = list(pairs) if pairs else replay.symbols()
+    start, end = replay.start_ms, replay.end_ms
+    del replay
+    
+    partitions = [pairs[i::workers] for i in range(workers) if pairs[i::workers]]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(partitions)) as executor:
+        outputs = list(executor.map(_replay_partition, [
+            {'root': root, 'start': start, 'end': end, 'exchanges': exchanges, 'pairs': partition,
+             'step': step, 'driver_options': driver_options}
+            for partition in partitions
+        ]))
+    wall = time.perf_counter() - started
+    
+    # 按单进程回放的顺序合并：同一步内先交易所、后交易对
+    exchange_order = {exchange: i for i, exchange in enumerate(exchanges)}
+    pair_order = {pair: i for i, pair in enumerate(pairs)}
+    results = sorted((item for _, items in outputs for item in items),
+                     key=lambda item: (item['timestamp'], exchange_order[item['exchange']],
+                                       pair_order[item.get('pair', item.get('symbol'))]))
+    
+    partial = [stats for stats, _ in outputs]
+    simulated = max(stats['simulated_seconds'] for stats in partial)
+    pair_steps = sum(stats['pair_steps'] for stats in partial)
+    return {
+        **partial[0],
+        'end': max(stats['end'] for stats in partial),
+        'workers': len(partitions),
+        'steps': max(stats['steps'] for stats in partial),
+        'pair_steps': pair_steps,
+        'simulated_seconds': simulated,
+        'wall_seconds': wall,
+        'speedup': simulated / wall if wall else None,
+        'pair_steps_per_second': pair_steps / wall if wall else None,
+        'step_ms': {name: max(stats['step_ms'][name] for stats in partial) for name in ('p50', 'p99', 'max')},
+        'requests': sum(stats['requests'] for stats in partial),
+        **build_driver(**driver_options).summarize(results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行情回放')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='录制目录')
+    parser.add_argument('--start', default=None, help='起始时间（ISO 格式）')
+    parser.add_argument('--end', default=None, help='结束时间（ISO 格式，不含）')
+    parser.add_argument('--exchanges', nargs='+', default=None, help='只回放这些交易所')
+    parser.add_argument('--pairs', nargs='+', default=None, help='只回放这些交易对')
+    parser.add_argument('--step', type=float, default=10.0, help='模拟时钟步长（秒）')
+    parser.add_argument('--speed', type=float, default=0.0, help='回放倍速，0 表示全速')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='全速回放时按交易对分给多个进程（要求交易对之间互不影响）')
+    parser.add_argument('--driver', choices=['trading_system', 'strategy'], default='trading_system',
+                        help='驱动高频交易系统或单个策略')
+    parser.add_argument('--strategy', default='RSIStrategy', help='--driver strategy 时使用的策略类名')
+    parser.add_argument('--timeframe', default='1m', help='--driver strategy 时请求的K线周期')
+    parser.add_argument('--limit', type=int, default=100, help='--driver strategy 时每次请求的K线数')
+    parser.add_argument('--log-level', default='WARNING', help='回放期间的日志级别')
+    parser.add_argument('--output', default=None, help='结果JSON路径')
+    args = parser.parse_args()
+    
+    driver_options = {'driver': args.driver, 'strategy': args.strategy, 'timeframe': args.timeframe,
+                      'limit': args.limit, 'log_level': args.log_level}
+    logging.getLogger().setLevel(args.log_level)
+    if args.workers > 1:
+        if args.speed:
+            parser.error('--workers 只用于全速回放（--speed 0）')
+        stats = run_partitioned(args.root, args.workers, args.start, args.end, args.exchanges, args.pairs,
+                                args.step, **driver_options)
+    else:
+        replay = MarketReplay(args.root, args.start, args.end, args.exchanges, args.pairs)
+        driver = build_driver(exchanges=args.exchanges, pairs=args.pairs, **driver_options)
+        stats = ReplayEngine(replay, args.step, args.speed).run(driver)
+    
+    print(f"回放区间      {stats['start']} -> {stats['end']}")
+    print(f"步数          {stats['steps']} 步 x {stats['step_seconds']:g}s, {stats['pair_steps']} 交易对步")
+    print(f"用时          {stats['wall_seconds']:.2f}s (模拟 {stats['simulated_seconds']:.0f}s, "
+          f"{stats['speedup'] or 0:.0f}x)")
+    print(f"吞吐          {stats['pair_steps_per_second'] or 0:.0f} 交易对步/秒, "
+          f"单步 p50 {stats['step_ms']['p50']:.2f} ms / p99 {stats['step_ms']['p99']:.2f} ms")
+    print(f"结果          {stats['driver']}: "
+          f"{stats.get('trades', stats.get('signals'))} 笔, 摘要 {stats['digest']}")
+    
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,8 @@ from pathlib import Path
 
 from utils.logging_manager import LoggerMixin
 from config.exchange_config import ExchangeConfig
+from data.market_recorder import get_market_recorder
+from data.record_journal import PRICE_SCHEMA, get_journal, import_json_files, price_records
 
 class MultiExchangePriceCollector(LoggerMixin):
     """多交易所实时币价收集器"""
@@ -42,6 +44,8 @@ class MultiExchangePriceCollector(LoggerMixin):
         # 数据存储目录
         self.data_dir = Path("data/prices")
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.price_journal = get_journal(Path("data/journal/prices"), PRICE_SCHEMA)
+        self.recorder = get_market_recorder()
         
         # 缓存过期时间（秒）
         self.cache_expiry = 30
@@ -120,6 +124,8 @@ class MultiExchangePriceCollector(LoggerMixin):
             
             # 获取ticker数据
             ticker = exchange.fetch_ticker(symbol)
+            if self.recorder is not None:
+                self.recorder.record_ticker(exchange_name, symbol, ticker)
             
             price_data = {
                 'exchange': exchange_name,
@@ -267,14 +273,20 @@ class MultiExchangePriceCollector(LoggerMixin):
         }
     
     def save_price_data(self, data: Dict[str, Any], filename: str = None):
-        """保存价格数据到文件"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"prices_{timestamp}.json"
-        
-        filepath = self.data_dir / filename
+        """
+        保存价格数据
         
+        Args:
+            data: fetch_multi_coin_prices / fetch_all_prices 的输出
+            filename: 指定时导出为该 JSON 文件，否则逐笔追加到价格日志
+        """
         try:
+            if filename is None:
+                saved = self.price_journal.append_many(price_records(data))
+                self.logger.info(f"✅ 价格数据已追加到日志: {saved} 条")
+                return
+            
+            filepath = self.data_dir / filename
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2, default=str)
             
@@ -283,6 +295,43 @@ class MultiExchangePriceCollector(LoggerMixin):
         except Exception as e:
             self.logger.error(f"❌ 保存价格数据失败: {e}")
     
+    def load_price_history(self, start=None, end=None, symbol: str = None) -> pd.DataFrame:
+        """
+        从价格日志读取时间范围内的逐笔价格
+        
+        Args:
+            start: 起始时间（含），None 表示最早
+            end: 结束时间（不含），None 表示不限
+            symbol: 只返回该交易对
+        
+        Returns:
+            DataFrame（timestamp, exchange, symbol, last, bid, ask, high, low, volume, spread）
+        """
+        try:
+            df = self.price_journal.read_frame(start, end)
+            if symbol is not None:
+                df = df[df['symbol'] == symbol].reset_index(drop=True)
+            return df
+            
+        except Exception as e:
+            self.logger.error(f"❌ 读取价格日志失败: {e}")
+            return pd.DataFrame()
+    
+    def convert_legacy_price_files(self, remove: bool = False) -> int:
+        """
+        把旧版 prices_*.json 导入价格日志
+        
+        Args:
+            remove: 导入后是否删除旧文件
+        
+        Returns:
+            导入的价格记录数
+        """
+        files = sorted(self.data_dir.glob("prices_*.json"))
+        imported = import_json_files(self.price_journal, files, price_records, remove)
+        self.logger.info(f"✅ 已导入 {len(files)} 个旧版价格文件，共 {imported} 条价格记录")
+        return imported
+    
     def load_price_data(self, filename: str) -> Dict[str, Any]:
         """从文件加载价格数据"""
         filepath = self.data_dir / filename
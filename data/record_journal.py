@@ -0,0 +1,540 @@
+"""
+分段记录日志
+按天分段保存固定结构的二进制记录（交易信号、逐笔价格等），配合稀疏时间索引做区间读取：
+读取某个时间范围只打开范围内的日分段，并在分段内按索引直接定位到起始记录，
+结果以数据块流式返回，不需要解析整个历史。
+
+磁盘结构:
+    <root>/schema.json          字段定义
+    <root>/categories.json      分类字段的取值字典（字符串 -> 编码）
+    <root>/<YYYYMMDD>.bin       当天的定长记录（NumPy 结构化数组的原始字节）
+    <root>/<YYYYMMDD>.idx       稀疏索引：每 index_every 条记录一项 (时间戳, 记录号)，int64
+    <root>/<YYYYMMDD>.ext       结构之外的字段，每行一个 JSON，记录中保存其字节偏移
+    <root>/<YYYYMMDD>.unsorted  分段内出现时间倒序时的标记，读取该分段时不使用索引
+    <root>/.lock                写入锁
+
+字段类型: 'f8' 浮点（缺失为 NaN）、'i8' 整数、'category' 低基数字符串（编码 0 表示缺失）。
+时间戳统一为毫秒 int64，分段按 UTC 日期划分。
+进程内通过 get_journal 共享实例；多个进程写同一目录时，每次写入持有 .lock 上的文件锁，
+并在锁内重新读取分类字典与分段长度。读取方不受限制。
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data.feature_store import TimeLike, to_milliseconds
+from utils.journaled_state import atomic_write_text
+from utils.logging_manager import LoggerMixin
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有进程内的锁
+    fcntl = None
+
+FIELD_DTYPES = {'f8': '<f8', 'i8': '<i8', 'category': '<u4'}
+
+# 交易信号：策略输出的常用字段，其余字段（子信号、AI增强信息等）写入 .ext
+SIGNAL_SCHEMA = [
+    ('symbol', 'category'),
+    ('exchange', 'category'),
+    ('strategy', 'category'),
+    ('action', 'category'),
+    ('reason', 'category'),
+    ('confidence', 'f8'),
+    ('price', 'f8'),
+    ('amount', 'f8')
+]
+
+# 多交易所逐笔价格：MultiExchangePriceCollector.fetch_single_price 的输出
+PRICE_SCHEMA = [
+    ('exchange', 'category'),
+    ('symbol', 'category'),
+    ('last', 'f8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('volume', 'f8'),
+    ('spread', 'f8')
+]
+
+
+def _day_of(timestamp_ms: int) -> str:
+    return (datetime(1970, 1, 1) + timedelta(milliseconds=int(timestamp_ms))).strftime('%Y%m%d')
+
+
+class RecordJournal(LoggerMixin):
+    """按天分段的定长记录日志"""
+    
+    def __init__(self, root: Union[str, Path], schema: Sequence[Tuple[str, str]],
+                 index_every: int = 256, chunk_records: int = 65536):
+        """
+        初始化记录日志
+        
+        Args:
+            root: 日志目录
+            schema: [(字段名, 类型)]，类型为 'f8' / 'i8' / 'category'，时间戳字段自动添加
+            index_every: 稀疏索引的间隔（条）
+            chunk_records: 流式读取时每个数据块的最大记录数
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_every = index_every
+        self.chunk_records = chunk_records
+        
+        schema_file = self.root / 'schema.json'
+        if schema_file.exists():
+            with open(schema_file, 'r', encoding='utf-8') as f:
+                stored = [tuple(field) for field in json.load(f)]
+            if stored != [tuple(field) for field in schema]:
+                raise ValueError(f"日志 {self.root} 的字段定义与请求的不一致: {stored}")
+        else:
+            atomic_write_text(schema_file, json.dumps([list(field) for field in schema]))
+        
+        self.schema = [tuple(field) for field in schema]
+        self.kinds = dict(self.schema)
+        self.dtype = np.dtype(
+            [('timestamp', '<i8')] +
+            [(name, FIELD_DTYPES[kind]) for name, kind in self.schema] +
+            [('ext', '<i8')]
+        )
+        
+        self._lock = threading.Lock()
+        self._categories: Dict[str, Dict[str, int]] = {}
+        self._labels: Dict[str, List[Optional[str]]] = {}
+        self._load_categories()
+        
+        # 每个分段的写入状态：(记录数, 最后时间戳)，写入前按文件大小校验（其他进程可能追加过）
+        self._segments: Dict[str, Tuple[int, int]] = {}
+        
+        # 统计
+        self.records_written = 0
+        self.records_read = 0
+        self.segments_read = 0
+    
+    # ------------------------------------------------------------------
+    # 分类字段字典
+    # ------------------------------------------------------------------
+    
+    def _categories_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.root / 'categories.json').stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load_categories(self):
+        path = self.root / 'categories.json'
+        self._categories_loaded = self._categories_version()
+        stored = {}
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        for name, kind in self.schema:
+            if kind == 'category':
+                labels = [None] + stored.get(name, [])
+                self._labels[name] = labels
+                self._categories[name] = {label: code for code, label in enumerate(labels) if code}
+    
+    def _encode(self, name: str, value: Any) -> Tuple[int, bool]:
+        """返回 (编码, 是否新增了取值)"""
+        if value is None:
+            return 0, False
+        value = str(value)
+        codes = self._categories[name]
+        code = codes.get(value)
+        if code is not None:
+            return code, False
+        code = len(self._labels[name])
+        codes[value] = code
+        self._labels[name].append(value)
+        return code, True
+    
+    def _save_categories(self):
+        atomic_write_text(self.root / 'categories.json',
+                          json.dumps({name: labels[1:] for name, labels in self._labels.items()},
+                                     ensure_ascii=False))
+        self._categories_loaded = self._categories_version()
+    
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    
+    def _segment_paths(self, day: str) -> Tuple[Path, Path, Path]:
+        return self.root / f'{day}.bin', self.root / f'{day}.idx', self.root / f'{day}.ext'
+    
+    def _segment_state(self, day: str) -> Tuple[int, int]:
+        """分段的 (记录数, 最后时间戳)，需持有写入锁"""
+        bin_path, idx_path, _ = self._segment_paths(day)
+        size = bin_path.stat().st_size if bin_path.exists() else 0
+        state = self._segments.get(day)
+        if state is not None and state[0] * self.dtype.itemsize == size:
+            return state
+        
+        count, last = size // self.dtype.itemsize, -1
+        if size % self.dtype.itemsize:
+            # 写入中途崩溃留下的残缺记录
+            with open(bin_path, 'r+b') as f:
+                f.truncate(count * self.dtype.itemsize)
+        if idx_path.exists() and idx_path.stat().st_size % 16:
+            # 残缺的索引项会使之后追加的索引错位
+            with open(idx_path, 'r+b') as f:
+                f.truncate(idx_path.stat().st_size // 16 * 16)
+        if count:
+            last = int(np.fromfile(bin_path, dtype=self.dtype, count=1,
+                                   offset=(count - 1) * self.dtype.itemsize)['timestamp'][0])
+        state = self._segments[day] = (count, last)
+        return state
+    
+    @contextmanager
+    def _write_lock(self):
+        """进程内与跨进程的写入锁；取得锁后重新读取其他进程新增的分类取值"""
+        with self._lock:
+            with open(self.root / '.lock', 'a+b') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    if self._categories_version() != self._categories_loaded:
+                        self._load_categories()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        追加记录
+        
+        Args:
+            records: 记录字典，必须包含 timestamp（毫秒/datetime/ISO 字符串），
+                     schema 之外的字段原样保存在 .ext 中，读取时合并回记录
+        
+        Returns:
+            写入的记录数
+        """
+        with self._write_lock():
+            rows_by_day: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+            for record in records:
+                timestamp = to_milliseconds(record.get('timestamp'))
+                rows_by_day.setdefault(_day_of(timestamp), []).append((timestamp, record))
+            
+            # 先编码全部记录并保存新增的分类取值，其他进程读到记录时一定能解码
+            batches = []
+            new_categories = False
+            for day, rows in sorted(rows_by_day.items()):
+                rows.sort(key=lambda row: row[0])
+                array, extras, added = self._encode_rows(rows)
+                batches.append((day, rows, array, extras))
+                new_categories |= added
+            if new_categories:
+                self._save_categories()
+            
+            written = 0
+            for day, rows, array, extras in batches:
+                count, last = self._segment_state(day)
+                bin_path, idx_path, ext_path = self._segment_paths(day)
+                
+                # 先写 .ext 再写记录，记录中的偏移总是指向已落盘的内容
+                if extras:
+                    ext_offset = ext_path.stat().st_size if ext_path.exists() else 0
+                    offsets = ext_offset + np.cumsum([0] + [len(line) for line in extras[:-1]])
+                    array['ext'][array['ext'] >= 0] = offsets
+                    with open(ext_path, 'ab') as f:
+                        f.write(b''.join(extras))
+                with open(bin_path, 'ab') as f:
+                    f.write(array.tobytes())
+                
+                # 稀疏索引：落在 index_every 整数倍上的记录
+                positions = np.arange(count, count + len(rows))
+                marks = positions % self.index_every == 0
+                if marks.any():
+                    entries = np.column_stack([array['timestamp'][marks], positions[marks]]).astype('<i8')
+                    with open(idx_path, 'ab') as f:
+                        f.write(entries.tobytes())
+                if rows[0][0] < last:
+                    (self.root / f'{day}.unsorted').touch()
+                
+                self._segments[day] = (count + len(rows), rows[-1][0])
+                written += len(rows)
+            
+            self.records_written += written
+            return written
+    
+    def _encode_rows(self, rows: List[Tuple[int, Dict[str, Any]]]) -> Tuple[np.ndarray, List[bytes], bool]:
+        """
+        把记录编码为结构化数组
+        
+        Returns:
+            (数组, 结构之外字段的 JSON 行, 是否新增了分类取值)；有 .ext 的记录 ext 字段暂记为 0
+        """
+        columns: Dict[str, list] = {name: [] for name, _ in self.schema}
+        has_extra = np.zeros(len(rows), dtype=bool)
+        extras = []
+        new_categories = False
+        
+        for i, (_, record) in enumerate(rows):
+            extra = {}
+            for name, kind in self.schema:
+                value = record.get(name)
+                if isinstance(value, bool):
+                    extra[name] = value
+                    value = None
+                if kind == 'category':
+                    if value is not None and not isinstance(value, str):
+                        extra[name], value = value, None
+                    code, added = self._encode(name, value)
+                    new_categories |= added
+                    columns[name].append(code)
+                elif kind == 'f8':
+                    if value is not None and not isinstance(value, (int, float, np.number)):
+                        extra[name], value = value, None
+                    columns[name].append(np.nan if value is None else value)
+                else:
+                    if value is not None and not isinstance(value, (int, np.integer)):
+                        extra[name], value = value, None
+                    columns[name].append(0 if value is None else value)
+            for key, value in record.items():
+                if key != 'timestamp' and key not in self.kinds:
+                    extra[key] = value
+            if extra:
+                has_extra[i] = True
+                extras.append((json.dumps(extra, ensure_ascii=False, separators=(',', ':'), default=str) + '\n').encode('utf-8'))
+        
+        array = np.zeros(len(rows), dtype=self.dtype)
+        array['timestamp'] = [row[0] for row in rows]
+        for name, values in columns.items():
+            array[name] = values
+        array['ext'] = np.where(has_extra, 0, -1)
+        return array, extras, new_categories
+    
+    def append(self, record: Dict[str, Any]) -> int:
+        """追加单条记录"""
+        return self.append_many([record])
+    
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    
+    def segments(self) -> List[str]:
+        """所有分段的日期（YYYYMMDD，升序）"""
+        return sorted(path.stem for path in self.root.glob('*.bin'))
+    
+    def _start_record(self, day: str, start_ms: int) -> int:
+        """用稀疏索引找到不晚于 start_ms 的最后一个索引点"""
+        _, idx_path, _ = self._segment_paths(day)
+        if not idx_path.exists():
+            return 0
+        index = np.fromfile(idx_path, dtype='<i8')
+        index = index[:len(index) // 2 * 2].reshape(-1, 2)
+        position = np.searchsorted(index[:, 0], start_ms, side='left') - 1
+        return int(index[position, 1]) if position >= 0 else 0
+    
+    def iter_chunks(self, start: TimeLike = None, end: TimeLike = None) -> Iterator[np.ndarray]:
+        """
+        流式读取时间范围内的记录
+        
+        Args:
+            start: 起始时间（含），None 表示最早
+            end: 结束时间（不含），None 表示不限
+        
+        Yields:
+            结构化数组数据块（时间戳在 [start, end) 内）
+        """
+        days = self.segments()
+        if not days:
+            return
+        start_ms = to_milliseconds(start) if start is not None else None
+        end_ms = to_milliseconds(end) if end is not None else None
+        first_day = _day_of(start_ms) if start_ms is not None else days[0]
+        last_day = _day_of(end_ms - 1) if end_ms is not None else days[-1]
+        
+        def select(chunk: np.ndarray) -> np.ndarray:
+            mask = np.ones(len(chunk), dtype=bool)
+            if start_ms is not None:
+                mask &= chunk['timestamp'] >= start_ms
+            if end_ms is not None:
+                mask &= chunk['timestamp'] < end_ms
+            return chunk[mask]
+        
+        itemsize = self.dtype.itemsize
+        for day in days:
+            if day < first_day or day > last_day:
+                continue
+            bin_path = self._segment_paths(day)[0]
+            total = bin_path.stat().st_size // itemsize
+            self.segments_read += 1
+            
+            if (self.root / f'{day}.unsorted').exists():
+                # 时间乱序的分段整体读取后排序
+                records = select(np.fromfile(bin_path, dtype=self.dtype, count=total))
+                records = records[np.argsort(records['timestamp'], kind='stable')]
+                for offset in range(0, len(records), self.chunk_records):
+                    self.records_read += len(records[offset:offset + self.chunk_records])
+                    yield records[offset:offset + self.chunk_records]
+                continue
+            
+            position = self._start_record(day, start_ms) if start_ms is not None and day == first_day else 0
+            while position < total:
+                count = min(self.chunk_records, total - position)
+                chunk = np.fromfile(bin_path, dtype=self.dtype, count=count, offset=position * itemsize)
+                position += count
+                selected = select(chunk)
+                if len(selected):
+                    self.records_read += len(selected)
+                    yield selected
+                if end_ms is not None and chunk['timestamp'][-1] >= end_ms:
+                    break
+    
+    def _decode(self, chunk: np.ndarray, day_ext: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """数据块解码为字典：分类字段还原为字符串，缺失值为 None"""
+        columns = {'timestamp': [t.isoformat() for t in chunk['timestamp'].astype('datetime64[ms]').tolist()]}
+        for name, kind in self.schema:
+            if kind == 'category':
+                columns[name] = np.asarray(self._labels[name], dtype=object)[chunk[name]].tolist()
+            elif kind == 'f8':
+                values = chunk[name].astype(object)
+                values[np.isnan(chunk[name])] = None
+                columns[name] = values.tolist()
+            else:
+                columns[name] = chunk[name].tolist()
+        
+        names = list(columns)
+        records = [dict(zip(names, row)) for row in zip(*columns.values())]
+        for i in np.flatnonzero(chunk['ext'] >= 0):
+            records[i].update(self._read_ext(day_ext, int(chunk['timestamp'][i]), int(chunk['ext'][i])))
+        return records
+    
+    def _read_ext(self, cache: Dict[str, Any], timestamp_ms: int, offset: int) -> Dict[str, Any]:
+        day = _day_of(timestamp_ms)
+        handle = cache.get(day)
+        if handle is None:
+            handle = cache[day] = open(self._segment_paths(day)[2], 'rb')
+        handle.seek(offset)
+        return json.loads(handle.readline())
+    
+    def iter_records(self, start: TimeLike = None, end: TimeLike = None) -> Iterator[Dict[str, Any]]:
+        """流式读取时间范围内的记录（字典形式，含 .ext 中的字段）"""
+        with self._lock:
+            self._load_categories()
+        ext_handles: Dict[str, Any] = {}
+        try:
+            for chunk in self.iter_chunks(start, end):
+                yield from self._decode(chunk, ext_handles)
+        finally:
+            for handle in ext_handles.values():
+                handle.close()
+    
+    def read(self, start: TimeLike = None, end: TimeLike = None) -> List[Dict[str, Any]]:
+        """读取时间范围内的全部记录（字典列表）"""
+        return list(self.iter_records(start, end))
+    
+    def read_frame(self, start: TimeLike = None, end: TimeLike = None) -> pd.DataFrame:
+        """
+        读取时间范围内的记录为 DataFrame（只含 schema 字段，分类字段还原为字符串）
+        
+        Returns:
+            DataFrame，timestamp 列为 datetime
+        """
+        chunks = list(self.iter_chunks(start, end))
+        array = np.concatenate(chunks) if chunks else np.zeros(0, dtype=self.dtype)
+        with self._lock:
+            self._load_categories()
+        df = pd.DataFrame({'timestamp': pd.to_datetime(array['timestamp'], unit='ms')})
+        for name, kind in self.schema:
+            if kind == 'category':
+                labels = np.asarray(self._labels[name], dtype=object)
+                df[name] = labels[array[name]]
+            else:
+                df[name] = array[name]
+        return df
+    
+    def drop_before(self, cutoff: TimeLike) -> int:
+        """
+        删除早于 cutoff 所在日期的整日分段
+        
+        Args:
+            cutoff: 截止时间
+        
+        Returns:
+            删除的分段数
+        """
+        cutoff_day = _day_of(to_milliseconds(cutoff))
+        dropped = 0
+        with self._write_lock():
+            for day in self.segments():
+                if day >= cutoff_day:
+                    break
+                for suffix in ('bin', 'idx', 'ext', 'unsorted'):
+                    path = self.root / f'{day}.{suffix}'
+                    if path.exists():
+                        path.unlink()
+                self._segments.pop(day, None)
+                dropped += 1
+        return dropped
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取日志统计"""
+        return {
+            'root': str(self.root),
+            'segments': len(self.segments()),
+            'records_written': self.records_written,
+            'records_read': self.records_read,
+            'segments_read': self.segments_read
+        }
+
+
+def import_json_files(journal: RecordJournal, files: Iterable[Union[str, Path]],
+                      extract, remove: bool = False) -> int:
+    """
+    把旧版 JSON 文件导入记录日志
+    
+    Args:
+        journal: 目标日志
+        files: JSON 文件列表
+        extract: 把一个文件的内容转换为记录列表的函数
+        remove: 导入成功后是否删除该文件
+    
+    Returns:
+        导入的记录数
+    """
+    imported = 0
+    for path in sorted(Path(p) for p in files):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                imported += journal.append_many(extract(json.load(f)))
+        except Exception as e:
+            journal.logger.warning(f"⚠️ 跳过无法导入的文件 {path.name}: {e}")
+            continue
+        if remove:
+            path.unlink()
+    return imported
+
+
+def price_records(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """把 fetch_multi_coin_prices / fetch_all_prices 的输出展开为逐笔价格记录"""
+    if 'data' in data:
+        groups = data['data'].values()
+    else:
+        groups = [data]
+    return [dict(price) for group in groups for price in group.get('prices', [])]
+
+
+_journals: Dict[str, RecordJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(root: Union[str, Path], schema: Sequence[Tuple[str, str]]) -> RecordJournal:
+    """获取进程内共享的记录日志实例（同一目录只创建一个写入方）"""
+    key = str(Path(root).resolve())
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = RecordJournal(root, schema)
+        return journal
@@ -0,0 +1,304 @@
+"""
+回测结果存储
+嵌入式 SQLite（WAL 模式）保存每一代每个策略的回测结果，供回测引擎、进化系统和 Web 数据桥共享：
+写入按代批量提交，读取方（可在其他进程）不会被写入阻塞；
+代数、适应度、时间戳均建有索引，Top-N 查询沿索引读取前 N 行，与历史结果总数无关
+
+表结构:
+    backtest_results(id, strategy_name, strategy_id, generation, fitness, timestamp,
+                     total_return, sharpe_ratio, max_drawdown, win_rate, profit_factor,
+                     total_trades, avg_trade_duration, volatility, calmar_ratio, sortino_ratio,
+                     parameters)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from utils.logging_manager import LoggerMixin
+
+METRIC_COLUMNS = [
+    'total_return', 'sharpe_ratio', 'max_drawdown', 'win_rate', 'profit_factor',
+    'total_trades', 'avg_trade_duration', 'volatility', 'calmar_ratio', 'sortino_ratio'
+]
+
+RESULT_COLUMNS = ['strategy_name', 'strategy_id', 'generation', 'fitness', 'timestamp'] + METRIC_COLUMNS + ['parameters']
+
+DEFAULT_DB_PATH = Path(__file__).parent / 'results.db'
+
+_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS backtest_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        strategy_name TEXT NOT NULL,
+        strategy_id TEXT,
+        generation INTEGER NOT NULL DEFAULT 0,
+        fitness REAL NOT NULL DEFAULT 0,
+        timestamp REAL NOT NULL,
+        {', '.join(f"{column} {'INTEGER' if column == 'total_trades' else 'REAL'} NOT NULL DEFAULT 0"
+                   for column in METRIC_COLUMNS)},
+        parameters TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_generation ON backtest_results (generation, fitness DESC);
+    CREATE INDEX IF NOT EXISTS idx_results_fitness ON backtest_results (fitness DESC);
+    CREATE INDEX IF NOT EXISTS idx_results_timestamp ON backtest_results (timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_results_strategy ON backtest_results (strategy_name, timestamp DESC);
+'''
+
+
+def default_fitness(metrics: Dict[str, Any]) -> float:
+    """
+    未提供适应度时的综合评分（与仪表盘原有口径一致）
+    
+    Args:
+        metrics: 包含 total_return/sharpe_ratio/win_rate/max_drawdown 的字典
+    
+    Returns:
+        适应度
+    """
+    return (
+        0.35 * max(0, metrics.get('total_return', 0) or 0) +
+        0.25 * max(0, (metrics.get('sharpe_ratio', 0) or 0) / 3) +
+        0.25 * (metrics.get('win_rate', 0) or 0) +
+        0.15 * (1 - min(1, metrics.get('max_drawdown', 1) or 0))
+    )
+
+
+def _to_epoch(value: Union[str, float, int, datetime, None]) -> float:
+    """时间转换为秒级时间戳，None 表示当前时间"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class ResultsStore(LoggerMixin):
+    """回测结果存储"""
+    
+    def __init__(self, path: Union[str, Path, None] = None):
+        """
+        初始化结果存储
+        
+        Args:
+            path: 数据库文件路径，None 使用 data/results.db，':memory:' 为内存库
+        """
+        self.path = str(path or DEFAULT_DB_PATH)
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        
+        # 统计
+        self.rows_written = 0
+        self.batches_written = 0
+    
+    @staticmethod
+    def _row_values(record: Dict[str, Any], generation: Optional[int]) -> tuple:
+        metrics = {column: float(record.get(column, 0) or 0) for column in METRIC_COLUMNS}
+        metrics['total_trades'] = int(metrics['total_trades'])
+        fitness = record.get('fitness')
+        parameters = record.get('parameters')
+        return (
+            record['strategy_name'],
+            record.get('strategy_id'),
+            int(record.get('generation') or 0) if generation is None else int(generation),
+            float(fitness) if fitness is not None else default_fitness(metrics),
+            _to_epoch(record.get('timestamp')),
+            *metrics.values(),
+            json.dumps(parameters, ensure_ascii=False, default=float) if parameters is not None else None
+        )
+    
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        result = dict(row)
+        result['timestamp'] = datetime.fromtimestamp(result['timestamp']).isoformat()
+        if result.get('parameters'):
+            result['parameters'] = json.loads(result['parameters'])
+        return result
+    
+    def add_results(self, records: Iterable[Dict[str, Any]], generation: Optional[int] = None) -> int:
+        """
+        在同一个事务中批量写入回测结果
+        
+        Args:
+            records: 结果字典，至少包含 strategy_name，指标列缺省为 0，
+                     未给出 fitness 时按 default_fitness 计算
+            generation: 这一批结果所属的代数，None 时取各记录自带的 generation
+        
+        Returns:
+            写入的行数
+        """
+        rows = [self._row_values(record, generation) for record in records]
+        if not rows:
+            return 0
+        
+        placeholders = ', '.join('?' * len(RESULT_COLUMNS))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO backtest_results ({', '.join(RESULT_COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        self.rows_written += len(rows)
+        self.batches_written += 1
+        return len(rows)
+    
+    def add_result(self, record: Dict[str, Any], generation: Optional[int] = None) -> int:
+        """写入单条回测结果"""
+        return self.add_results([record], generation)
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+    
+    def top_n(self, n: int = 10, generation: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按适应度取前 N 个结果（沿索引读取，不扫描全表）
+        
+        Args:
+            n: 数量
+            generation: 只在某一代中取，None 表示全部历史
+        
+        Returns:
+            结果字典列表，适应度从高到低
+        """
+        if generation is None:
+            return self._query('SELECT * FROM backtest_results ORDER BY fitness DESC LIMIT ?', (n,))
+        return self._query(
+            'SELECT * FROM backtest_results WHERE generation = ? ORDER BY fitness DESC LIMIT ?',
+            (int(generation), n)
+        )
+    
+    def latest(self, n: int = 10) -> List[Dict[str, Any]]:
+        """最近写入的 N 个结果"""
+        return self._query('SELECT * FROM backtest_results ORDER BY timestamp DESC LIMIT ?', (n,))
+    
+    def latest_for_strategy(self, strategy_name: str) -> Optional[Dict[str, Any]]:
+        """某策略最近一次的回测结果"""
+        rows = self._query(
+            'SELECT * FROM backtest_results WHERE strategy_name = ? ORDER BY timestamp DESC LIMIT 1',
+            (strategy_name,)
+        )
+        return rows[0] if rows else None
+    
+    def latest_generation(self) -> Optional[int]:
+        """已有结果的最大代数"""
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(generation) FROM backtest_results').fetchone()
+        return row[0]
+    
+    def generation_summary(self, generation: int) -> Dict[str, Any]:
+        """
+        某一代的汇总
+        
+        Returns:
+            {'generation', 'count', 'best_fitness', 'avg_fitness'}
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*), MAX(fitness), AVG(fitness) FROM backtest_results WHERE generation = ?',
+                (int(generation),)
+            ).fetchone()
+        return {
+            'generation': int(generation),
+            'count': row[0],
+            'best_fitness': row[1] or 0.0,
+            'avg_fitness': row[2] or 0.0
+        }
+    
+    def count(self) -> int:
+        """结果总数"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM backtest_results').fetchone()[0]
+    
+    def prune(self, keep_generations: int) -> int:
+        """
+        删除较早的代，只保留最近 keep_generations 代
+        
+        Returns:
+            删除的行数
+        """
+        latest = self.latest_generation()
+        if latest is None:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute('DELETE FROM backtest_results WHERE generation <= ?',
+                                        (latest - keep_generations,))
+        return cursor.rowcount
+    
+    def import_json_dir(self, directory: Union[str, Path]) -> int:
+        """
+        导入旧版 data/backtest/*.json 回测结果（每个文件一条，代数记为 0）
+        
+        Args:
+            directory: JSON 文件目录
+        
+        Returns:
+            导入的行数
+        """
+        directory = Path(directory)
+        if not directory.exists():
+            return 0
+        
+        records = []
+        for file in directory.glob('*.json'):
+            try:
+                with open(file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                data.setdefault('strategy_name', file.stem.replace('_backtest_result', ''))
+                data.setdefault('timestamp', file.stat().st_mtime)
+                records.append(data)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 跳过无法读取的回测文件 {file.name}: {e}")
+        
+        imported = self.add_results(records)
+        if imported:
+            self.logger.info(f"📥 已导入 {imported} 个旧版回测结果文件")
+        return imported
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取存储统计"""
+        return {
+            'path': self.path,
+            'results': self.count(),
+            'latest_generation': self.latest_generation(),
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written
+        }
+
+
+_shared_store: Optional[ResultsStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_results_store() -> ResultsStore:
+    """
+    获取进程级共享的结果存储（路径由环境变量 RESULTS_DB_PATH 指定）
+    首次创建空库时导入 data/backtest 下的旧版 JSON 结果
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            store = ResultsStore(os.getenv('RESULTS_DB_PATH'))
+            if store.count() == 0:
+                store.import_json_dir(Path(__file__).parent / 'backtest')
+            _shared_store = store
+        return _shared_store
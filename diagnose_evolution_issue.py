@@ -9,6 +9,8 @@ import os
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from utils.journaled_state import load_journaled_state
+
 def diagnose_evolution():
     """诊断进化系统问题"""
     print("=" * 70)
@@ -20,10 +22,8 @@ def diagnose_evolution():
     print("-" * 70)
     
     state_file = Path("data/evolution/evolution_state.json")
-    if state_file.exists():
-        with open(state_file, 'r') as f:
-            state = json.load(f)
-        
+    state = load_journaled_state(state_file)
+    if state is not None:
         print(f"✅ 状态文件存在")
         print(f"   当前代数: {state.get('current_generation', 0)}")
         print(f"   最佳适应度: {state.get('best_fitness', 0):.4f}")
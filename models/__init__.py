@@ -2,14 +2,28 @@
 AI模型管理模块
 """
 
-from .model_manager import ModelManager
-from .lstm_model import LSTMModel
-from .transformer_model import TransformerModel
-from .garch_model import GARCHModel
+from utils.lazy_import import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'ModelManager': '.model_manager',
+    'ModelCache': '.model_manager',
+    'InferenceService': '.inference_service',
+    'LSTMModel': '.lstm_model',
+    'TransformerModel': '.transformer_model',
+    'GARCHModel': '.garch_model',
+    'OnlineForecaster': '.online_learning',
+    'OnlineScaler': '.online_learning',
+    'ShadowEvaluator': '.online_learning'
+})
 
 __all__ = [
     'ModelManager',
+    'ModelCache',
+    'InferenceService',
     'LSTMModel',
     'TransformerModel',
-    'GARCHModel'
-] 
\ No newline at end of file
+    'GARCHModel',
+    'OnlineForecaster',
+    'OnlineScaler',
+    'ShadowEvaluator'
+]
@@ -1,12 +1,199 @@
 """
 GARCH模型
+基于极大似然估计的 GARCH(p,q)：条件方差递推由 scipy.signal.lfilter（编译实现）完成，
+解析梯度沿用同一递推，支持滚动窗口热启动重估与多交易对逐个热启动拟合
 """
 
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional
+from scipy.optimize import minimize
+from scipy.signal import lfilter, lfiltic
 from utils.logging_manager import LoggerMixin
 
+# 收益率放大倍数，改善优化器数值条件（参数输出时换算回原始尺度）
+RETURN_SCALE = 100.0
+LOG_2PI = np.log(2 * np.pi)
+
+
+def _backcast(eps2: np.ndarray, span: int = 75) -> float:
+    """样本前方差回推值：前 span 期残差平方的指数加权均值"""
+    n = min(span, len(eps2))
+    weights = 0.94 ** np.arange(n)
+    return float(weights @ eps2[:n] / weights.sum())
+
+
+def _garch_variance(params: np.ndarray, eps2: np.ndarray, p: int, q: int,
+                    backcast: float, with_grad: bool = False):
+    """
+    计算条件方差 σ²_t = ω + Σα_i·ε²_{t-i} + Σβ_j·σ²_{t-j}
+    
+    递推为以 [1, -β] 为分母的IIR滤波，整段由 lfilter 一次完成；
+    对每个参数的导数满足同一递推，堆叠后同样一次 lfilter 得到。
+    
+    Args:
+        params: [ω, α_1..α_p, β_1..β_q]
+        eps2: 残差平方
+        p: ARCH阶数
+        q: GARCH阶数
+        backcast: 样本前残差平方/方差的回推值
+        with_grad: 是否同时返回 dσ²/dθ
+    
+    Returns:
+        sigma2，或 (sigma2, dsigma2) 其中 dsigma2 形状为 (1+p+q, T)
+    """
+    T = len(eps2)
+    omega, alpha, beta = params[0], params[1:1 + p], params[1 + p:1 + p + q]
+    
+    eps2_ext = np.concatenate([np.full(p, backcast), eps2])
+    lagged_eps2 = [eps2_ext[p - i:p - i + T] for i in range(1, p + 1)]
+    
+    x = np.full(T, omega)
+    for a_i, lag in zip(alpha, lagged_eps2):
+        x += a_i * lag
+    
+    denominator = np.r_[1.0, -beta]
+    if q > 0:
+        zi = lfiltic([1.0], denominator, np.full(q, backcast))
+        sigma2 = lfilter([1.0], denominator, x, zi=zi)[0]
+    else:
+        sigma2 = x
+    
+    if not with_grad:
+        return sigma2
+    
+    sigma2_ext = np.concatenate([np.full(q, backcast), sigma2])
+    rows = [np.ones(T)] + lagged_eps2 + [sigma2_ext[q - j:q - j + T] for j in range(1, q + 1)]
+    dsigma2 = lfilter([1.0], denominator, np.vstack(rows), axis=1)
+    return sigma2, dsigma2
+
+
+def _negative_loglikelihood(params: np.ndarray, eps2: np.ndarray, p: int, q: int,
+                            backcast: float):
+    """正态分布负对数似然及其解析梯度"""
+    sigma2, dsigma2 = _garch_variance(params, eps2, p, q, backcast, with_grad=True)
+    if not np.all(sigma2 > 0):
+        return 1e12, np.zeros_like(params)
+    
+    ratio = eps2 / sigma2
+    nll = 0.5 * (len(eps2) * LOG_2PI + np.log(sigma2).sum() + ratio.sum())
+    grad = 0.5 * (dsigma2 @ ((1.0 - ratio) / sigma2))
+    return nll, grad
+
+
+def fit_garch(returns: np.ndarray, p: int = 1, q: int = 1,
+              start: Optional[Dict[str, Any]] = None, maxiter: int = 200) -> Dict[str, Any]:
+    """
+    极大似然拟合 GARCH(p,q)（常数均值、正态分布）
+    
+    Args:
+        returns: 收益率序列
+        p: ARCH阶数
+        q: GARCH阶数
+        start: 热启动参数（上一次拟合结果，原始尺度），None表示默认初值
+        maxiter: 最大迭代次数
+    
+    Returns:
+        参数与拟合统计（omega/alpha/beta 为原始收益率尺度）
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[np.isfinite(r)]
+    if len(r) < max(p, q) + 10:
+        raise ValueError(f"收益率数据不足: {len(r)}")
+    
+    mu = float(r.mean())
+    eps2 = ((r - mu) * RETURN_SCALE) ** 2
+    backcast = _backcast(eps2)
+    variance = float(eps2.mean())
+    
+    if start is not None:
+        x0 = np.r_[start['omega'] * RETURN_SCALE ** 2, start['alpha'], start['beta']]
+    else:
+        x0 = np.r_[variance * 0.1, np.full(p, 0.1 / max(p, 1)), np.full(q, 0.8 / max(q, 1))]
+    
+    bounds = [(variance * 1e-8, variance * 10)] + [(0.0, 1.0)] * (p + q)
+    x0 = np.clip(x0, [b[0] for b in bounds], [b[1] for b in bounds])
+    
+    # 平稳性约束 Σα + Σβ < 1
+    stationarity = {
+        'type': 'ineq',
+        'fun': lambda x: 1.0 - 1e-6 - x[1:].sum(),
+        'jac': lambda x: np.r_[0.0, -np.ones(p + q)]
+    }
+    
+    # 负对数似然随样本量线性增长，收敛阈值按样本量缩放
+    result = minimize(
+        _negative_loglikelihood, x0, args=(eps2, p, q, backcast), jac=True,
+        method='SLSQP', bounds=bounds, constraints=[stationarity],
+        options={'maxiter': maxiter, 'ftol': 1e-9 * len(eps2)}
+    )
+    
+    params = result.x
+    T = len(r)
+    k = 2 + p + q  # 含均值
+    # 还原到原始尺度的对数似然：每个观测 -0.5·log(σ²) 平移 log(scale)
+    log_likelihood = float(-result.fun + T * np.log(RETURN_SCALE))
+    
+    return {
+        'omega': float(params[0] / RETURN_SCALE ** 2),
+        'alpha': params[1:1 + p].tolist(),
+        'beta': params[1 + p:].tolist(),
+        'mu': mu,
+        'persistence': float(params[1:].sum()),
+        'log_likelihood': log_likelihood,
+        'aic': 2 * k - 2 * log_likelihood,
+        'bic': float(k * np.log(T) - 2 * log_likelihood),
+        'converged': bool(result.success),
+        'iterations': int(result.nit),
+        'n_obs': T
+    }
+
+
+def conditional_variance(returns: np.ndarray, params: Dict[str, Any], p: int, q: int) -> np.ndarray:
+    """用给定参数计算收益率序列的条件方差（原始尺度）"""
+    r = np.asarray(returns, dtype=np.float64)
+    eps2 = (r - params['mu']) ** 2
+    theta = np.r_[params['omega'], params['alpha'], params['beta']]
+    return _garch_variance(theta, eps2, p, q, _backcast(eps2))
+
+
+def forecast_variance(returns: np.ndarray, params: Dict[str, Any], p: int, q: int,
+                      horizon: int = 1) -> np.ndarray:
+    """
+    多步条件方差预测，未来残差平方以其条件期望（即预测方差）代替
+    
+    Args:
+        returns: 截至当前的收益率序列
+        params: 拟合参数
+        p: ARCH阶数
+        q: GARCH阶数
+        horizon: 预测期数
+    
+    Returns:
+        未来 horizon 期的条件方差
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    eps2 = (r - params['mu']) ** 2
+    sigma2 = _garch_variance(np.r_[params['omega'], params['alpha'], params['beta']],
+                             eps2, p, q, _backcast(eps2))
+    
+    eps2_hist = list(eps2[-p:]) if p else []
+    sigma2_hist = list(sigma2[-q:]) if q else []
+    forecast = np.empty(horizon)
+    for h in range(horizon):
+        value = params['omega']
+        value += sum(a * e for a, e in zip(params['alpha'], reversed(eps2_hist)))
+        value += sum(b * s for b, s in zip(params['beta'], reversed(sigma2_hist)))
+        forecast[h] = value
+        eps2_hist.append(value)
+        sigma2_hist.append(value)
+    return forecast
+
+
+# 未配置 rolling_window 时流式追加的缓冲区上限（不小于训练样本量），热启动重估的耗时不随运行时间增长
+DEFAULT_STREAM_WINDOW = 5000
+
+
 class GARCHModel(LoggerMixin):
     """GARCH模型类"""
     
@@ -20,6 +207,8 @@ class GARCHModel(LoggerMixin):
         self.config = config or {}
         self.model = None
         self.is_trained = False
+        self.returns_buffer = np.array([])
+        self.stream_window: Optional[int] = None
         
     def prepare_data(self, data: pd.DataFrame) -> np.ndarray:
         """
@@ -62,17 +251,15 @@ class GARCHModel(LoggerMixin):
             vol = self.config.get('vol', 'GARCH')
             dist = self.config.get('dist', 'normal')
             
-            # 模拟模型结构
+            if vol != 'GARCH' or dist != 'normal':
+                self.logger.warning(f"⚠️ 仅支持 GARCH/normal，{vol}/{dist} 将按 GARCH/normal 估计")
+            
             model_structure = {
                 'p': p,
                 'q': q,
                 'vol': vol,
                 'dist': dist,
-                'parameters': {
-                    'omega': 0.0001,
-                    'alpha': [0.1],
-                    'beta': [0.8]
-                }
+                'parameters': {}
             }
             
             self.model = model_structure
@@ -84,12 +271,23 @@ class GARCHModel(LoggerMixin):
             self.logger.error(f"❌ 构建GARCH模型失败: {e}")
             return None
     
-    def train(self, returns: np.ndarray) -> Dict[str, Any]:
+    def _apply_fit(self, estimated_params: Dict[str, Any]):
+        """保存拟合结果"""
+        self.model['estimated_params'] = estimated_params
+        self.model['parameters'] = {
+            'omega': estimated_params['omega'],
+            'alpha': estimated_params['alpha'],
+            'beta': estimated_params['beta']
+        }
+        self.is_trained = True
+    
+    def train(self, returns: np.ndarray, window: Optional[int] = None) -> Dict[str, Any]:
         """
-        训练GARCH模型
+        训练GARCH模型（极大似然估计）
         
         Args:
             returns: 收益率数据
+            window: 只用最近 window 条收益率估计，None 表示按配置 rolling_window（未配置时使用全部数据）
             
         Returns:
             训练结果
@@ -100,25 +298,25 @@ class GARCHModel(LoggerMixin):
             
             self.logger.info("🚀 开始训练GARCH模型...")
             
-            # 模拟训练过程
-            # 在实际应用中，这里应该使用arch库进行GARCH模型拟合
-            p = self.model['p']
-            q = self.model['q']
-            
-            # 模拟参数估计
-            estimated_params = {
-                'omega': 0.0001,
-                'alpha': [0.1] * p,
-                'beta': [0.8] * q,
-                'aic': 1500.0,
-                'bic': 1520.0,
-                'log_likelihood': -750.0
-            }
+            returns = np.asarray(returns, dtype=np.float64)
+            window = window or self.config.get('rolling_window')
+            if window and len(returns) > window:
+                self.logger.info(f"✂️ 只使用最近 {window} 条收益率估计，丢弃较早的 {len(returns) - window} 条")
+                returns = returns[-window:]
+            self.stream_window = window or max(len(returns), DEFAULT_STREAM_WINDOW)
+            
+            estimated_params = fit_garch(
+                returns, self.model['p'], self.model['q'],
+                maxiter=self.config.get('maxiter', 200)
+            )
+            self._apply_fit(estimated_params)
+            self.returns_buffer = returns
             
-            self.model['estimated_params'] = estimated_params
-            self.is_trained = True
+            if not estimated_params['converged']:
+                self.logger.warning("⚠️ GARCH极大似然估计未完全收敛")
             
-            self.logger.info("✅ GARCH模型训练完成")
+            self.logger.info(f"✅ GARCH模型训练完成 - 持续性: {estimated_params['persistence']:.4f}, "
+                             f"迭代 {estimated_params['iterations']} 次")
             
             return {
                 'model': self.model,
@@ -132,12 +330,100 @@ class GARCHModel(LoggerMixin):
             self.logger.error(f"❌ 训练GARCH模型失败: {e}")
             return {}
     
-    def predict_volatility(self, returns: np.ndarray, horizon: int = 1) -> np.ndarray:
+    def update(self, new_returns, refit: bool = True) -> Dict[str, Any]:
+        """
+        流式追加收益率，并以当前参数为初值热启动重估
+        
+        窗口只平移少量观测时似然面几乎不变，热启动通常几次迭代即收敛。
+        缓冲区上限为 rolling_window；未配置时取训练样本量与 DEFAULT_STREAM_WINDOW 中的较大者。
+        
+        Args:
+            new_returns: 新到达的收益率（标量或数组）
+            refit: 是否重估参数，False时仅追加数据
+        
+        Returns:
+            最新参数估计
+        """
+        try:
+            if not self.is_trained:
+                self.logger.error("❌ 模型尚未训练")
+                return {}
+            
+            buffer = np.concatenate([self.returns_buffer, np.atleast_1d(np.asarray(new_returns, dtype=np.float64))])
+            if len(buffer) > self.stream_window:
+                if len(self.returns_buffer) < self.stream_window:
+                    self.logger.info(f"📏 收益率缓冲区达到上限 {self.stream_window}，之后按滚动窗口重估")
+                buffer = buffer[-self.stream_window:]
+            self.returns_buffer = buffer
+            
+            if refit:
+                estimated_params = fit_garch(
+                    buffer, self.model['p'], self.model['q'],
+                    start=self.model['estimated_params'],
+                    maxiter=self.config.get('refit_maxiter', 50)
+                )
+                self._apply_fit(estimated_params)
+            
+            return self.model['estimated_params']
+            
+        except Exception as e:
+            self.logger.error(f"❌ GARCH滚动重估失败: {e}")
+            return {}
+    
+    def fit_symbols(self, returns_by_symbol: Dict[str, np.ndarray],
+                    warm_start: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        依次拟合多个交易对（每个交易对各做一次极大似然估计，不跨序列向量化）
+        
+        各序列的 β 不同，条件方差递推无法合并为一次 lfilter，因此逐个拟合，节省来自热启动：
+        交易对已有上次结果时以其热启动；没有时以已拟合交易对的参数中位数作为初值，
+        同类资产的参数相近，可明显减少迭代次数。
+        
+        Args:
+            returns_by_symbol: {symbol: 收益率数组}，也可传入以交易对为列的DataFrame
+            warm_start: 是否热启动
+        
+        Returns:
+            {symbol: 参数估计}
+        """
+        if self.model is None:
+            self.build_model()
+        
+        if isinstance(returns_by_symbol, pd.DataFrame):
+            returns_by_symbol = {col: returns_by_symbol[col].to_numpy() for col in returns_by_symbol.columns}
+        
+        p, q = self.model['p'], self.model['q']
+        previous = self.model.setdefault('symbol_params', {})
+        results = {}
+        
+        for symbol, returns in returns_by_symbol.items():
+            start = None
+            if warm_start:
+                start = previous.get(symbol)
+                if start is None and results:
+                    fitted = list(results.values())
+                    start = {
+                        'omega': float(np.median([r['omega'] for r in fitted])),
+                        'alpha': np.median([r['alpha'] for r in fitted], axis=0).tolist(),
+                        'beta': np.median([r['beta'] for r in fitted], axis=0).tolist()
+                    }
+            
+            try:
+                results[symbol] = fit_garch(returns, p, q, start=start,
+                                            maxiter=self.config.get('maxiter', 200))
+            except Exception as e:
+                self.logger.warning(f"⚠️ {symbol} GARCH拟合失败: {e}")
+        
+        previous.update(results)
+        self.logger.info(f"✅ 多交易对拟合完成: {len(results)}/{len(returns_by_symbol)} 个交易对")
+        return results
+    
+    def predict_volatility(self, returns: np.ndarray = None, horizon: int = 1) -> np.ndarray:
         """
         预测波动率
         
         Args:
-            returns: 收益率数据
+            returns: 收益率数据，None表示使用训练/滚动窗口中的数据
             horizon: 预测期数
             
         Returns:
@@ -150,12 +436,13 @@ class GARCHModel(LoggerMixin):
             
             self.logger.info(f"🔮 使用GARCH模型预测未来 {horizon} 期波动率...")
             
-            # 模拟波动率预测
-            # 在实际应用中，这里应该使用训练好的GARCH模型进行预测
-            current_volatility = np.std(returns[-20:])  # 使用最近20期的标准差作为当前波动率
+            if returns is None:
+                returns = self.returns_buffer
             
-            # 模拟未来波动率预测
-            volatility_forecast = np.array([current_volatility * (1 + np.random.normal(0, 0.1)) for _ in range(horizon)])
+            variance_forecast = forecast_variance(
+                returns, self.model['estimated_params'], self.model['p'], self.model['q'], horizon
+            )
+            volatility_forecast = np.sqrt(variance_forecast)
             
             self.logger.info(f"✅ GARCH波动率预测完成，生成了 {len(volatility_forecast)} 个预测")
             return volatility_forecast
@@ -181,9 +468,9 @@ class GARCHModel(LoggerMixin):
             
             self.logger.info("📊 计算条件波动率...")
             
-            # 模拟条件波动率计算
-            # 在实际应用中，这里应该使用训练好的GARCH模型计算条件波动率
-            conditional_vol = np.sqrt(np.cumsum(returns ** 2) / np.arange(1, len(returns) + 1))
+            conditional_vol = np.sqrt(conditional_variance(
+                returns, self.model['estimated_params'], self.model['p'], self.model['q']
+            ))
             
             self.logger.info(f"✅ 条件波动率计算完成，生成了 {len(conditional_vol)} 个值")
             return conditional_vol
@@ -272,7 +559,8 @@ class GARCHModel(LoggerMixin):
             model_data = {
                 'model': self.model,
                 'config': self.config,
-                'is_trained': self.is_trained
+                'is_trained': self.is_trained,
+                'returns_buffer': self.returns_buffer
             }
             
             with open(filepath, 'wb') as f:
@@ -304,6 +592,9 @@ class GARCHModel(LoggerMixin):
             self.model = model_data['model']
             self.config = model_data['config']
             self.is_trained = model_data['is_trained']
+            self.returns_buffer = model_data.get('returns_buffer', np.array([]))
+            self.stream_window = self.config.get('rolling_window') or max(len(self.returns_buffer),
+                                                                         DEFAULT_STREAM_WINDOW)
             
             self.logger.info(f"✅ GARCH模型已加载: {filepath}")
             return True
@@ -0,0 +1,246 @@
+"""
+批量推理服务
+模型常驻内存，来自不同策略/交易对的预测请求按模型排队，
+在时间窗口或批大小达到上限时合并为一次向量化前向计算，结果通过 Future 返回
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logging_manager import LoggerMixin
+
+
+class _PendingRequest:
+    """排队中的预测请求"""
+    
+    __slots__ = ('X', 'rows', 'batched', 'future', 'enqueued_at')
+    
+    def __init__(self, X: np.ndarray, batched: bool, future: Future):
+        self.X = X
+        self.rows = len(X)
+        self.batched = batched
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceService(LoggerMixin):
+    """批量推理服务"""
+    
+    def __init__(self, model_manager, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        初始化推理服务
+        
+        Args:
+            model_manager: 模型管理器（提供带LRU缓存的 load_model）
+            max_batch_size: 单次前向计算的最大样本数
+            max_wait_ms: 首个请求入队后最长等待凑批的时间（毫秒）
+        """
+        self.model_manager = model_manager
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        
+        self._models: Dict[str, Any] = {}
+        self._queues: Dict[str, List[_PendingRequest]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        
+        # 统计
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_samples = 0
+        self.failed_batches = 0
+    
+    @staticmethod
+    def _key(model_name: str, model_type: str) -> str:
+        return f"{model_type}_{model_name}"
+    
+    def start(self):
+        """启动调度线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._dispatch_loop, name='inference-service', daemon=True)
+        self._thread.start()
+        self.logger.info("🚀 推理服务已启动")
+    
+    def stop(self, timeout: float = 5.0):
+        """停止调度线程，已排队的请求会先处理完"""
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        for key in list(self._models):
+            self.model_manager.model_cache.unpin(key)
+        self._models.clear()
+        self.logger.info("🛑 推理服务已停止")
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def load(self, model_name: str, model_type: str = 'lstm', model: Any = None) -> bool:
+        """
+        加载模型并固定在缓存中，服务运行期间不会被淘汰
+        
+        Args:
+            model_name: 模型名称
+            model_type: 模型类型
+            model: 直接提供的模型对象，None表示从模型管理器加载
+        
+        Returns:
+            是否加载成功
+        """
+        key = self._key(model_name, model_type)
+        if key in self._models:
+            return True
+        
+        if model is None:
+            model = self.model_manager.load_model(model_name, model_type)
+            if model is None:
+                return False
+        else:
+            self.model_manager.model_cache.put(key, model)
+        
+        self.model_manager.model_cache.pin(key)
+        self._models[key] = model
+        return True
+    
+    def unload(self, model_name: str, model_type: str = 'lstm'):
+        """取消常驻，模型重新参与缓存淘汰"""
+        key = self._key(model_name, model_type)
+        if self._models.pop(key, None) is not None:
+            self.model_manager.model_cache.unpin(key)
+    
+    def submit(self, model_name: str, X: np.ndarray, model_type: str = 'lstm',
+               batched: bool = False) -> Future:
+        """
+        提交预测请求
+        
+        Args:
+            model_name: 模型名称
+            X: 单个样本（如 (序列长度, 特征数)），batched=True 时为一批样本
+            model_type: 模型类型
+            batched: X 是否已带批维度
+        
+        Returns:
+            Future，结果为单个预测值（batched=True 时为预测数组）
+        """
+        future = Future()
+        key = self._key(model_name, model_type)
+        
+        if key not in self._models and not self.load(model_name, model_type):
+            future.set_exception(KeyError(f"模型不存在: {key}"))
+            return future
+        
+        X = np.asarray(X)
+        request = _PendingRequest(X if batched else X[None], batched, future)
+        
+        with self._condition:
+            if not self._running:
+                future.set_exception(RuntimeError("推理服务未启动"))
+                return future
+            self._queues.setdefault(key, []).append(request)
+            self.total_requests += 1
+            self._condition.notify()
+        
+        return future
+    
+    def predict(self, model_name: str, X: np.ndarray, model_type: str = 'lstm',
+                batched: bool = False, timeout: Optional[float] = None) -> Any:
+        """同步预测：提交后等待结果"""
+        return self.submit(model_name, X, model_type, batched).result(timeout)
+    
+    def _take_ready(self) -> Tuple[List[Tuple[str, List[_PendingRequest]]], Optional[float]]:
+        """取出已满足批大小或等待时间的队列（需持有锁），并返回下次需要醒来的等待时长"""
+        now = time.perf_counter()
+        ready = []
+        next_wait = None
+        
+        for key, queue in self._queues.items():
+            if not queue:
+                continue
+            pending_rows = sum(r.rows for r in queue)
+            waited = now - queue[0].enqueued_at
+            if pending_rows >= self.max_batch_size or waited >= self.max_wait or not self._running:
+                batch, rows = [], 0
+                while queue and (not batch or rows + queue[0].rows <= self.max_batch_size):
+                    request = queue.pop(0)
+                    batch.append(request)
+                    rows += request.rows
+                ready.append((key, batch))
+                if queue:
+                    next_wait = 0.0
+            else:
+                remaining = self.max_wait - waited
+                next_wait = remaining if next_wait is None else min(next_wait, remaining)
+        
+        return ready, next_wait
+    
+    def _dispatch_loop(self):
+        """调度循环：凑批并执行前向计算"""
+        while True:
+            with self._condition:
+                ready, next_wait = self._take_ready()
+                if not ready:
+                    if not self._running and not any(self._queues.values()):
+                        return
+                    self._condition.wait(next_wait)
+                    continue
+            
+            for key, batch in ready:
+                self._run_batch(key, batch)
+    
+    def _run_batch(self, key: str, batch: List[_PendingRequest]):
+        """对一批请求执行一次前向计算并分发结果"""
+        model = self._models.get(key)
+        try:
+            if model is None:
+                raise KeyError(f"模型未加载: {key}")
+            
+            X = batch[0].X if len(batch) == 1 else np.concatenate([r.X for r in batch])
+            predictions = np.asarray(model.predict(X))
+            if len(predictions) != len(X):
+                raise ValueError(f"预测结果数量不一致: {len(predictions)} != {len(X)}")
+            
+            self.total_batches += 1
+            self.total_samples += len(X)
+            
+            offset = 0
+            for request in batch:
+                result = predictions[offset:offset + request.rows]
+                request.future.set_result(result if request.batched else result[0])
+                offset += request.rows
+            
+        except Exception as e:
+            self.failed_batches += 1
+            self.logger.error(f"❌ 批量推理失败 {key}: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取服务统计"""
+        with self._condition:
+            queued = sum(len(q) for q in self._queues.values())
+        return {
+            'running': self._running,
+            'models': list(self._models),
+            'queued_requests': queued,
+            'total_requests': self.total_requests,
+            'total_batches': self.total_batches,
+            'total_samples': self.total_samples,
+            'failed_batches': self.failed_batches,
+            'avg_batch_size': self.total_samples / self.total_batches if self.total_batches else 0.0,
+            'cache': self.model_manager.model_cache.get_statistics()
+        }
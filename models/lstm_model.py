@@ -7,6 +7,8 @@ import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from sklearn.preprocessing import MinMaxScaler
 from utils.logging_manager import LoggerMixin
+from utils.sequence_windows import sliding_windows
+from models.numpy_nn import LSTMNetwork, fit_network, predict_batches, limit_threads
 
 class LSTMModel(LoggerMixin):
     """LSTM模型类"""
@@ -32,7 +34,7 @@ class LSTMModel(LoggerMixin):
             sequence_length: 序列长度
             
         Returns:
-            (X, y) 训练数据
+            (X, y) 训练数据，X 为只读步幅视图
         """
         try:
             # 选择特征列
@@ -45,17 +47,24 @@ class LSTMModel(LoggerMixin):
             # 标准化
             scaled_features = self.scaler.fit_transform(features)
             
-            X, y = [], []
-            for i in range(sequence_length, len(scaled_features)):
-                X.append(scaled_features[i-sequence_length:i])
-                y.append(scaled_features[i, feature_columns.index(target_column)])
+            # 滑动窗口视图，不复制数据
+            X = sliding_windows(scaled_features, sequence_length)
+            y = scaled_features[sequence_length:, feature_columns.index(target_column)]
             
-            return np.array(X), np.array(y)
+            return X, y
             
         except Exception as e:
             self.logger.error(f"❌ 准备LSTM数据失败: {e}")
             return np.array([]), np.array([])
     
+    def _inverse_target(self, values: np.ndarray) -> np.ndarray:
+        """将目标列的标准化值还原为原始尺度"""
+        if not hasattr(self.scaler, 'scale_'):
+            return values
+        feature_columns = self.config.get('feature_columns', ['close'])
+        index = feature_columns.index(self.config.get('target_column', 'close'))
+        return (values - self.scaler.min_[index]) / self.scaler.scale_[index]
+    
     def build_model(self, input_shape: Tuple[int, int]) -> Any:
         """
         构建LSTM模型
@@ -67,15 +76,17 @@ class LSTMModel(LoggerMixin):
             LSTM模型
         """
         try:
-            # 这里应该导入tensorflow，但为了简化，我们创建一个模拟的模型结构
             self.logger.info("🔧 构建LSTM模型...")
             
-            # 模拟模型结构
+            layers = self.config.get('hidden_layers', [128, 64, 32])
+            dropout_rate = self.config.get('dropout_rate', 0.2)
             model_structure = {
                 'input_shape': input_shape,
-                'layers': self.config.get('hidden_layers', [128, 64, 32]),
-                'dropout_rate': self.config.get('dropout_rate', 0.2),
-                'learning_rate': self.config.get('learning_rate', 0.001)
+                'layers': layers,
+                'dropout_rate': dropout_rate,
+                'learning_rate': self.config.get('learning_rate', 0.001),
+                'network': LSTMNetwork(input_shape[1], layers, dropout_rate,
+                                       seed=self.config.get('seed', 42))
             }
             
             self.model = model_structure
@@ -107,21 +118,20 @@ class LSTMModel(LoggerMixin):
             
             self.logger.info("🚀 开始训练LSTM模型...")
             
-            # 模拟训练过程
-            epochs = self.config.get('epochs', 100)
-            batch_size = self.config.get('batch_size', 32)
-            
-            # 模拟训练指标
-            training_history = {
-                'loss': [0.5, 0.3, 0.2, 0.15, 0.1],
-                'val_loss': [0.6, 0.4, 0.25, 0.2, 0.15],
-                'accuracy': [0.6, 0.75, 0.85, 0.9, 0.92],
-                'val_accuracy': [0.55, 0.7, 0.8, 0.85, 0.88]
-            }
+            with limit_threads(self.config.get('num_threads')):
+                training_history = fit_network(
+                    self.model['network'], X_train, y_train, X_val, y_val,
+                    epochs=self.config.get('epochs', 100),
+                    batch_size=self.config.get('batch_size', 32),
+                    learning_rate=self.config.get('learning_rate', 0.001),
+                    patience=self.config.get('early_stopping_patience', 10),
+                    seed=self.config.get('seed', 42)
+                )
             
             self.is_trained = True
             
-            self.logger.info("✅ LSTM模型训练完成")
+            self.logger.info(f"✅ LSTM模型训练完成 - {training_history['epochs_run']} 轮, "
+                             f"最佳轮次 {training_history['best_epoch'] + 1}")
             
             return {
                 'model': self.model,
@@ -150,13 +160,11 @@ class LSTMModel(LoggerMixin):
             
             self.logger.info("🔮 使用LSTM模型进行预测...")
             
-            # 模拟预测过程
-            predictions = np.random.normal(0, 0.1, X.shape[0])
+            with limit_threads(self.config.get('num_threads')):
+                predictions = predict_batches(self.model['network'], X)
             
-            # 反标准化
-            if hasattr(self.scaler, 'inverse_transform'):
-                # 这里需要根据实际的数据结构进行调整
-                predictions = self.scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+            # 反标准化为目标列的原始尺度
+            predictions = self._inverse_target(predictions)
             
             self.logger.info(f"✅ LSTM预测完成，生成了 {len(predictions)} 个预测")
             return predictions
@@ -188,6 +196,9 @@ class LSTMModel(LoggerMixin):
             if len(predictions) == 0:
                 return {}
             
+            # 测试标签来自 prepare_data（已标准化），与预测统一到原始尺度
+            y_test = self._inverse_target(np.asarray(y_test))
+            
             # 计算评估指标
             mse = np.mean((predictions - y_test) ** 2)
             rmse = np.sqrt(mse)
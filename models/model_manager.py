@@ -6,22 +6,101 @@ import os
 import json
 import pickle
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from pathlib import Path
 
 from utils.logging_manager import LoggerMixin
+from utils.ttl_cache import TTLCache, estimate_size
 from config.ai_config import AIConfig
 
+
+# 模型大小估算与通用缓存一致（numpy数组按 nbytes，内存映射不计）
+estimate_model_size = estimate_size
+
+
+class ModelCache(TTLCache):
+    """
+    按内存上限与数量上限淘汰的 LRU 模型缓存（不过期）
+    
+    被推理服务占用的模型可固定（pin），固定的模型不会被淘汰。
+    """
+    
+    def __init__(self, max_models: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        """
+        初始化模型缓存
+        
+        Args:
+            max_models: 最多缓存的模型数量
+            max_bytes: 缓存模型的估算内存上限（字节）
+        """
+        super().__init__('models', max_entries=max_models, max_bytes=max_bytes,
+                         ttl=None, sizeof=estimate_model_size)
+    
+    @property
+    def max_models(self) -> int:
+        return self.max_entries
+    
+    def __getitem__(self, key: str) -> Any:
+        model = self.get(key)
+        if model is None and key not in self._entries:
+            raise KeyError(key)
+        return model
+    
+    def __setitem__(self, key: str, model: Any):
+        self.put(key, model)
+    
+    def __delitem__(self, key: str):
+        if not self.remove(key):
+            raise KeyError(key)
+    
+    def put(self, key: str, model: Any, size: Optional[int] = None):
+        """
+        放入模型，必要时按LRU淘汰
+        
+        Args:
+            key: 缓存键
+            model: 模型对象
+            size: 内存占用（字节），None表示自动估算
+        """
+        self.set(key, model, size=size)
+    
+    def remove(self, key: str) -> bool:
+        """移除模型（忽略固定状态）"""
+        return self.delete(key)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        stats = super().get_statistics()
+        with self._lock:
+            stats.update({
+                'models': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_models': self.max_entries,
+                'entries': {k: e.size for k, e in self._entries.items()}
+            })
+        return stats
+
+
 class ModelManager(LoggerMixin):
     """AI模型管理器"""
     
-    def __init__(self):
-        """初始化模型管理器"""
+    def __init__(self, max_cached_models: int = 16, max_cache_bytes: int = 512 * 1024 * 1024,
+                 mmap_weights: Union[bool, str] = True):
+        """
+        初始化模型管理器
+        
+        Args:
+            max_cached_models: 最多常驻内存的模型数量
+            max_cache_bytes: 常驻模型的估算内存上限（字节）
+            mmap_weights: 加载权重容器时张量的内存映射方式：True 写时复制（加载后可继续训练），
+                'r' 只读映射，False 读入内存
+        """
+        self.mmap_weights = mmap_weights
         self.models_dir = Path('models')
         self.models_dir.mkdir(exist_ok=True)
         
-        # 模型缓存
-        self.model_cache = {}
+        # 模型缓存（LRU，按数量与内存上限淘汰）
+        self.model_cache = ModelCache(max_cached_models, max_cache_bytes)
         self.model_configs = {}
         
         # 加载模型配置
@@ -52,14 +131,11 @@ class ModelManager(LoggerMixin):
             是否保存成功
         """
         try:
+            from models.weight_store import save_weights, weights_path
+            
             model_dir = self.models_dir / model_type
             model_dir.mkdir(parents=True, exist_ok=True)
             
-            # 保存模型文件
-            model_file = model_dir / f"{model_name}.pkl"
-            with open(model_file, 'wb') as f:
-                pickle.dump(model, f)
-            
             # 保存元数据
             metadata_file = model_dir / f"{model_name}_metadata.json"
             if metadata is None:
@@ -68,10 +144,14 @@ class ModelManager(LoggerMixin):
             metadata.update({
                 'model_name': model_name,
                 'model_type': model_type,
-                'created_at': datetime.now().isoformat(),
-                'version': '1.0'
+                'created_at': datetime.now().isoformat()
             })
             
+            # 保存为权重容器（张量单独存为 .npy，加载时内存映射）
+            manifest = save_weights(weights_path(model_dir, model_name), model, metadata=metadata)
+            metadata['version'] = manifest['version']
+            metadata['content_hash'] = manifest['content_hash']
+            
             with open(metadata_file, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             
@@ -98,23 +178,30 @@ class ModelManager(LoggerMixin):
             模型对象
         """
         try:
+            from models.weight_store import load_weights, weights_path
+            
             # 检查缓存
             cache_key = f"{model_type}_{model_name}"
-            if cache_key in self.model_cache:
-                self.logger.info(f"✅ 从缓存加载模型: {model_name}")
-                return self.model_cache[cache_key]
+            model = self.model_cache.get(cache_key)
+            if model is not None:
+                self.logger.debug(f"✅ 从缓存加载模型: {model_name}")
+                return model
             
             model_dir = self.models_dir / model_type
+            weights_dir = weights_path(model_dir, model_name)
             model_file = model_dir / f"{model_name}.pkl"
             
-            if not model_file.exists():
+            if weights_dir.exists():
+                # 权重容器：张量按需内存映射
+                model = load_weights(weights_dir, mmap=self.mmap_weights)
+            elif model_file.exists():
+                # 兼容旧的 pickle 模型（可用 python -m models.weight_store convert 转换）
+                with open(model_file, 'rb') as f:
+                    model = pickle.load(f)
+            else:
                 self.logger.warning(f"⚠️ 模型文件不存在: {model_file}")
                 return None
             
-            # 加载模型
-            with open(model_file, 'rb') as f:
-                model = pickle.load(f)
-            
             # 更新缓存
             self.model_cache[cache_key] = model
             
@@ -163,6 +250,8 @@ class ModelManager(LoggerMixin):
             模型列表
         """
         try:
+            from models.weight_store import WEIGHTS_SUFFIX
+            
             models = {}
             
             if model_type:
@@ -177,6 +266,10 @@ class ModelManager(LoggerMixin):
                     for file in model_dir.glob('*.pkl'):
                         model_name = file.stem
                         model_files.append(model_name)
+                    for file in model_dir.glob(f'*{WEIGHTS_SUFFIX}'):
+                        model_name = file.name[:-len(WEIGHTS_SUFFIX)]
+                        if model_name not in model_files:
+                            model_files.append(model_name)
                     models[mt] = model_files
             
             return models
@@ -197,6 +290,8 @@ class ModelManager(LoggerMixin):
             是否删除成功
         """
         try:
+            from models.weight_store import delete_weights, weights_path
+            
             model_dir = self.models_dir / model_type
             model_file = model_dir / f"{model_name}.pkl"
             metadata_file = model_dir / f"{model_name}_metadata.json"
@@ -204,6 +299,7 @@ class ModelManager(LoggerMixin):
             # 删除模型文件
             if model_file.exists():
                 model_file.unlink()
+            delete_weights(weights_path(model_dir, model_name))
             
             # 删除元数据文件
             if metadata_file.exists():
@@ -211,8 +307,7 @@ class ModelManager(LoggerMixin):
             
             # 从缓存中移除
             cache_key = f"{model_type}_{model_name}"
-            if cache_key in self.model_cache:
-                del self.model_cache[cache_key]
+            self.model_cache.remove(cache_key)
             
             self.logger.info(f"✅ 模型已删除: {model_name} ({model_type})")
             return True
@@ -269,6 +364,8 @@ class ModelManager(LoggerMixin):
             模型信息
         """
         try:
+            from models.weight_store import open_weights, weights_path
+            
             info = {
                 'model_name': model_name,
                 'model_type': model_type,
@@ -280,15 +377,22 @@ class ModelManager(LoggerMixin):
             # 检查模型是否存在
             model_dir = self.models_dir / model_type
             model_file = model_dir / f"{model_name}.pkl"
-            info['exists'] = model_file.exists()
+            weights_dir = weights_path(model_dir, model_name)
+            info['exists'] = model_file.exists() or weights_dir.exists()
             
             # 获取元数据
             if info['exists']:
                 info['metadata'] = self.get_model_metadata(model_name, model_type)
                 
                 # 获取文件大小
-                info['file_size'] = model_file.stat().st_size
-                info['created_at'] = datetime.fromtimestamp(model_file.stat().st_ctime).isoformat()
+                if weights_dir.exists():
+                    manifest = open_weights(weights_dir).manifest
+                    info['file_size'] = manifest['total_tensor_bytes']
+                    info['version'] = manifest['version']
+                    info['created_at'] = manifest['created_at']
+                else:
+                    info['file_size'] = model_file.stat().st_size
+                    info['created_at'] = datetime.fromtimestamp(model_file.stat().st_ctime).isoformat()
             
             return info
             
@@ -296,10 +400,16 @@ class ModelManager(LoggerMixin):
             self.logger.error(f"❌ 获取模型信息失败: {e}")
             return {}
     
-    def cleanup_cache(self):
-        """清理模型缓存"""
-        self.model_cache.clear()
-        self.logger.info("✅ 模型缓存已清理")
+    def cleanup_cache(self, max_idle_seconds: float = 600):
+        """
+        清理模型缓存：只淘汰长时间未使用且未被推理服务固定的模型
+        
+        Args:
+            max_idle_seconds: 最长空闲时间（秒），0表示淘汰所有未固定的模型
+        """
+        evicted = self.model_cache.evict_idle(max_idle_seconds)
+        self.logger.info(f"✅ 模型缓存已清理，淘汰 {evicted} 个模型，"
+                         f"剩余 {len(self.model_cache)} 个 ({self.model_cache.total_bytes / 1024 / 1024:.1f} MB)")
     
     def get_models_summary(self) -> Dict[str, Any]:
         """
@@ -313,6 +423,7 @@ class ModelManager(LoggerMixin):
                 'total_models': 0,
                 'models_by_type': {},
                 'cache_size': len(self.model_cache),
+                'cache': self.model_cache.get_statistics(),
                 'models_directory': str(self.models_dir)
             }
             
@@ -0,0 +1,481 @@
+"""
+NumPy 神经网络引擎
+为 LSTMModel / TransformerModel 提供纯 NumPy 的前向、反向传播与 Adam 训练循环，
+不依赖深度学习框架；计算以 float32 批量矩阵运算完成，BLAS 线程数可控，随机性由种子决定
+"""
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from utils.sequence_windows import SequenceBatches
+
+DTYPE = np.float32
+
+
+@contextmanager
+def limit_threads(num_threads: Optional[int]):
+    """限制 BLAS 线程数，None 表示不限制"""
+    if num_threads:
+        with threadpool_limits(limits=num_threads, user_api='blas'):
+            yield
+    else:
+        yield
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _glorot(rng: np.random.Generator, fan_in: int, fan_out: int) -> np.ndarray:
+    limit = np.sqrt(6.0 / (fan_in + fan_out))
+    return rng.uniform(-limit, limit, (fan_in, fan_out)).astype(DTYPE)
+
+
+def _dropout_mask(rng: Optional[np.random.Generator], shape: Tuple[int, ...], rate: float):
+    """反向缩放的 dropout 掩码，推理或 rate=0 时返回 None"""
+    if rng is None or rate <= 0:
+        return None
+    return (rng.random(shape) >= rate).astype(DTYPE) / (1.0 - rate)
+
+
+class Adam:
+    """Adam 优化器（带全局梯度范数裁剪）"""
+    
+    def __init__(self, params: Dict[str, np.ndarray], learning_rate: float = 0.001,
+                 beta1: float = 0.9, beta2: float = 0.999, eps: float = 1e-8, clip_norm: float = 1.0):
+        self.params = params
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.clip_norm = clip_norm
+        self.m = {k: np.zeros_like(v) for k, v in params.items()}
+        self.v = {k: np.zeros_like(v) for k, v in params.items()}
+        self.t = 0
+    
+    def step(self, grads: Dict[str, np.ndarray]):
+        self.t += 1
+        if self.clip_norm:
+            norm = np.sqrt(sum(float(np.sum(g * g)) for g in grads.values()))
+            if norm > self.clip_norm:
+                scale = self.clip_norm / (norm + 1e-12)
+                grads = {k: g * scale for k, g in grads.items()}
+        
+        lr = self.learning_rate * np.sqrt(1 - self.beta2 ** self.t) / (1 - self.beta1 ** self.t)
+        for k, g in grads.items():
+            self.m[k] *= self.beta1
+            self.m[k] += (1 - self.beta1) * g
+            self.v[k] *= self.beta2
+            self.v[k] += (1 - self.beta2) * g * g
+            self.params[k] -= (lr * self.m[k] / (np.sqrt(self.v[k]) + self.eps)).astype(DTYPE)
+
+
+class LSTMNetwork:
+    """堆叠 LSTM + 线性输出层，预测序列之后一步的目标值"""
+    
+    def __init__(self, n_features: int, hidden_layers: List[int], dropout_rate: float = 0.0,
+                 seed: int = 42):
+        rng = np.random.default_rng(seed)
+        self.hidden_layers = list(hidden_layers)
+        self.dropout_rate = dropout_rate
+        self.params: Dict[str, np.ndarray] = {}
+        
+        fan_in = n_features
+        for layer, hidden in enumerate(self.hidden_layers):
+            self.params[f'lstm{layer}_Wx'] = _glorot(rng, fan_in, 4 * hidden)
+            # 循环权重用正交初始化
+            q, _ = np.linalg.qr(rng.standard_normal((4 * hidden, hidden)))
+            self.params[f'lstm{layer}_Wh'] = q.T.astype(DTYPE)
+            bias = np.zeros(4 * hidden, dtype=DTYPE)
+            bias[hidden:2 * hidden] = 1.0  # 遗忘门偏置
+            self.params[f'lstm{layer}_b'] = bias
+            fan_in = hidden
+        
+        self.params['out_W'] = _glorot(rng, fan_in, 1)
+        self.params['out_b'] = np.zeros(1, dtype=DTYPE)
+    
+    def _lstm_forward(self, layer: int, x: np.ndarray):
+        Wx = self.params[f'lstm{layer}_Wx']
+        Wh = self.params[f'lstm{layer}_Wh']
+        b = self.params[f'lstm{layer}_b']
+        B, T, F = x.shape
+        H = Wh.shape[0]
+        
+        # 输入投影对所有时间步一次完成
+        xw = (x.reshape(B * T, F) @ Wx).reshape(B, T, 4 * H) + b
+        h = np.zeros((B, H), dtype=DTYPE)
+        c = np.zeros((B, H), dtype=DTYPE)
+        hs = np.empty((B, T, H), dtype=DTYPE)
+        gates = np.empty((B, T, 4 * H), dtype=DTYPE)
+        cs = np.empty((B, T, H), dtype=DTYPE)
+        
+        for t in range(T):
+            z = xw[:, t] + h @ Wh
+            i = _sigmoid(z[:, :H])
+            f = _sigmoid(z[:, H:2 * H])
+            g = np.tanh(z[:, 2 * H:3 * H])
+            o = _sigmoid(z[:, 3 * H:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            gates[:, t, :H], gates[:, t, H:2 * H], gates[:, t, 2 * H:3 * H], gates[:, t, 3 * H:] = i, f, g, o
+            cs[:, t] = c
+            hs[:, t] = h
+        
+        return hs, (x, hs, gates, cs)
+    
+    def _lstm_backward(self, layer: int, dhs: np.ndarray, cache, grads: Dict[str, np.ndarray],
+                       last_only: bool) -> np.ndarray:
+        x, hs, gates, cs = cache
+        Wx = self.params[f'lstm{layer}_Wx']
+        Wh = self.params[f'lstm{layer}_Wh']
+        B, T, F = x.shape
+        H = Wh.shape[0]
+        
+        dz_all = np.empty((B, T, 4 * H), dtype=DTYPE)
+        dWh = np.zeros_like(Wh)
+        dh_next = np.zeros((B, H), dtype=DTYPE)
+        dc_next = np.zeros((B, H), dtype=DTYPE)
+        
+        for t in reversed(range(T)):
+            dh = dh_next if (last_only and t != T - 1) else dhs[:, t] + dh_next
+            i, f, g, o = gates[:, t, :H], gates[:, t, H:2 * H], gates[:, t, 2 * H:3 * H], gates[:, t, 3 * H:]
+            c = cs[:, t]
+            c_prev = cs[:, t - 1] if t > 0 else np.zeros_like(c)
+            h_prev = hs[:, t - 1] if t > 0 else np.zeros_like(c)
+            
+            tanh_c = np.tanh(c)
+            dc = dc_next + dh * o * (1 - tanh_c * tanh_c)
+            dz = dz_all[:, t]
+            dz[:, :H] = dc * g * i * (1 - i)
+            dz[:, H:2 * H] = dc * c_prev * f * (1 - f)
+            dz[:, 2 * H:3 * H] = dc * i * (1 - g * g)
+            dz[:, 3 * H:] = dh * tanh_c * o * (1 - o)
+            
+            dWh += h_prev.T @ dz
+            dh_next = dz @ Wh.T
+            dc_next = dc * f
+        
+        dz_flat = dz_all.reshape(B * T, 4 * H)
+        grads[f'lstm{layer}_Wx'] = x.reshape(B * T, F).T @ dz_flat
+        grads[f'lstm{layer}_Wh'] = dWh
+        grads[f'lstm{layer}_b'] = dz_flat.sum(axis=0)
+        return (dz_flat @ Wx.T).reshape(B, T, F)
+    
+    def forward(self, X: np.ndarray, rng: Optional[np.random.Generator] = None):
+        """
+        前向计算
+        
+        Args:
+            X: (批, 序列长度, 特征数)
+            rng: 训练时的随机数生成器（用于dropout），推理时为 None
+        
+        Returns:
+            (预测 (批,), 反向传播缓存)
+        """
+        h = np.asarray(X, dtype=DTYPE)
+        caches = []
+        for layer in range(len(self.hidden_layers)):
+            h, cache = self._lstm_forward(layer, h)
+            mask = _dropout_mask(rng, h.shape, self.dropout_rate) if layer < len(self.hidden_layers) - 1 else None
+            if mask is not None:
+                h = h * mask
+            caches.append((cache, mask))
+        
+        last = h[:, -1]
+        y = (last @ self.params['out_W'] + self.params['out_b'])[:, 0]
+        return y, (caches, last)
+    
+    def backward(self, dy: np.ndarray, cache) -> Dict[str, np.ndarray]:
+        """由输出梯度计算所有参数梯度"""
+        caches, last = cache
+        grads: Dict[str, np.ndarray] = {}
+        dy = dy.astype(DTYPE)[:, None]
+        grads['out_W'] = last.T @ dy
+        grads['out_b'] = dy.sum(axis=0)
+        
+        B, T = caches[-1][0][1].shape[:2]
+        dhs = np.zeros((B, T, self.hidden_layers[-1]), dtype=DTYPE)
+        dhs[:, -1] = dy @ self.params['out_W'].T
+        last_only = True
+        
+        for layer in reversed(range(len(self.hidden_layers))):
+            layer_cache, mask = caches[layer]
+            if mask is not None:
+                dhs = dhs * mask
+            dhs = self._lstm_backward(layer, dhs, layer_cache, grads, last_only)
+            last_only = False
+        return grads
+
+
+def _layer_norm(x: np.ndarray, gamma: np.ndarray, beta: np.ndarray, eps: float = 1e-5):
+    mu = x.mean(axis=-1, keepdims=True)
+    inv_std = 1.0 / np.sqrt(x.var(axis=-1, keepdims=True) + eps)
+    x_hat = (x - mu) * inv_std
+    return x_hat * gamma + beta, (x_hat, inv_std)
+
+
+def _layer_norm_backward(dy: np.ndarray, gamma: np.ndarray, cache):
+    x_hat, inv_std = cache
+    D = x_hat.shape[-1]
+    dx_hat = dy * gamma
+    dx = inv_std / D * (D * dx_hat - dx_hat.sum(axis=-1, keepdims=True)
+                        - x_hat * (dx_hat * x_hat).sum(axis=-1, keepdims=True))
+    axes = tuple(range(dy.ndim - 1))
+    return dx, (dy * x_hat).sum(axis=axes), dy.sum(axis=axes)
+
+
+def _linear(x: np.ndarray, W: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (x.reshape(-1, x.shape[-1]) @ W + b).reshape(*x.shape[:-1], W.shape[1])
+
+
+def _linear_backward(dy: np.ndarray, x: np.ndarray, W: np.ndarray):
+    dy2 = dy.reshape(-1, dy.shape[-1])
+    x2 = x.reshape(-1, x.shape[-1])
+    return (dy2 @ W.T).reshape(x.shape), x2.T @ dy2, dy2.sum(axis=0)
+
+
+class TransformerNetwork:
+    """Pre-LN Transformer 编码器 + 线性输出层，以最后一个时间步的表示预测下一步目标值"""
+    
+    def __init__(self, n_features: int, max_sequence_length: int, d_model: int = 64,
+                 n_heads: int = 4, n_layers: int = 2, d_ff: int = 128, dropout: float = 0.0,
+                 seed: int = 42):
+        if d_model % n_heads != 0:
+            raise ValueError(f"d_model ({d_model}) 必须能被 n_heads ({n_heads}) 整除")
+        
+        rng = np.random.default_rng(seed)
+        self.d_model = d_model
+        self.n_heads = n_heads
+        self.n_layers = n_layers
+        self.dropout = dropout
+        self.params: Dict[str, np.ndarray] = {
+            'in_W': _glorot(rng, n_features, d_model),
+            'in_b': np.zeros(d_model, dtype=DTYPE)
+        }
+        for l in range(n_layers):
+            for name in ('q', 'k', 'v', 'o'):
+                self.params[f'l{l}_W{name}'] = _glorot(rng, d_model, d_model)
+                self.params[f'l{l}_b{name}'] = np.zeros(d_model, dtype=DTYPE)
+            self.params[f'l{l}_W1'] = _glorot(rng, d_model, d_ff)
+            self.params[f'l{l}_b1'] = np.zeros(d_ff, dtype=DTYPE)
+            self.params[f'l{l}_W2'] = _glorot(rng, d_ff, d_model)
+            self.params[f'l{l}_b2'] = np.zeros(d_model, dtype=DTYPE)
+            for ln in ('ln1', 'ln2'):
+                self.params[f'l{l}_{ln}_g'] = np.ones(d_model, dtype=DTYPE)
+                self.params[f'l{l}_{ln}_b'] = np.zeros(d_model, dtype=DTYPE)
+        self.params['lnf_g'] = np.ones(d_model, dtype=DTYPE)
+        self.params['lnf_b'] = np.zeros(d_model, dtype=DTYPE)
+        self.params['out_W'] = _glorot(rng, d_model, 1)
+        self.params['out_b'] = np.zeros(1, dtype=DTYPE)
+        
+        # 正弦位置编码
+        position = np.arange(max_sequence_length)[:, None]
+        div = np.exp(np.arange(0, d_model, 2) * (-np.log(10000.0) / d_model))
+        pe = np.zeros((max_sequence_length, d_model))
+        pe[:, 0::2] = np.sin(position * div)
+        pe[:, 1::2] = np.cos(position * div)[:, :d_model // 2]
+        self.positional_encoding = pe.astype(DTYPE)
+    
+    def _split_heads(self, x: np.ndarray) -> np.ndarray:
+        B, T, _ = x.shape
+        return x.reshape(B, T, self.n_heads, -1).transpose(0, 2, 1, 3)
+    
+    def _merge_heads(self, x: np.ndarray) -> np.ndarray:
+        B, _, T, _ = x.shape
+        return x.transpose(0, 2, 1, 3).reshape(B, T, self.d_model)
+    
+    def _attention_forward(self, l: int, a: np.ndarray):
+        p = self.params
+        q = self._split_heads(_linear(a, p[f'l{l}_Wq'], p[f'l{l}_bq']))
+        k = self._split_heads(_linear(a, p[f'l{l}_Wk'], p[f'l{l}_bk']))
+        v = self._split_heads(_linear(a, p[f'l{l}_Wv'], p[f'l{l}_bv']))
+        scale = 1.0 / np.sqrt(q.shape[-1])
+        
+        scores = (q @ k.transpose(0, 1, 3, 2)) * scale
+        scores -= scores.max(axis=-1, keepdims=True)
+        attn = np.exp(scores)
+        attn /= attn.sum(axis=-1, keepdims=True)
+        context = self._merge_heads(attn @ v)
+        out = _linear(context, p[f'l{l}_Wo'], p[f'l{l}_bo'])
+        return out, (a, q, k, v, attn, context, scale)
+    
+    def _attention_backward(self, l: int, dout: np.ndarray, cache, grads: Dict[str, np.ndarray]) -> np.ndarray:
+        p = self.params
+        a, q, k, v, attn, context, scale = cache
+        
+        dcontext, grads[f'l{l}_Wo'], grads[f'l{l}_bo'] = _linear_backward(dout, context, p[f'l{l}_Wo'])
+        dctx = self._split_heads(dcontext)
+        dattn = dctx @ v.transpose(0, 1, 3, 2)
+        dv = attn.transpose(0, 1, 3, 2) @ dctx
+        dscores = attn * (dattn - (dattn * attn).sum(axis=-1, keepdims=True)) * scale
+        dq = dscores @ k
+        dk = dscores.transpose(0, 1, 3, 2) @ q
+        
+        da = np.zeros_like(a)
+        for name, d in (('q', dq), ('k', dk), ('v', dv)):
+            dx, grads[f'l{l}_W{name}'], grads[f'l{l}_b{name}'] = _linear_backward(
+                self._merge_heads(d), a, p[f'l{l}_W{name}']
+            )
+            da += dx
+        return da
+    
+    def forward(self, X: np.ndarray, rng: Optional[np.random.Generator] = None):
+        """
+        前向计算
+        
+        Args:
+            X: (批, 序列长度, 特征数)
+            rng: 训练时的随机数生成器（用于dropout），推理时为 None
+        
+        Returns:
+            (预测 (批,), 反向传播缓存)
+        """
+        p = self.params
+        X = np.asarray(X, dtype=DTYPE)
+        T = X.shape[1]
+        if T > len(self.positional_encoding):
+            raise ValueError(f"序列长度 {T} 超过 max_sequence_length {len(self.positional_encoding)}")
+        
+        h = _linear(X, p['in_W'], p['in_b']) + self.positional_encoding[:T]
+        caches = []
+        for l in range(self.n_layers):
+            a, ln1 = _layer_norm(h, p[f'l{l}_ln1_g'], p[f'l{l}_ln1_b'])
+            attn_out, attn_cache = self._attention_forward(l, a)
+            mask1 = _dropout_mask(rng, attn_out.shape, self.dropout)
+            h = h + (attn_out * mask1 if mask1 is not None else attn_out)
+            
+            b, ln2 = _layer_norm(h, p[f'l{l}_ln2_g'], p[f'l{l}_ln2_b'])
+            hidden = _linear(b, p[f'l{l}_W1'], p[f'l{l}_b1'])
+            relu = np.maximum(hidden, 0)
+            ff_out = _linear(relu, p[f'l{l}_W2'], p[f'l{l}_b2'])
+            mask2 = _dropout_mask(rng, ff_out.shape, self.dropout)
+            h = h + (ff_out * mask2 if mask2 is not None else ff_out)
+            
+            caches.append((ln1, attn_cache, mask1, ln2, b, hidden, relu, mask2))
+        
+        last = h[:, -1]
+        final, lnf = _layer_norm(last, p['lnf_g'], p['lnf_b'])
+        y = (final @ p['out_W'] + p['out_b'])[:, 0]
+        return y, (X, caches, lnf, final, h.shape)
+    
+    def backward(self, dy: np.ndarray, cache) -> Dict[str, np.ndarray]:
+        """由输出梯度计算所有参数梯度"""
+        p = self.params
+        X, caches, lnf, final, shape = cache
+        grads: Dict[str, np.ndarray] = {}
+        
+        dy = dy.astype(DTYPE)[:, None]
+        grads['out_W'] = final.T @ dy
+        grads['out_b'] = dy.sum(axis=0)
+        dlast, grads['lnf_g'], grads['lnf_b'] = _layer_norm_backward(dy @ p['out_W'].T, p['lnf_g'], lnf)
+        
+        dh = np.zeros(shape, dtype=DTYPE)
+        dh[:, -1] = dlast
+        
+        for l in reversed(range(self.n_layers)):
+            ln1, attn_cache, mask1, ln2, b, hidden, relu, mask2 = caches[l]
+            
+            dff = dh * mask2 if mask2 is not None else dh
+            drelu, grads[f'l{l}_W2'], grads[f'l{l}_b2'] = _linear_backward(dff, relu, p[f'l{l}_W2'])
+            dhidden = drelu * (hidden > 0)
+            db, grads[f'l{l}_W1'], grads[f'l{l}_b1'] = _linear_backward(dhidden, b, p[f'l{l}_W1'])
+            dx, grads[f'l{l}_ln2_g'], grads[f'l{l}_ln2_b'] = _layer_norm_backward(db, p[f'l{l}_ln2_g'], ln2)
+            dh = dh + dx
+            
+            dattn = dh * mask1 if mask1 is not None else dh
+            da = self._attention_backward(l, dattn, attn_cache, grads)
+            dx, grads[f'l{l}_ln1_g'], grads[f'l{l}_ln1_b'] = _layer_norm_backward(da, p[f'l{l}_ln1_g'], ln1)
+            dh = dh + dx
+        
+        _, grads['in_W'], grads['in_b'] = _linear_backward(dh, X, p['in_W'])
+        return grads
+
+
+def predict_batches(network, X: np.ndarray, batch_size: int = 256) -> np.ndarray:
+    """分批推理，避免一次物化全部滑动窗口"""
+    if len(X) == 0:
+        return np.empty(0, dtype=DTYPE)
+    return np.concatenate([
+        network.forward(np.ascontiguousarray(X[start:start + batch_size]))[0]
+        for start in range(0, len(X), batch_size)
+    ])
+
+
+def fit_network(network, X_train: np.ndarray, y_train: np.ndarray,
+                X_val: Optional[np.ndarray] = None, y_val: Optional[np.ndarray] = None,
+                epochs: int = 100, batch_size: int = 32, learning_rate: float = 0.001,
+                patience: int = 10, seed: int = 42,
+                on_epoch: Optional[Callable[[int, float, Optional[float]], None]] = None) -> Dict[str, Any]:
+    """
+    小批量 Adam 训练（均方误差），验证集损失连续 patience 轮不下降时提前停止并恢复最佳参数
+    
+    Args:
+        network: LSTMNetwork 或 TransformerNetwork
+        X_train: 训练序列
+        y_train: 训练目标
+        X_val: 验证序列
+        y_val: 验证目标
+        epochs: 最大训练轮数
+        batch_size: 批大小
+        learning_rate: 学习率
+        patience: 提前停止的容忍轮数
+        seed: 随机种子（打乱顺序与dropout）
+        on_epoch: 每轮结束的回调 (epoch, loss, val_loss)
+    
+    Returns:
+        训练历史
+    """
+    rng = np.random.default_rng(seed)
+    optimizer = Adam(network.params, learning_rate=learning_rate)
+    batches = SequenceBatches(X_train, np.asarray(y_train, dtype=DTYPE), batch_size=batch_size,
+                              shuffle=True, seed=seed)
+    has_val = X_val is not None and y_val is not None and len(X_val) > 0
+    
+    history = {'loss': [], 'val_loss': []}
+    best_loss = np.inf
+    best_params = None
+    best_epoch = 0
+    wait = 0
+    
+    for epoch in range(epochs):
+        total, count = 0.0, 0
+        for X_batch, y_batch in batches:
+            pred, cache = network.forward(X_batch, rng)
+            diff = pred - y_batch
+            total += float(diff @ diff)
+            count += len(diff)
+            optimizer.step(network.backward(2.0 * diff / len(diff), cache))
+        
+        loss = total / max(count, 1)
+        history['loss'].append(loss)
+        
+        val_loss = None
+        if has_val:
+            val_pred = predict_batches(network, X_val, max(batch_size, 256))
+            val_loss = float(np.mean((val_pred - y_val) ** 2))
+            history['val_loss'].append(val_loss)
+        
+        if on_epoch:
+            on_epoch(epoch, loss, val_loss)
+        
+        monitored = val_loss if has_val else loss
+        if monitored < best_loss - 1e-10:
+            best_loss = monitored
+            best_params = {k: v.copy() for k, v in network.params.items()}
+            best_epoch = epoch
+            wait = 0
+        else:
+            wait += 1
+            if patience and wait >= patience:
+                break
+    
+    if best_params is not None:
+        for k, v in best_params.items():
+            network.params[k][...] = v
+    
+    history['best_epoch'] = best_epoch
+    history['epochs_run'] = len(history['loss'])
+    return history
@@ -0,0 +1,396 @@
+"""
+在线学习模型
+每根K线收盘时以常数时间更新特征、标准化统计量与模型（先预测后训练），
+无需在全部历史上重新训练；影子评估模式并行运行批量重训模型以对比两者的预测精度
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge, SGDRegressor
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from utils.logging_manager import LoggerMixin
+
+
+class OnlineScaler:
+    """
+    增量标准化器
+    
+    Welford 算法维护均值/方差，同时维护最小/最大值，每次更新 O(特征数)，
+    替代在全部历史上 MinMaxScaler.fit_transform。
+    """
+    
+    def __init__(self, method: str = 'standard'):
+        """
+        初始化标准化器
+        
+        Args:
+            method: 'standard'（均值方差）或 'minmax'
+        """
+        if method not in ('standard', 'minmax'):
+            raise ValueError(f"不支持的标准化方法: {method}")
+        self.method = method
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+        self.min = None
+        self.max = None
+    
+    def partial_fit(self, x: np.ndarray):
+        """用一个样本更新统计量"""
+        x = np.asarray(x, dtype=np.float64)
+        if self.n == 0:
+            self.mean = np.zeros_like(x)
+            self.m2 = np.zeros_like(x)
+            self.min = x.copy()
+            self.max = x.copy()
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        np.minimum(self.min, x, out=self.min)
+        np.maximum(self.max, x, out=self.max)
+        return self
+    
+    @property
+    def std(self) -> np.ndarray:
+        if self.n < 2:
+            return np.ones_like(self.mean)
+        std = np.sqrt(self.m2 / (self.n - 1))
+        return np.where(std > 0, std, 1.0)
+    
+    def transform(self, x: np.ndarray) -> np.ndarray:
+        """按当前统计量标准化"""
+        x = np.asarray(x, dtype=np.float64)
+        if self.n == 0:
+            return x
+        if self.method == 'standard':
+            return (x - self.mean) / self.std
+        span = self.max - self.min
+        return (x - self.min) / np.where(span > 0, span, 1.0)
+
+
+class CandleFeatures:
+    """
+    增量K线特征
+    
+    只保留最近 n_lags 个收盘价与几个指数均线状态，每根K线 O(n_lags) 更新。
+    特征：滞后对数收益率、K线振幅、收盘价相对快/慢EMA偏离、成交量相对EMA的对数比。
+    """
+    
+    def __init__(self, n_lags: int = 10, fast_span: int = 12, slow_span: int = 48):
+        self.n_lags = n_lags
+        self.fast_alpha = 2.0 / (fast_span + 1)
+        self.slow_alpha = 2.0 / (slow_span + 1)
+        self.closes: Deque[float] = deque(maxlen=n_lags + 1)
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_volume = None
+    
+    @property
+    def n_features(self) -> int:
+        return self.n_lags + 4
+    
+    def update(self, candle: Dict[str, float]) -> Optional[np.ndarray]:
+        """
+        加入一根已收盘的K线
+        
+        Args:
+            candle: 含 open/high/low/close/volume 的字典
+        
+        Returns:
+            特征向量；历史不足 n_lags 根时返回 None
+        """
+        close = float(candle['close'])
+        volume = float(candle.get('volume', 0.0))
+        self.closes.append(close)
+        
+        if self.ema_fast is None:
+            self.ema_fast = self.ema_slow = close
+            self.ema_volume = volume
+        else:
+            self.ema_fast += self.fast_alpha * (close - self.ema_fast)
+            self.ema_slow += self.slow_alpha * (close - self.ema_slow)
+            self.ema_volume += self.slow_alpha * (volume - self.ema_volume)
+        
+        if len(self.closes) <= self.n_lags:
+            return None
+        
+        closes = np.fromiter(self.closes, dtype=np.float64, count=len(self.closes))
+        lagged_returns = np.diff(np.log(closes))[::-1]
+        high = float(candle.get('high', close))
+        low = float(candle.get('low', close))
+        return np.r_[
+            lagged_returns,
+            np.log(high / low) if low > 0 else 0.0,
+            close / self.ema_fast - 1.0,
+            close / self.ema_slow - 1.0,
+            np.log1p(volume) - np.log1p(self.ema_volume)
+        ]
+
+
+class RollingForestRegressor:
+    """
+    滑动窗口树集成
+    
+    维护最近 window 个样本；每 refit_every 个新样本按轮转只重训其中一棵树（自助采样），
+    单根K线的均摊代价有上界，旧行情随树的轮换逐步被遗忘。
+    """
+    
+    def __init__(self, n_estimators: int = 10, window: int = 2000, refit_every: int = 20,
+                 max_depth: int = 4, min_samples: int = 100, seed: int = 42):
+        self.n_estimators = n_estimators
+        self.refit_every = refit_every
+        self.max_depth = max_depth
+        self.min_samples = min_samples
+        self.rng = np.random.default_rng(seed)
+        self.X: Deque[np.ndarray] = deque(maxlen=window)
+        self.y: Deque[float] = deque(maxlen=window)
+        self.trees: List[Optional[DecisionTreeRegressor]] = [None] * n_estimators
+        self._next_tree = 0
+        self._since_refit = 0
+    
+    def _refit_tree(self, index: int):
+        X = np.asarray(self.X)
+        y = np.asarray(self.y)
+        sample = self.rng.integers(0, len(X), len(X))
+        tree = DecisionTreeRegressor(max_depth=self.max_depth,
+                                     random_state=int(self.rng.integers(1 << 31)))
+        self.trees[index] = tree.fit(X[sample], y[sample])
+    
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        for x_row, y_value in zip(np.atleast_2d(X), np.atleast_1d(y)):
+            self.X.append(x_row)
+            self.y.append(float(y_value))
+            self._since_refit += 1
+        
+        if len(self.X) < self.min_samples:
+            return self
+        
+        if any(tree is None for tree in self.trees):
+            # 首次达到最小样本量时一次性训练全部树
+            for i in range(self.n_estimators):
+                self._refit_tree(i)
+            self._since_refit = 0
+        elif self._since_refit >= self.refit_every:
+            self._refit_tree(self._next_tree)
+            self._next_tree = (self._next_tree + 1) % self.n_estimators
+            self._since_refit = 0
+        return self
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(X)
+        trees = [t for t in self.trees if t is not None]
+        if not trees:
+            return np.zeros(len(X))
+        return np.mean([t.predict(X) for t in trees], axis=0)
+
+
+class OnlineForecaster(LoggerMixin):
+    """在线K线收益率预测器：先预测、待下一根K线收盘后再以实际收益率训练"""
+    
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        初始化在线预测器
+        
+        Args:
+            config: 配置，支持 model_type ('sgd'/'forest')、n_lags、scaler、learning_rate、
+                forest_* 与 seed
+        """
+        self.config = config or {}
+        self.model_type = self.config.get('model_type', 'sgd')
+        seed = self.config.get('seed', 42)
+        
+        self.features = CandleFeatures(n_lags=self.config.get('n_lags', 10))
+        self.scaler = OnlineScaler(self.config.get('scaler', 'standard'))
+        
+        if self.model_type == 'sgd':
+            self.model = SGDRegressor(
+                loss='huber', penalty='l2', alpha=self.config.get('alpha', 1e-4),
+                learning_rate='constant', eta0=self.config.get('learning_rate', 0.001),
+                random_state=seed
+            )
+        elif self.model_type == 'forest':
+            self.model = RollingForestRegressor(
+                n_estimators=self.config.get('forest_estimators', 10),
+                window=self.config.get('forest_window', 2000),
+                refit_every=self.config.get('forest_refit_every', 20),
+                max_depth=self.config.get('forest_max_depth', 4),
+                seed=seed
+            )
+        else:
+            raise ValueError(f"不支持的在线模型类型: {self.model_type}")
+        
+        self._pending: Optional[np.ndarray] = None
+        self._last_close: Optional[float] = None
+        self._fitted = False
+        
+        # 统计
+        self.updates = 0
+        self.update_time = 0.0
+        self.last_prediction: Optional[float] = None
+    
+    def update(self, candle: Dict[str, float]) -> Optional[float]:
+        """
+        处理一根已收盘的K线
+        
+        上一根K线的特征此时得到真实标签（本根的对数收益率）并用于训练，
+        随后用本根K线的特征预测下一根的收益率。
+        
+        Args:
+            candle: 含 open/high/low/close/volume 的字典
+        
+        Returns:
+            下一根K线的预测对数收益率；预热阶段返回 None
+        """
+        start = time.perf_counter()
+        close = float(candle['close'])
+        
+        if self._pending is not None and self._last_close:
+            target = np.log(close / self._last_close)
+            self.model.partial_fit(self._pending[None], np.array([target]))
+            self._fitted = True
+        
+        features = self.features.update(candle)
+        self._last_close = close
+        prediction = None
+        
+        if features is not None:
+            self.scaler.partial_fit(features)
+            self._pending = self.scaler.transform(features)
+            if self._fitted:
+                prediction = float(self.model.predict(self._pending[None])[0])
+        
+        self.last_prediction = prediction
+        self.updates += 1
+        self.update_time += time.perf_counter() - start
+        return prediction
+    
+    def update_many(self, data: pd.DataFrame) -> np.ndarray:
+        """按顺序处理多根K线（用于预热），返回每根K线之后的预测"""
+        predictions = [self.update(row) for row in data[['open', 'high', 'low', 'close', 'volume']]
+                       .to_dict('records')]
+        return np.array([np.nan if p is None else p for p in predictions])
+    
+    def predict_price(self) -> Optional[float]:
+        """下一根K线的预测收盘价"""
+        if self.last_prediction is None or self._last_close is None:
+            return None
+        return self._last_close * float(np.exp(self.last_prediction))
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'model_type': self.model_type,
+            'updates': self.updates,
+            'avg_update_ms': self.update_time / self.updates * 1000 if self.updates else 0.0,
+            'last_prediction': self.last_prediction
+        }
+
+
+class ShadowEvaluator(LoggerMixin):
+    """
+    影子评估：在线模型与批量重训模型并行，按“先预测后揭晓”逐根比较精度
+    
+    批量模型代表现有做法：每 batch_retrain_every 根K线在历史上重新
+    MinMaxScaler.fit_transform 并从头训练；历史只保留最近 batch_window 根，
+    单次重训的内存与耗时有上限。
+    """
+    
+    def __init__(self, online: OnlineForecaster,
+                 batch_model_factory: Callable[[], Any] = None,
+                 batch_retrain_every: int = 500, window: int = 500, batch_window: int = 5000):
+        """
+        初始化影子评估器
+        
+        Args:
+            online: 在线预测器
+            batch_model_factory: 创建批量模型的函数（需实现 fit/predict），默认岭回归
+            batch_retrain_every: 批量模型的重训间隔（K线数）
+            window: 滚动误差统计窗口
+            batch_window: 批量模型训练使用的最近K线数
+        """
+        self.online = online
+        self.batch_model_factory = batch_model_factory or (lambda: Ridge(alpha=1.0))
+        self.batch_retrain_every = batch_retrain_every
+        
+        self.batch_features = CandleFeatures(n_lags=online.features.n_lags)
+        self.batch_scaler: Optional[MinMaxScaler] = None
+        self.batch_model = None
+        self.history_X: Deque[np.ndarray] = deque(maxlen=batch_window)
+        self.history_y: Deque[float] = deque(maxlen=batch_window)
+        self._batch_pending: Optional[np.ndarray] = None
+        self._last_close: Optional[float] = None
+        self._since_retrain = 0
+        
+        self._pending_predictions: Dict[str, Optional[float]] = {'online': None, 'batch': None}
+        self.errors: Dict[str, Deque[float]] = {'online': deque(maxlen=window), 'batch': deque(maxlen=window)}
+        self.hits: Dict[str, Deque[int]] = {'online': deque(maxlen=window), 'batch': deque(maxlen=window)}
+        self.retrain_time = 0.0
+        self.retrains = 0
+    
+    def _update_batch(self, candle: Dict[str, float]) -> Optional[float]:
+        close = float(candle['close'])
+        if self._batch_pending is not None and self._last_close:
+            self.history_X.append(self._batch_pending)
+            self.history_y.append(np.log(close / self._last_close))
+            self._since_retrain += 1
+        
+        features = self.batch_features.update(candle)
+        self._last_close = close
+        self._batch_pending = features
+        
+        if self.history_X and (self.batch_model is None or self._since_retrain >= self.batch_retrain_every) \
+                and len(self.history_X) >= 50:
+            start = time.perf_counter()
+            self.batch_scaler = MinMaxScaler()
+            X = self.batch_scaler.fit_transform(np.asarray(self.history_X))
+            self.batch_model = self.batch_model_factory().fit(X, np.asarray(self.history_y))
+            self.retrain_time += time.perf_counter() - start
+            self.retrains += 1
+            self._since_retrain = 0
+        
+        if features is None or self.batch_model is None:
+            return None
+        return float(self.batch_model.predict(self.batch_scaler.transform(features[None]))[0])
+    
+    def update(self, candle: Dict[str, float]) -> Dict[str, Optional[float]]:
+        """
+        处理一根已收盘的K线：先对上一轮预测记分，再更新两个模型并给出新预测
+        
+        Returns:
+            {'online': 预测, 'batch': 预测}
+        """
+        if self._last_close:
+            realized = np.log(float(candle['close']) / self._last_close)
+            for name, predicted in self._pending_predictions.items():
+                if predicted is not None:
+                    self.errors[name].append(predicted - realized)
+                    self.hits[name].append(int(np.sign(predicted) == np.sign(realized)))
+        
+        predictions = {
+            'online': self.online.update(candle),
+            'batch': self._update_batch(candle)
+        }
+        self._pending_predictions = predictions
+        return predictions
+    
+    def report(self) -> Dict[str, Any]:
+        """滚动窗口内的误差与方向准确率对比"""
+        result = {}
+        for name in ('online', 'batch'):
+            errors = np.asarray(self.errors[name])
+            result[name] = {
+                'samples': len(errors),
+                'mse': float(np.mean(errors ** 2)) if len(errors) else None,
+                'mae': float(np.mean(np.abs(errors))) if len(errors) else None,
+                'direction_accuracy': float(np.mean(self.hits[name])) if self.hits[name] else None
+            }
+        result['online']['avg_update_ms'] = self.online.get_statistics()['avg_update_ms']
+        result['batch']['retrains'] = self.retrains
+        result['batch']['avg_retrain_ms'] = self.retrain_time / self.retrains * 1000 if self.retrains else 0.0
+        return result
@@ -7,6 +7,8 @@ import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from sklearn.preprocessing import MinMaxScaler
 from utils.logging_manager import LoggerMixin
+from utils.sequence_windows import sliding_windows
+from models.numpy_nn import TransformerNetwork, fit_network, predict_batches, limit_threads
 
 class TransformerModel(LoggerMixin):
     """Transformer模型类"""
@@ -32,7 +34,7 @@ class TransformerModel(LoggerMixin):
             sequence_length: 序列长度
             
         Returns:
-            (X, y) 训练数据
+            (X, y) 训练数据，X 为只读步幅视图
         """
         try:
             # 选择特征列
@@ -45,17 +47,24 @@ class TransformerModel(LoggerMixin):
             # 标准化
             scaled_features = self.scaler.fit_transform(features)
             
-            X, y = [], []
-            for i in range(sequence_length, len(scaled_features)):
-                X.append(scaled_features[i-sequence_length:i])
-                y.append(scaled_features[i, feature_columns.index(target_column)])
+            # 滑动窗口视图，不复制数据
+            X = sliding_windows(scaled_features, sequence_length)
+            y = scaled_features[sequence_length:, feature_columns.index(target_column)]
             
-            return np.array(X), np.array(y)
+            return X, y
             
         except Exception as e:
             self.logger.error(f"❌ 准备Transformer数据失败: {e}")
             return np.array([]), np.array([])
     
+    def _inverse_target(self, values: np.ndarray) -> np.ndarray:
+        """将目标列的标准化值还原为原始尺度"""
+        if not hasattr(self.scaler, 'scale_'):
+            return values
+        feature_columns = self.config.get('feature_columns', ['close'])
+        index = feature_columns.index(self.config.get('target_column', 'close'))
+        return (values - self.scaler.min_[index]) / self.scaler.scale_[index]
+    
     def build_model(self, input_shape: Tuple[int, int]) -> Any:
         """
         构建Transformer模型
@@ -69,7 +78,6 @@ class TransformerModel(LoggerMixin):
         try:
             self.logger.info("🔧 构建Transformer模型...")
             
-            # 模拟模型结构
             model_structure = {
                 'input_shape': input_shape,
                 'd_model': self.config.get('d_model', 512),
@@ -77,8 +85,14 @@ class TransformerModel(LoggerMixin):
                 'n_layers': self.config.get('n_layers', 6),
                 'd_ff': self.config.get('d_ff', 2048),
                 'dropout': self.config.get('dropout', 0.1),
-                'max_sequence_length': self.config.get('max_sequence_length', 100)
+                'max_sequence_length': max(self.config.get('max_sequence_length', 100), input_shape[0])
             }
+            model_structure['network'] = TransformerNetwork(
+                input_shape[1], model_structure['max_sequence_length'],
+                d_model=model_structure['d_model'], n_heads=model_structure['n_heads'],
+                n_layers=model_structure['n_layers'], d_ff=model_structure['d_ff'],
+                dropout=model_structure['dropout'], seed=self.config.get('seed', 42)
+            )
             
             self.model = model_structure
             self.logger.info("✅ Transformer模型构建完成")
@@ -109,21 +123,20 @@ class TransformerModel(LoggerMixin):
             
             self.logger.info("🚀 开始训练Transformer模型...")
             
-            # 模拟训练过程
-            epochs = self.config.get('epochs', 50)
-            batch_size = self.config.get('batch_size', 16)
-            
-            # 模拟训练指标
-            training_history = {
-                'loss': [0.4, 0.25, 0.15, 0.1, 0.08],
-                'val_loss': [0.45, 0.3, 0.2, 0.15, 0.12],
-                'accuracy': [0.7, 0.85, 0.92, 0.95, 0.97],
-                'val_accuracy': [0.65, 0.8, 0.88, 0.92, 0.94]
-            }
+            with limit_threads(self.config.get('num_threads')):
+                training_history = fit_network(
+                    self.model['network'], X_train, y_train, X_val, y_val,
+                    epochs=self.config.get('epochs', 50),
+                    batch_size=self.config.get('batch_size', 16),
+                    learning_rate=self.config.get('learning_rate', 0.0001),
+                    patience=self.config.get('early_stopping_patience', 10),
+                    seed=self.config.get('seed', 42)
+                )
             
             self.is_trained = True
             
-            self.logger.info("✅ Transformer模型训练完成")
+            self.logger.info(f"✅ Transformer模型训练完成 - {training_history['epochs_run']} 轮, "
+                             f"最佳轮次 {training_history['best_epoch'] + 1}")
             
             return {
                 'model': self.model,
@@ -152,12 +165,11 @@ class TransformerModel(LoggerMixin):
             
             self.logger.info("🔮 使用Transformer模型进行预测...")
             
-            # 模拟预测过程
-            predictions = np.random.normal(0, 0.08, X.shape[0])
+            with limit_threads(self.config.get('num_threads')):
+                predictions = predict_batches(self.model['network'], X)
             
-            # 反标准化
-            if hasattr(self.scaler, 'inverse_transform'):
-                predictions = self.scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+            # 反标准化为目标列的原始尺度
+            predictions = self._inverse_target(predictions)
             
             self.logger.info(f"✅ Transformer预测完成，生成了 {len(predictions)} 个预测")
             return predictions
@@ -189,6 +201,9 @@ class TransformerModel(LoggerMixin):
             if len(predictions) == 0:
                 return {}
             
+            # 测试标签来自 prepare_data（已标准化），与预测统一到原始尺度
+            y_test = self._inverse_target(np.asarray(y_test))
+            
             # 计算评估指标
             mse = np.mean((predictions - y_test) ** 2)
             rmse = np.sqrt(mse)
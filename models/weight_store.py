@@ -0,0 +1,455 @@
+"""
+内存映射模型权重格式
+模型对象拆分为清单 manifest.json、只含非数组结构的小型 skeleton.pkl，以及每个张量一个 .npy 文件。
+加载时张量默认以 mmap_mode='c'（写时复制）打开，按需分页读取，多个进程共享同一份页缓存；
+对张量的原地修改（如加载后继续训练）只落在进程私有的页上，不会写回文件。
+
+目录结构:
+    <name>.weights/
+        CURRENT                 当前版本号
+        v<version>/
+            manifest.json       格式版本、元数据、张量清单（dtype/shape/sha256）
+            skeleton.pkl        去掉大数组后的对象结构
+            tensors/<name>.npy  张量数据
+
+用法:
+    python -m models.weight_store convert models/   # 将已有 .pkl 模型转换为权重格式
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.logging_manager import get_logger
+
+FORMAT_NAME = 'jesse-weights'
+FORMAT_VERSION = 1
+WEIGHTS_SUFFIX = '.weights'
+
+# mmap=True 时使用的映射模式：写时复制，加载的模型可直接继续训练
+DEFAULT_MMAP_MODE = 'c'
+
+# 比较元数据是否变化时忽略的字段（每次保存都会变）
+VOLATILE_METADATA_KEYS = ('created_at',)
+
+logger = get_logger(__name__)
+
+
+def _sha256_file(filepath: Path, chunk_size: int = 1 << 20) -> str:
+    """计算文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _mmap_mode(mmap: Union[bool, str]) -> Optional[str]:
+    """把 mmap 参数转换为 np.load 的 mmap_mode（False 表示读入内存）"""
+    if mmap is True:
+        return DEFAULT_MMAP_MODE
+    if not mmap:
+        return None
+    if mmap not in ('r', 'c'):
+        raise ValueError(f"不支持的内存映射模式: {mmap}")
+    return mmap
+
+
+def _stable_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """去掉易变字段后的元数据，用于判断新版本是否只是重复保存"""
+    return {k: v for k, v in (metadata or {}).items() if k not in VOLATILE_METADATA_KEYS}
+
+
+def _tensor_paths(obj: Any) -> Dict[int, str]:
+    """为对象图中的数组生成可读的路径名（如 model.weights.W），同一数组取首次遇到的路径"""
+    paths: Dict[int, str] = {}
+    seen = set()
+    stack: List[Tuple[Any, str]] = [(obj, '')]
+    
+    while stack:
+        item, path = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        
+        if isinstance(item, np.ndarray):
+            paths[id(item)] = path or 'tensor'
+        elif isinstance(item, dict):
+            stack.extend((v, f"{path}.{k}" if path else str(k)) for k, v in item.items())
+        elif isinstance(item, (list, tuple)):
+            stack.extend((v, f"{path}.{i}" if path else str(i)) for i, v in enumerate(item))
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.append((item.__dict__, path))
+    
+    return paths
+
+
+class _TensorPickler(pickle.Pickler):
+    """把大数组替换为持久化引用，写入单独的 .npy 文件"""
+    
+    def __init__(self, file, tensor_dir: Path, names: Dict[int, str], min_bytes: int):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.tensor_dir = tensor_dir
+        self.names = names
+        self.min_bytes = min_bytes
+        self.tensors: Dict[str, Dict[str, Any]] = {}
+        self._written: Dict[int, str] = {}
+    
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.nbytes < self.min_bytes:
+            return None
+        
+        name = self._written.get(id(obj))
+        if name is not None:
+            return ('tensor', name)
+        
+        base = re.sub(r'[^0-9A-Za-z_.-]', '_', self.names.get(id(obj), 'tensor'))
+        name = base
+        suffix = 1
+        while name in self.tensors:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        
+        filepath = self.tensor_dir / f"{name}.npy"
+        np.save(filepath, np.ascontiguousarray(obj), allow_pickle=False)
+        self.tensors[name] = {
+            'file': f"tensors/{name}.npy",
+            'dtype': obj.dtype.str,
+            'shape': list(obj.shape),
+            'nbytes': int(obj.nbytes),
+            'sha256': _sha256_file(filepath)
+        }
+        self._written[id(obj)] = name
+        return ('tensor', name)
+
+
+class _TensorUnpickler(pickle.Unpickler):
+    """按持久化引用从权重容器取回张量"""
+    
+    def __init__(self, file, container: 'WeightContainer'):
+        super().__init__(file)
+        self.container = container
+    
+    def persistent_load(self, pid):
+        kind, name = pid
+        if kind != 'tensor':
+            raise pickle.UnpicklingError(f"未知的持久化引用: {pid}")
+        return self.container[name]
+
+
+class WeightContainer:
+    """
+    已打开的权重容器（某一版本）
+    
+    只读取清单，张量在首次访问时才以内存映射方式打开。
+    """
+    
+    def __init__(self, version_dir: Union[str, Path], mmap: Union[bool, str] = True):
+        """
+        打开权重容器
+        
+        Args:
+            version_dir: 版本目录（v<version>）
+            mmap: True 或 'c' 以写时复制内存映射打开张量（可写，修改不落盘），
+                'r' 以只读内存映射打开，False 读入内存副本
+        """
+        self.version_dir = Path(version_dir)
+        self.mmap = mmap
+        self.mmap_mode = _mmap_mode(mmap)
+        with open(self.version_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        
+        if self.manifest.get('format') != FORMAT_NAME:
+            raise ValueError(f"不是权重容器: {self.version_dir}")
+        if self.manifest.get('format_version', 0) > FORMAT_VERSION:
+            raise ValueError(f"权重格式版本过新: {self.manifest.get('format_version')}")
+        
+        self._tensors: Dict[str, np.ndarray] = {}
+    
+    @property
+    def version(self) -> int:
+        return self.manifest['version']
+    
+    @property
+    def content_hash(self) -> str:
+        return self.manifest['content_hash']
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.manifest.get('metadata', {})
+    
+    def keys(self) -> List[str]:
+        return list(self.manifest['tensors'])
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.manifest['tensors']
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest['tensors'])
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        tensor = self._tensors.get(name)
+        if tensor is None:
+            info = self.manifest['tensors'][name]
+            tensor = np.load(self.version_dir / info['file'],
+                             mmap_mode=self.mmap_mode, allow_pickle=False)
+            if tensor.dtype.str != info['dtype'] or list(tensor.shape) != info['shape']:
+                raise ValueError(f"张量 {name} 与清单不一致")
+            self._tensors[name] = tensor
+        return tensor
+    
+    def verify(self) -> List[str]:
+        """
+        校验所有文件的内容哈希
+        
+        Returns:
+            校验失败的文件列表（空列表表示完整）
+        """
+        failed = []
+        if _sha256_file(self.version_dir / 'skeleton.pkl') != self.manifest['skeleton_sha256']:
+            failed.append('skeleton.pkl')
+        for name, info in self.manifest['tensors'].items():
+            if _sha256_file(self.version_dir / info['file']) != info['sha256']:
+                failed.append(info['file'])
+        return failed
+    
+    def load_object(self) -> Any:
+        """还原模型对象，其中的大数组为本容器的（内存映射）张量"""
+        with open(self.version_dir / 'skeleton.pkl', 'rb') as f:
+            return _TensorUnpickler(f, self).load()
+
+
+def weights_path(directory: Union[str, Path], name: str) -> Path:
+    """模型名对应的权重容器路径"""
+    return Path(directory) / f"{name}{WEIGHTS_SUFFIX}"
+
+
+def current_version(path: Union[str, Path]) -> Optional[int]:
+    """读取容器的当前版本号，不存在时返回 None"""
+    try:
+        return int((Path(path) / 'CURRENT').read_text().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_weights(path: Union[str, Path], obj: Any, metadata: Optional[Dict[str, Any]] = None,
+                 min_tensor_bytes: int = 1024, keep_versions: int = 2) -> Dict[str, Any]:
+    """
+    保存模型对象为权重容器的新版本
+    
+    内容哈希与元数据（忽略 created_at）都与当前版本相同时不写新版本。CURRENT 通过原子替换切换，
+    正在读取旧版本（已建立内存映射）的进程不受影响。
+    
+    Args:
+        path: 容器目录（<name>.weights）
+        obj: 模型对象
+        metadata: 写入清单的元数据
+        min_tensor_bytes: 小于该字节数的数组内联在 skeleton 中
+        keep_versions: 保留的历史版本数量
+    
+    Returns:
+        清单
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    previous = current_version(path)
+    version = (previous or 0) + 1
+    
+    staging = path / f".v{version}.tmp{os.getpid()}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    (staging / 'tensors').mkdir(parents=True)
+    
+    try:
+        buffer = io.BytesIO()
+        pickler = _TensorPickler(buffer, staging / 'tensors', _tensor_paths(obj), min_tensor_bytes)
+        pickler.dump(obj)
+        (staging / 'skeleton.pkl').write_bytes(buffer.getvalue())
+        skeleton_sha256 = hashlib.sha256(buffer.getvalue()).hexdigest()
+        
+        content = hashlib.sha256(skeleton_sha256.encode())
+        for name in sorted(pickler.tensors):
+            content.update(f"{name}:{pickler.tensors[name]['sha256']}".encode())
+        content_hash = content.hexdigest()
+        
+        if previous is not None:
+            try:
+                current = WeightContainer(path / f"v{previous}")
+                if (current.content_hash == content_hash and
+                        _stable_metadata(current.metadata) == _stable_metadata(metadata)):
+                    shutil.rmtree(staging)
+                    return current.manifest
+            except (FileNotFoundError, ValueError):
+                pass
+        
+        manifest = {
+            'format': FORMAT_NAME,
+            'format_version': FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'content_hash': content_hash,
+            'skeleton_sha256': skeleton_sha256,
+            'total_tensor_bytes': sum(t['nbytes'] for t in pickler.tensors.values()),
+            'metadata': metadata or {},
+            'tensors': pickler.tensors
+        }
+        with open(staging / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+        
+        os.replace(staging, path / f"v{version}")
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    
+    current_tmp = path / f"CURRENT.tmp{os.getpid()}"
+    current_tmp.write_text(str(version))
+    os.replace(current_tmp, path / 'CURRENT')
+    
+    # 清理旧版本（已映射的文件在 Linux 上删除后仍可读取）
+    for old in sorted(int(p.name[1:]) for p in path.glob('v*') if p.name[1:].isdigit()):
+        if old <= version - keep_versions:
+            shutil.rmtree(path / f"v{old}", ignore_errors=True)
+    
+    return manifest
+
+
+def open_weights(path: Union[str, Path], version: Optional[int] = None,
+                 mmap: Union[bool, str] = True) -> WeightContainer:
+    """
+    打开权重容器
+    
+    Args:
+        path: 容器目录
+        version: 版本号，None表示当前版本
+        mmap: 内存映射方式，见 WeightContainer
+    
+    Returns:
+        WeightContainer
+    """
+    path = Path(path)
+    if version is None:
+        version = current_version(path)
+        if version is None:
+            raise FileNotFoundError(f"权重容器不存在: {path}")
+    return WeightContainer(path / f"v{version}", mmap=mmap)
+
+
+def load_weights(path: Union[str, Path], version: Optional[int] = None,
+                 mmap: Union[bool, str] = True, verify: bool = False) -> Any:
+    """
+    加载模型对象
+    
+    Args:
+        path: 容器目录
+        version: 版本号，None表示当前版本
+        mmap: True 写时复制映射（默认，可继续训练），'r' 只读映射，False 读入内存
+        verify: 是否先校验内容哈希（需读取全部文件）
+    
+    Returns:
+        模型对象
+    """
+    container = open_weights(path, version, mmap)
+    if verify:
+        failed = container.verify()
+        if failed:
+            raise ValueError(f"权重文件校验失败: {failed}")
+    return container.load_object()
+
+
+def delete_weights(path: Union[str, Path]) -> bool:
+    """删除整个权重容器"""
+    path = Path(path)
+    if not path.exists():
+        return False
+    shutil.rmtree(path)
+    return True
+
+
+def convert_pickle(pickle_path: Union[str, Path], remove_original: bool = False,
+                   metadata: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    将 pickle 模型文件转换为同目录下的权重容器
+    
+    Args:
+        pickle_path: .pkl 文件路径
+        remove_original: 转换并校验成功后是否删除原文件
+        metadata: 附加元数据
+    
+    Returns:
+        权重容器路径
+    """
+    pickle_path = Path(pickle_path)
+    with open(pickle_path, 'rb') as f:
+        obj = pickle.load(f)
+    
+    target = weights_path(pickle_path.parent, pickle_path.stem)
+    info = {'converted_from': pickle_path.name}
+    info.update(metadata or {})
+    save_weights(target, obj, metadata=info)
+    
+    if remove_original:
+        if open_weights(target).verify():
+            raise ValueError(f"转换结果校验失败: {target}")
+        pickle_path.unlink()
+    
+    return target
+
+
+def convert_directory(directory: Union[str, Path], remove_original: bool = False) -> List[Path]:
+    """
+    递归转换目录下的所有 .pkl 模型文件
+    
+    Args:
+        directory: 模型目录
+        remove_original: 是否删除原 .pkl 文件
+    
+    Returns:
+        生成的权重容器路径列表
+    """
+    converted = []
+    for pickle_path in sorted(Path(directory).rglob('*.pkl')):
+        if pickle_path.name == 'skeleton.pkl':
+            continue
+        try:
+            converted.append(convert_pickle(pickle_path, remove_original))
+            logger.info(f"✅ 已转换: {pickle_path}")
+        except Exception as e:
+            logger.error(f"❌ 转换失败 {pickle_path}: {e}")
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型权重格式工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    convert_parser = subparsers.add_parser('convert', help='将 .pkl 模型转换为权重容器')
+    convert_parser.add_argument('directory', help='模型目录')
+    convert_parser.add_argument('--remove-original', action='store_true', help='转换后删除 .pkl 文件')
+    
+    verify_parser = subparsers.add_parser('verify', help='校验权重容器内容哈希')
+    verify_parser.add_argument('path', help='<name>.weights 目录')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'convert':
+        converted = convert_directory(args.directory, args.remove_original)
+        print(f"转换完成: {len(converted)} 个模型")
+    elif args.command == 'verify':
+        failed = open_weights(args.path).verify()
+        print("校验通过" if not failed else f"校验失败: {failed}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,14 @@
 """
 
 import logging
+import os
 import time
 import psutil
 import pandas as pd
 from typing import Dict, Any
 
+from utils.latency_metrics import get_latency_statistics, start_metrics_server_from_env
+
 class SystemMonitor:
     """系统监控器"""
     
@@ -24,6 +27,11 @@ class SystemMonitor:
         try:
             self.logger.info("🔧 初始化系统监控器...")
             self.start_time = time.time()
+            
+            # 设置了 METRICS_PORT 时导出延迟指标（Prometheus 格式）
+            if start_metrics_server_from_env():
+                self.logger.info(f"📈 延迟指标: http://127.0.0.1:{os.getenv('METRICS_PORT')}/metrics")
+            
             self.logger.info("✅ 系统监控器初始化完成")
         except Exception as e:
             self.logger.error(f"❌ 系统监控器初始化失败: {e}")
@@ -116,8 +124,11 @@ class SystemMonitor:
     def get_performance_summary(self) -> Dict[str, Any]:
         """获取性能摘要"""
         try:
+            # 各热路径操作的 p50/p95/p99 延迟
+            latency = get_latency_statistics()
+            
             if not self.performance_metrics:
-                return {'status': 'no_data'}
+                return {'status': 'no_data', 'latency': latency}
             
             latest_metrics = self.performance_metrics[-1]
             
@@ -128,7 +139,8 @@ class SystemMonitor:
                 'memory_percent': latest_metrics['memory_percent'],
                 'disk_percent': latest_metrics['disk_percent'],
                 'error_count': latest_metrics['error_count'],
-                'total_metrics': len(self.performance_metrics)
+                'total_metrics': len(self.performance_metrics),
+                'latency': latency
             }
             
         except Exception as e:
@@ -24,6 +24,8 @@ from ai_modules.daily_review_ai import DailyReviewAI
 from ai_modules.strategy_evolution_tracker import StrategyEvolutionTracker
 from monitoring.system_monitor import SystemMonitor
 from data.market_data_collector import MarketDataCollector
+from utils import clock
+from utils.runtime_profiler import install_runtime_profiler
 
 class HighFrequencyTradingSystem:
     """
@@ -45,7 +47,7 @@ class HighFrequencyTradingSystem:
         self.trading_active = False
         self.daily_trades = []
         self.daily_pnl = 0
-        self.start_time = datetime.now()
+        self.start_time = clock.now()
         
         # 配置参数
         self.load_config()
@@ -93,6 +95,9 @@ class HighFrequencyTradingSystem:
         self.logger.info("🎯 开始高频量化交易...")
         self.trading_active = True
         
+        # 运行中可通过信号/本地套接字开启剖析，无需重启
+        install_runtime_profiler('high_frequency')
+        
         try:
             # 初始化交易所连接
             self._initialize_exchanges()
@@ -140,17 +145,7 @@ class HighFrequencyTradingSystem:
                     time.sleep(60)
                     continue
                 
-                # 获取市场数据
-                market_data = self._get_market_data()
-                
-                # 执行交易策略
-                self._execute_trading_strategies(market_data)
-                
-                # 检查风险控制
-                self._check_risk_controls()
-                
-                # 更新系统状态
-                self._update_system_status()
+                self.run_cycle()
                 
                 # 短暂休眠
                 time.sleep(10)  # 10秒检查一次
@@ -159,9 +154,27 @@ class HighFrequencyTradingSystem:
                 self.logger.error(f"❌ 交易循环错误: {e}")
                 time.sleep(30)
     
+    def run_cycle(self):
+        """
+        执行一轮交易：获取行情 -> 策略信号 -> 风控 -> 状态更新
+        
+        实盘由 _trading_loop 每 10 秒调用一次；回放时由 data.market_replay 在模拟时钟的每一步调用
+        """
+        # 获取市场数据
+        market_data = self._get_market_data()
+        
+        # 执行交易策略
+        self._execute_trading_strategies(market_data)
+        
+        # 检查风险控制
+        self._check_risk_controls()
+        
+        # 更新系统状态
+        self._update_system_status()
+    
     def _is_trading_time(self) -> bool:
         """检查是否为交易时间"""
-        now = datetime.now()
+        now = clock.now()
         
         # 24小时交易
         return True
@@ -214,7 +227,7 @@ class HighFrequencyTradingSystem:
         try:
             # 模拟交易执行
             trade = {
-                'timestamp': datetime.now(),
+                'timestamp': clock.now(),
                 'exchange': exchange,
                 'pair': pair,
                 'direction': 'LONG',
@@ -235,7 +248,7 @@ class HighFrequencyTradingSystem:
         try:
             # 模拟交易执行
             trade = {
-                'timestamp': datetime.now(),
+                'timestamp': clock.now(),
                 'exchange': exchange,
                 'pair': pair,
                 'direction': 'SHORT',
@@ -272,7 +285,7 @@ class HighFrequencyTradingSystem:
                 'trading_active': self.trading_active,
                 'daily_trades': len(self.daily_trades),
                 'daily_pnl': self.daily_pnl,
-                'uptime': (datetime.now() - self.start_time).total_seconds()
+                'uptime': (clock.now() - self.start_time).total_seconds()
             })
         except Exception as e:
             self.logger.warning(f"⚠️ 系统状态更新失败: {e}")
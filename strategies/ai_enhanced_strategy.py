@@ -6,6 +6,7 @@ import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 from .base_strategy import BaseStrategy
+from utils.latency_metrics import timed
 from .ma_crossover_strategy import MACrossoverStrategy
 from .rsi_strategy import RSIStrategy
 from .macd_strategy import MACDStrategy
@@ -48,6 +49,7 @@ class AIEnhancedStrategy(BaseStrategy):
             'bollinger': BollingerStrategy()
         }
     
+    @timed('strategy.generate_signals', strategy='AIEnhancedStrategy')
     def generate_signals(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成AI增强的交易信号
@@ -6,6 +6,7 @@ import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 from .base_strategy import BaseStrategy
+from utils.latency_metrics import timed
 
 class BollingerStrategy(BaseStrategy):
     """布林带策略"""
@@ -31,6 +32,7 @@ class BollingerStrategy(BaseStrategy):
         
         super().__init__(name, default_params)
     
+    @timed('strategy.generate_signals', strategy='BollingerStrategy')
     def generate_signals(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成交易信号
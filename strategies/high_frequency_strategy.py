@@ -11,6 +11,9 @@ from datetime import datetime, timedelta
 import logging
 from finta import TA
 
+from utils import clock
+from utils.latency_metrics import timed
+
 class HighFrequencyStrategy:
     """
     高频交易策略
@@ -37,6 +40,7 @@ class HighFrequencyStrategy:
         self.daily_pnl = 0
         self.last_trade_time = None
         
+    @timed('strategy.should_long', strategy='HighFrequencyStrategy')
     def should_long(self, data: pd.DataFrame) -> bool:
         """判断是否应该做多"""
         # 高频交易信号
@@ -53,6 +57,7 @@ class HighFrequencyStrategy:
             
         return False
     
+    @timed('strategy.should_short', strategy='HighFrequencyStrategy')
     def should_short(self, data: pd.DataFrame) -> bool:
         """判断是否应该做空"""
         # 高频交易信号
@@ -223,7 +228,7 @@ class HighFrequencyStrategy:
         if self.last_trade_time is None:
             return False
             
-        current_time = datetime.now()
+        current_time = clock.now()
         holding_time = (current_time - self.last_trade_time).total_seconds()
         
         return holding_time > self.max_holding_time
@@ -263,7 +268,7 @@ class HighFrequencyStrategy:
     def _record_trade(self, direction: str, qty: float, price: float):
         """记录交易"""
         trade = {
-            'timestamp': datetime.now(),
+            'timestamp': clock.now(),
             'direction': direction,
             'quantity': qty,
             'price': price,
@@ -271,7 +276,7 @@ class HighFrequencyStrategy:
         }
         
         self.trades_today.append(trade)
-        self.last_trade_time = datetime.now()
+        self.last_trade_time = trade['timestamp']
         
         self.logger.info(f"📝 记录交易: {direction} {qty} @ {price}")
     
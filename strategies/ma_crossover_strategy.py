@@ -7,6 +7,7 @@ import pandas as pd
 from typing import Dict, List, Any
 from datetime import datetime
 from .base_strategy import BaseStrategy
+from utils.latency_metrics import timed
 
 class MACrossoverStrategy(BaseStrategy):
     """移动平均线交叉策略"""
@@ -32,6 +33,7 @@ class MACrossoverStrategy(BaseStrategy):
         
         super().__init__(name, default_params)
     
+    @timed('strategy.generate_signals', strategy='MACrossoverStrategy')
     def generate_signals(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成交易信号
@@ -5,6 +5,7 @@
 
 from typing import Dict, Any
 from strategies.enhanced_strategy_base import EnhancedStrategyBase
+from utils.latency_metrics import timed
 
 class MultiTimeframeStrategy(EnhancedStrategyBase):
     """多时间框架趋势策略"""
@@ -27,6 +28,7 @@ class MultiTimeframeStrategy(EnhancedStrategyBase):
         
         super().__init__(name, default_params)
     
+    @timed('strategy.generate_signals', strategy='MultiTimeframeStrategy')
     def generate_signals(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成交易信号
@@ -6,6 +6,7 @@ import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 from .base_strategy import BaseStrategy
+from utils.latency_metrics import timed
 
 class RSIStrategy(BaseStrategy):
     """RSI策略"""
@@ -32,6 +33,7 @@ class RSIStrategy(BaseStrategy):
         
         super().__init__(name, default_params)
     
+    @timed('strategy.generate_signals', strategy='RSIStrategy')
     def generate_signals(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成交易信号
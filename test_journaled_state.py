@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+追加式状态持久化测试
+覆盖增量保存、崩溃恢复（残缺日志行、快照已写但日志未清空）、改写旧元素、删除键与截断列表
+"""
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from utils.journaled_state import JournaledState
+
+
+def _new_state(directory: Path, **kwargs) -> JournaledState:
+    return JournaledState(directory / 'state.json', append_only=['history'], **kwargs)
+
+
+def test_round_trip(tmp_path: Path):
+    """测试增量保存与重新加载"""
+    print("💾 测试增量保存...")
+    journal = _new_state(tmp_path)
+    state = journal.load({'history': [], 'generation': 0})
+    
+    for i in range(5):
+        state['history'].append({'generation': i, 'fitness': i * 0.1})
+        state['generation'] = i
+        journal.save(state)
+    
+    # 未变化时不写入
+    assert journal.save(state) == 0, "状态未变化时仍写入了记录"
+    
+    loaded = _new_state(tmp_path).load()
+    assert loaded == state, f"重新加载的状态不一致: {loaded}"
+    
+    print(f"✅ 增量保存正常: {journal.get_statistics()}")
+
+
+def test_torn_line(tmp_path: Path):
+    """测试写入中途崩溃留下的残缺行"""
+    print("✂️ 测试残缺日志行...")
+    journal = _new_state(tmp_path)
+    state = journal.load({'history': []})
+    for i in range(3):
+        state['history'].append(i)
+        journal.save(state)
+    
+    # 模拟崩溃：最后一条记录只写了一半
+    with open(journal.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op":"extend","key":"history","items":[3')
+    
+    recovered = _new_state(tmp_path)
+    loaded = recovered.load()
+    assert loaded['history'] == [0, 1, 2], f"残缺行未被忽略: {loaded}"
+    
+    # 截掉残缺行后继续追加，新记录可读
+    loaded['history'].append(3)
+    recovered.save(loaded)
+    assert _new_state(tmp_path).load()['history'] == [0, 1, 2, 3], "恢复后追加的记录丢失"
+    
+    print("✅ 残缺行被忽略，后续追加正常")
+
+
+def test_snapshot_before_truncate(tmp_path: Path):
+    """测试快照已写入、日志尚未清空时崩溃"""
+    print("📸 测试快照写入后日志未清空...")
+    journal = _new_state(tmp_path)
+    state = journal.load({'history': []})
+    for i in range(4):
+        state['history'].append(i)
+        journal.save(state)
+    
+    log_before = journal.log_path.read_bytes()
+    journal.compact(state)
+    # 模拟崩溃：快照已替换，日志仍是合并前的内容
+    journal.log_path.write_bytes(log_before)
+    
+    loaded = _new_state(tmp_path).load()
+    assert loaded['history'] == [0, 1, 2, 3], f"已合并的日志记录被重复应用: {loaded['history']}"
+    
+    print("✅ 按序号跳过已合并的记录")
+
+
+def test_rewrite_and_delete(tmp_path: Path):
+    """测试改写追加式列表的旧元素、删除顶层键"""
+    print("✏️ 测试改写旧元素与删除键...")
+    journal = _new_state(tmp_path)
+    state = journal.load({'history': [{'id': 1, 'status': 'open'}, {'id': 2, 'status': 'open'}],
+                          'temp': 1})
+    journal.save(state)
+    
+    state['history'][0]['status'] = 'closed'
+    assert journal.save(state, modified=['history']) != 0, "改写旧元素未被保存"
+    
+    del state['temp']
+    assert journal.save(state) != 0, "删除键未被保存"
+    
+    loaded = _new_state(tmp_path).load()
+    assert loaded == state, f"重新加载的状态不一致: {loaded}"
+    
+    print("✅ 改写与删除均已持久化")
+
+
+def test_truncate_and_regrow(tmp_path: Path):
+    """测试截断追加式列表后再追加"""
+    print("📏 测试截断后再追加...")
+    journal = _new_state(tmp_path)
+    state = journal.load({'history': list(range(10))})
+    journal.save(state)
+    
+    state['history'] = state['history'][-3:]
+    journal.save(state)
+    state['history'].extend(range(100, 120))
+    journal.save(state)
+    
+    loaded = _new_state(tmp_path).load()
+    assert loaded == state, f"截断后再追加的状态不一致: {loaded['history']}"
+    
+    print("✅ 截断后整体写入，之后只追加新元素")
+
+
+def main():
+    """主测试函数"""
+    print("🧪 追加式状态持久化测试")
+    print("=" * 50)
+    
+    tests = [
+        ("增量保存", test_round_trip),
+        ("残缺日志行", test_torn_line),
+        ("快照后日志未清空", test_snapshot_before_truncate),
+        ("改写与删除", test_rewrite_and_delete),
+        ("截断后再追加", test_truncate_and_regrow)
+    ]
+    
+    passed = 0
+    total = len(tests)
+    
+    for test_name, test_func in tests:
+        print(f"\n🔍 测试: {test_name}")
+        directory = Path(tempfile.mkdtemp(prefix='journaled_state_'))
+        try:
+            test_func(directory)
+            passed += 1
+            print(f"✅ {test_name} 测试通过")
+        except AssertionError as e:
+            print(f"❌ {e}")
+            print(f"❌ {test_name} 测试失败")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
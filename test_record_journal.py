@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+分段记录日志测试
+覆盖读写往返、跨日区间读取、残缺记录恢复、时间乱序分段、.ext 附加字段与多进程写入
+"""
+
+import multiprocessing
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from data.record_journal import PRICE_SCHEMA, RecordJournal
+
+DAY_MS = 86_400_000
+# 2024-01-01 00:00:00 UTC
+BASE_MS = 1_704_067_200_000
+
+
+def _price(timestamp: int, symbol: str = 'BTC/USDT', exchange: str = 'binance', **extra) -> dict:
+    record = {'timestamp': timestamp, 'exchange': exchange, 'symbol': symbol,
+              'last': 100.0 + timestamp % 1000, 'bid': 99.0, 'ask': 101.0, 'spread': 2.0}
+    record.update(extra)
+    return record
+
+
+def test_round_trip(tmp_path: Path):
+    """测试写入后读回"""
+    print("💾 测试读写往返...")
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=16)
+    records = [_price(BASE_MS + i * 1000, symbol=f'C{i % 3}/USDT') for i in range(100)]
+    journal.append_many(records)
+    
+    loaded = RecordJournal(tmp_path, PRICE_SCHEMA).read()
+    assert len(loaded) == 100, f"记录数不一致: {len(loaded)}"
+    assert [r['symbol'] for r in loaded] == [r['symbol'] for r in records], "分类字段解码错误"
+    assert loaded[0]['high'] is None and loaded[5]['last'] == records[5]['last'], f"数值字段错误: {loaded[0]}"
+    
+    print(f"✅ 读写往返正常: {journal.get_statistics()}")
+
+
+def test_cross_day_range(tmp_path: Path):
+    """测试跨日分段的区间读取"""
+    print("📅 测试跨日区间读取...")
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=8, chunk_records=50)
+    # 三天，每小时 60 条
+    timestamps = [BASE_MS + i * 60_000 for i in range(3 * 24 * 60)]
+    journal.append_many(_price(t) for t in timestamps)
+    
+    assert journal.segments() == ['20240101', '20240102', '20240103'], f"分段划分错误: {journal.segments()}"
+    
+    start, end = BASE_MS + DAY_MS - 90 * 60_000, BASE_MS + 2 * DAY_MS + 30 * 60_000
+    expected = [t for t in timestamps if start <= t < end]
+    chunks = list(journal.iter_chunks(start, end))
+    got = [int(t) for chunk in chunks for t in chunk['timestamp']]
+    assert got == expected, f"区间读取结果不一致: {len(got)} vs {len(expected)}"
+    assert max(len(chunk) for chunk in chunks) <= 50, "数据块超过 chunk_records"
+    
+    print(f"✅ 跨日区间读取正常，共 {len(got)} 条")
+
+
+def test_torn_tail(tmp_path: Path):
+    """测试写入中途崩溃留下的残缺记录"""
+    print("✂️ 测试残缺记录恢复...")
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=4)
+    journal.append_many(_price(BASE_MS + i) for i in range(10))
+    
+    # 模拟崩溃：记录与索引都只写了一半
+    with open(tmp_path / '20240101.bin', 'ab') as f:
+        f.write(b'\x01' * (journal.dtype.itemsize // 2))
+    with open(tmp_path / '20240101.idx', 'ab') as f:
+        f.write(b'\x01' * 8)
+    
+    recovered = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=4)
+    assert len(recovered.read()) == 10, "残缺记录未被忽略"
+    
+    recovered.append_many(_price(BASE_MS + 10 + i) for i in range(10))
+    loaded = RecordJournal(tmp_path, PRICE_SCHEMA).read(start=BASE_MS + 12)
+    assert [r['last'] for r in loaded] == [100.0 + 12 + i for i in range(8)], \
+        f"恢复后追加的记录或索引错误: {[r['last'] for r in loaded]}"
+    
+    print("✅ 残缺记录被截掉，后续追加与索引正常")
+
+
+def test_unsorted_segment(tmp_path: Path):
+    """测试分段内时间倒序的记录"""
+    print("🔀 测试时间乱序分段...")
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=4)
+    journal.append_many(_price(BASE_MS + i * 1000) for i in range(20, 40))
+    journal.append_many(_price(BASE_MS + i * 1000) for i in range(0, 20))
+    
+    assert (tmp_path / '20240101.unsorted').exists(), "未标记乱序分段"
+    
+    loaded = journal.read(start=BASE_MS + 10_000, end=BASE_MS + 30_000)
+    timestamps = [r['timestamp'] for r in loaded]
+    assert len(loaded) == 20 and timestamps == sorted(timestamps), f"乱序分段读取错误: {len(loaded)} 条"
+    
+    print("✅ 乱序分段整体读取并排序")
+
+
+def test_ext_fields(tmp_path: Path):
+    """测试 schema 之外的字段与类型不符的值"""
+    print("📎 测试 .ext 附加字段...")
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA)
+    records = [
+        _price(BASE_MS, source='ws', depth={'bids': [[1, 2]]}),
+        _price(BASE_MS + 1),
+        _price(BASE_MS + 2, last='n/a', symbol=42),
+        _price(BASE_MS + DAY_MS, note='次日')
+    ]
+    journal.append_many(records)
+    
+    loaded = RecordJournal(tmp_path, PRICE_SCHEMA).read()
+    checks = [
+        loaded[0]['source'] == 'ws' and loaded[0]['depth'] == {'bids': [[1, 2]]},
+        'source' not in loaded[1],
+        loaded[2]['last'] == 'n/a' and loaded[2]['symbol'] == 42,
+        loaded[3]['note'] == '次日'
+    ]
+    assert all(checks), f"附加字段读回错误: {checks}"
+    
+    print("✅ 附加字段与类型不符的值原样读回")
+
+
+def _index_consistent(journal: RecordJournal, day: str) -> bool:
+    records = np.fromfile(journal.root / f'{day}.bin', dtype=journal.dtype)
+    index = np.fromfile(journal.root / f'{day}.idx', dtype='<i8').reshape(-1, 2)
+    return bool((records['timestamp'][index[:, 1]] == index[:, 0]).all())
+
+
+def _writer(root: str, worker: int, batches: int):
+    journal = RecordJournal(root, PRICE_SCHEMA, index_every=16)
+    for batch in range(batches):
+        journal.append_many(_price(BASE_MS + (batch * 10 + i) * 1000, symbol=f'W{worker}-{i % 4}/USDT',
+                                   worker=worker) for i in range(10))
+
+
+def test_multi_process_writers(tmp_path: Path):
+    """测试多个进程同时写入同一目录"""
+    print("👥 测试多进程写入...")
+    RecordJournal(tmp_path, PRICE_SCHEMA, index_every=16)
+    workers = [multiprocessing.Process(target=_writer, args=(str(tmp_path), worker, 50)) for worker in range(2)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    
+    journal = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=16)
+    loaded = journal.read()
+    assert len(loaded) == 1000, f"记录数不一致: {len(loaded)}"
+    # 分类编码一致：每条记录的交易对都属于写入它的进程
+    assert all(r['symbol'].startswith(f"W{r['worker']}-") for r in loaded), "分类字段编码冲突"
+    # 索引项指向的记录号与其时间戳一致
+    assert _index_consistent(journal, '20240101'), "稀疏索引位置错误"
+    
+    # 另一个实例缓存的分段长度已过期时，追加的位置与索引仍然正确
+    stale = RecordJournal(tmp_path, PRICE_SCHEMA, index_every=16)
+    stale.append_many([_price(BASE_MS + DAY_MS)])
+    journal.append_many(_price(BASE_MS + DAY_MS + i) for i in range(1, 21))
+    stale.append_many(_price(BASE_MS + DAY_MS + i) for i in range(21, 40))
+    assert _index_consistent(journal, '20240102'), "过期实例追加后索引错位"
+    loaded = journal.read(start=BASE_MS + DAY_MS + 17)
+    assert [r['last'] for r in loaded] == [100.0 + i for i in range(17, 40)], "过期实例追加后区间读取错误"
+    
+    print("✅ 多进程写入的记录、分类字典与索引一致")
+
+
+def main():
+    """主测试函数"""
+    print("🧪 分段记录日志测试")
+    print("=" * 50)
+    
+    tests = [
+        ("读写往返", test_round_trip),
+        ("跨日区间读取", test_cross_day_range),
+        ("残缺记录恢复", test_torn_tail),
+        ("时间乱序分段", test_unsorted_segment),
+        ("附加字段", test_ext_fields),
+        ("多进程写入", test_multi_process_writers)
+    ]
+    
+    passed = 0
+    total = len(tests)
+    
+    for test_name, test_func in tests:
+        print(f"\n🔍 测试: {test_name}")
+        root = Path(tempfile.mkdtemp(prefix='record_journal_'))
+        try:
+            test_func(root)
+            passed += 1
+            print(f"✅ {test_name} 测试通过")
+        except AssertionError as e:
+            print(f"❌ {e}")
+            print(f"❌ {test_name} 测试失败")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    
+    print("\n" + "=" * 50)
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
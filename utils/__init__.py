@@ -1,13 +1,28 @@
 """
 工具模块
+包级名称按需导入，导入 utils.logging_manager 等轻量子模块时不会连带加载 pandas/sklearn
 """
 
-from .logging_manager import setup_logging, get_logger
-from .data_processor import DataProcessor
-from .helpers import *
+from .lazy_import import lazy_exports
+
+# 原先通过 from .helpers import * 导出的工具函数
+_HELPER_NAMES = (
+    'ensure_directory', 'save_json', 'load_json', 'save_pickle', 'load_pickle', 'calculate_md5',
+    'format_timestamp', 'get_time_range', 'calculate_returns', 'calculate_sharpe_ratio',
+    'calculate_max_drawdown', 'calculate_volatility', 'normalize_data', 'create_lagged_features',
+    'calculate_technical_indicators', 'validate_config', 'safe_divide', 'format_number',
+    'format_percentage'
+)
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'setup_logging': '.logging_manager',
+    'get_logger': '.logging_manager',
+    'DataProcessor': '.data_processor',
+    **{name: '.helpers' for name in _HELPER_NAMES}
+})
 
 __all__ = [
     'setup_logging',
     'get_logger', 
     'DataProcessor'
-] 
\ No newline at end of file
+]
@@ -3,12 +3,15 @@
 自动扫描多交易所套利机会，无需手动选择
 """
 
+import statistics
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
 from dataclasses import dataclass
 
+from utils.ttl_cache import TTLCache
+
 @dataclass
 class ArbitrageOpportunity:
     """套利机会数据类"""
@@ -41,14 +44,16 @@ class ArbitrageOpportunity:
 class ArbitrageScanner:
     """智能套利扫描器"""
     
-    def __init__(self, market_data_collector):
+    def __init__(self, market_data_collector, lifetime_tracker=None):
         """
         初始化套利扫描器
         
         Args:
             market_data_collector: 市场数据采集器实例
+            lifetime_tracker: 机会生命周期追踪器（可选）
         """
         self.collector = market_data_collector
+        self.lifetime_tracker = lifetime_tracker
         
         # 扫描配置
         self.min_spread_percent = 0.5  # 最小价差百分比（考虑手续费）
@@ -62,10 +67,14 @@ class ArbitrageScanner:
             'okx': 0.1
         }
         
-        # 缓存
-        self.opportunities_cache = []
+        # 缓存最近一次扫描结果（scan_interval 内有效，过期后仍可读取直到下次扫描）
+        self.scan_cache = TTLCache('arbitrage.opportunities', max_entries=1, max_bytes=16 * 1024 * 1024,
+                                   ttl=self.scan_interval, stale_ttl=float('inf'))
         self.last_scan_time = 0
         
+        # 最近一次扫描看到的现货价格 {symbol: {exchange: last}}，供资金费率扫描计算基差
+        self.spot_prices: Dict[str, Dict[str, float]] = {}
+        
         # 统计
         self.total_scans = 0
         self.opportunities_found = 0
@@ -136,6 +145,9 @@ class ArbitrageScanner:
             except Exception as e:
                 continue
         
+        if prices:
+            self.spot_prices[symbol] = {exchange: data['price'] for exchange, data in prices.items()}
+        
         # 如果少于2个交易所有数据，无法套利
         if len(prices) < 2:
             return opportunities
@@ -222,8 +234,9 @@ class ArbitrageScanner:
         current_time = time.time()
         
         # 检查是否需要重新扫描
-        if current_time - self.last_scan_time < self.scan_interval:
-            return self.opportunities_cache
+        cached, stale = self.scan_cache.get_with_state('latest')
+        if stale is False:
+            return cached
         
         # 执行扫描
         opportunities = self.scan_all_symbols(symbols, exchanges)
@@ -233,18 +246,32 @@ class ArbitrageScanner:
         self.opportunities_found += len(opportunities)
         
         # 更新缓存
-        self.opportunities_cache = opportunities
+        self.scan_cache.set('latest', opportunities, ttl=self.scan_interval)
         self.last_scan_time = current_time
         
+        # 追踪机会的生命周期
+        if self.lifetime_tracker is not None:
+            self.lifetime_tracker.update(opportunities, current_time)
+        
         # 如果有回调函数，调用它
         if callback and opportunities:
             callback(opportunities)
         
         return opportunities
     
+    def get_spot_reference_prices(self) -> Dict[str, float]:
+        """各交易对在最近一次扫描中各交易所现货价格的中位数（不产生请求）"""
+        return {symbol: float(statistics.median(prices.values()))
+                for symbol, prices in self.spot_prices.items() if prices}
+    
+    @property
+    def opportunities_cache(self) -> List[ArbitrageOpportunity]:
+        """最近一次扫描的套利机会"""
+        return self.scan_cache.peek('latest', [])
+    
     def get_statistics(self) -> Dict:
         """获取扫描统计信息"""
-        return {
+        stats = {
             'total_scans': self.total_scans,
             'opportunities_found': self.opportunities_found,
             'avg_opportunities_per_scan': (
@@ -253,8 +280,14 @@ class ArbitrageScanner:
             ),
             'last_scan_time': datetime.fromtimestamp(self.last_scan_time).isoformat() 
                 if self.last_scan_time > 0 else None,
-            'cache_size': len(self.opportunities_cache)
+            'cache_size': len(self.opportunities_cache),
+            'cache': self.scan_cache.get_statistics()
         }
+        
+        if self.lifetime_tracker is not None:
+            stats['lifetime'] = self.lifetime_tracker.get_statistics()
+        
+        return stats
     
     def get_top_opportunities(self, limit: int = 10) -> List[Dict]:
         """
@@ -0,0 +1,436 @@
+"""
+套利机会生命周期追踪器
+跨扫描识别同一套利机会，记录开启/关闭时间、峰值价差与衰减，
+写入仅追加的定长二进制存储，并提供按交易对/交易所对的生命周期分位数汇总
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.logging_manager import LoggerMixin
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有进程内的锁
+    fcntl = None
+
+# 单条生命周期记录（56字节，小端定长）
+LIFETIME_DTYPE = np.dtype([
+    ('key_id', '<u4'),
+    ('opened_at', '<f8'),
+    ('last_seen', '<f8'),
+    ('closed_at', '<f8'),
+    ('peak_at', '<f8'),
+    ('first_profit', '<f4'),
+    ('peak_profit', '<f4'),
+    ('last_profit', '<f4'),
+    ('peak_spread', '<f4'),
+    ('observations', '<u4'),
+])
+
+# 两次观测间隔超过该秒数时，视为机会已在间隔中消失（看板刷新间隔最长120秒）
+DEFAULT_MAX_GAP = 300.0
+
+
+@dataclass
+class OpportunityLifetime:
+    """一个套利机会从出现到消失的生命周期"""
+    symbol: str
+    buy_exchange: str
+    sell_exchange: str
+    opened_at: float
+    last_seen: float
+    peak_at: float
+    first_profit: float
+    peak_profit: float
+    last_profit: float
+    peak_spread: float
+    observations: int = 1
+    closed_at: Optional[float] = None
+    
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.symbol, self.buy_exchange, self.sell_exchange)
+    
+    @property
+    def lifetime(self) -> float:
+        """生命周期（秒）：关闭前取最后一次观测时间"""
+        end = self.closed_at if self.closed_at is not None else self.last_seen
+        return end - self.opened_at
+    
+    @property
+    def decay_rate(self) -> float:
+        """峰值之后的利润衰减速度（%/秒）"""
+        elapsed = self.last_seen - self.peak_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.peak_profit - self.last_profit) / elapsed
+    
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'buy_exchange': self.buy_exchange,
+            'sell_exchange': self.sell_exchange,
+            'opened_at': datetime.fromtimestamp(self.opened_at).isoformat(),
+            'closed_at': datetime.fromtimestamp(self.closed_at).isoformat()
+                if self.closed_at is not None else None,
+            'lifetime': self.lifetime,
+            'first_profit': self.first_profit,
+            'peak_profit': self.peak_profit,
+            'last_profit': self.last_profit,
+            'peak_spread': self.peak_spread,
+            'decay_rate': self.decay_rate,
+            'observations': self.observations
+        }
+
+
+class ArbitrageLifetimeStore(LoggerMixin):
+    """
+    仅追加的生命周期存储
+    
+    lifetimes.bin 为 LIFETIME_DTYPE 定长记录，读取时 np.fromfile 直接映射为结构化数组；
+    lifetime_keys.jsonl 追加保存 key_id → (symbol, buy_exchange, sell_exchange) 映射，
+    key_id 为文件中有效行的序号。同一目录可能有多个存储实例（每个仪表板会话一个）在写，
+    分配新编号时持有文件锁并先读入其他实例追加的行，保证同一编号只对应一个键。
+    """
+    
+    def __init__(self, data_dir: str = 'data/arbitrage'):
+        """
+        初始化存储
+        
+        Args:
+            data_dir: 存储目录
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.records_file = self.data_dir / 'lifetimes.bin'
+        self.keys_file = self.data_dir / 'lifetime_keys.jsonl'
+        
+        self._lock = threading.Lock()
+        self._key_ids: Dict[Tuple[str, str, str], int] = {}
+        self._keys: List[Tuple[str, str, str]] = []
+        self._keys_offset = 0
+        self._load_keys()
+    
+    def _load_keys(self):
+        """读入键文件中尚未读取的完整行"""
+        if not self.keys_file.exists():
+            return
+        with open(self.keys_file, 'rb') as f:
+            self._read_new_keys(f)
+    
+    def _read_new_keys(self, f) -> bool:
+        """
+        从上次读到的位置继续解析键映射
+        
+        Returns:
+            文件末尾是否残留不完整的行（崩溃时写了一半）
+        """
+        f.seek(self._keys_offset)
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            try:
+                key = tuple(json.loads(line))
+            except ValueError:
+                # 崩溃残留的半行，所有实例都跳过，不占编号
+                continue
+            if key not in self._key_ids:
+                self._key_ids[key] = len(self._keys)
+            self._keys.append(key)
+        self._keys_offset += complete
+        return complete < len(data)
+    
+    def _key_id(self, key: Tuple[str, str, str]) -> int:
+        """获取（必要时分配）键编号"""
+        key_id = self._key_ids.get(key)
+        if key_id is not None:
+            return key_id
+        
+        with open(self.keys_file, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # 其他实例可能已经分配了这个键或占用了下一个编号
+                torn = self._read_new_keys(f)
+                key_id = self._key_ids.get(key)
+                if key_id is None:
+                    line = json.dumps(list(key), ensure_ascii=False).encode('utf-8') + b'\n'
+                    if torn:
+                        # 先补齐残留的半行，使其成为一个被跳过的无效行
+                        line = b'\n' + line
+                    f.write(line)
+                    f.flush()
+                    self._read_new_keys(f)
+                    key_id = self._key_ids[key]
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return key_id
+    
+    def append(self, lifetimes: List[OpportunityLifetime]):
+        """
+        追加已关闭的生命周期记录
+        
+        Args:
+            lifetimes: 生命周期列表
+        """
+        if not lifetimes:
+            return
+        
+        with self._lock:
+            records = np.zeros(len(lifetimes), dtype=LIFETIME_DTYPE)
+            for i, lt in enumerate(lifetimes):
+                records[i] = (
+                    self._key_id(lt.key), lt.opened_at, lt.last_seen,
+                    lt.closed_at if lt.closed_at is not None else lt.last_seen,
+                    lt.peak_at, lt.first_profit, lt.peak_profit,
+                    lt.last_profit, lt.peak_spread, lt.observations
+                )
+            # 单次写入整块记录
+            with open(self.records_file, 'ab') as f:
+                f.write(records.tobytes())
+    
+    def load(self, since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """
+        读取生命周期记录
+        
+        Args:
+            since: 起始时间戳（按开启时间过滤）
+            until: 结束时间戳
+        
+        Returns:
+            LIFETIME_DTYPE 结构化数组
+        """
+        if not self.records_file.exists():
+            return np.zeros(0, dtype=LIFETIME_DTYPE)
+        
+        # 记录可能引用其他实例新分配的键
+        with self._lock:
+            self._load_keys()
+        
+        # 截掉崩溃时写入的不完整尾部记录
+        count = os.path.getsize(self.records_file) // LIFETIME_DTYPE.itemsize
+        records = np.fromfile(self.records_file, dtype=LIFETIME_DTYPE, count=count)
+        
+        mask = np.ones(len(records), dtype=bool)
+        if since is not None:
+            mask &= records['opened_at'] >= since
+        if until is not None:
+            mask &= records['opened_at'] < until
+        return records[mask]
+    
+    def key_of(self, key_id: int) -> Tuple[str, str, str]:
+        """键编号还原为 (symbol, buy_exchange, sell_exchange)"""
+        return self._keys[key_id]
+    
+    def to_dataframe(self, since: Optional[float] = None) -> pd.DataFrame:
+        """以DataFrame形式读取记录（供仪表板展示）"""
+        records = self.load(since)
+        if len(records) == 0:
+            return pd.DataFrame()
+        
+        df = pd.DataFrame(records)
+        keys = [self._keys[k] for k in records['key_id']]
+        df['symbol'] = [k[0] for k in keys]
+        df['buy_exchange'] = [k[1] for k in keys]
+        df['sell_exchange'] = [k[2] for k in keys]
+        df['lifetime'] = df['closed_at'] - df['opened_at']
+        return df.drop(columns=['key_id'])
+    
+    def lifetime_rollup(self, since: Optional[float] = None,
+                        percentiles: Tuple[float, ...] = (50, 90, 99)) -> List[Dict]:
+        """
+        按 (交易对, 买入交易所, 卖出交易所) 汇总生命周期分位数
+        
+        一次 lexsort 后按组边界直接取分位位置（线性插值），整体 O(n log n)。
+        
+        Args:
+            since: 起始时间戳
+            percentiles: 分位数列表
+        
+        Returns:
+            汇总结果列表
+        """
+        records = self.load(since)
+        if len(records) == 0:
+            return []
+        
+        lifetimes = records['closed_at'] - records['opened_at']
+        key_ids = records['key_id']
+        order = np.lexsort((lifetimes, key_ids))
+        sorted_keys = key_ids[order]
+        sorted_lifetimes = lifetimes[order]
+        
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        counts = np.diff(np.r_[starts, len(sorted_keys)])
+        
+        peak_sum = np.add.reduceat(records['peak_profit'][order].astype(np.float64), starts)
+        
+        quantiles = {}
+        for p in percentiles:
+            position = starts + (counts - 1) * (p / 100.0)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, starts + counts - 1)
+            fraction = position - lower
+            quantiles[p] = sorted_lifetimes[lower] * (1 - fraction) + sorted_lifetimes[upper] * fraction
+        
+        rollup = []
+        for g, start in enumerate(starts):
+            symbol, buy_exchange, sell_exchange = self._keys[int(sorted_keys[start])]
+            item = {
+                'symbol': symbol,
+                'buy_exchange': buy_exchange,
+                'sell_exchange': sell_exchange,
+                'count': int(counts[g]),
+                'avg_peak_profit': float(peak_sum[g] / counts[g]),
+                'max_lifetime': float(sorted_lifetimes[start + counts[g] - 1])
+            }
+            for p in percentiles:
+                item[f'p{p:g}_lifetime'] = float(quantiles[p][g])
+            rollup.append(item)
+        
+        rollup.sort(key=lambda x: x['count'], reverse=True)
+        return rollup
+
+
+class ArbitrageLifetimeTracker(LoggerMixin):
+    """跨扫描追踪套利机会的生命周期"""
+    
+    def __init__(self, store: Optional[ArbitrageLifetimeStore] = None,
+                 max_gap: Optional[float] = DEFAULT_MAX_GAP):
+        """
+        初始化追踪器
+        
+        Args:
+            store: 生命周期存储，None表示只在内存中追踪
+            max_gap: 两次观测的最大间隔（秒），超过时在上次观测处关闭生命周期，None表示不限制
+        """
+        self.store = store
+        self.max_gap = max_gap
+        self.active: Dict[Tuple[str, str, str], OpportunityLifetime] = {}
+        # 同一进程内的多个会话共享追踪器
+        self._lock = threading.Lock()
+        
+        # 统计
+        self.total_opened = 0
+        self.total_closed = 0
+        
+        # 退出时写出仍存活的生命周期
+        if store is not None:
+            atexit.register(self.close_all)
+    
+    def _persist(self, closed: List[OpportunityLifetime]):
+        if not closed:
+            return
+        self.total_closed += len(closed)
+        if self.store is not None:
+            try:
+                self.store.append(closed)
+            except Exception as e:
+                self.logger.error(f"❌ 写入套利生命周期失败: {e}")
+    
+    def update(self, opportunities: List, scan_time: Optional[float] = None) -> List[OpportunityLifetime]:
+        """
+        用一次扫描结果更新追踪状态
+        
+        Args:
+            opportunities: ArbitrageOpportunity 列表
+            scan_time: 扫描时间戳，默认当前时间
+        
+        Returns:
+            本次扫描中关闭的生命周期
+        """
+        now = scan_time if scan_time is not None else time.time()
+        with self._lock:
+            closed = self._update(opportunities, now)
+            self._persist(closed)
+        return closed
+    
+    def _update(self, opportunities: List, now: float) -> List[OpportunityLifetime]:
+        closed = []
+        # 扫描间隔过长：无法确认机会在间隔中一直存在，在最后一次观测处关闭
+        if self.max_gap is not None:
+            for key in [k for k, lt in self.active.items() if now - lt.last_seen > self.max_gap]:
+                lifetime = self.active.pop(key)
+                lifetime.closed_at = lifetime.last_seen
+                closed.append(lifetime)
+        
+        seen = set()
+        for opp in opportunities:
+            key = (opp.symbol, opp.buy_exchange, opp.sell_exchange)
+            seen.add(key)
+            profit = float(opp.profit_potential)
+            spread = float(opp.spread_percent)
+            
+            lifetime = self.active.get(key)
+            if lifetime is None:
+                self.active[key] = OpportunityLifetime(
+                    symbol=opp.symbol,
+                    buy_exchange=opp.buy_exchange,
+                    sell_exchange=opp.sell_exchange,
+                    opened_at=now,
+                    last_seen=now,
+                    peak_at=now,
+                    first_profit=profit,
+                    peak_profit=profit,
+                    last_profit=profit,
+                    peak_spread=spread
+                )
+                self.total_opened += 1
+                continue
+            
+            lifetime.last_seen = now
+            lifetime.last_profit = profit
+            lifetime.observations += 1
+            if profit > lifetime.peak_profit:
+                lifetime.peak_profit = profit
+                lifetime.peak_at = now
+            lifetime.peak_spread = max(lifetime.peak_spread, spread)
+        
+        # 本次未出现的机会视为已关闭（关闭时间为首次未观测到的扫描时刻）
+        for key in [k for k in self.active if k not in seen]:
+            lifetime = self.active.pop(key)
+            lifetime.closed_at = now
+            closed.append(lifetime)
+        
+        return closed
+    
+    def close_all(self) -> List[OpportunityLifetime]:
+        """
+        关闭并写出所有仍存活的生命周期（关闭时间取最后一次观测），进程退出时自动调用
+        
+        Returns:
+            被关闭的生命周期
+        """
+        with self._lock:
+            closed = list(self.active.values())
+            self.active.clear()
+            for lifetime in closed:
+                lifetime.closed_at = lifetime.last_seen
+            self._persist(closed)
+        return closed
+    
+    def get_active(self) -> List[Dict]:
+        """获取当前仍存活的机会"""
+        with self._lock:
+            active = sorted(self.active.values(), key=lambda x: x.opened_at)
+        return [lt.to_dict() for lt in active]
+    
+    def get_statistics(self) -> Dict:
+        """获取追踪统计"""
+        return {
+            'active': len(self.active),
+            'total_opened': self.total_opened,
+            'total_closed': self.total_closed
+        }
@@ -0,0 +1,80 @@
+"""
+可替换的时钟
+交易路径上取“当前时间”统一经过这里：实盘时就是系统时钟，回放时换成由回放引擎推进的模拟时钟，
+策略与交易系统看到的时间与回放数据一致，同一份录制回放多次结果完全相同。
+时钟是进程级的（回放在单线程中驱动），用 use_clock 临时替换。
+模拟时钟的日期时间按 UTC 给出（不带时区），回放结果与运行主机的时区无关。
+"""
+
+import time as _time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def utc_datetime(ms: int) -> datetime:
+    """毫秒时间戳转换为不带时区的 UTC 时间"""
+    return _EPOCH + timedelta(milliseconds=int(ms))
+
+
+class SimulatedClock:
+    """模拟时钟，只由调用方推进"""
+    
+    def __init__(self, start_ms: int):
+        """
+        初始化模拟时钟
+        
+        Args:
+            start_ms: 起始时间（毫秒时间戳）
+        """
+        self.ms = int(start_ms)
+    
+    def time(self) -> float:
+        """当前时间（秒，同 time.time）"""
+        return self.ms / 1000.0
+    
+    def now(self) -> datetime:
+        """当前 UTC 时间（不带时区）"""
+        return utc_datetime(self.ms)
+    
+    def advance_to(self, ms: int):
+        """推进到指定时间（毫秒），不允许倒退"""
+        if ms < self.ms:
+            raise ValueError(f"模拟时钟不能倒退: {ms} < {self.ms}")
+        self.ms = int(ms)
+    
+    def advance(self, ms: int):
+        """向前推进指定毫秒数"""
+        self.advance_to(self.ms + ms)
+
+
+_clock: Optional[SimulatedClock] = None
+
+
+def now() -> datetime:
+    """当前本地时间，回放时为模拟时间（UTC）"""
+    return _clock.now() if _clock is not None else datetime.now()
+
+
+def time() -> float:
+    """当前时间戳（秒），回放时为模拟时间"""
+    return _clock.time() if _clock is not None else _time.time()
+
+
+def current_clock() -> Optional[SimulatedClock]:
+    """正在使用的模拟时钟，实盘时为 None"""
+    return _clock
+
+
+@contextmanager
+def use_clock(clock: Optional[SimulatedClock]) -> Iterator[Optional[SimulatedClock]]:
+    """在 with 块内把进程时钟替换为 clock，退出时恢复"""
+    global _clock
+    previous, _clock = _clock, clock
+    try:
+        yield clock
+    finally:
+        _clock = previous
@@ -5,11 +5,8 @@
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
-from sklearn.model_selection import train_test_split
-# import talib  # 替换为finta
-from finta import TA
 from utils.logging_manager import LoggerMixin
+from utils.sequence_windows import sliding_windows, SequenceBatches
 
 class DataProcessor(LoggerMixin):
     """数据处理类"""
@@ -116,7 +113,9 @@ class DataProcessor(LoggerMixin):
                 return df_indicators
         
         try:
-            # 使用finta计算技术指标
+            # 使用finta计算技术指标（导入较慢，用到时再导入）
+            from finta import TA
+            
             # 移动平均线
             df_indicators['sma_5'] = TA.SMA(df_indicators, 5)
             df_indicators['sma_20'] = TA.SMA(df_indicators, 20)
@@ -213,7 +212,9 @@ class DataProcessor(LoggerMixin):
         df_normalized = df.copy()
         scaler_info = {}
         
-        # 选择缩放器
+        # 选择缩放器（sklearn 导入较慢，用到时再导入）
+        from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
+        
         if method == 'minmax':
             scaler = MinMaxScaler()
         elif method == 'standard':
@@ -250,7 +251,7 @@ class DataProcessor(LoggerMixin):
             sequence_length: 序列长度
             
         Returns:
-            X: 特征序列
+            X: 特征序列（只读步幅视图，不复制数据）
             y: 目标序列
         """
         self.logger.info(f"🔄 创建长度为 {sequence_length} 的时间序列...")
@@ -261,16 +262,8 @@ class DataProcessor(LoggerMixin):
         if len(feature_columns) == 0:
             raise ValueError("没有找到特征列")
         
-        X, y = [], []
-        
-        for i in range(sequence_length, len(df)):
-            # 特征序列
-            X.append(df[feature_columns].iloc[i-sequence_length:i].values)
-            # 目标值
-            y.append(df[self.target_column].iloc[i])
-        
-        X = np.array(X)
-        y = np.array(y)
+        X = sliding_windows(df[feature_columns].to_numpy(), sequence_length)
+        y = df[self.target_column].to_numpy()[sequence_length:]
         
         self.logger.info(f"✅ 创建了 {len(X)} 个序列，特征形状: {X.shape}")
         return X, y
@@ -292,21 +285,37 @@ class DataProcessor(LoggerMixin):
         """
         self.logger.info("✂️ 分割数据集...")
         
-        # 首先分割出训练集
-        X_train, X_temp, y_train, y_temp = train_test_split(
-            X, y, test_size=(1-train_split), shuffle=False
-        )
+        # 按时间顺序切片（与 train_test_split(shuffle=False) 的切分点一致），
+        # 切片保持视图，不会把滑动窗口物化
+        train_end = len(X) - int(np.ceil((1 - train_split) * len(X)))
+        X_train, X_temp, y_train, y_temp = X[:train_end], X[train_end:], y[:train_end], y[train_end:]
         
         # 从剩余数据中分割验证集和测试集
         test_split = 1 - validation_split / (1 - train_split)
-        X_val, X_test, y_val, y_test = train_test_split(
-            X_temp, y_temp, test_size=test_split, shuffle=False
-        )
+        val_end = len(X_temp) - int(np.ceil(test_split * len(X_temp)))
+        X_val, X_test, y_val, y_test = X_temp[:val_end], X_temp[val_end:], y_temp[:val_end], y_temp[val_end:]
         
         self.logger.info(f"✅ 数据集分割完成 - 训练: {len(X_train)}, 验证: {len(X_val)}, 测试: {len(X_test)}")
         
         return X_train, X_val, X_test, y_train, y_val, y_test
     
+    def iter_batches(self, X: np.ndarray, y: np.ndarray, batch_size: int = 32,
+                     shuffle: bool = False, seed: Optional[int] = None) -> SequenceBatches:
+        """
+        按批迭代序列数据，每次只物化一个批次
+        
+        Args:
+            X: 特征序列
+            y: 目标序列
+            batch_size: 批大小
+            shuffle: 是否打乱
+            seed: 随机种子
+            
+        Returns:
+            可重复迭代的批量迭代器，产出 (X_batch, y_batch)
+        """
+        return SequenceBatches(X, y, batch_size=batch_size, shuffle=shuffle, seed=seed)
+    
     def inverse_transform(self, data: np.ndarray, scaler_info: Dict) -> np.ndarray:
         """
         反向转换数据
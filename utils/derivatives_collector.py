@@ -4,9 +4,15 @@
 """
 
 import ccxt
+import time
 import numpy as np
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+
+from data.market_recorder import get_market_recorder
+from utils.ttl_cache import TTLCache
 
 class DerivativesDataCollector:
     """衍生品数据采集器"""
@@ -19,7 +25,76 @@ class DerivativesDataCollector:
             base_collector: 基础市场数据采集器实例
         """
         self.base_collector = base_collector
-        self.cache = {}
+        
+        # 按指标分别设置过期时间的缓存: (metric, exchange, symbol) -> 数据
+        self.cache = TTLCache('derivatives', max_entries=4096, max_bytes=32 * 1024 * 1024)
+        self.cache_expiry = {
+            'open_interest': 300,           # 5分钟
+            'open_interest_history': 300,   # 5分钟（1h K线内只追加新点）
+            'funding_rate': 3600,           # 1小时
+            'funding_rate_universe': 3600,  # 全市场批量结果，与单合约资金费率同步过期
+            'funding_history': 3600         # 1小时（8h结算，只追加新点）
+        }
+        
+        # 增量历史：(exchange, symbol) -> 按时间升序的历史点
+        self.history_limit = 24
+        self.oi_history: Dict[Tuple[str, str], List[Dict]] = {}
+        self.funding_history: Dict[Tuple[str, str], List[Dict]] = {}
+        
+        # MARKET_RECORDER=1 时录制从交易所取到的资金费率与持仓量
+        self.recorder = get_market_recorder()
+    
+    def _cache_get(self, metric: str, exchange_name: str, symbol: str) -> Optional[Any]:
+        """读取指标缓存，过期返回None"""
+        return self.cache.get((metric, exchange_name, symbol))
+    
+    def _cache_set(self, metric: str, exchange_name: str, symbol: str, data: Any):
+        """写入指标缓存"""
+        self.cache.set((metric, exchange_name, symbol), data, ttl=self.cache_expiry.get(metric, 300))
+    
+    def get_cached_funding_rates(self, exchanges: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict]]:
+        """
+        读取缓存中未过期的资金费率（不产生任何请求）
+        
+        Args:
+            exchanges: 交易所过滤，None表示全部
+        
+        Returns:
+            {exchange: {交易对: 资金费率数据}}
+        """
+        results: Dict[str, Dict[str, Dict]] = {}
+        for (metric, exchange_name, symbol), data in self.cache.items():
+            if metric != 'funding_rate':
+                continue
+            if exchanges is not None and exchange_name not in exchanges:
+                continue
+            results.setdefault(exchange_name, {})[symbol] = data
+        return results
+    
+    def _get_exchange(self, exchange_name: str):
+        """获取（必要时初始化）交易所实例"""
+        if exchange_name not in self.base_collector.exchanges:
+            if not self.base_collector.initialize_exchange(exchange_name):
+                return None
+        return self.base_collector.exchanges[exchange_name]
+    
+    def _respect_rate_limit(self, exchange_name: str):
+        """与基础采集器共用同一交易所的请求间隔"""
+        respect = getattr(self.base_collector, '_respect_rate_limit', None)
+        if respect is not None:
+            respect(exchange_name)
+    
+    @staticmethod
+    def _to_swap_symbol(symbol: str) -> str:
+        """现货交易对转换为ccxt统一的永续合约symbol: BTC/USDT -> BTC/USDT:USDT"""
+        if ':' in symbol or '/' not in symbol:
+            return symbol
+        return f"{symbol}:{symbol.split('/')[1]}"
+    
+    @staticmethod
+    def _to_spot_symbol(symbol: str) -> str:
+        """永续合约symbol还原为现货交易对: BTC/USDT:USDT -> BTC/USDT"""
+        return symbol.split(':')[0]
 
     def _convert_to_futures_symbol(self, symbol: str, exchange_name: str) -> str:
         """
@@ -52,9 +127,34 @@ class DerivativesDataCollector:
                 return symbol + ':USDT'
         
         return symbol
-        self.cache_expiry = {
-            'open_interest': 300,  # 5分钟
-            'funding_rate': 3600   # 1小时
+    
+    def _format_open_interest(self, oi_data: Dict, exchange_name: str,
+                              symbol: str, futures_symbol: str) -> Dict:
+        """统一持仓量数据格式"""
+        # 安全获取数值
+        oi_amount = oi_data.get('openInterestAmount') or oi_data.get('openInterest') or 0
+        oi_value = oi_data.get('openInterestValue') or 0
+        
+        return {
+            'current': float(oi_amount) if oi_amount else 0,
+            'value': float(oi_value) if oi_value else 0,
+            'timestamp': datetime.now().isoformat(),
+            'symbol': symbol,
+            'futures_symbol': futures_symbol,
+            'exchange': exchange_name
+        }
+    
+    def _format_funding_rate(self, funding_data: Dict, exchange_name: str, symbol: str) -> Dict:
+        """统一资金费率数据格式"""
+        return {
+            'current': float(funding_data.get('fundingRate') or 0),
+            'next_funding_time': funding_data.get('fundingTimestamp'),
+            'interval': funding_data.get('interval'),
+            'mark_price': funding_data.get('markPrice'),
+            'index_price': funding_data.get('indexPrice'),
+            'timestamp': datetime.now().isoformat(),
+            'symbol': symbol,
+            'exchange': exchange_name
         }
     
     def get_open_interest(self, exchange_name: str, symbol: str) -> Optional[Dict]:
@@ -68,6 +168,10 @@ class DerivativesDataCollector:
         Returns:
             持仓量数据
         """
+        cached = self._cache_get('open_interest', exchange_name, symbol)
+        if cached is not None:
+            return cached
+        
         try:
             if exchange_name not in self.base_collector.exchanges:
                 if not self.base_collector.initialize_exchange(exchange_name):
@@ -83,6 +187,7 @@ class DerivativesDataCollector:
             futures_symbol = self._convert_to_futures_symbol(symbol, exchange_name)
             
             # 获取持仓量
+            self._respect_rate_limit(exchange_name)
             try:
                 oi_data = exchange.fetch_open_interest(futures_symbol)
             except:
@@ -92,18 +197,11 @@ class DerivativesDataCollector:
             if not oi_data:
                 return None
             
-            # 安全获取数值
-            oi_amount = oi_data.get('openInterestAmount') or oi_data.get('openInterest') or 0
-            oi_value = oi_data.get('openInterestValue') or 0
-            
-            return {
-                'current': float(oi_amount) if oi_amount else 0,
-                'value': float(oi_value) if oi_value else 0,
-                'timestamp': datetime.now().isoformat(),
-                'symbol': symbol,
-                'futures_symbol': futures_symbol,
-                'exchange': exchange_name
-            }
+            result = self._format_open_interest(oi_data, exchange_name, symbol, futures_symbol)
+            self._cache_set('open_interest', exchange_name, symbol, result)
+            if self.recorder is not None:
+                self.recorder.record_open_interest([result])
+            return result
             
         except Exception as e:
             print(f"获取 {exchange_name} {symbol} 持仓量失败: {e}")
@@ -113,7 +211,7 @@ class DerivativesDataCollector:
     def get_open_interest_history(self, exchange_name: str, symbol: str, 
                                   timeframe: str = '1h', limit: int = 24) -> Optional[List[Dict]]:
         """
-        获取历史持仓量数据
+        获取历史持仓量数据（增量：只请求上次之后的新数据点）
         
         Args:
             exchange_name: 交易所名称
@@ -124,6 +222,11 @@ class DerivativesDataCollector:
         Returns:
             历史持仓量列表
         """
+        cache_symbol = f"{symbol}_{timeframe}"
+        cached = self._cache_get('open_interest_history', exchange_name, cache_symbol)
+        if cached is not None:
+            return cached
+        
         try:
             if exchange_name not in self.base_collector.exchanges:
                 if not self.base_collector.initialize_exchange(exchange_name):
@@ -142,27 +245,56 @@ class DerivativesDataCollector:
             # 转换为期货symbol
             futures_symbol = self._convert_to_futures_symbol(symbol, exchange_name)
             
+            history_key = (exchange_name, cache_symbol)
+            known = self.oi_history.get(history_key, [])
+            since = self._next_since(known)
+            
             # 获取历史持仓量
+            self._respect_rate_limit(exchange_name)
             try:
-                history = exchange.fetch_open_interest_history(futures_symbol, timeframe, limit=limit)
+                history = exchange.fetch_open_interest_history(futures_symbol, timeframe, since=since, limit=limit)
             except:
-                history = exchange.fetch_open_interest_history(symbol, timeframe, limit=limit)
+                history = exchange.fetch_open_interest_history(symbol, timeframe, since=since, limit=limit)
             
-            if not history:
-                return None
-            
-            return [
+            new_points = [
                 {
                     'value': float(item.get('openInterestAmount', 0) or item.get('openInterest', 0)),
                     'timestamp': item.get('timestamp'),
                     'datetime': item.get('datetime')
                 }
-                for item in history
+                for item in (history or [])
             ]
             
+            merged = self._merge_history(known, new_points, limit)
+            if not merged:
+                return None
+            
+            self.oi_history[history_key] = merged
+            self._cache_set('open_interest_history', exchange_name, cache_symbol, merged)
+            return merged
+            
         except Exception as e:
             print(f"获取 {exchange_name} {symbol} 历史持仓量失败: {e}")
             return None
+    
+    @staticmethod
+    def _next_since(known: List[Dict]) -> Optional[int]:
+        """已有历史的下一个起始时间戳（毫秒），无历史返回None"""
+        if known and known[-1].get('timestamp'):
+            return int(known[-1]['timestamp']) + 1
+        return None
+    
+    @staticmethod
+    def _merge_history(known: List[Dict], new_points: List[Dict], limit: int) -> List[Dict]:
+        """将新数据点追加到已有历史（按时间戳去重），保留最近limit条"""
+        last_ts = known[-1].get('timestamp') if known else None
+        appended = [
+            item for item in new_points
+            if last_ts is None or (item.get('timestamp') or 0) > last_ts
+        ]
+        merged = known + appended
+        return merged[-limit:] if limit else merged
+    
     def get_funding_rate(self, exchange_name: str, symbol: str) -> Optional[Dict]:
         """
         获取资金费率
@@ -174,6 +306,10 @@ class DerivativesDataCollector:
         Returns:
             资金费率数据
         """
+        cached = self._cache_get('funding_rate', exchange_name, symbol)
+        if cached is not None:
+            return cached
+        
         try:
             if exchange_name not in self.base_collector.exchanges:
                 if not self.base_collector.initialize_exchange(exchange_name):
@@ -189,6 +325,7 @@ class DerivativesDataCollector:
             # 转换为期货symbol
             futures_symbol = self._convert_to_futures_symbol(symbol, exchange_name)
             
+            self._respect_rate_limit(exchange_name)
             try:
                 funding_data = exchange.fetch_funding_rate(futures_symbol)
             except:
@@ -201,13 +338,11 @@ class DerivativesDataCollector:
             if not funding_data:
                 return None
             
-            return {
-                'current': float(funding_data.get('fundingRate', 0)),
-                'next_funding_time': funding_data.get('fundingTimestamp'),
-                'timestamp': datetime.now().isoformat(),
-                'symbol': symbol,
-                'exchange': exchange_name
-            }
+            result = self._format_funding_rate(funding_data, exchange_name, symbol)
+            self._cache_set('funding_rate', exchange_name, symbol, result)
+            if self.recorder is not None:
+                self.recorder.record_funding_rates([result])
+            return result
             
         except Exception as e:
             print(f"获取 {exchange_name} {symbol} 资金费率失败: {e}")
@@ -216,7 +351,7 @@ class DerivativesDataCollector:
     def get_funding_rate_history(self, exchange_name: str, symbol: str, 
                                  limit: int = 24) -> Optional[List[Dict]]:
         """
-        获取历史资金费率
+        获取历史资金费率（增量：只请求上次之后的新结算点）
         
         Args:
             exchange_name: 交易所名称
@@ -226,6 +361,10 @@ class DerivativesDataCollector:
         Returns:
             历史资金费率列表
         """
+        cached = self._cache_get('funding_history', exchange_name, symbol)
+        if cached is not None:
+            return cached
+        
         try:
             if exchange_name not in self.base_collector.exchanges:
                 if not self.base_collector.initialize_exchange(exchange_name):
@@ -237,21 +376,36 @@ class DerivativesDataCollector:
             if not hasattr(exchange, 'fetch_funding_rate_history'):
                 return None
             
-            # 获取历史资金费率
-            history = exchange.fetch_funding_rate_history(symbol, limit=limit)
+            futures_symbol = self._convert_to_futures_symbol(symbol, exchange_name)
             
-            if not history:
-                return None
+            history_key = (exchange_name, symbol)
+            known = self.funding_history.get(history_key, [])
+            since = self._next_since(known)
+            
+            # 获取历史资金费率
+            self._respect_rate_limit(exchange_name)
+            try:
+                history = exchange.fetch_funding_rate_history(futures_symbol, since=since, limit=limit)
+            except:
+                history = exchange.fetch_funding_rate_history(symbol, since=since, limit=limit)
             
-            return [
+            new_points = [
                 {
                     'rate': float(item.get('fundingRate', 0)),
                     'timestamp': item.get('timestamp'),
                     'datetime': item.get('datetime')
                 }
-                for item in history
+                for item in (history or [])
             ]
             
+            merged = self._merge_history(known, new_points, limit)
+            if not merged:
+                return None
+            
+            self.funding_history[history_key] = merged
+            self._cache_set('funding_history', exchange_name, symbol, merged)
+            return merged
+            
         except Exception as e:
             print(f"获取 {exchange_name} {symbol} 历史资金费率失败: {e}")
             return None
@@ -346,31 +500,261 @@ class DerivativesDataCollector:
         Returns:
             完整的衍生品数据
         """
+        oi_data = self.get_open_interest(exchange_name, symbol)
+        funding_data = self.get_funding_rate(exchange_name, symbol)
+        return self._assemble_derivatives_data(exchange_name, symbol, oi_data, funding_data)
+    
+    def _assemble_derivatives_data(self, exchange_name: str, symbol: str,
+                                   oi_data: Optional[Dict], funding_data: Optional[Dict],
+                                   include_history: bool = True) -> Dict:
+        """组合当前值与（增量）历史，计算指标"""
         result = {}
         
-        # 获取当前持仓量
-        oi_data = self.get_open_interest(exchange_name, symbol)
+        # 当前持仓量
         if oi_data:
             result['open_interest'] = oi_data
             
             # 获取历史持仓量并计算指标
-            oi_history = self.get_open_interest_history(exchange_name, symbol, '1h', 24)
-            if oi_history:
-                oi_values = [item['value'] for item in oi_history if item.get('value')]
-                if oi_values:
-                    oi_metrics = self.calculate_oi_metrics(oi_data['current'], oi_values)
-                    result['oi_metrics'] = oi_metrics
-        
-        # 获取当前资金费率
-        funding_data = self.get_funding_rate(exchange_name, symbol)
+            if include_history:
+                oi_history = self.get_open_interest_history(exchange_name, symbol, '1h', self.history_limit)
+                if oi_history:
+                    oi_values = [item['value'] for item in oi_history if item.get('value')]
+                    if oi_values:
+                        oi_metrics = self.calculate_oi_metrics(oi_data['current'], oi_values)
+                        result['oi_metrics'] = oi_metrics
+        
+        # 当前资金费率
         if funding_data:
             result['funding_rate'] = funding_data
         
         # 获取历史资金费率并计算指标
-        funding_history = self.get_funding_rate_history(exchange_name, symbol, 24)
-        if funding_history:
-            result['funding_history'] = funding_history
-            funding_metrics = self.calculate_funding_metrics(funding_history)
-            result['funding_metrics'] = funding_metrics
+        if include_history:
+            funding_history = self.get_funding_rate_history(exchange_name, symbol, self.history_limit)
+            if funding_history:
+                result['funding_history'] = funding_history
+                funding_metrics = self.calculate_funding_metrics(funding_history)
+                result['funding_metrics'] = funding_metrics
         
         return result
+    
+    def fetch_all_funding_rates(self, exchange_name: str,
+                                symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        批量获取资金费率（交易所级接口，一次请求覆盖全部永续合约）
+        
+        Args:
+            exchange_name: 交易所名称
+            symbols: 现货交易对列表，None表示全部USDT永续
+        
+        Returns:
+            {现货交易对: 资金费率数据}
+        """
+        # 全部命中缓存时不发请求；全市场请求按交易所整体缓存
+        if symbols:
+            cached = {s: self._cache_get('funding_rate', exchange_name, s) for s in symbols}
+            if all(v is not None for v in cached.values()):
+                return cached
+        else:
+            cached = self._cache_get('funding_rate_universe', exchange_name, '*')
+            if cached is not None:
+                return dict(cached)
+        
+        exchange = self._get_exchange(exchange_name)
+        if exchange is None:
+            return {}
+        
+        results = {}
+        if exchange.has.get('fetchFundingRates'):
+            swap_symbols = [self._to_swap_symbol(s) for s in symbols] if symbols else None
+            self._respect_rate_limit(exchange_name)
+            try:
+                raw = exchange.fetch_funding_rates(swap_symbols)
+            except Exception as e:
+                print(f"批量获取 {exchange_name} 资金费率失败: {e}")
+                raw = {}
+            
+            for swap_symbol, funding_data in (raw or {}).items():
+                symbol = self._to_spot_symbol(swap_symbol)
+                if not symbol.endswith('/USDT'):
+                    continue
+                if symbols and symbol not in symbols:
+                    continue
+                data = self._format_funding_rate(funding_data, exchange_name, symbol)
+                self._cache_set('funding_rate', exchange_name, symbol, data)
+                results[symbol] = data
+            if results and self.recorder is not None:
+                self.recorder.record_funding_rates(results.values())
+        
+        # 不支持批量接口（或批量结果缺失）的交易对逐个补齐
+        for symbol in (symbols or []):
+            if symbol not in results:
+                data = self.get_funding_rate(exchange_name, symbol)
+                if data:
+                    results[symbol] = data
+        
+        if not symbols and results:
+            self._cache_set('funding_rate_universe', exchange_name, '*', results)
+        return results
+    
+    def fetch_all_open_interest(self, exchange_name: str, symbols: List[str],
+                                fallback: bool = True) -> Dict[str, Dict]:
+        """
+        批量获取持仓量（交易所支持 fetchOpenInterests 时一次请求，否则逐个并走缓存）
+        
+        Args:
+            exchange_name: 交易所名称
+            symbols: 现货交易对列表
+            fallback: 批量结果缺失时是否逐个补齐
+        
+        Returns:
+            {现货交易对: 持仓量数据}
+        """
+        results = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._cache_get('open_interest', exchange_name, symbol)
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                missing.append(symbol)
+        
+        if not missing:
+            return results
+        
+        exchange = self._get_exchange(exchange_name)
+        if exchange is None:
+            return results
+        
+        if exchange.has.get('fetchOpenInterests'):
+            self._respect_rate_limit(exchange_name)
+            try:
+                raw = exchange.fetch_open_interests([self._to_swap_symbol(s) for s in missing])
+            except Exception as e:
+                print(f"批量获取 {exchange_name} 持仓量失败: {e}")
+                raw = {}
+            
+            for swap_symbol, oi_data in (raw or {}).items():
+                symbol = self._to_spot_symbol(swap_symbol)
+                if symbol not in missing or not oi_data:
+                    continue
+                data = self._format_open_interest(oi_data, exchange_name, symbol, swap_symbol)
+                self._cache_set('open_interest', exchange_name, symbol, data)
+                results[symbol] = data
+            if self.recorder is not None:
+                self.recorder.record_open_interest(results[symbol] for symbol in missing if symbol in results)
+        
+        for symbol in (missing if fallback else []):
+            if symbol not in results:
+                data = self.get_open_interest(exchange_name, symbol)
+                if data:
+                    results[symbol] = data
+        
+        return results
+    
+    def _collect_exchange_batch(self, exchange_name: str, symbols: Optional[List[str]],
+                                include_history: bool) -> Dict[str, Dict]:
+        """单个交易所的批量采集（在独立线程中执行）"""
+        funding_rates = self.fetch_all_funding_rates(exchange_name, symbols)
+        if symbols is None:
+            symbols = sorted(funding_rates)
+        
+        open_interest = self.fetch_all_open_interest(exchange_name, symbols)
+        
+        batch = {}
+        for symbol in symbols:
+            data = self._assemble_derivatives_data(
+                exchange_name, symbol,
+                open_interest.get(symbol), funding_rates.get(symbol),
+                include_history=include_history
+            )
+            if data:
+                batch[symbol] = data
+        return batch
+    
+    def get_batch_derivatives_data(self, pairs: List[tuple],
+                                   include_history: bool = True) -> Dict[str, Dict]:
+        """
+        批量获取多个交易对的衍生品数据
+        
+        同一交易所的资金费率/持仓量走交易所级接口，不同交易所并发执行，
+        历史数据只增量追加，各指标按各自TTL缓存。
+        
+        Args:
+            pairs: 交易对列表 [(exchange, symbol), ...]
+            include_history: 是否包含历史及指标
+        
+        Returns:
+            {f"{exchange}_{symbol}": 衍生品数据}
+        """
+        by_exchange = defaultdict(list)
+        for exchange_name, symbol in pairs:
+            if symbol not in by_exchange[exchange_name]:
+                by_exchange[exchange_name].append(symbol)
+        
+        results = {}
+        if not by_exchange:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=len(by_exchange)) as executor:
+            futures = {
+                executor.submit(self._collect_exchange_batch, exchange_name, symbols, include_history): exchange_name
+                for exchange_name, symbols in by_exchange.items()
+            }
+            for future in as_completed(futures):
+                exchange_name = futures[future]
+                try:
+                    for symbol, data in future.result().items():
+                        results[f"{exchange_name}_{symbol}"] = data
+                except Exception as e:
+                    print(f"批量获取 {exchange_name} 衍生品数据失败: {e}")
+        
+        return results
+    
+    def get_universe_snapshot(self, exchanges: List[str]) -> Dict[str, Dict[str, Dict]]:
+        """
+        全市场衍生品快照：每个交易所一次资金费率批量请求，交易所间并发
+        
+        不含历史数据（逐合约历史无法在一个限速窗口内完成）。
+        
+        Args:
+            exchanges: 交易所列表
+        
+        Returns:
+            {exchange: {现货交易对: 衍生品数据}}
+        """
+        snapshot = {}
+        if not exchanges:
+            return snapshot
+        
+        with ThreadPoolExecutor(max_workers=len(exchanges)) as executor:
+            futures = {
+                executor.submit(self._collect_universe, exchange_name): exchange_name
+                for exchange_name in exchanges
+            }
+            for future in as_completed(futures):
+                exchange_name = futures[future]
+                try:
+                    snapshot[exchange_name] = future.result()
+                except Exception as e:
+                    print(f"获取 {exchange_name} 全市场衍生品快照失败: {e}")
+                    snapshot[exchange_name] = {}
+        
+        return snapshot
+    
+    def _collect_universe(self, exchange_name: str) -> Dict[str, Dict]:
+        """单个交易所的全市场快照"""
+        funding_rates = self.fetch_all_funding_rates(exchange_name)
+        
+        # 只有支持批量持仓量接口时才附带持仓量，避免逐合约请求
+        open_interest = {}
+        exchange = self._get_exchange(exchange_name)
+        if exchange is not None and exchange.has.get('fetchOpenInterests'):
+            open_interest = self.fetch_all_open_interest(exchange_name, sorted(funding_rates), fallback=False)
+        
+        return {
+            symbol: self._assemble_derivatives_data(
+                exchange_name, symbol, open_interest.get(symbol), funding_data,
+                include_history=False
+            )
+            for symbol, funding_data in funding_rates.items()
+        }
@@ -0,0 +1,228 @@
+"""
+跨交易所资金费率套利扫描器
+基于已缓存的批量资金费率数据，寻找 binance/okx/bitget 永续合约之间的资金费率错位
+"""
+
+import time
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+@dataclass
+class FundingArbitrageOpportunity:
+    """资金费率套利机会数据类"""
+    symbol: str
+    long_exchange: str          # 做多（收取/少付资金费）的交易所
+    short_exchange: str         # 做空（收取资金费）的交易所
+    long_rate: float            # 单期资金费率
+    short_rate: float
+    funding_diff_annual: float  # 年化资金费率差（%）
+    long_basis: float           # 做多所 永续相对现货/指数 的基差（%）
+    short_basis: float
+    expected_carry: float       # 持有期扣除手续费后的预期收益（%）
+    breakeven_days: float       # 覆盖手续费所需天数
+    timestamp: datetime
+    
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'long_exchange': self.long_exchange,
+            'short_exchange': self.short_exchange,
+            'long_rate': self.long_rate,
+            'short_rate': self.short_rate,
+            'funding_diff_annual': self.funding_diff_annual,
+            'long_basis': self.long_basis,
+            'short_basis': self.short_basis,
+            'expected_carry': self.expected_carry,
+            'breakeven_days': self.breakeven_days,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+
+class FundingArbitrageScanner:
+    """跨交易所资金费率套利扫描器"""
+    
+    def __init__(self, derivatives_collector):
+        """
+        初始化扫描器
+        
+        Args:
+            derivatives_collector: 衍生品数据采集器实例（只读取其缓存）
+        """
+        self.derivatives_collector = derivatives_collector
+        
+        # 扫描配置
+        self.exchanges = ['binance', 'okx', 'bitget']
+        self.min_annual_diff = 10.0  # 最小年化资金费率差（%）
+        self.holding_days = 7        # 预期持有天数
+        self.scan_interval = 30      # 扫描间隔（秒）
+        
+        # 永续合约吃单手续费（%）
+        self.exchange_fees = {
+            'binance': 0.05,
+            'okx': 0.05,
+            'bitget': 0.06
+        }
+        
+        # 缓存
+        self.opportunities_cache = []
+        self.last_scan_time = 0
+        
+        # 统计
+        self.total_scans = 0
+        self.opportunities_found = 0
+    
+    @staticmethod
+    def _interval_hours(interval) -> float:
+        """资金费结算间隔（小时），缺失时按8小时"""
+        if isinstance(interval, str) and interval.endswith('h'):
+            try:
+                return float(interval[:-1])
+            except ValueError:
+                pass
+        return 8.0
+    
+    def build_frame(self, funding_rates: Dict[str, Dict[str, Dict]],
+                    spot_prices: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        """
+        将 {exchange: {symbol: 资金费率数据}} 展平为一张表
+        
+        Args:
+            funding_rates: 资金费率数据
+            spot_prices: 现货价格 {symbol: price}，缺失时用指数价格计算基差
+        
+        Returns:
+            每行一个 (exchange, symbol) 的DataFrame
+        """
+        rows = []
+        for exchange_name, symbols in funding_rates.items():
+            for symbol, data in symbols.items():
+                mark = data.get('mark_price')
+                reference = (spot_prices or {}).get(symbol) or data.get('index_price')
+                rows.append({
+                    'exchange': exchange_name,
+                    'symbol': symbol,
+                    'rate': data.get('current', 0.0) or 0.0,
+                    'interval_hours': self._interval_hours(data.get('interval')),
+                    'mark_price': mark if mark else np.nan,
+                    'reference_price': reference if reference else np.nan
+                })
+        
+        df = pd.DataFrame(rows, columns=['exchange', 'symbol', 'rate', 'interval_hours',
+                                         'mark_price', 'reference_price'])
+        if df.empty:
+            return df
+        
+        # 年化资金费率（%）与基差（%）
+        df['annual_rate'] = df['rate'] * (24.0 * 365 / df['interval_hours']) * 100
+        df['basis'] = (df['mark_price'] - df['reference_price']) / df['reference_price'] * 100
+        return df
+    
+    def scan(self, funding_rates: Optional[Dict[str, Dict[str, Dict]]] = None,
+             spot_prices: Optional[Dict[str, float]] = None) -> List[FundingArbitrageOpportunity]:
+        """
+        一次性计算所有交易对、所有交易所组合的资金费率套利
+        
+        Args:
+            funding_rates: 资金费率数据，None表示读取衍生品采集器缓存
+            spot_prices: 现货价格（可选）
+        
+        Returns:
+            按预期收益排序的机会列表
+        """
+        if funding_rates is None:
+            funding_rates = self.derivatives_collector.get_cached_funding_rates(self.exchanges)
+        
+        df = self.build_frame(funding_rates, spot_prices)
+        if df.empty:
+            return []
+        
+        # symbol × exchange 矩阵
+        wide = df.drop_duplicates(['symbol', 'exchange'], keep='last').pivot(
+            index='symbol', columns='exchange', values=['annual_rate', 'rate', 'basis']
+        )
+        annual = wide['annual_rate']
+        rate = {ex: wide['rate'][ex].to_numpy() for ex in annual.columns}
+        basis = {ex: wide['basis'][ex].to_numpy() for ex in annual.columns}
+        
+        exchanges = [ex for ex in self.exchanges if ex in annual.columns]
+        symbols = annual.index.to_numpy()
+        now = datetime.now()
+        opportunities = []
+        
+        for ex_a, ex_b in combinations(exchanges, 2):
+            a = annual[ex_a].to_numpy()
+            b = annual[ex_b].to_numpy()
+            diff = b - a
+            valid = np.isfinite(diff) & (np.abs(diff) >= self.min_annual_diff)
+            if not valid.any():
+                continue
+            
+            # 在资金费率低的交易所做多、高的交易所做空，两腿开平共4笔吃单
+            round_trip_fee = 2 * (self.exchange_fees.get(ex_a, 0.05) + self.exchange_fees.get(ex_b, 0.05))
+            abs_diff = np.abs(diff)
+            carry = abs_diff * self.holding_days / 365 - round_trip_fee
+            breakeven = np.where(abs_diff > 0, round_trip_fee / abs_diff * 365, np.inf)
+            
+            for idx in np.flatnonzero(valid):
+                symbol = symbols[idx]
+                long_ex, short_ex = (ex_a, ex_b) if diff[idx] > 0 else (ex_b, ex_a)
+                opportunities.append(FundingArbitrageOpportunity(
+                    symbol=symbol,
+                    long_exchange=long_ex,
+                    short_exchange=short_ex,
+                    long_rate=float(rate[long_ex][idx]),
+                    short_rate=float(rate[short_ex][idx]),
+                    funding_diff_annual=float(abs_diff[idx]),
+                    long_basis=float(basis[long_ex][idx]),
+                    short_basis=float(basis[short_ex][idx]),
+                    expected_carry=float(carry[idx]),
+                    breakeven_days=float(breakeven[idx]),
+                    timestamp=now
+                ))
+        
+        opportunities.sort(key=lambda x: x.expected_carry, reverse=True)
+        return opportunities
+    
+    def continuous_scan(self, spot_prices: Optional[Dict[str, float]] = None,
+                        callback=None) -> List[FundingArbitrageOpportunity]:
+        """
+        持续扫描（带缓存），每次只读取已缓存的批量数据
+        
+        Args:
+            spot_prices: 现货价格（可选）
+            callback: 发现机会时的回调函数
+        
+        Returns:
+            资金费率套利机会列表
+        """
+        current_time = time.time()
+        
+        if current_time - self.last_scan_time < self.scan_interval:
+            return self.opportunities_cache
+        
+        opportunities = self.scan(spot_prices=spot_prices)
+        
+        self.total_scans += 1
+        self.opportunities_found += len(opportunities)
+        self.opportunities_cache = opportunities
+        self.last_scan_time = current_time
+        
+        if callback and opportunities:
+            callback(opportunities)
+        
+        return opportunities
+    
+    def get_top_opportunities(self, limit: int = 10) -> List[Dict]:
+        """获取预期收益最高的机会（字典格式）"""
+        return [opp.to_dict() for opp in self.opportunities_cache[:limit]]
+    
+    def export_to_dataframe(self) -> pd.DataFrame:
+        """导出为DataFrame"""
+        if not self.opportunities_cache:
+            return pd.DataFrame()
+        return pd.DataFrame([opp.to_dict() for opp in self.opportunities_cache])
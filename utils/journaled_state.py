@@ -0,0 +1,291 @@
+"""
+追加式状态持久化
+状态字典保存为 “紧凑快照 + 追加日志” 两个文件：
+    <name>.json     快照，即完整状态（无缩进），附带已合并日志的序号 _journal_seq，原子写入（临时文件 + 重命名）
+    <name>.jsonl    自快照以来的变更日志，每行一条记录，只追加
+保存时只写变更：声明为追加式的列表只写新增元素，其余顶层键在值变化时整体写一条记录，
+删除的顶层键写一条删除记录；
+日志累积到一定条数后合并进新快照并清空日志。加载时读取快照并重放日志尾部，
+崩溃导致的残缺行会被忽略；快照写入后、日志清空前崩溃时按序号跳过已合并的记录。
+
+追加式列表的比较与新增元素数量成正比：只比较长度与最后一个已持久化元素，并维护已持久化前缀的
+滚动哈希（每次只对新增元素求哈希）。就地改写或截断已持久化的旧元素时，需在 save 的 modified
+中声明该键，此时按滚动哈希比较整个前缀，不一致则整体写入（下次合并快照时也总会写入完整状态）。
+
+快照与旧版的完整状态 JSON 格式相同，旧文件可直接作为初始快照加载。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from utils.logging_manager import LoggerMixin
+
+SEQ_KEY = '_journal_seq'
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class _ListFingerprint:
+    """追加式列表的指纹：长度、最后一个元素的序列化结果与已持久化前缀的滚动哈希"""
+    
+    __slots__ = ('length', 'last', 'hasher')
+    
+    def __init__(self, items: list = ()):
+        self.length = 0
+        self.last: Optional[str] = None
+        self.hasher = hashlib.sha1()
+        self.extend(items)
+    
+    def extend(self, items: list):
+        for item in items:
+            self.last = _dumps(item)
+            self.hasher.update(self.last.encode('utf-8') + b'\n')
+        self.length += len(items)
+    
+    def matches_tail(self, value: list) -> bool:
+        """value 的前 length 个元素的最后一个与已持久化的最后一个元素相同"""
+        return self.length == 0 or _dumps(value[self.length - 1]) == self.last
+    
+    def matches_prefix(self, value: list) -> bool:
+        """value 的前 length 个元素与已持久化前缀完全相同（需要对整个前缀求哈希）"""
+        return self.hexdigest() == _ListFingerprint(value[:self.length]).hexdigest()
+    
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+def atomic_write_text(path: Union[str, Path], text: str):
+    """
+    原子写入文本文件：先写同目录临时文件并 fsync，再重命名覆盖目标
+    
+    Args:
+        path: 目标文件
+        text: 文件内容
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_journaled_state(snapshot_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    只读加载状态（快照 + 日志重放），不修改文件，供其他进程读取
+    
+    Args:
+        snapshot_path: 快照文件路径
+    
+    Returns:
+        状态字典，快照与日志都不存在时返回 None
+    """
+    return JournaledState(snapshot_path).read()
+
+
+class JournaledState(LoggerMixin):
+    """快照 + 追加日志的状态文件"""
+    
+    def __init__(self, snapshot_path: Union[str, Path], append_only: Iterable[str] = (),
+                 compact_every: int = 200, fsync: bool = False):
+        """
+        初始化状态文件
+        
+        Args:
+            snapshot_path: 快照文件路径，日志文件为同名 .jsonl
+            append_only: 只会在末尾追加元素的列表键（截断或改写旧元素时自动退化为整体写入）
+            compact_every: 日志累积多少条记录后合并为新快照
+            fsync: 每次追加后是否 fsync（快照写入总是 fsync）
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = self.snapshot_path.with_suffix('.jsonl')
+        self.append_only = set(append_only)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._log_records = 0
+        # 已持久化的各键指纹：普通键为序列化结果，追加式列表为 _ListFingerprint
+        self._persisted: Dict[str, Any] = {}
+        
+        # 统计
+        self.appends = 0
+        self.compactions = 0
+    
+    def _read_snapshot(self) -> Tuple[Dict[str, Any], int]:
+        if not self.snapshot_path.exists():
+            return {}, 0
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state, int(state.pop(SEQ_KEY, 0))
+    
+    def _replay(self, state: Dict[str, Any], snapshot_seq: int) -> Tuple[int, int, Optional[int]]:
+        """
+        把日志中序号大于快照的记录应用到 state
+        
+        Returns:
+            (最后序号, 日志记录数, 遇到残缺记录时有效内容的字节数，否则为 None)
+        """
+        seq, records, valid_bytes = snapshot_seq, 0, 0
+        if not self.log_path.exists():
+            return seq, records, None
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # 写入中途崩溃留下的残缺行
+                    self.logger.warning(f"⚠️ 忽略 {self.log_path.name} 中不完整的日志记录")
+                    return seq, records, valid_bytes
+                valid_bytes += len(line)
+                records += 1
+                if record['seq'] <= snapshot_seq:
+                    continue
+                if record['op'] == 'extend':
+                    state.setdefault(record['key'], []).extend(record['items'])
+                elif record['op'] == 'delete':
+                    state.pop(record['key'], None)
+                else:
+                    state[record['key']] = record['value']
+                seq = record['seq']
+        return seq, records, None
+    
+    def read(self) -> Optional[Dict[str, Any]]:
+        """读取当前状态（快照 + 日志重放），不改变内部指纹"""
+        if not self.snapshot_path.exists() and not self.log_path.exists():
+            return None
+        state, snapshot_seq = self._read_snapshot()
+        self._replay(state, snapshot_seq)
+        return state
+    
+    def load(self, default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        加载状态并以其作为后续增量保存的基准
+        
+        Args:
+            default: 文件不存在时的初始状态
+        
+        Returns:
+            状态字典
+        """
+        with self._lock:
+            state, snapshot_seq = self._read_snapshot()
+            if not state and default is not None:
+                state = default
+            self._seq, self._log_records, valid_bytes = self._replay(state, snapshot_seq)
+            if valid_bytes is not None:
+                # 截掉残缺记录，保证之后追加的记录可读
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+            self._persisted = {key: self._fingerprint(key, value) for key, value in state.items()}
+            if self._log_records >= self.compact_every:
+                self._compact(state)
+            return state
+    
+    def _fingerprint(self, key: str, value: Any) -> Any:
+        if key in self.append_only and isinstance(value, list):
+            return _ListFingerprint(value)
+        return _dumps(value)
+    
+    def _diff_list(self, key: str, value: list, previous: _ListFingerprint,
+                   modified: bool) -> Iterable[Tuple[Dict[str, Any], Any]]:
+        if len(value) >= previous.length:
+            # 只看边界元素；声明改写过旧元素时才比较整个前缀
+            unchanged = previous.matches_prefix(value) if modified else previous.matches_tail(value)
+            if unchanged:
+                if len(value) > previous.length:
+                    items = value[previous.length:]
+                    previous.extend(items)
+                    yield {'op': 'extend', 'key': key, 'items': items}, previous
+                return
+        # 截断或改写了旧元素
+        yield {'op': 'set', 'key': key, 'value': value}, _ListFingerprint(value)
+    
+    def _diff(self, state: Dict[str, Any], modified: Iterable[str] = ()) -> Iterable[Tuple[Dict[str, Any], Any]]:
+        """生成相对已持久化状态的变更记录及写入后该键的新指纹（删除时为 None）"""
+        modified = set(modified)
+        for key, value in state.items():
+            previous = self._persisted.get(key)
+            if isinstance(previous, _ListFingerprint) and key in self.append_only and isinstance(value, list):
+                yield from self._diff_list(key, value, previous, key in modified)
+                continue
+            fingerprint = self._fingerprint(key, value)
+            if fingerprint == previous:
+                continue
+            yield {'op': 'set', 'key': key, 'value': value}, fingerprint
+        
+        for key in [key for key in self._persisted if key not in state]:
+            yield {'op': 'delete', 'key': key}, None
+    
+    def save(self, state: Dict[str, Any], modified: Iterable[str] = ()) -> int:
+        """
+        追加保存状态的变更，日志过长时合并为新快照
+        
+        Args:
+            state: 当前完整状态
+            modified: 就地改写或截断过已持久化旧元素的追加式列表键
+        
+        Returns:
+            本次追加的记录数
+        """
+        with self._lock:
+            lines = []
+            for record, fingerprint in list(self._diff(state, modified)):
+                self._seq += 1
+                record['seq'] = self._seq
+                lines.append(_dumps(record) + '\n')
+                if fingerprint is None:
+                    del self._persisted[record['key']]
+                else:
+                    self._persisted[record['key']] = fingerprint
+            
+            if lines:
+                self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(lines))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                self._log_records += len(lines)
+                self.appends += len(lines)
+            
+            if self._log_records >= self.compact_every:
+                self._compact(state)
+            return len(lines)
+    
+    def _compact(self, state: Dict[str, Any]):
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.snapshot_path, _dumps({**state, SEQ_KEY: self._seq}))
+        atomic_write_text(self.log_path, '')
+        self._persisted = {key: self._fingerprint(key, value) for key, value in state.items()}
+        self._log_records = 0
+        self.compactions += 1
+    
+    def compact(self, state: Dict[str, Any]):
+        """立即把完整状态写为新快照并清空日志"""
+        with self._lock:
+            self._compact(state)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取持久化统计"""
+        return {
+            'snapshot': str(self.snapshot_path),
+            'seq': self._seq,
+            'log_records': self._log_records,
+            'appends': self.appends,
+            'compactions': self.compactions
+        }
@@ -0,0 +1,386 @@
+"""
+热路径延迟统计
+每个操作一个 HDR 风格的对数线性直方图（微秒精度，相对误差约 3%，内存固定），
+通过装饰器或上下文管理器记录耗时，汇总 p50/p95/p99，并以 Prometheus 文本格式在本地端口导出
+
+用法:
+    @timed('market_data.fetch_ohlcv', none_is_error=True)   # 内部捕获异常、失败时返回 None
+    def fetch_ohlcv(...): ...
+    
+    with measure_latency('evolution.generation'):
+        ...
+
+环境变量:
+    LATENCY_METRICS=0       关闭记录（被装饰的函数只多一次属性判断）
+    METRICS_PORT=9108       调用 start_metrics_server_from_env() 时在 127.0.0.1 上提供 /metrics
+"""
+
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# 每个 2 的幂区间划分的子桶数（2^5=32，相对误差 < 1/32）
+_SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+# 小于该值（微秒）的耗时逐个计数
+_LINEAR_LIMIT = _SUB_BUCKETS * 2
+# 可记录的最大耗时 2^40 微秒（约 12.7 天），更大的值计入最后一个桶
+_MAX_EXPONENT = 40
+_BUCKET_COUNT = _SUB_BUCKETS * (_MAX_EXPONENT - _SUB_BUCKET_BITS + 1)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket_index(micros: int) -> int:
+    """耗时（微秒）对应的桶下标"""
+    if micros < _LINEAR_LIMIT:
+        return max(micros, 0)
+    exponent = micros.bit_length() - 1
+    if exponent >= _MAX_EXPONENT:
+        return _BUCKET_COUNT - 1
+    shift = exponent - _SUB_BUCKET_BITS
+    return _SUB_BUCKETS * shift + (micros >> shift)
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """桶下标对应的耗时区间 [lower, upper)（微秒）"""
+    if index < _LINEAR_LIMIT:
+        return index, index + 1
+    shift = index // _SUB_BUCKETS - 1
+    mantissa = index % _SUB_BUCKETS + _SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class _State:
+    """全局开关"""
+    enabled = os.getenv('LATENCY_METRICS', '1') not in ('', '0')
+
+
+def set_latency_metrics_enabled(enabled: bool):
+    """运行时开启/关闭延迟记录"""
+    _State.enabled = enabled
+
+
+def latency_metrics_enabled() -> bool:
+    """延迟记录是否开启"""
+    return _State.enabled
+
+
+class LatencyHistogram:
+    """单个操作的延迟直方图"""
+    
+    def __init__(self, name: str, labels: Optional[Dict[str, str]] = None):
+        """
+        初始化直方图
+        
+        Args:
+            name: 操作名称，如 market_data.fetch_ohlcv
+            labels: 附加标签，如 {'strategy': 'RSIStrategy'}
+        """
+        self.name = name
+        self.labels = dict(labels or {})
+        
+        self._lock = threading.Lock()
+        self._counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.min_seconds = math.inf
+        self.max_seconds = 0.0
+    
+    def record(self, seconds: float, error: bool = False):
+        """
+        记录一次耗时
+        
+        Args:
+            seconds: 耗时（秒）
+            error: 本次调用是否失败（抛出异常或以返回值报告失败）
+        """
+        index = _bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_seconds += seconds
+            if seconds < self.min_seconds:
+                self.min_seconds = seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+            if error:
+                self.errors += 1
+    
+    def quantiles(self, quantiles: Iterable[float] = QUANTILES) -> Dict[float, float]:
+        """
+        计算分位数（秒），取所在桶的中点，并限制在已观测的最小/最大值之间
+        
+        Args:
+            quantiles: 0~1 之间的分位点
+        
+        Returns:
+            {分位点: 耗时秒数}，没有数据时为 0
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count, low, high = self.count, self.min_seconds, self.max_seconds
+        
+        quantiles = sorted(quantiles)
+        result = {q: 0.0 for q in quantiles}
+        if not count:
+            return result
+        
+        pending = iter(quantiles)
+        q = next(pending)
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while seen >= q * count:
+                lower, upper = _bucket_bounds(index)
+                result[q] = min(max((lower + upper) / 2 / 1_000_000, low), high)
+                q = next(pending, None)
+                if q is None:
+                    return result
+        return result
+    
+    def reset(self):
+        """清空记录"""
+        with self._lock:
+            self._counts = [0] * _BUCKET_COUNT
+            self.count = self.errors = 0
+            self.total_seconds = 0.0
+            self.min_seconds = math.inf
+            self.max_seconds = 0.0
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取延迟统计（毫秒）"""
+        p50, p95, p99 = (self.quantiles()[q] for q in QUANTILES)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(p50 * 1000, 3),
+            'p95_ms': round(p95 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3)
+        }
+
+
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(name: str, **labels: str) -> LatencyHistogram:
+    """
+    获取（必要时创建）进程内共享的延迟直方图
+    
+    Args:
+        name: 操作名称
+        **labels: 附加标签
+    
+    Returns:
+        LatencyHistogram
+    """
+    key = (name, tuple(sorted(labels.items())))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = _histograms[key] = LatencyHistogram(name, labels)
+    return histogram
+
+
+@contextmanager
+def measure_latency(name: str, **labels: str):
+    """记录 with 代码块的耗时（异常也会记录并计入 errors）"""
+    if not _State.enabled:
+        yield
+        return
+    
+    histogram = get_latency_histogram(name, **labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        histogram.record(time.perf_counter() - start, error=True)
+        raise
+    histogram.record(time.perf_counter() - start)
+
+
+def timed(name: str, none_is_error: bool = False, **labels: str) -> Callable:
+    """
+    记录函数每次调用耗时的装饰器，支持普通函数与协程函数
+    
+    Args:
+        name: 操作名称
+        none_is_error: 返回 None 时计入 errors（用于内部捕获异常、以 None 表示失败的函数）
+        **labels: 附加标签
+    """
+    def decorator(func: Callable) -> Callable:
+        histogram = get_latency_histogram(name, **labels)
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _State.enabled:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    histogram.record(time.perf_counter() - start, error=True)
+                    raise
+                histogram.record(time.perf_counter() - start, error=none_is_error and result is None)
+                return result
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                histogram.record(time.perf_counter() - start, error=True)
+                raise
+            histogram.record(time.perf_counter() - start, error=none_is_error and result is None)
+            return result
+        return wrapper
+    
+    return decorator
+
+
+def _label_key(histogram: LatencyHistogram) -> str:
+    return ','.join([histogram.name] + [f'{k}={v}' for k, v in sorted(histogram.labels.items())])
+
+
+def get_latency_statistics() -> Dict[str, Dict[str, Any]]:
+    """
+    获取所有有记录的操作的延迟统计
+    
+    Returns:
+        {'操作名[,标签=值...]': {'count', 'errors', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+    """
+    with _histograms_lock:
+        histograms = list(_histograms.values())
+    return {_label_key(h): h.get_statistics() for h in sorted(histograms, key=_label_key) if h.count}
+
+
+def reset_latency_metrics():
+    """清空所有直方图"""
+    with _histograms_lock:
+        histograms = list(_histograms.values())
+    for histogram in histograms:
+        histogram.reset()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(metric: str = 'trading_latency_seconds') -> str:
+    """
+    以 Prometheus 文本格式（summary 类型）导出所有直方图
+    
+    Args:
+        metric: 指标名称，操作名称作为 op 标签
+    
+    Returns:
+        Prometheus exposition 文本
+    """
+    with _histograms_lock:
+        histograms = sorted(_histograms.values(), key=_label_key)
+    
+    lines = [
+        f'# HELP {metric} Latency of instrumented operations.',
+        f'# TYPE {metric} summary'
+    ]
+    errors = [
+        f'# HELP {metric.replace("_seconds", "")}_errors_total Instrumented calls that raised or reported failure.',
+        f'# TYPE {metric.replace("_seconds", "")}_errors_total counter'
+    ]
+    for histogram in histograms:
+        if not histogram.count:
+            continue
+        labels = ','.join(f'{k}="{_escape(str(v))}"' for k, v in
+                          [('op', histogram.name)] + sorted(histogram.labels.items()))
+        for q, value in histogram.quantiles().items():
+            lines.append(f'{metric}{{{labels},quantile="{q}"}} {value:.9g}')
+        lines.append(f'{metric}_sum{{{labels}}} {histogram.total_seconds:.9g}')
+        lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        errors.append(f'{metric.replace("_seconds", "")}_errors_total{{{labels}}} {histogram.errors}')
+    return '\n'.join(lines + errors) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics 请求处理"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # 抓取请求频繁，不写访问日志
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    在后台线程启动 /metrics 端点（进程内只启动一次）
+    
+    Args:
+        port: 端口，0 表示随机端口
+        host: 监听地址，默认只监听本机
+    
+    Returns:
+        HTTP 服务器（server_address 为实际监听地址）
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        return _server
+
+
+def start_metrics_server_from_env() -> Optional[ThreadingHTTPServer]:
+    """设置了环境变量 METRICS_PORT 时启动 /metrics 端点；未设置或端口不可用时返回 None"""
+    port = os.getenv('METRICS_PORT')
+    if not port:
+        return None
+    try:
+        return start_metrics_server(int(port))
+    except (OSError, ValueError) as e:
+        # 指标导出失败不影响业务进程启动
+        logging.getLogger(__name__).warning(f"⚠️ 延迟指标端口 {port} 启动失败: {e}")
+        return None
+
+
+def stop_metrics_server():
+    """停止 /metrics 端点"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
@@ -0,0 +1,37 @@
+"""
+包级名称的延迟导入（PEP 562）
+包的 __init__ 只声明 “名称 -> 子模块”，首次访问名称时才导入对应子模块，
+避免导入包内一个轻量子模块时连带加载整个包（及其 sklearn/scipy/ccxt 等重依赖）
+
+用法（包的 __init__.py 中）:
+    __getattr__, __dir__ = lazy_exports(__name__, {'DataManager': '.data_manager'})
+"""
+
+import importlib
+import sys
+from typing import Callable, Dict, Tuple
+
+
+def lazy_exports(package: str, attrs: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    生成包模块的 __getattr__ / __dir__
+    
+    Args:
+        package: 包名（传入 __name__）
+        attrs: 名称 -> 相对子模块路径，如 {'DataManager': '.data_manager'}
+    
+    Returns:
+        (__getattr__, __dir__)
+    """
+    def __getattr__(name):
+        if name in attrs:
+            value = getattr(importlib.import_module(attrs[name], package), name)
+            # 缓存到包命名空间，之后的访问不再经过 __getattr__
+            setattr(sys.modules[package], name, value)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+    
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(attrs))
+    
+    return __getattr__, __dir__
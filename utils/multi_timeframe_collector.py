@@ -2,24 +2,42 @@
 多时间框架数据采集器
 """
 
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import pandas as pd
 
+from data.feature_store import TIMEFRAME_MS
+from utils.refresh_scheduler import CandleRefreshScheduler
+from utils.timeframe_resampler import TimeframeResampler
+from utils.ttl_cache import TTLCache
+
 class MultiTimeframeCollector:
     """多时间框架数据采集器"""
     
-    def __init__(self, base_collector):
+    def __init__(self, base_collector, feature_store=None, derive_timeframes: bool = True,
+                 stale_while_revalidate: bool = True, online_learning: Optional[bool] = None):
         """
         初始化
         
         Args:
             base_collector: 基础市场数据采集器实例
+            feature_store: 特征存储，None 表示使用进程级共享实例
+            derive_timeframes: 是否由1分钟K线本地派生高周期（REST仅用于历史回补）
+            stale_while_revalidate: 缓存过期后先返回旧值并在后台刷新，而不是阻塞调用方
+                （旧值最多再提供 stale_periods 个K线周期，返回数据中 stale 为 True）
+            online_learning: 是否在K线收盘时更新在线预测模型，None 表示按 AIConfig（环境变量 ONLINE_LEARNING）
         """
         self.base_collector = base_collector
+        if feature_store is None:
+            from data.feature_store import get_shared_feature_store
+            feature_store = get_shared_feature_store()
+        self.feature_store = feature_store
         self.timeframes = ['1m', '3m', '5m', '15m', '1h', '4h', '1d']
-        self.cache = {}
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_periods = 1.0
+        self.cache = TTLCache('multi_timeframe', max_entries=2048, max_bytes=64 * 1024 * 1024)
         
         # 缓存过期时间（秒）
         self.cache_expiry = {
@@ -42,6 +60,37 @@ class MultiTimeframeCollector:
             '4h': 100,
             '1d': 100
         }
+        
+        # 本地重采样：每次刷新只请求一次1分钟K线
+        self.derive_timeframes = derive_timeframes
+        self.base_timeframe = '1m'
+        self.base_fetch_limit = 1000
+        self.base_refresh_interval = 1.0
+        self.resampler = TimeframeResampler(self.timeframes, self.base_timeframe)
+        self._base_refreshed_at: Dict[str, float] = {}
+        
+        # 收盘刷新：调度器在K线收盘后 refresh_delay 秒统一刷新，
+        # 缓存在收盘后 refresh_delay + refresh_grace 秒过期（留出一轮刷新的时间）
+        self.timeframe_seconds = {tf: TIMEFRAME_MS[tf] / 1000 for tf in self.timeframes}
+        self.refresh_delay = 2.0
+        self.refresh_grace = 5.0
+        self.scheduler: Optional[CandleRefreshScheduler] = None
+        self._symbol_locks: Dict[tuple, threading.Lock] = {}
+        self._symbol_locks_guard = threading.Lock()
+        
+        # 在线学习：每个 (交易所, 交易对, 时间框架) 一个预测器，随新收盘K线增量更新
+        from config.ai_config import AIConfig
+        self.online_config = AIConfig.get_online_learning_config()
+        if online_learning is not None:
+            self.online_config['enabled'] = online_learning
+        self.online_models: Dict[tuple, Any] = {}
+        # 每个 (交易所, 交易对, 周期) 一把锁，一个模型重训时不阻塞其他交易对
+        self._online_locks: Dict[tuple, threading.Lock] = {}
+        self._online_lock = threading.Lock()
+        
+        # 请求统计
+        self.rest_requests = 0
+        self.backfill_requests = 0
     
     def _get_cache_key(self, exchange: str, symbol: str, timeframe: str) -> str:
         """生成缓存键"""
@@ -49,35 +98,86 @@ class MultiTimeframeCollector:
     
     def _is_cache_valid(self, exchange: str, symbol: str, timeframe: str) -> bool:
         """检查缓存是否有效"""
-        cache_key = self._get_cache_key(exchange, symbol, timeframe)
-        
-        if cache_key not in self.cache:
-            return False
-        
-        cache_data = self.cache[cache_key]
-        cache_time = cache_data.get('timestamp', 0)
-        expiry_time = self.cache_expiry.get(timeframe, 300)
-        
-        return (time.time() - cache_time) < expiry_time
+        return self._get_cache_key(exchange, symbol, timeframe) in self.cache
     
     def _get_from_cache(self, exchange: str, symbol: str, timeframe: str) -> Dict:
         """从缓存获取数据"""
-        cache_key = self._get_cache_key(exchange, symbol, timeframe)
-        return self.cache[cache_key]['data']
+        return self.cache.get(self._get_cache_key(exchange, symbol, timeframe), {})
     
-    def _fetch_and_cache(self, exchange: str, symbol: str, timeframe: str) -> Dict:
-        """获取数据并缓存"""
+    def _symbol_lock(self, exchange: str, symbol: str) -> threading.Lock:
+        """同一交易对的K线拉取与重采样串行执行"""
+        with self._symbol_locks_guard:
+            return self._symbol_locks.setdefault((exchange, symbol), threading.Lock())
+    
+    def _cache_ttl(self, timeframe: str) -> float:
+        """缓存有效期：对齐到下一根K线收盘后 refresh_delay + refresh_grace 秒，未知周期使用配置值"""
+        period = self.timeframe_seconds.get(timeframe)
+        if not period:
+            return self.cache_expiry.get(timeframe, 300)
+        until_close = period - time.time() % period
+        return until_close + self.refresh_delay + self.refresh_grace
+    
+    def _stale_ttl(self, timeframe: str) -> float:
+        """过期后仍可返回旧值的宽限时间：stale_periods 个K线周期（刷新持续失败时旧值不会无限期使用）"""
+        if not self.stale_while_revalidate:
+            return 0.0
+        period = self.timeframe_seconds.get(timeframe) or self.cache_expiry.get(timeframe, 300)
+        return period * self.stale_periods
+    
+    def _refresh_base(self, exchange: str, symbol: str):
+        """增量拉取1分钟K线并派生高周期（同一交易对在 base_refresh_interval 内只请求一次）"""
+        key = self._get_cache_key(exchange, symbol, self.base_timeframe)
+        if time.time() - self._base_refreshed_at.get(key, 0) < self.base_refresh_interval:
+            return
+        
+        last_ts = self.resampler.last_base_timestamp(exchange, symbol)
+        if last_ts is None:
+            limit = self.base_fetch_limit
+        else:
+            # 从最后一根（可能未收盘）开始补齐
+            missed = int(time.time() * 1000 - last_ts) // 60000 + 1
+            limit = min(max(missed, 2), self.base_fetch_limit)
+        
+        df = self.base_collector.fetch_ohlcv(exchange, symbol, self.base_timeframe, limit)
+        self.rest_requests += 1
+        self._base_refreshed_at[key] = time.time()
+        self.resampler.update_base(exchange, symbol, df)
+    
+    def _get_ohlcv(self, exchange: str, symbol: str, timeframe: str, limit: int):
+        """获取OHLCV：优先由1分钟K线派生，历史不足时回补"""
+        if not self.derive_timeframes:
+            self.rest_requests += 1
+            return self.base_collector.fetch_ohlcv(exchange, symbol, timeframe, limit)
+        
+        self._refresh_base(exchange, symbol)
+        if self.resampler.needs_backfill(exchange, symbol, timeframe, limit):
+            df = self.base_collector.fetch_ohlcv(exchange, symbol, timeframe, limit)
+            self.rest_requests += 1
+            self.backfill_requests += 1
+            if timeframe == self.base_timeframe:
+                self.resampler.update_base(exchange, symbol, df)
+            else:
+                self.resampler.backfill(exchange, symbol, timeframe, df)
+                # 基础K线尚未覆盖正在形成的K线时，直接使用REST结果
+                if self.resampler.needs_backfill(exchange, symbol, timeframe, limit):
+                    return df
+        
+        return self.resampler.get_ohlcv(exchange, symbol, timeframe, limit)
+    
+    def _build_data(self, exchange: str, symbol: str, timeframe: str) -> Optional[Dict]:
+        """获取K线并计算指标，失败返回None"""
         try:
             # 获取OHLCV数据
             limit = self.limits.get(timeframe, 100)
-            df = self.base_collector.fetch_ohlcv(exchange, symbol, timeframe, limit)
+            with self._symbol_lock(exchange, symbol):
+                df = self._get_ohlcv(exchange, symbol, timeframe, limit)
             
             if df is None or len(df) < 50:
-                return {}
+                return None
             
-            # 计算技术指标
-            from utils.technical_indicators import TechnicalIndicators
-            indicators = TechnicalIndicators.calculate_all_indicators(df)
+            # 已收盘K线及其完整指标列增量写入特征存储，当前K线的指标在存储尾部之上续算
+            added = self.feature_store.update_from_ohlcv(exchange, symbol, timeframe, df)
+            indicators = self.feature_store.get_current_indicators(exchange, symbol, timeframe, df)
             
             # 构建数据
             data = {
@@ -88,18 +188,91 @@ class MultiTimeframeCollector:
                 'timestamp': datetime.now().isoformat()
             }
             
-            # 缓存数据
-            cache_key = self._get_cache_key(exchange, symbol, timeframe)
-            self.cache[cache_key] = {
-                'data': data,
-                'timestamp': time.time()
-            }
+            forecast = self._update_online(exchange, symbol, timeframe, added)
+            if forecast is not None:
+                data['online_forecast'] = forecast
             
             return data
             
         except Exception as e:
             print(f"获取 {exchange} {symbol} {timeframe} 数据失败: {e}")
-            return {}
+            return None
+    
+    def _update_online(self, exchange: str, symbol: str, timeframe: str, added: int) -> Optional[Dict]:
+        """
+        把新收盘的K线逐根喂给在线预测器（影子模式下同时更新批量重训模型）
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            added: 特征存储新追加的已收盘K线数量
+        
+        Returns:
+            最新预测；未启用或该时间框架不参与时返回 None
+        """
+        config = self.online_config
+        if not config.get('enabled') or timeframe not in config.get('timeframes', self.timeframes):
+            return None
+        
+        from models.online_learning import OnlineForecaster, ShadowEvaluator
+        key = (exchange, symbol, timeframe)
+        with self._online_lock:
+            lock = self._online_locks.setdefault(key, threading.Lock())
+        
+        with lock:
+            model = self.online_models.get(key)
+            if model is None:
+                forecaster = OnlineForecaster(config)
+                model = ShadowEvaluator(forecaster, batch_retrain_every=config.get('batch_retrain_every', 500),
+                                        batch_window=config.get('batch_window', 5000)) \
+                    if config.get('shadow', False) else forecaster
+                self.online_models[key] = model
+            
+            if added:
+                closed = self.feature_store.get_frame(exchange, symbol, timeframe, rows=added,
+                                                      features=['open', 'high', 'low', 'close', 'volume'])
+                for candle in closed.to_dict('records'):
+                    model.update(candle)
+            
+            forecaster = model.online if isinstance(model, ShadowEvaluator) else model
+            forecast = {
+                'predicted_return': forecaster.last_prediction,
+                'predicted_price': forecaster.predict_price(),
+                'updates': forecaster.updates
+            }
+            if isinstance(model, ShadowEvaluator):
+                forecast['shadow'] = model.report()
+            return forecast
+    
+    def get_online_forecast(self, exchange: str, symbol: str, timeframe: str) -> Optional[Dict]:
+        """获取在线预测器的最新预测与影子评估结果，尚未建立时返回 None"""
+        return self._get_from_cache(exchange, symbol, timeframe).get('online_forecast')
+    
+    def _fetch_and_cache(self, exchange: str, symbol: str, timeframe: str) -> Dict:
+        """获取数据并缓存（同一键的并发请求只拉取一次）"""
+        cache_key = self._get_cache_key(exchange, symbol, timeframe)
+        data = self.cache.load(cache_key, lambda: self._build_data(exchange, symbol, timeframe),
+                               ttl=self._cache_ttl(timeframe), stale_ttl=self._stale_ttl(timeframe))
+        return data or {}
+    
+    def _refresh_async(self, exchange: str, symbol: str, timeframe: str):
+        """后台刷新（已有刷新在进行时不重复发起）"""
+        cache_key = self._get_cache_key(exchange, symbol, timeframe)
+        self.cache.refresh_async(cache_key, lambda: self._build_data(exchange, symbol, timeframe),
+                                 ttl=self._cache_ttl(timeframe), stale_ttl=self._stale_ttl(timeframe))
+    
+    def refresh(self, exchange: str, symbol: str, timeframes: List[str]):
+        """
+        同步刷新交易对的若干时间框架（派生模式下只请求一次1分钟K线）
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframes: 时间框架列表
+        """
+        for tf in timeframes:
+            self._fetch_and_cache(exchange, symbol, tf)
     
     def get_multi_timeframe_data(self, exchange: str, symbol: str, 
                                  timeframes: Optional[List[str]] = None) -> Dict:
@@ -112,46 +285,74 @@ class MultiTimeframeCollector:
             timeframes: 时间框架列表，默认使用全部
             
         Returns:
-            多时间框架数据字典
+            多时间框架数据字典；每个时间框架的数据带 stale 标记，
+            为 True 表示缓存已过期、返回的是后台刷新完成前的旧值
         """
         if timeframes is None:
             timeframes = self.timeframes
         
+        timeframes = [tf for tf in timeframes if tf in self.timeframes]
         result = {}
         
         for tf in timeframes:
-            if tf not in self.timeframes:
-                continue
-            
-            # 检查缓存
-            if self._is_cache_valid(exchange, symbol, tf):
-                result[tf] = self._get_from_cache(exchange, symbol, tf)
-            else:
-                result[tf] = self._fetch_and_cache(exchange, symbol, tf)
+            # 检查缓存：过期但在宽限期内时返回旧值并后台刷新
+            data, stale = self.cache.get_with_state(self._get_cache_key(exchange, symbol, tf))
+            if data is None:
+                data, stale = self._fetch_and_cache(exchange, symbol, tf), False
+            elif stale and self.stale_while_revalidate:
+                self._refresh_async(exchange, symbol, tf)
+            elif stale:
+                data, stale = self._fetch_and_cache(exchange, symbol, tf), False
+            # 缓存中的字典是共享的，标记加在副本上
+            result[tf] = dict(data, stale=bool(stale)) if data else data
+        
+        if self.scheduler is not None:
+            self.scheduler.track(exchange, symbol, timeframes)
         
         return result
     
+    def start_refresh_scheduler(self, delay: Optional[float] = None, max_workers: int = 8):
+        """
+        启动收盘刷新调度器：每个时间框架收盘后统一刷新所有已读取过的交易对
+        
+        Args:
+            delay: 收盘后延迟刷新的秒数，None表示使用 refresh_delay
+            max_workers: 每轮刷新的并发数
+        """
+        if self.scheduler is not None:
+            return
+        if delay is not None:
+            self.refresh_delay = delay
+        self.scheduler = CandleRefreshScheduler(self.refresh, self.timeframe_seconds,
+                                                delay=self.refresh_delay, max_workers=max_workers)
+        self.scheduler.start()
+    
+    def stop_refresh_scheduler(self):
+        """停止收盘刷新调度器"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+    
     def clear_cache(self, exchange: Optional[str] = None, 
                    symbol: Optional[str] = None):
         """清除缓存"""
         if exchange is None and symbol is None:
             self.cache.clear()
         else:
-            keys_to_remove = []
-            for key in self.cache.keys():
-                if exchange and not key.startswith(exchange):
-                    continue
-                if symbol and symbol not in key:
-                    continue
-                keys_to_remove.append(key)
-            
-            for key in keys_to_remove:
-                del self.cache[key]
+            self.cache.clear(lambda key: (not exchange or key.startswith(exchange))
+                             and (not symbol or symbol in key))
     
     def get_cache_stats(self) -> Dict:
         """获取缓存统计信息"""
+        stats = self.cache.get_statistics()
         return {
             'total_cached': len(self.cache),
-            'cache_keys': list(self.cache.keys()),
-            'memory_usage': sum(len(str(v)) for v in self.cache.values())
+            'cache_keys': self.cache.keys(),
+            'memory_usage': stats['bytes'],
+            'cache': stats,
+            'rest_requests': self.rest_requests,
+            'backfill_requests': self.backfill_requests,
+            'resampler': self.resampler.get_statistics(),
+            'scheduler': self.scheduler.get_statistics() if self.scheduler else None,
+            'online_models': len(self.online_models)
         }
@@ -0,0 +1,169 @@
+"""
+K线收盘刷新调度器
+在每个时间框架的K线收盘后稍作延迟，统一刷新所有已订阅交易对的数据：
+同一收盘时刻的刷新合并为一轮并发执行，读取方在刷新期间继续拿到上一次的值
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from utils.logging_manager import LoggerMixin
+
+
+class CandleRefreshScheduler(LoggerMixin):
+    """K线收盘刷新调度器"""
+    
+    def __init__(self, refresh_fn: Callable[[str, str, List[str]], None],
+                 periods: Dict[str, float], delay: float = 2.0, max_workers: int = 8):
+        """
+        初始化调度器
+        
+        Args:
+            refresh_fn: 刷新函数 (exchange, symbol, timeframes)
+            periods: 时间框架到周期秒数的映射（收盘时刻按 UTC 整周期对齐）
+            delay: 收盘后延迟多少秒刷新（等待交易所生成收盘K线）
+            max_workers: 每轮刷新的并发数
+        """
+        self.refresh_fn = refresh_fn
+        self.periods = periods
+        self.delay = delay
+        self.max_workers = max_workers
+        
+        self._subscriptions: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running = False
+        
+        # 统计
+        self.rounds = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.last_round_seconds = 0.0
+    
+    def track(self, exchange: str, symbol: str, timeframes: List[str]):
+        """订阅交易对的时间框架"""
+        with self._lock:
+            subscribed = self._subscriptions.setdefault((exchange, symbol), set())
+            new = set(timeframes) - subscribed
+            subscribed.update(timeframes)
+        if new:
+            self._wakeup.set()
+    
+    def untrack(self, exchange: str, symbol: str):
+        """取消订阅"""
+        with self._lock:
+            self._subscriptions.pop((exchange, symbol), None)
+    
+    def next_due(self, now: float) -> Tuple[float, List[str]]:
+        """
+        下一次刷新的时间与届时收盘的时间框架
+        
+        Args:
+            now: 当前时间（秒）
+        
+        Returns:
+            (刷新时间, 时间框架列表)；没有订阅时为 (inf, [])
+        """
+        with self._lock:
+            timeframes = set().union(*self._subscriptions.values()) if self._subscriptions else set()
+        
+        due: Dict[float, List[str]] = {}
+        for tf in timeframes:
+            period = self.periods.get(tf)
+            if not period:
+                continue
+            # 晚于 now 的最近一个 “收盘 + 延迟” 时刻
+            at = math.floor((now - self.delay) / period) * period + period + self.delay
+            due.setdefault(round(at, 3), []).append(tf)
+        
+        if not due:
+            return math.inf, []
+        at = min(due)
+        return at, due[at]
+    
+    def run_round(self, timeframes: List[str]) -> int:
+        """
+        对订阅了这些时间框架的所有交易对执行一轮并发刷新
+        
+        Returns:
+            刷新的交易对数量
+        """
+        with self._lock:
+            batch = [(exchange, symbol, [tf for tf in timeframes if tf in tfs])
+                     for (exchange, symbol), tfs in self._subscriptions.items()]
+        batch = [item for item in batch if item[2]]
+        if not batch:
+            return 0
+        
+        def refresh(item):
+            try:
+                self.refresh_fn(*item)
+                return True
+            except Exception as e:
+                self.logger.warning(f"⚠️ 刷新 {item[0]} {item[1]} {item[2]} 失败: {e}")
+                return False
+        
+        start = time.perf_counter()
+        if self._executor is None:
+            results = [refresh(item) for item in batch]
+        else:
+            results = list(self._executor.map(refresh, batch))
+        
+        self.rounds += 1
+        self.refreshes += sum(results)
+        self.errors += len(results) - sum(results)
+        self.last_round_seconds = time.perf_counter() - start
+        return len(batch)
+    
+    def _loop(self):
+        while self._running:
+            at, timeframes = self.next_due(time.time())
+            wait = at - time.time()
+            if wait > 0:
+                # 新订阅或停止时提前醒来重新计算
+                woken = self._wakeup.wait(min(wait, 60.0))
+                self._wakeup.clear()
+                if woken or wait > 60.0:
+                    continue
+            if self._running:
+                self.run_round(timeframes)
+    
+    def start(self):
+        """启动调度线程"""
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='candle-refresh')
+        self._thread = threading.Thread(target=self._loop, name='candle-refresh-scheduler', daemon=True)
+        self._thread.start()
+        self.logger.info("🚀 K线收盘刷新调度器已启动")
+    
+    def stop(self, timeout: float = 5.0):
+        """停止调度线程"""
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self.logger.info("🛑 K线收盘刷新调度器已停止")
+    
+    def get_statistics(self) -> Dict:
+        """获取调度统计"""
+        with self._lock:
+            subscriptions = len(self._subscriptions)
+        return {
+            'running': self._running,
+            'subscriptions': subscriptions,
+            'rounds': self.rounds,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'last_round_seconds': self.last_round_seconds
+        }
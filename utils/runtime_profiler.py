@@ -0,0 +1,426 @@
+"""
+运行时性能剖析
+长时间运行的进程（进化系统、高频交易系统）无需重启即可开启/关闭剖析：
+    采样剖析    后台线程按固定间隔采样所有线程的调用栈，停止后在 logs/ 写出 collapsed stacks
+               （每行 “线程;帧;帧;... 次数”，可直接交给 flamegraph.pl / speedscope / inferno）
+    内存快照    tracemalloc 按代码行统计的 Top-N 内存分配，与上一次快照对比增长
+
+控制方式:
+    信号        SIGUSR1 开始/停止采样剖析；设置 PROFILER_MEMORY_SIGNAL（如 USR2）后该信号记录内存快照
+               （首次会开启 tracemalloc）。默认不注册：pm2 reloadLogs 会发送 SIGUSR2
+    本地套接字   logs/profiler_<name>.sock（仅属主可访问），每行一条命令，返回一行 JSON：
+                   status
+                   profile start [间隔秒]      profile stop      profile <秒数> [间隔秒]
+                   memory start | snapshot [N] | stop
+
+命令行客户端:
+    python -m utils.runtime_profiler auto_evolution profile 60
+    python -m utils.runtime_profiler high_frequency memory snapshot 30
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.logging_manager import LoggerMixin
+
+DEFAULT_LOG_DIR = Path('logs')
+
+
+def memory_signal() -> Optional[int]:
+    """环境变量 PROFILER_MEMORY_SIGNAL 指定的内存快照信号（USR2 / SIGUSR2 / 编号），未设置或无效时为 None"""
+    value = os.getenv('PROFILER_MEMORY_SIGNAL', '').strip().upper()
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    return getattr(signal, value if value.startswith('SIG') else f'SIG{value}', None)
+
+
+def socket_path(name: str, log_dir: Path = DEFAULT_LOG_DIR) -> Path:
+    """进程 name 的控制套接字路径"""
+    return log_dir / f'profiler_{name}.sock'
+
+
+class StackSampler:
+    """调用栈采样器"""
+    
+    def __init__(self, interval: float = 0.01):
+        """
+        初始化采样器
+        
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def _frame_label(code) -> str:
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+    
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, f'thread-{ident}'))
+            self.stacks[';'.join(reversed(labels))] += 1
+        self.samples += 1
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def start(self):
+        """开始采样"""
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """停止采样"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.time()
+    
+    def write_collapsed(self, path: Path):
+        """写出 collapsed stacks（按次数从多到少）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class RuntimeProfiler(LoggerMixin):
+    """进程内的剖析控制器"""
+    
+    def __init__(self, name: str, log_dir: Path = DEFAULT_LOG_DIR):
+        """
+        初始化剖析控制器
+        
+        Args:
+            name: 进程名称（用于输出文件与套接字名）
+            log_dir: 输出目录
+        """
+        self.name = name
+        self.log_dir = Path(log_dir)
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._window_timer: Optional[threading.Timer] = None
+        self._memory_baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._server: Optional[socket.socket] = None
+        self.socket_path: Optional[Path] = None
+    
+    def _output_path(self, kind: str, suffix: str) -> Path:
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        return self.log_dir / f"{kind}_{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+    
+    # ---- 采样剖析 ----
+    
+    def start_profiling(self, interval: float = 0.01, duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        开始采样剖析
+        
+        Args:
+            interval: 采样间隔（秒）
+            duration: 采样时长（秒），到时自动停止并写出结果；None 表示直到 stop_profiling
+        
+        Returns:
+            状态字典
+        """
+        with self._lock:
+            if self._sampler is not None:
+                return {'ok': False, 'error': 'profiling already running'}
+            self._sampler = StackSampler(interval)
+            self._sampler.start()
+            if duration:
+                self._window_timer = threading.Timer(duration, self.stop_profiling)
+                self._window_timer.daemon = True
+                self._window_timer.start()
+        self.logger.info(f"🔬 采样剖析已开始（间隔 {interval * 1000:.0f}ms"
+                         f"{f'，{duration:.0f} 秒后停止' if duration else ''}）")
+        return {'ok': True, 'interval': interval, 'duration': duration}
+    
+    def stop_profiling(self) -> Dict[str, Any]:
+        """
+        停止采样剖析并写出 collapsed stacks
+        
+        Returns:
+            {'ok', 'path', 'samples', 'stacks', 'seconds'}
+        """
+        with self._lock:
+            sampler, self._sampler = self._sampler, None
+            timer, self._window_timer = self._window_timer, None
+        if sampler is None:
+            return {'ok': False, 'error': 'profiling not running'}
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        
+        sampler.stop()
+        path = self._output_path('profile', '.collapsed')
+        sampler.write_collapsed(path)
+        seconds = sampler.stopped_at - sampler.started_at
+        self.logger.info(f"🔬 采样剖析已停止: {sampler.samples} 次采样 / {seconds:.1f} 秒 -> {path}")
+        return {'ok': True, 'path': str(path), 'samples': sampler.samples,
+                'stacks': len(sampler.stacks), 'seconds': round(seconds, 3)}
+    
+    def toggle_profiling(self) -> Dict[str, Any]:
+        """未在采样时开始，否则停止并写出结果"""
+        if self._sampler is None:
+            return self.start_profiling()
+        return self.stop_profiling()
+    
+    # ---- 内存快照 ----
+    
+    def start_memory_tracing(self, frames: int = 1) -> Dict[str, Any]:
+        """开启 tracemalloc（会增加内存分配开销，用完应关闭）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_tracemalloc = True
+            self.logger.info("🧠 tracemalloc 已开启")
+        return {'ok': True, 'tracing': True}
+    
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+    
+    def memory_snapshot(self, top: int = 25) -> Dict[str, Any]:
+        """
+        记录内存快照：按代码行的 Top-N 分配，以及相对上一次快照增长最多的 Top-N
+        
+        Args:
+            top: 列出的条目数
+        
+        Returns:
+            {'ok', 'path', 'traced_mb', 'peak_mb'}
+        """
+        if not tracemalloc.is_tracing():
+            # 首次调用只开启跟踪，下一次快照才有数据
+            self.start_memory_tracing()
+            self._memory_baseline = self._take_snapshot()
+            return {'ok': True, 'tracing': True, 'note': 'tracemalloc started; take another snapshot later'}
+        
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f'# {self.name} {datetime.now().isoformat()} traced={current / 1e6:.1f}MB peak={peak / 1e6:.1f}MB',
+                 f'# top {top} by size']
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        if self._memory_baseline is not None:
+            lines.append(f'# top {top} growth since previous snapshot')
+            lines += [str(stat) for stat in snapshot.compare_to(self._memory_baseline, 'lineno')[:top]]
+        self._memory_baseline = snapshot
+        
+        path = self._output_path('memory', '.txt')
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        self.logger.info(f"🧠 内存快照: {current / 1e6:.1f}MB（峰值 {peak / 1e6:.1f}MB） -> {path}")
+        return {'ok': True, 'path': str(path), 'traced_mb': round(current / 1e6, 2), 'peak_mb': round(peak / 1e6, 2)}
+    
+    def stop_memory_tracing(self) -> Dict[str, Any]:
+        """关闭由本控制器开启的 tracemalloc"""
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self.logger.info("🧠 tracemalloc 已关闭")
+        self._started_tracemalloc = False
+        self._memory_baseline = None
+        return {'ok': True, 'tracing': tracemalloc.is_tracing()}
+    
+    # ---- 控制接口 ----
+    
+    def status(self) -> Dict[str, Any]:
+        """当前剖析状态"""
+        sampler = self._sampler
+        return {
+            'ok': True,
+            'name': self.name,
+            'pid': os.getpid(),
+            'profiling': sampler is not None,
+            'samples': sampler.samples if sampler else 0,
+            'tracemalloc': tracemalloc.is_tracing(),
+            'socket': str(self.socket_path) if self.socket_path else None
+        }
+    
+    def handle_command(self, command: str) -> Dict[str, Any]:
+        """
+        执行一条文本命令（格式见模块说明）
+        
+        Args:
+            command: 如 'profile 60'、'memory snapshot 30'
+        
+        Returns:
+            结果字典
+        """
+        parts = command.split()
+        try:
+            if not parts or parts[0] == 'status':
+                return self.status()
+            if parts[0] == 'profile' and len(parts) > 1:
+                if parts[1] == 'start':
+                    return self.start_profiling(*(float(p) for p in parts[2:3]))
+                if parts[1] == 'stop':
+                    return self.stop_profiling()
+                duration = float(parts[1])
+                interval = float(parts[2]) if len(parts) > 2 else 0.01
+                return self.start_profiling(interval, duration)
+            if parts[0] == 'memory' and len(parts) > 1:
+                if parts[1] == 'start':
+                    return self.start_memory_tracing()
+                if parts[1] == 'snapshot':
+                    return self.memory_snapshot(int(parts[2]) if len(parts) > 2 else 25)
+                if parts[1] == 'stop':
+                    return self.stop_memory_tracing()
+        except ValueError as e:
+            return {'ok': False, 'error': str(e)}
+        return {'ok': False, 'error': f'unknown command: {command.strip()}'}
+    
+    def _serve(self):
+        while self._server is not None:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(5.0)
+                    command = conn.makefile('r', encoding='utf-8').readline()
+                    result = self.handle_command(command)
+                    conn.sendall((json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8'))
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 剖析命令处理失败: {e}")
+    
+    @staticmethod
+    def _run_async(func):
+        threading.Thread(target=func, name='profiler-signal', daemon=True).start()
+    
+    def install(self, signals: bool = True, control_socket: bool = True):
+        """
+        注册信号处理与控制套接字
+        
+        Args:
+            signals: 是否注册 SIGUSR1 与 PROFILER_MEMORY_SIGNAL（只能在主线程注册，其他线程中调用时跳过）
+            control_socket: 是否监听本地控制套接字
+        """
+        if signals and hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            # 处理函数里不做文件读写和加锁，交给线程执行
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self._run_async(self.toggle_profiling))
+            memory_signum = memory_signal()
+            if memory_signum is not None:
+                signal.signal(memory_signum, lambda signum, frame: self._run_async(self.memory_snapshot))
+            elif os.getenv('PROFILER_MEMORY_SIGNAL', '').strip():
+                self.logger.warning(f"⚠️ 无效的 PROFILER_MEMORY_SIGNAL: {os.getenv('PROFILER_MEMORY_SIGNAL')}")
+        
+        if control_socket and hasattr(socket, 'AF_UNIX') and self._server is None:
+            path = socket_path(self.name, self.log_dir)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                path.unlink()
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            old_umask = os.umask(0o177)
+            try:
+                server.bind(str(path))
+            finally:
+                os.umask(old_umask)
+            server.listen(4)
+            self._server, self.socket_path = server, path
+            threading.Thread(target=self._serve, name='profiler-control', daemon=True).start()
+        
+        self.logger.info(f"🔬 运行时剖析已就绪（kill -USR1 {os.getpid()} 或 "
+                         f"python -m utils.runtime_profiler {self.name} profile 60）")
+    
+    def uninstall(self):
+        """关闭控制套接字并停止进行中的剖析"""
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        if self.socket_path is not None and self.socket_path.exists():
+            self.socket_path.unlink()
+        if self._sampler is not None:
+            self.stop_profiling()
+        self.stop_memory_tracing()
+
+
+_profilers: Dict[str, RuntimeProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def install_runtime_profiler(name: str) -> Optional[RuntimeProfiler]:
+    """
+    为当前进程安装运行时剖析（同名只安装一次）；环境变量 RUNTIME_PROFILER=0 时不安装
+    
+    Args:
+        name: 进程名称，如 auto_evolution、high_frequency
+    
+    Returns:
+        RuntimeProfiler，未安装时为 None
+    """
+    if os.getenv('RUNTIME_PROFILER', '1') in ('', '0'):
+        return None
+    with _profilers_lock:
+        profiler = _profilers.get(name)
+        if profiler is None:
+            profiler = RuntimeProfiler(name)
+            try:
+                profiler.install()
+            except OSError as e:
+                # 剖析入口不可用不影响业务进程
+                profiler.logger.warning(f"⚠️ 运行时剖析控制套接字启动失败: {e}")
+            _profilers[name] = profiler
+        return profiler
+
+
+def send_command(name_or_path: str, command: str, timeout: float = 30.0,
+                 log_dir: Path = DEFAULT_LOG_DIR) -> Dict[str, Any]:
+    """
+    向运行中的进程发送剖析命令
+    
+    Args:
+        name_or_path: 进程名称或套接字路径
+        command: 命令文本
+        timeout: 等待回复的秒数
+    
+    Returns:
+        进程返回的结果字典
+    """
+    path = Path(name_or_path) if name_or_path.endswith('.sock') else socket_path(name_or_path, log_dir)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(path))
+        client.sendall((command.strip() + '\n').encode('utf-8'))
+        return json.loads(client.makefile('r', encoding='utf-8').readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='向运行中的进程发送剖析命令')
+    parser.add_argument('target', help='进程名称（auto_evolution / high_frequency）或 .sock 路径')
+    parser.add_argument('command', nargs='+', help='status | profile start|stop|<秒数> | memory start|snapshot|stop')
+    args = parser.parse_args()
+    
+    print(json.dumps(send_command(args.target, ' '.join(args.command)), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+时间序列滑动窗口工具
+基于 numpy 步幅视图构建 (样本数, 序列长度, 特征数) 的训练序列，不复制底层数据；
+配合按批物化的迭代器，训练时同一时刻只占用一个批次的内存
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_windows(values: np.ndarray, sequence_length: int) -> np.ndarray:
+    """
+    构建滑动窗口序列视图
+    
+    第 i 个窗口为 values[i:i+sequence_length]，对应的预测目标为 values[i+sequence_length]，
+    因此最后一个完整窗口（其后没有目标）不包含在内。
+    
+    Args:
+        values: 二维特征数组 (时间, 特征)，一维数组视为单特征
+        sequence_length: 序列长度
+    
+    Returns:
+        只读步幅视图，形状 (len(values) - sequence_length, sequence_length, 特征数)
+    """
+    if sequence_length <= 0:
+        raise ValueError(f"序列长度必须为正数: {sequence_length}")
+    
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, None]
+    
+    n_windows = len(values) - sequence_length
+    if n_windows <= 0:
+        return np.empty((0, sequence_length, values.shape[1]), dtype=values.dtype)
+    
+    # sliding_window_view 返回 (窗口数, 特征, 序列长度)，交换后两轴仍是视图
+    windows = sliding_window_view(values[:-1], sequence_length, axis=0).swapaxes(1, 2)
+    windows.flags.writeable = False
+    return windows
+
+
+class SequenceBatches:
+    """
+    惰性小批量迭代器
+    
+    持有窗口视图与目标数组，每次迭代只把当前批次物化为连续数组，可多轮重复迭代。
+    """
+    
+    def __init__(self, X: np.ndarray, y: np.ndarray, batch_size: int = 32,
+                 shuffle: bool = False, drop_last: bool = False, seed: Optional[int] = None):
+        """
+        初始化批量迭代器
+        
+        Args:
+            X: 特征序列（通常为 sliding_windows 返回的视图）
+            y: 目标数组
+            batch_size: 批大小
+            shuffle: 每轮是否打乱样本顺序
+            drop_last: 是否丢弃不足一批的尾部样本
+            seed: 随机种子
+        """
+        if len(X) != len(y):
+            raise ValueError(f"特征与目标长度不一致: {len(X)} != {len(y)}")
+        if batch_size <= 0:
+            raise ValueError(f"批大小必须为正数: {batch_size}")
+        
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+    
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.X) // self.batch_size
+        return -(-len(self.X) // self.batch_size)
+    
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        n = len(self.X)
+        order = self.rng.permutation(n) if self.shuffle else None
+        
+        for b in range(len(self)):
+            start = b * self.batch_size
+            stop = min(start + self.batch_size, n)
+            if order is None:
+                # 切片仍是视图，物化为连续数组后交给模型
+                yield np.ascontiguousarray(self.X[start:stop]), np.ascontiguousarray(self.y[start:stop])
+            else:
+                # 花式索引只复制当前批次
+                index = np.sort(order[start:stop])
+                yield self.X[index], self.y[index]
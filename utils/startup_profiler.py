@@ -0,0 +1,236 @@
+"""
+启动耗时分析
+统计入口脚本/模块冷启动时每个模块的导入耗时（基于解释器的 -X importtime）以及各组件的初始化耗时。
+
+组件计时: 在初始化代码中使用
+    with startup_profiler.component('backtest_engine'):
+        self.backtest_engine = StrategyBacktestEngine()
+设置环境变量 STARTUP_PROFILE=1 时记录耗时，并在 STARTUP_PROFILE_OUTPUT 指定的文件中追加 JSON 行；
+未设置时 component() 不做任何事。
+
+命令行:
+    python -m utils.startup_profiler start_complete_auto_evolution_system.py
+    python -m utils.startup_profiler ai_modules.auto_strategy_evolution_system \\
+        --construct AutoStrategyEvolutionSystem --top 30 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+@dataclass
+class ImportRecord:
+    """单个模块的导入耗时（微秒）"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(text: str) -> List[ImportRecord]:
+    """
+    解析 -X importtime 的输出
+    
+    Args:
+        text: 解释器 stderr 内容
+    
+    Returns:
+        按导入完成顺序排列的记录
+    """
+    records = []
+    for line in text.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def summarize_imports(records: List[ImportRecord], top: int = 20) -> Dict:
+    """
+    汇总导入耗时：总耗时、自身耗时最高的模块、各顶层包的累计耗时
+    
+    Args:
+        records: parse_importtime 的结果
+        top: 返回的模块数
+    
+    Returns:
+        汇总字典（毫秒）
+    """
+    packages: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + record.self_us
+    
+    slowest = sorted(records, key=lambda r: r.self_us, reverse=True)[:top]
+    return {
+        'total_import_ms': round(sum(r.cumulative_us for r in records if r.depth == 0) / 1000, 2),
+        'modules_imported': len(records),
+        'slowest_modules': [
+            {'module': r.module, 'self_ms': round(r.self_us / 1000, 2), 'cumulative_ms': round(r.cumulative_us / 1000, 2)}
+            for r in slowest
+        ],
+        'packages_ms': {
+            name: round(us / 1000, 2)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        }
+    }
+
+
+class StartupProfiler:
+    """组件初始化计时器"""
+    
+    def __init__(self, enabled: Optional[bool] = None, output: Optional[str] = None):
+        """
+        初始化计时器
+        
+        Args:
+            enabled: 是否记录，None 时由环境变量 STARTUP_PROFILE 决定
+            output: 追加 JSON 行的文件，None 时由环境变量 STARTUP_PROFILE_OUTPUT 决定
+        """
+        self.enabled = os.getenv('STARTUP_PROFILE', '') not in ('', '0') if enabled is None else enabled
+        self.output = output if output is not None else os.getenv('STARTUP_PROFILE_OUTPUT')
+        self.components: List[Dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    @contextmanager
+    def component(self, name: str):
+        """计时一个组件的初始化（嵌套的组件记为子项）"""
+        if not self.enabled:
+            yield
+            return
+        
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            path = '/'.join(stack)
+            stack.pop()
+            self.record(path, elapsed)
+    
+    def record(self, name: str, seconds: float):
+        """记录一个耗时"""
+        entry = {'component': name, 'ms': round(seconds * 1000, 3)}
+        with self._lock:
+            self.components.append(entry)
+            if self.output:
+                with open(self.output, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    
+    def report(self) -> List[Dict]:
+        """已记录的组件耗时"""
+        with self._lock:
+            return list(self.components)
+
+
+startup_profiler = StartupProfiler()
+
+
+def profile_startup(target: str, construct: Optional[str] = None, top: int = 20,
+                    python: str = sys.executable, cwd: Optional[str] = None) -> Dict:
+    """
+    在新的解释器进程中冷启动目标并统计耗时
+    
+    Args:
+        target: 模块名（如 ai_modules.auto_strategy_evolution_system）或 .py 脚本路径
+                （脚本以非 __main__ 方式执行，只统计模块级的导入与初始化）
+        construct: 导入后实例化的类名（在目标模块中查找），用于统计组件初始化耗时
+        top: 报告中列出的最慢模块数
+        python: 解释器路径
+        cwd: 工作目录，None 为项目根目录
+    
+    Returns:
+        {'target', 'wall_ms', 'total_import_ms', 'modules_imported', 'slowest_modules',
+         'packages_ms', 'components'}
+    """
+    if target.endswith('.py'):
+        load = f"import runpy; namespace = runpy.run_path({str(Path(target).resolve())!r}, run_name='__startup_profile__')"
+        lookup = 'namespace[{name!r}]'
+    else:
+        load = f"import importlib; module = importlib.import_module({target!r})"
+        lookup = 'getattr(module, {name!r})'
+    code = [
+        'import sys, time',
+        f'sys.path.insert(0, {str(PROJECT_ROOT)!r})',
+        'start = time.perf_counter()',
+        load
+    ]
+    if construct:
+        code.append(f'{lookup.format(name=construct)}()')
+    code.append("sys.stdout.write('\\n__startup_wall_ms__=%.3f\\n' % ((time.perf_counter() - start) * 1000))")
+    
+    with tempfile.NamedTemporaryFile('r', suffix='.jsonl', delete=False) as components_file:
+        components_path = components_file.name
+    env = dict(os.environ, STARTUP_PROFILE='1', STARTUP_PROFILE_OUTPUT=components_path, PYTHONDONTWRITEBYTECODE='1')
+    try:
+        completed = subprocess.run([python, '-X', 'importtime', '-c', '\n'.join(code)],
+                                   cwd=cwd or str(PROJECT_ROOT), env=env, capture_output=True, text=True)
+        with open(components_path, 'r', encoding='utf-8') as f:
+            components = [json.loads(line) for line in f if line.strip()]
+    finally:
+        os.unlink(components_path)
+    
+    wall = re.search(r'__startup_wall_ms__=([\d.]+)', completed.stdout)
+    if completed.returncode != 0 or wall is None:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"启动 {target} 失败:\n" + '\n'.join(errors[-20:]))
+    
+    summary = summarize_imports(parse_importtime(completed.stderr), top)
+    return {'target': target, 'wall_ms': float(wall.group(1)), **summary, 'components': components}
+
+
+def format_report(result: Dict) -> str:
+    """把 profile_startup 的结果格式化为文本报告"""
+    lines = [
+        f"🚀 启动分析: {result['target']}",
+        f"   总耗时 {result['wall_ms']:.1f} ms，导入 {result['modules_imported']} 个模块共 {result['total_import_ms']:.1f} ms",
+        '',
+        '📦 各顶层包导入耗时 (ms):'
+    ]
+    lines += [f'   {name:<40} {ms:>10.1f}' for name, ms in result['packages_ms'].items()]
+    lines += ['', '🐢 自身导入耗时最高的模块 (self / cumulative ms):']
+    lines += [f"   {m['module']:<60} {m['self_ms']:>8.1f} {m['cumulative_ms']:>10.1f}" for m in result['slowest_modules']]
+    if result['components']:
+        lines += ['', '🔧 组件初始化耗时 (ms):']
+        lines += [f"   {c['component']:<60} {c['ms']:>10.1f}" for c in result['components']]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入口脚本/模块启动耗时分析')
+    parser.add_argument('target', help='模块名或 .py 脚本路径')
+    parser.add_argument('--construct', type=str, default=None, help='导入后实例化的类名')
+    parser.add_argument('--top', type=int, default=20, help='列出的最慢模块数')
+    parser.add_argument('--output', type=str, default=None, help='结果输出JSON文件')
+    args = parser.parse_args()
+    
+    result = profile_startup(args.target, args.construct, args.top)
+    print(format_report(result))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
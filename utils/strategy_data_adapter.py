@@ -4,19 +4,29 @@
 """
 
 from typing import Dict, Any, List, Optional
+import numpy as np
 from data.market_data_collector import MarketDataCollector
+from data.feature_store import FeatureStore, get_shared_feature_store
+from utils.derivatives_collector import DerivativesDataCollector
 
 class StrategyDataAdapter:
     """策略数据适配器"""
     
-    def __init__(self, collector: Optional[MarketDataCollector] = None):
+    # 默认机器学习特征列（特征存储中的列名）
+    ML_FEATURES = ['ema20', 'rsi14', 'macd', 'atr14', 'close', 'volume', 'volume_avg']
+    
+    def __init__(self, collector: Optional[MarketDataCollector] = None,
+                 feature_store: Optional[FeatureStore] = None):
         """
         初始化适配器
         
         Args:
             collector: 市场数据采集器实例
+            feature_store: 特征存储，None 表示使用进程级共享实例
         """
         self.collector = collector or MarketDataCollector()
+        self.feature_store = feature_store or get_shared_feature_store()
+        self.derivatives_collector = DerivativesDataCollector(self.collector)
     
     def get_strategy_data(self, exchange: str, symbol: str,
                          timeframes: Optional[List[str]] = None,
@@ -75,12 +85,19 @@ class StrategyDataAdapter:
         """
         batch_data = {}
         
+        # 衍生品数据按交易所批量获取（交易所级接口 + 并发），不再逐对请求
+        derivatives = {}
+        if include_derivatives:
+            derivatives = self.derivatives_collector.get_batch_derivatives_data(pairs)
+        
         for exchange, symbol in pairs:
             key = f"{exchange}_{symbol}"
             data = self.get_strategy_data(
-                exchange, symbol, timeframes, include_derivatives
+                exchange, symbol, timeframes, include_derivatives=False
             )
             if data:
+                if key in derivatives:
+                    data['derivatives'] = derivatives[key]
                 batch_data[key] = data
         
         return batch_data
@@ -135,3 +152,20 @@ class StrategyDataAdapter:
                 features.append(oi.get('change_24h', 0))
         
         return features
+    
+    def get_feature_matrix(self, pairs: List[tuple], timeframe: str = '1h',
+                           features: Optional[List[str]] = None,
+                           as_of: Any = None) -> np.ndarray:
+        """
+        从特征存储读取多个交易对在同一时刻的特征矩阵（只含当时已收盘的K线）
+        
+        Args:
+            pairs: 交易对列表 [(exchange, symbol), ...]
+            timeframe: 时间框架
+            features: 特征列，默认 ML_FEATURES
+            as_of: 观察时刻，None 表示最新
+        
+        Returns:
+            (交易对数, 特征数) 矩阵，缺失数据为 nan
+        """
+        return self.feature_store.get_snapshot(pairs, timeframe, features or self.ML_FEATURES, as_of)
@@ -0,0 +1,266 @@
+"""
+K线重采样引擎
+维护 1 分钟基础K线，用 NumPy reduceat 按周期分桶聚合出更高时间框架：
+已收盘的桶增量并入各时间框架的历史，正在形成的K线由基础K线实时聚合，
+只有深度历史缺失时才需要通过 REST 回补
+"""
+
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.feature_store import TIMEFRAME_MS
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def aggregate_ohlcv(timestamps: np.ndarray, values: np.ndarray,
+                    timeframe_ms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按周期聚合 OHLCV
+    
+    Args:
+        timestamps: 升序的K线开盘时间（毫秒）
+        values: (n, 5) 的 open/high/low/close/volume
+        timeframe_ms: 目标周期（毫秒），桶按 UTC 整点对齐
+    
+    Returns:
+        (桶开盘时间, (桶数, 5) 聚合结果, 每桶包含的基础K线数)
+    """
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5)), np.empty(0, dtype=np.int64)
+    
+    buckets = timestamps - timestamps % timeframe_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)]
+    
+    aggregated = np.column_stack([
+        values[starts, 0],
+        np.maximum.reduceat(values[:, 1], starts),
+        np.minimum.reduceat(values[:, 2], starts),
+        values[ends - 1, 3],
+        np.add.reduceat(values[:, 4], starts)
+    ])
+    return buckets[starts], aggregated, ends - starts
+
+
+class _Bars:
+    """按时间升序保存的K线数组"""
+    
+    def __init__(self, max_bars: int):
+        self.max_bars = max_bars
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, 5))
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self.timestamps[-1]) if len(self.timestamps) else None
+    
+    def merge(self, timestamps: np.ndarray, values: np.ndarray, overwrite: bool = True):
+        """合并K线，时间戳相同的行按 overwrite 决定保留新值还是旧值"""
+        if len(timestamps) == 0:
+            return
+        if overwrite:
+            keep = ~np.isin(self.timestamps, timestamps)
+            all_ts = np.r_[self.timestamps[keep], timestamps]
+            all_values = np.vstack([self.values[keep], values])
+        else:
+            keep = ~np.isin(timestamps, self.timestamps)
+            all_ts = np.r_[self.timestamps, timestamps[keep]]
+            all_values = np.vstack([self.values, values[keep]])
+        order = np.argsort(all_ts, kind='stable')
+        self.timestamps = all_ts[order][-self.max_bars:]
+        self.values = all_values[order][-self.max_bars:]
+    
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        """追加晚于最后一根的K线"""
+        if len(self):
+            newer = timestamps > self.timestamps[-1]
+            timestamps, values = timestamps[newer], values[newer]
+        if len(timestamps):
+            self.timestamps = np.r_[self.timestamps, timestamps][-self.max_bars:]
+            self.values = np.vstack([self.values, values])[-self.max_bars:]
+
+
+class TimeframeResampler:
+    """多时间框架重采样引擎"""
+    
+    def __init__(self, timeframes: Sequence[str], base_timeframe: str = '1m',
+                 max_base_bars: int = 2880, max_bars: int = 1000):
+        """
+        初始化重采样引擎
+        
+        Args:
+            timeframes: 需要派生的时间框架
+            base_timeframe: 基础K线周期
+            max_base_bars: 保留的基础K线数，至少覆盖最大时间框架的一个完整周期
+            max_bars: 每个时间框架保留的已收盘K线数
+        """
+        self.base_timeframe = base_timeframe
+        self.base_ms = TIMEFRAME_MS[base_timeframe]
+        self.timeframes = [tf for tf in timeframes if tf != base_timeframe]
+        self.max_base_bars = max(max_base_bars,
+                                 max((TIMEFRAME_MS[tf] // self.base_ms for tf in self.timeframes), default=0) * 2)
+        self.max_bars = max_bars
+        
+        self.base: Dict[Tuple[str, str], _Bars] = {}
+        self.history: Dict[Tuple[str, str], Dict[str, _Bars]] = {}
+        self._closed_until: Dict[Tuple[str, str], int] = {}
+    
+    @staticmethod
+    def _frame_to_arrays(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        timestamps = np.asarray(df['timestamp'].values)
+        if np.issubdtype(timestamps.dtype, np.datetime64):
+            timestamps = timestamps.astype('datetime64[ms]').astype(np.int64)
+        return timestamps.astype(np.int64), df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    
+    @staticmethod
+    def _arrays_to_frame(timestamps: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(values, columns=OHLCV_COLUMNS)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='ms'))
+        return df
+    
+    def _now_ms(self, now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) * 1000)
+    
+    def last_base_timestamp(self, exchange: str, symbol: str) -> Optional[int]:
+        """最后一根基础K线的开盘时间（毫秒）"""
+        base = self.base.get((exchange, symbol))
+        return base.last_timestamp if base else None
+    
+    def update_base(self, exchange: str, symbol: str, df: pd.DataFrame,
+                    now: Optional[float] = None) -> int:
+        """
+        合并新的基础K线，并把新收盘的高周期K线并入历史
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            df: 基础周期的 OHLCV（最后一根可以是未收盘K线，会被后续数据覆盖）
+            now: 当前时间（秒），None 表示系统时间
+        
+        Returns:
+            新派生出的已收盘高周期K线数量
+        """
+        key = (exchange, symbol)
+        base = self.base.setdefault(key, _Bars(self.max_base_bars))
+        if df is not None and len(df):
+            base.merge(*self._frame_to_arrays(df))
+        
+        now_ms = self._now_ms(now)
+        closed_until = now_ms - now_ms % self.base_ms
+        self._closed_until[key] = closed_until
+        if not len(base):
+            return 0
+        
+        history = self.history.setdefault(key, {})
+        folded = 0
+        for tf in self.timeframes:
+            tf_ms = TIMEFRAME_MS[tf]
+            buckets, values, _ = aggregate_ohlcv(base.timestamps, base.values, tf_ms)
+            # 只取被基础K线完整覆盖且已收盘的桶
+            done = (buckets >= base.timestamps[0]) & (buckets + tf_ms <= closed_until)
+            bars = history.setdefault(tf, _Bars(self.max_bars))
+            before = len(bars)
+            bars.append(buckets[done], values[done])
+            folded += len(bars) - before
+        return folded
+    
+    def backfill(self, exchange: str, symbol: str, timeframe: str, df: pd.DataFrame,
+                 now: Optional[float] = None):
+        """
+        用 REST 获取的高周期K线回补历史（只保留已收盘K线，已派生的K线优先）
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            df: 该时间框架的 OHLCV
+            now: 当前时间（秒），None 表示系统时间
+        """
+        if df is None or not len(df):
+            return
+        timestamps, values = self._frame_to_arrays(df)
+        closed = timestamps + TIMEFRAME_MS[timeframe] <= self._now_ms(now)
+        bars = self.history.setdefault((exchange, symbol), {}).setdefault(timeframe, _Bars(self.max_bars))
+        bars.merge(timestamps[closed], values[closed], overwrite=False)
+    
+    def needs_backfill(self, exchange: str, symbol: str, timeframe: str, limit: int,
+                       now: Optional[float] = None) -> bool:
+        """
+        是否需要通过 REST 回补：已收盘历史不足、与当前时间之间有缺口，
+        或基础K线尚未覆盖正在形成的K线
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            limit: 需要的K线数量（含正在形成的一根）
+            now: 当前时间（秒），None 表示系统时间
+        
+        Returns:
+            是否需要回补
+        """
+        key = (exchange, symbol)
+        base = self.base.get(key)
+        if timeframe == self.base_timeframe:
+            return base is None or len(base) < limit
+        
+        bars = self.history.get(key, {}).get(timeframe)
+        if base is None or not len(base) or bars is None or len(bars) < limit - 1:
+            return True
+        
+        tf_ms = TIMEFRAME_MS[timeframe]
+        now_ms = self._now_ms(now)
+        forming = now_ms - now_ms % tf_ms
+        return bars.last_timestamp < forming - tf_ms or base.timestamps[0] > forming
+    
+    def get_ohlcv(self, exchange: str, symbol: str, timeframe: str,
+                  limit: int = 100) -> Optional[pd.DataFrame]:
+        """
+        获取某时间框架最近 limit 根K线（最后一根为基础K线聚合出的正在形成的K线）
+        
+        Args:
+            exchange: 交易所名称
+            symbol: 交易对
+            timeframe: 时间框架
+            limit: K线数量
+        
+        Returns:
+            与 fetch_ohlcv 相同格式的 DataFrame，无数据时返回 None
+        """
+        key = (exchange, symbol)
+        base = self.base.get(key)
+        if base is None or not len(base):
+            return None
+        
+        if timeframe == self.base_timeframe:
+            return self._arrays_to_frame(base.timestamps[-limit:], base.values[-limit:])
+        
+        tf_ms = TIMEFRAME_MS[timeframe]
+        bars = self.history.get(key, {}).get(timeframe)
+        timestamps = bars.timestamps if bars is not None else np.empty(0, dtype=np.int64)
+        values = bars.values if bars is not None else np.empty((0, 5))
+        
+        # 正在形成的K线：最后一个桶中晚于已收盘历史的部分
+        last_closed = timestamps[-1] if len(timestamps) else -1
+        tail = base.timestamps - base.timestamps % tf_ms > last_closed
+        if tail.any():
+            forming_ts, forming_values, _ = aggregate_ohlcv(base.timestamps[tail], base.values[tail], tf_ms)
+            timestamps = np.r_[timestamps, forming_ts]
+            values = np.vstack([values, forming_values])
+        
+        return self._arrays_to_frame(timestamps[-limit:], values[-limit:])
+    
+    def get_statistics(self) -> Dict[str, int]:
+        """获取引擎统计"""
+        return {
+            'symbols': len(self.base),
+            'base_bars': sum(len(b) for b in self.base.values()),
+            'derived_bars': sum(len(b) for tfs in self.history.values() for b in tfs.values())
+        }
@@ -0,0 +1,422 @@
+"""
+单交易所三角/多腿套利引擎
+基于全市场行情构建货币图，用对数价格负环检测寻找3-4腿的盈利循环
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+
+from utils.logging_manager import LoggerMixin
+
+
+@dataclass
+class TriangularOpportunity:
+    """三角/多腿套利机会数据类"""
+    exchange: str
+    path: List[str]          # 货币路径，首尾相同，例如 ['USDT', 'BTC', 'ETH', 'USDT']
+    legs: List[Dict]         # 每一腿: symbol / side / price
+    profit_percent: float    # 扣除手续费后的循环收益率
+    timestamp: datetime
+    
+    def to_dict(self):
+        return {
+            'exchange': self.exchange,
+            'path': ' → '.join(self.path),
+            'legs': self.legs,
+            'cycle_length': len(self.legs),
+            'profit_percent': self.profit_percent,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+
+class TriangularArbitrageEngine(LoggerMixin):
+    """
+    单交易所多腿套利引擎
+    
+    图结构：每个现货市场 BASE/QUOTE 对应两条有向边
+        BASE → QUOTE（按bid卖出），权重 -log(bid * (1 - fee))
+        QUOTE → BASE（按ask买入），权重 -log((1 / ask) * (1 - fee))
+    循环权重之和为负即代表扣费后有利可图。
+    
+    边按终点排序存放在NumPy数组中（入边邻接数组），有界跳数的Bellman-Ford
+    对所有起点同时做向量化松弛；行情变化时只改写对应边的权重，不重建图。
+    """
+    
+    def __init__(self, market_data_collector=None, fee_percent: float = 0.1,
+                 max_cycle_length: int = 4, min_profit_percent: float = 0.05,
+                 min_quote_volume: float = 0.0, volume_currency: str = 'USDT'):
+        """
+        初始化引擎
+        
+        Args:
+            market_data_collector: 市场数据采集器实例（需提供 fetch_tickers）
+            fee_percent: 单腿吃单手续费（%）
+            max_cycle_length: 最大循环腿数（3或4）
+            min_profit_percent: 扣费后的最小循环收益率（%）
+            min_quote_volume: 最小24h成交额（以 volume_currency 计），低于此值的市场不参与
+            volume_currency: 成交额换算的统一货币。各市场的 quoteVolume 以各自计价货币计
+                （USDT/BTC/ETH...），按 QUOTE/volume_currency 的行情换算后再比较；无法换算的市场不参与
+        """
+        self.collector = market_data_collector
+        self.fee_percent = fee_percent
+        self.max_cycle_length = max(3, min(int(max_cycle_length), 4))
+        self.min_profit_percent = min_profit_percent
+        self.min_quote_volume = min_quote_volume
+        self.volume_currency = volume_currency
+        
+        self.exchange_name = None
+        
+        # 图结构
+        self.currencies: List[str] = []
+        self.currency_index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.symbol_edges: Dict[str, Tuple[int, int]] = {}  # symbol -> (卖出边, 买入边)
+        self._tickers: Dict[str, Dict] = {}  # 最近一次报价，图结构变化时用于重建
+        
+        self._edge_src = np.empty(0, dtype=np.int64)
+        self._edge_dst = np.empty(0, dtype=np.int64)
+        self._edge_symbol = np.empty(0, dtype=np.int64)
+        self._edge_is_buy = np.empty(0, dtype=bool)
+        self._edge_weight = np.empty(0, dtype=np.float64)
+        self._edge_price = np.empty(0, dtype=np.float64)
+        
+        self._group_starts = np.empty(0, dtype=np.int64)
+        self._group_dst = np.empty(0, dtype=np.int64)
+        self._group_of_edge = np.empty(0, dtype=np.int64)
+        self._source_nodes = np.empty(0, dtype=np.int64)
+        
+        # 统计
+        self.total_scans = 0
+        self.opportunities_found = 0
+        self.last_search_ms = 0.0
+        self.last_update_count = 0
+        self.opportunities_cache: List[TriangularOpportunity] = []
+    
+    @staticmethod
+    def _parse_symbol(symbol: str) -> Optional[Tuple[str, str]]:
+        """解析现货交易对，衍生品（带 ':'）返回None"""
+        if ':' in symbol or '/' not in symbol:
+            return None
+        base, quote = symbol.split('/', 1)
+        if not base or not quote or base == quote:
+            return None
+        return base, quote
+    
+    @staticmethod
+    def _mid_price(ticker: Optional[Dict]) -> Optional[float]:
+        if not ticker:
+            return None
+        bid, ask = ticker.get('bid'), ticker.get('ask')
+        if bid and ask and bid > 0 and ask > 0:
+            return (bid + ask) / 2
+        last = ticker.get('last')
+        return last if last and last > 0 else None
+    
+    def _volume_rate(self, quote: str, tickers: Dict[str, Dict]) -> Optional[float]:
+        """1 单位 quote 折合多少 volume_currency，无法换算返回None"""
+        if quote == self.volume_currency:
+            return 1.0
+        direct = f'{quote}/{self.volume_currency}'
+        price = self._mid_price(tickers.get(direct) or self._tickers.get(direct))
+        if price:
+            return price
+        inverse = f'{self.volume_currency}/{quote}'
+        price = self._mid_price(tickers.get(inverse) or self._tickers.get(inverse))
+        return 1.0 / price if price else None
+    
+    def _quote_weights(self, ticker: Dict, volume_rate: Optional[float] = 1.0) -> Tuple[float, float, float, float]:
+        """
+        由行情计算 (卖出边权重, 买入边权重, bid, ask)，无效报价返回inf
+        
+        Args:
+            ticker: ccxt 行情
+            volume_rate: 该市场计价货币折合 volume_currency 的汇率，None 表示无法换算
+        """
+        bid = ticker.get('bid')
+        ask = ticker.get('ask')
+        
+        if self.min_quote_volume > 0:
+            if volume_rate is None or (ticker.get('quoteVolume') or 0) * volume_rate < self.min_quote_volume:
+                return math.inf, math.inf, 0.0, 0.0
+        if not bid or not ask or bid <= 0 or ask <= 0:
+            return math.inf, math.inf, 0.0, 0.0
+        
+        fee_log = -math.log1p(-self.fee_percent / 100)
+        sell_weight = -math.log(bid) + fee_log
+        buy_weight = math.log(ask) + fee_log
+        return sell_weight, buy_weight, float(bid), float(ask)
+    
+    def build_graph(self, tickers: Dict[str, Dict], exchange_name: Optional[str] = None):
+        """
+        由全量行情构建货币图
+        
+        Args:
+            tickers: {symbol: ticker}，通常来自 fetch_tickers
+            exchange_name: 交易所名称
+        """
+        if exchange_name is not None:
+            self.exchange_name = exchange_name
+        
+        currency_index: Dict[str, int] = {}
+        quote_currencies = set()
+        src, dst, sym, is_buy = [], [], [], []
+        symbols = []
+        
+        for symbol in sorted(tickers):
+            parsed = self._parse_symbol(symbol)
+            if parsed is None:
+                continue
+            base, quote = parsed
+            b = currency_index.setdefault(base, len(currency_index))
+            q = currency_index.setdefault(quote, len(currency_index))
+            quote_currencies.add(q)
+            
+            s = len(symbols)
+            symbols.append(symbol)
+            # 卖出 BASE 得到 QUOTE
+            src.append(b); dst.append(q); sym.append(s); is_buy.append(False)
+            # 用 QUOTE 买入 BASE
+            src.append(q); dst.append(b); sym.append(s); is_buy.append(True)
+        
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        
+        # 按终点排序，便于 reduceat 按入边分组求最小值
+        order = np.argsort(dst, kind='stable')
+        self._edge_src = src[order]
+        self._edge_dst = dst[order]
+        self._edge_symbol = np.asarray(sym, dtype=np.int64)[order]
+        self._edge_is_buy = np.asarray(is_buy, dtype=bool)[order]
+        self._edge_weight = np.full(len(order), np.inf)
+        self._edge_price = np.zeros(len(order))
+        
+        if len(order):
+            boundaries = np.flatnonzero(self._edge_dst[1:] != self._edge_dst[:-1]) + 1
+            self._group_starts = np.concatenate(([0], boundaries))
+        else:
+            self._group_starts = np.empty(0, dtype=np.int64)
+        self._group_dst = self._edge_dst[self._group_starts]
+        counts = np.diff(np.append(self._group_starts, len(order)))
+        self._group_of_edge = np.repeat(np.arange(len(self._group_starts)), counts)
+        
+        self.currencies = sorted(currency_index, key=currency_index.get)
+        self.currency_index = currency_index
+        self.symbols = symbols
+        self.symbol_edges = {}
+        self._tickers = {}
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        for s, symbol in enumerate(symbols):
+            self.symbol_edges[symbol] = (int(position[2 * s]), int(position[2 * s + 1]))
+        
+        # 任何循环都至少经过一个计价货币，只需从计价货币出发搜索
+        self._source_nodes = np.asarray(sorted(quote_currencies), dtype=np.int64)
+        
+        self.update_quotes(tickers)
+        self.logger.info(
+            f"✅ 构建货币图: {len(self.currencies)} 种货币, {len(symbols)} 个市场, "
+            f"{len(self._source_nodes)} 个计价货币"
+        )
+    
+    def update_quotes(self, tickers: Dict[str, Dict]) -> int:
+        """
+        增量更新边权重（只改写报价变化的市场）
+        
+        Args:
+            tickers: {symbol: ticker}
+        
+        Returns:
+            更新的市场数量；出现新市场时返回 -1 表示已重建图
+        """
+        updated = 0
+        rates: Dict[str, Optional[float]] = {}
+        for symbol, ticker in tickers.items():
+            edges = self.symbol_edges.get(symbol)
+            if edges is None:
+                if self._parse_symbol(symbol) is not None:
+                    # 新上线的市场改变了图结构，合并后重建
+                    merged = dict(self._tickers)
+                    merged.update(tickers)
+                    self.build_graph(merged)
+                    return -1
+                continue
+            
+            sell_edge, buy_edge = edges
+            volume_rate = 1.0
+            if self.min_quote_volume > 0:
+                quote = symbol.split('/', 1)[1]
+                if quote not in rates:
+                    rates[quote] = self._volume_rate(quote, tickers)
+                volume_rate = rates[quote]
+            sell_weight, buy_weight, bid, ask = self._quote_weights(ticker, volume_rate)
+            self._edge_weight[sell_edge] = sell_weight
+            self._edge_weight[buy_edge] = buy_weight
+            self._edge_price[sell_edge] = bid
+            self._edge_price[buy_edge] = ask
+            self._tickers[symbol] = ticker
+            updated += 1
+        
+        self.last_update_count = updated
+        return updated
+    
+    def find_cycles(self) -> List[TriangularOpportunity]:
+        """
+        有界跳数Bellman-Ford：从所有计价货币同时出发，逐层松弛，
+        在第3、4层检查回到起点的负权路径
+        
+        Returns:
+            按收益率排序的套利机会列表
+        """
+        start = time.perf_counter()
+        n_edges = len(self._edge_weight)
+        n_nodes = len(self.currencies)
+        n_sources = len(self._source_nodes)
+        if n_edges == 0 or n_sources == 0:
+            return []
+        
+        threshold = -math.log1p(self.min_profit_percent / 100)
+        rows = np.arange(n_sources)
+        edge_positions = np.arange(n_edges)
+        
+        dist = np.full((n_sources, n_nodes), np.inf)
+        dist[rows, self._source_nodes] = 0.0
+        predecessors = []
+        
+        opportunities = []
+        seen = set()
+        
+        for level in range(1, self.max_cycle_length + 1):
+            candidate = dist[:, self._edge_src] + self._edge_weight
+            best = np.minimum.reduceat(candidate, self._group_starts, axis=1)
+            
+            # 记录每个节点取得最小值的第一条入边
+            hit = candidate == best[:, self._group_of_edge]
+            picked = np.where(hit & np.isfinite(candidate), edge_positions, n_edges)
+            first_edge = np.minimum.reduceat(picked, self._group_starts, axis=1)
+            
+            pred = np.full((n_sources, n_nodes), -1, dtype=np.int64)
+            pred[:, self._group_dst] = np.where(first_edge < n_edges, first_edge, -1)
+            predecessors.append(pred)
+            
+            dist = np.full((n_sources, n_nodes), np.inf)
+            dist[:, self._group_dst] = best
+            
+            if level < 3:
+                continue
+            
+            closing = dist[rows, self._source_nodes]
+            for row in np.flatnonzero(closing < threshold):
+                cycle = self._reconstruct(predecessors, row, int(self._source_nodes[row]), level)
+                if cycle is None:
+                    continue
+                key = self._canonical_key(cycle)
+                if key in seen:
+                    continue
+                seen.add(key)
+                opportunities.append(self._to_opportunity(cycle, float(closing[row])))
+        
+        opportunities.sort(key=lambda x: x.profit_percent, reverse=True)
+        self.last_search_ms = (time.perf_counter() - start) * 1000
+        return opportunities
+    
+    def _reconstruct(self, predecessors: List[np.ndarray], row: int,
+                     source: int, level: int) -> Optional[List[int]]:
+        """沿前驱边回溯出循环的边序列，非简单循环返回None"""
+        edges = []
+        node = source
+        for depth in range(level - 1, -1, -1):
+            edge = int(predecessors[depth][row, node])
+            if edge < 0:
+                return None
+            edges.append(edge)
+            node = int(self._edge_src[edge])
+        if node != source:
+            return None
+        edges.reverse()
+        
+        visited = [int(self._edge_src[e]) for e in edges]
+        if len(set(visited)) != len(visited):
+            return None
+        return edges
+    
+    def _canonical_key(self, edges: List[int]) -> Tuple[int, ...]:
+        """循环的旋转不变键，用于跨起点去重"""
+        pivot = edges.index(min(edges))
+        return tuple(edges[pivot:] + edges[:pivot])
+    
+    def _to_opportunity(self, edges: List[int], total_weight: float) -> TriangularOpportunity:
+        """将边序列转换为套利机会"""
+        path = [self.currencies[int(self._edge_src[edges[0]])]]
+        legs = []
+        for e in edges:
+            path.append(self.currencies[int(self._edge_dst[e])])
+            legs.append({
+                'symbol': self.symbols[int(self._edge_symbol[e])],
+                'side': 'buy' if self._edge_is_buy[e] else 'sell',
+                'price': float(self._edge_price[e])
+            })
+        
+        return TriangularOpportunity(
+            exchange=self.exchange_name or '',
+            path=path,
+            legs=legs,
+            profit_percent=float(math.expm1(-total_weight) * 100),
+            timestamp=datetime.now()
+        )
+    
+    def scan_exchange(self, exchange_name: str) -> List[TriangularOpportunity]:
+        """
+        一次批量行情请求 + 增量更新 + 负环搜索
+        
+        Args:
+            exchange_name: 交易所名称
+        
+        Returns:
+            套利机会列表
+        """
+        if self.collector is None:
+            raise ValueError("未提供市场数据采集器")
+        
+        tickers = self.collector.fetch_tickers(exchange_name)
+        if not tickers:
+            return []
+        
+        if exchange_name != self.exchange_name or not self.symbol_edges:
+            self.build_graph(tickers, exchange_name)
+        else:
+            self.update_quotes(tickers)
+        
+        opportunities = self.find_cycles()
+        
+        self.total_scans += 1
+        self.opportunities_found += len(opportunities)
+        self.opportunities_cache = opportunities
+        
+        if opportunities:
+            best = opportunities[0]
+            self.logger.info(
+                f"🔺 {exchange_name} 发现 {len(opportunities)} 个多腿套利机会, "
+                f"最佳 {best.profit_percent:.3f}% ({' → '.join(best.path)}), "
+                f"搜索耗时 {self.last_search_ms:.2f}ms"
+            )
+        return opportunities
+    
+    def get_statistics(self) -> Dict:
+        """获取引擎统计信息"""
+        return {
+            'exchange': self.exchange_name,
+            'currencies': len(self.currencies),
+            'markets': len(self.symbols),
+            'edges': int(len(self._edge_weight)),
+            'active_edges': int(np.isfinite(self._edge_weight).sum()),
+            'total_scans': self.total_scans,
+            'opportunities_found': self.opportunities_found,
+            'last_search_ms': self.last_search_ms,
+            'last_update_count': self.last_update_count,
+            'cache_size': len(self.opportunities_cache)
+        }
@@ -0,0 +1,425 @@
+"""
+有界 TTL 缓存
+线程安全，按条目数与内存上限做 LRU 淘汰，支持过期后在宽限期内返回旧值并后台刷新（stale-while-revalidate），
+每个缓存实例是一个命名空间，记录命中/未命中/淘汰/过期次数与实际内存占用
+"""
+
+import math
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    估算对象占用的内存（字节）
+    
+    递归遍历 dict/list/tuple/对象属性，numpy数组按 nbytes 计，DataFrame/Series 按 memory_usage(deep=True) 计，
+    其余按 sys.getsizeof 计，共享引用只计一次。
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        
+        if isinstance(item, np.memmap):
+            # 内存映射的数据由各进程共享页缓存，不计入本进程缓存
+            continue
+        if isinstance(item, np.ndarray):
+            # 视图只计基数组
+            if item.base is not None and isinstance(item.base, np.ndarray):
+                stack.append(item.base)
+            else:
+                total += item.nbytes
+            continue
+        if isinstance(item, pd.DataFrame):
+            total += int(item.memory_usage(index=True, deep=True).sum())
+            continue
+        if isinstance(item, pd.Series):
+            total += int(item.memory_usage(index=True, deep=True))
+            continue
+        
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.append(item.__dict__)
+    
+    return total
+
+
+class _Entry:
+    """缓存条目"""
+    
+    __slots__ = ('value', 'size', 'stored_at', 'expires_at', 'stale_until', 'last_access')
+    
+    def __init__(self, value: Any, size: int, ttl: Optional[float], stale_ttl: float):
+        now = time.time()
+        self.value = value
+        self.size = size
+        self.stored_at = now
+        self.expires_at = math.inf if ttl is None else now + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.last_access = now
+
+
+_registry: 'weakref.WeakSet[TTLCache]' = weakref.WeakSet()
+_registry_lock = threading.Lock()
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    global _refresh_executor
+    with _registry_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        return _refresh_executor
+
+
+class TTLCache:
+    """有界 TTL 缓存"""
+    
+    def __init__(self, name: str, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = 300, stale_ttl: float = 0.0,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        """
+        初始化缓存
+        
+        Args:
+            name: 命名空间名称（用于统计）
+            max_entries: 最多条目数
+            max_bytes: 内存上限（字节）
+            ttl: 默认有效期（秒），None表示不过期
+            stale_ttl: 过期后仍可作为旧值返回的宽限时间（秒）
+            sizeof: 计算条目内存占用的函数
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.sizeof = sizeof
+        
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._pinned: Dict[Hashable, int] = {}
+        self._loading: Dict[Hashable, Future] = {}
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        
+        # 统计
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        
+        with _registry_lock:
+            _registry.add(self)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.time()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _remove(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+        return entry
+    
+    def _lookup(self, key: Hashable) -> Tuple[Optional[_Entry], bool]:
+        """返回 (条目, 是否已过期)；超过宽限期的条目直接删除（需持有锁）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        now = time.time()
+        if entry.stale_until <= now and key not in self._pinned:
+            self._remove(key)
+            self.expirations += 1
+            return None, False
+        self._entries.move_to_end(key)
+        entry.last_access = now
+        return entry, entry.expires_at <= now
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取未过期的值并标记为最近使用"""
+        with self._lock:
+            entry, stale = self._lookup(key)
+            if entry is None or stale:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry.value
+    
+    def get_with_state(self, key: Hashable) -> Tuple[Any, Optional[bool]]:
+        """
+        读取值及其状态
+        
+        Returns:
+            (值, 是否过期)；不存在时为 (None, None)，过期但仍在宽限期内时返回旧值和 True
+        """
+        with self._lock:
+            entry, stale = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry.value, stale
+    
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """读取值（包括已过期的），不影响LRU顺序与统计"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry.value
+    
+    def age(self, key: Hashable) -> Optional[float]:
+        """条目写入后经过的秒数"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else time.time() - entry.stored_at
+    
+    def set(self, key: Hashable, value: Any, ttl: Any = ..., size: Optional[int] = None,
+            stale_ttl: Any = ...):
+        """
+        写入值，必要时按LRU淘汰
+        
+        Args:
+            key: 缓存键
+            value: 值
+            ttl: 有效期（秒），省略时使用默认值，None表示不过期
+            size: 内存占用（字节），None表示自动计算
+            stale_ttl: 该条目过期后的宽限时间（秒），省略时使用默认值
+        """
+        if size is None:
+            size = self.sizeof(value)
+        entry = _Entry(value, size, self.ttl if ttl is ... else ttl,
+                       self.stale_ttl if stale_ttl is ... else stale_ttl)
+        
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.total_bytes += size
+            self._evict()
+    
+    def delete(self, key: Hashable) -> bool:
+        """删除条目（忽略固定状态）"""
+        with self._lock:
+            self._pinned.pop(key, None)
+            return self._remove(key) is not None
+    
+    def pin(self, key: Hashable):
+        """固定条目，不参与淘汰与过期清理（可重入）"""
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+    
+    def unpin(self, key: Hashable):
+        """取消一次固定"""
+        with self._lock:
+            count = self._pinned.get(key, 0) - 1
+            if count > 0:
+                self._pinned[key] = count
+            else:
+                self._pinned.pop(key, None)
+            self._evict()
+    
+    def _evict(self):
+        """从最久未使用的未固定条目开始淘汰，直到满足上限（需持有锁）"""
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            if key in self._pinned:
+                continue
+            self._remove(key)
+            self.evictions += 1
+    
+    def purge_expired(self) -> int:
+        """删除超过宽限期的条目，返回删除数量"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e.stale_until <= now and k not in self._pinned]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+    
+    def evict_idle(self, max_idle_seconds: float) -> int:
+        """
+        淘汰超过指定时间未被访问的未固定条目
+        
+        Args:
+            max_idle_seconds: 最长空闲时间（秒）
+        
+        Returns:
+            淘汰的条目数量
+        """
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if e.last_access < cutoff and k not in self._pinned]
+            for key in idle:
+                self._remove(key)
+            self.evictions += len(idle)
+            return len(idle)
+    
+    def clear(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """
+        清空缓存
+        
+        Args:
+            predicate: 只删除满足条件的键，None表示全部（包括固定的条目）
+        """
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                self._pinned.clear()
+                self.total_bytes = 0
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                self.delete(key)
+    
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+    
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """未过期的条目"""
+        now = time.time()
+        with self._lock:
+            snapshot = [(k, e.value) for k, e in self._entries.items() if e.expires_at > now]
+        return iter(snapshot)
+    
+    def _begin_load(self, key: Hashable, loader: Callable[[], Any],
+                    ttl: Any, stale_ttl: Any = ...) -> Tuple[Future, Optional[Callable[[], None]]]:
+        """
+        同一个键同时只执行一次加载（需持有锁）
+        
+        Returns:
+            (Future, 需要由调用方执行的加载函数)；已有加载在进行时加载函数为 None
+        """
+        future = self._loading.get(key)
+        if future is not None:
+            return future, None
+        future = Future()
+        self._loading[key] = future
+        
+        def run():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl, stale_ttl=stale_ttl)
+                future.set_result(value)
+            except Exception as e:
+                self.refresh_errors += 1
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        
+        return future, run
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Any = ...) -> Any:
+        """
+        读取值，缺失时同步加载；已过期但在宽限期内时立即返回旧值并在后台刷新
+        
+        Args:
+            key: 缓存键
+            loader: 加载函数，返回 None 时不写入缓存
+            ttl: 有效期（秒），省略时使用默认值
+        
+        Returns:
+            缓存值或加载结果
+        """
+        value, stale = self.get_with_state(key)
+        if stale is False:
+            return value
+        
+        if stale:
+            self.refresh_async(key, loader, ttl)
+            return value
+        
+        return self.load(key, loader, ttl)
+    
+    def load(self, key: Hashable, loader: Callable[[], Any], ttl: Any = ..., stale_ttl: Any = ...) -> Any:
+        """同步加载并写入（同一个键已有加载在进行时等待其结果）"""
+        with self._lock:
+            future, run = self._begin_load(key, loader, ttl, stale_ttl)
+        if run is not None:
+            run()
+        return future.result()
+    
+    def refresh_async(self, key: Hashable, loader: Callable[[], Any], ttl: Any = ...,
+                      stale_ttl: Any = ...) -> Future:
+        """在后台刷新条目（已有刷新在进行时返回同一个 Future）"""
+        with self._lock:
+            future, run = self._begin_load(key, loader, ttl, stale_ttl)
+        if run is not None:
+            self.refreshes += 1
+            _get_refresh_executor().submit(run)
+        return future
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取命名空间统计"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'pinned': len(self._pinned),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors
+            }
+
+
+def get_cache_statistics() -> Dict[str, Dict[str, Any]]:
+    """所有命名空间的缓存统计（同名的多个实例合并计数）"""
+    with _registry_lock:
+        caches = list(_registry)
+    
+    result: Dict[str, Dict[str, Any]] = {}
+    for cache in caches:
+        stats = cache.get_statistics()
+        merged = result.get(stats['name'])
+        if merged is None:
+            stats['instances'] = 1
+            result[stats['name']] = stats
+            continue
+        merged['instances'] += 1
+        for field, value in stats.items():
+            if field not in ('name', 'hit_rate') and isinstance(value, (int, float)):
+                merged[field] += value
+    
+    for stats in result.values():
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+    return result
@@ -17,16 +17,39 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from utils.arbitrage_scanner import ArbitrageScanner
+from utils.arbitrage_tracker import ArbitrageLifetimeStore, ArbitrageLifetimeTracker
+from utils.derivatives_collector import DerivativesDataCollector
+from utils.funding_arbitrage_scanner import FundingArbitrageScanner
 from data.market_data_collector import MarketDataCollector
 
 
+@st.cache_resource
+def get_lifetime_tracker() -> ArbitrageLifetimeTracker:
+    """进程内共享的生命周期追踪器，多个浏览器会话不会重复记录同一机会"""
+    return ArbitrageLifetimeTracker(ArbitrageLifetimeStore())
+
+
 class ArbitrageDashboard:
     """套利机会仪表板"""
     
     def __init__(self):
         """初始化仪表板"""
         self.collector = MarketDataCollector()
-        self.scanner = ArbitrageScanner(self.collector)
+        
+        # 生命周期追踪跨页面刷新与会话保持状态
+        self.lifetime_tracker = get_lifetime_tracker()
+        self.lifetime_store = self.lifetime_tracker.store
+        
+        self.scanner = ArbitrageScanner(
+            self.collector,
+            lifetime_tracker=self.lifetime_tracker
+        )
+        
+        # 衍生品采集器的TTL缓存跨刷新保留，资金费率扫描只读缓存
+        if 'derivatives_collector' not in st.session_state:
+            st.session_state.derivatives_collector = DerivativesDataCollector(MarketDataCollector())
+        self.derivatives_collector = st.session_state.derivatives_collector
+        self.funding_scanner = FundingArbitrageScanner(self.derivatives_collector)
         
         # 默认配置
         self.default_symbols = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'SOL/USDT']
@@ -239,6 +262,75 @@ class ArbitrageDashboard:
         
         st.plotly_chart(fig, use_container_width=True)
     
+    def render_funding_arbitrage(self, limit: int = 20):
+        """渲染跨交易所资金费率套利机会"""
+        st.markdown("### 💰 资金费率套利机会")
+        
+        # 全市场资金费率按交易所整体缓存，TTL 内不会请求交易所
+        self.derivatives_collector.get_universe_snapshot(self.funding_scanner.exchanges)
+        # 基差相对现货价计算，现货价取自上面套利扫描已拿到的行情，不额外请求
+        spot_prices = self.scanner.get_spot_reference_prices()
+        opportunities = self.funding_scanner.continuous_scan(spot_prices=spot_prices)
+        
+        if not opportunities:
+            st.info("🔍 暂无资金费率套利机会")
+            return
+        
+        df = pd.DataFrame([opp.to_dict() for opp in opportunities[:limit]])
+        df['long_rate'] = df['long_rate'].apply(lambda x: f"{x * 100:.4f}%")
+        df['short_rate'] = df['short_rate'].apply(lambda x: f"{x * 100:.4f}%")
+        df['funding_diff_annual'] = df['funding_diff_annual'].apply(lambda x: f"{x:.1f}%")
+        df['long_basis'] = df['long_basis'].apply(lambda x: f"{x:.3f}%")
+        df['short_basis'] = df['short_basis'].apply(lambda x: f"{x:.3f}%")
+        df['expected_carry'] = df['expected_carry'].apply(lambda x: f"{x:.2f}%")
+        df['breakeven_days'] = df['breakeven_days'].apply(lambda x: f"{x:.1f}天")
+        
+        df = df.rename(columns={
+            'symbol': '交易对',
+            'long_exchange': '做多交易所',
+            'short_exchange': '做空交易所',
+            'long_rate': '做多费率',
+            'short_rate': '做空费率',
+            'funding_diff_annual': '年化费率差',
+            'long_basis': '做多基差',
+            'short_basis': '做空基差',
+            'expected_carry': f'{self.funding_scanner.holding_days}天预期收益',
+            'breakeven_days': '回本天数'
+        })
+        
+        st.dataframe(df.drop(columns=['timestamp']), use_container_width=True, hide_index=True)
+        st.caption("基差 = (标记价格 - 现货价格) / 现货价格；未在现货扫描范围内的交易对以指数价格代替现货价格")
+    
+    def render_lifetime_rollup(self, hours: int = 24):
+        """渲染套利机会生命周期分位数汇总"""
+        since = time.time() - hours * 3600
+        rollup = self.lifetime_store.lifetime_rollup(since=since)
+        
+        st.markdown(f"### ⏱️ 机会生命周期（最近{hours}小时）")
+        
+        if not rollup:
+            st.info("暂无已关闭的套利机会记录")
+            return
+        
+        df = pd.DataFrame(rollup)
+        for col in ['p50_lifetime', 'p90_lifetime', 'p99_lifetime', 'max_lifetime']:
+            df[col] = df[col].apply(lambda x: f"{x:.1f}s")
+        df['avg_peak_profit'] = df['avg_peak_profit'].apply(lambda x: f"{x:.2f}%")
+        
+        df = df.rename(columns={
+            'symbol': '交易对',
+            'buy_exchange': '买入交易所',
+            'sell_exchange': '卖出交易所',
+            'count': '次数',
+            'avg_peak_profit': '平均峰值利润',
+            'p50_lifetime': 'P50存活',
+            'p90_lifetime': 'P90存活',
+            'p99_lifetime': 'P99存活',
+            'max_lifetime': '最长存活'
+        })
+        
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    
     def render_auto_refresh(self):
         """渲染自动刷新控制"""
         col1, col2, col3 = st.columns([3, 1, 1])
@@ -318,6 +410,12 @@ class ArbitrageDashboard:
             with col2:
                 self.render_confidence_distribution(opportunities)
         
+        st.markdown("---")
+        self.render_lifetime_rollup()
+        
+        st.markdown("---")
+        self.render_funding_arbitrage()
+        
         # 自动刷新
         if auto_refresh:
             time.sleep(self.scanner.scan_interval)
@@ -10,6 +10,9 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import pandas as pd
 
+from data.results_store import get_shared_results_store
+from utils.journaled_state import load_journaled_state
+
 
 class DataBridge:
     """数据桥接类 - 从后端系统获取真实数据"""
@@ -17,71 +20,31 @@ class DataBridge:
     def __init__(self):
         self.project_root = Path(__file__).parent.parent
         self.data_dir = self.project_root / "data"
-        self.backtest_dir = self.data_dir / "backtest"
         self.logs_dir = self.project_root / "logs"
+        self.results_store = get_shared_results_store()
     
     def get_evolution_status(self) -> Dict:
         """获取策略进化状态 - 从进化系统状态文件读取真实数据"""
         try:
-            # 优先从进化系统状态文件读取
-            evolution_state_file = self.data_dir / "evolution" / "evolution_state.json"
-            if evolution_state_file.exists():
-                with open(evolution_state_file, 'r') as f:
-                    state_data = json.load(f)
-                    
-                    # 获取真实的代数和适应度
-                    current_generation = state_data.get('current_generation', 0)
-                    best_fitness = state_data.get('best_fitness', 0)
-                    avg_fitness = state_data.get('avg_fitness', 0)
-                    
-                    # 读取最新的回测结果用于策略列表
-                    strategies = []
-                    if self.backtest_dir.exists():
-                        backtest_files = list(self.backtest_dir.glob("*.json"))
-                        latest_files = sorted(backtest_files, key=lambda x: x.stat().st_mtime, reverse=True)[:10]
-                        
-                        for file in latest_files:
-                            try:
-                                with open(file, 'r') as bf:
-                                    data = json.load(bf)
-                                    # 计算fitness（如果没有的话）
-                                    fitness = data.get('fitness', 0)
-                                    if fitness == 0:
-                                        # 根据多个指标计算fitness
-                                        total_return = data.get('total_return', 0)
-                                        sharpe = data.get('sharpe_ratio', 0)
-                                        win_rate = data.get('win_rate', 0)
-                                        max_dd = data.get('max_drawdown', 1)
-                                        
-                                        # 综合评分公式（与进化系统一致）
-                                        fitness = (
-                                            0.35 * max(0, total_return) +  # 收益率权重35%
-                                            0.25 * max(0, sharpe / 3) +     # 夏普比率权重25%（归一化）
-                                            0.25 * win_rate +               # 胜率权重25%
-                                            0.15 * (1 - min(1, max_dd))     # 回撤权重15%
-                                        )
-                                    
-                                    strategies.append({
-                                        'name': file.stem,
-                                        'fitness': fitness,
-                                        'return': data.get('total_return', 0),
-                                        'sharpe': data.get('sharpe_ratio', 0),
-                                        'win_rate': data.get('win_rate', 0)
-                                    })
-                            except:
-                                continue
-                    
-                    # 按fitness排序
-                    strategies.sort(key=lambda x: x['fitness'], reverse=True)
-                    
-                    return {
-                        'current_generation': current_generation,
-                        'best_fitness': best_fitness,
-                        'avg_fitness': avg_fitness,
-                        'population_size': len(strategies),
-                        'strategies': strategies,
-                        'is_running': True
-                    }
+            # 优先从进化系统状态文件读取（快照 + 追加日志）
+            state_data = load_journaled_state(self.data_dir / "evolution" / "evolution_state.json")
+            if state_data is not None:
+                # 获取真实的代数和适应度
+                current_generation = state_data.get('current_generation', 0)
+                best_fitness = state_data.get('best_fitness', 0)
+                avg_fitness = state_data.get('avg_fitness', 0)
+                
+                # 从结果存储读取当前代适应度最高的策略
+                strategies = self._top_strategies(current_generation)
+                
+                return {
+                    'current_generation': current_generation,
+                    'best_fitness': best_fitness,
+                    'avg_fitness': avg_fitness,
+                    'population_size': len(strategies),
+                    'strategies': strategies,
+                    'is_running': True
+                }
             
             # 如果状态文件不存在，回退到旧逻辑
             return self._fallback_evolution_status()
@@ -92,57 +55,34 @@ class DataBridge:
             traceback.print_exc()
             return self._get_default_evolution_status()
     
+    def _top_strategies(self, generation: Optional[int] = None, limit: int = 10) -> List[Dict]:
+        """从结果存储读取某一代（没有该代结果时为全部历史）适应度最高的策略"""
+        results = self.results_store.top_n(limit, generation)
+        if not results and generation is not None:
+            results = self.results_store.top_n(limit)
+        return [{
+            'name': r['strategy_name'],
+            'fitness': r['fitness'],
+            'return': r['total_return'],
+            'sharpe': r['sharpe_ratio'],
+            'win_rate': r['win_rate']
+        } for r in results]
+    
     def _fallback_evolution_status(self) -> Dict:
-        """回退方案：从回测文件推断状态"""
+        """回退方案：从结果存储推断状态"""
         try:
-            if not self.backtest_dir.exists():
+            latest_generation = self.results_store.latest_generation()
+            if latest_generation is None:
                 return self._get_default_evolution_status()
             
-            backtest_files = list(self.backtest_dir.glob("*.json"))
-            if not backtest_files:
-                return self._get_default_evolution_status()
-            
-            latest_files = sorted(backtest_files, key=lambda x: x.stat().st_mtime, reverse=True)[:10]
-            
-            strategies = []
-            best_fitness = 0
-            for file in latest_files:
-                try:
-                    with open(file, 'r') as f:
-                        data = json.load(f)
-                        # 计算fitness
-                        total_return = data.get('total_return', 0)
-                        sharpe = data.get('sharpe_ratio', 0)
-                        win_rate = data.get('win_rate', 0)
-                        max_dd = data.get('max_drawdown', 1)
-                        
-                        fitness = (
-                            0.35 * max(0, total_return) +
-                            0.25 * max(0, sharpe / 3) +
-                            0.25 * win_rate +
-                            0.15 * (1 - min(1, max_dd))
-                        )
-                        
-                        if fitness > best_fitness:
-                            best_fitness = fitness
-                        
-                        strategies.append({
-                            'name': file.stem,
-                            'fitness': fitness,
-                            'return': data.get('total_return', 0),
-                            'sharpe': data.get('sharpe_ratio', 0),
-                            'win_rate': data.get('win_rate', 0)
-                        })
-                except:
-                    continue
-            
-            strategies.sort(key=lambda x: x['fitness'], reverse=True)
+            summary = self.results_store.generation_summary(latest_generation)
+            strategies = self._top_strategies(latest_generation)
             
             return {
-                'current_generation': len(backtest_files),  # 回退方案：用文件数
-                'best_fitness': best_fitness,
-                'avg_fitness': sum(s['fitness'] for s in strategies) / len(strategies) if strategies else 0,
-                'population_size': len(strategies),
+                'current_generation': latest_generation,
+                'best_fitness': summary['best_fitness'],
+                'avg_fitness': summary['avg_fitness'],
+                'population_size': summary['count'],
                 'strategies': strategies,
                 'is_running': True
             }
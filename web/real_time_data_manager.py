@@ -7,7 +7,6 @@
 import time
 import threading
 import queue
-import ccxt
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -16,6 +15,9 @@ import logging
 import requests
 import json
 
+from data.market_recorder import get_market_recorder
+from utils.ttl_cache import TTLCache
+
 class RealTimeDataManager:
     """实时数据管理器"""
     
@@ -23,12 +25,6 @@ class RealTimeDataManager:
         """初始化实时数据管理器"""
         self.logger = logging.getLogger(__name__)
         
-        # 数据缓存
-        self.price_cache = {}
-        self.volume_cache = {}
-        self.system_status_cache = {}
-        self.trading_signals_cache = []
-        
         # 缓存过期时间（秒）
         self.cache_expiry = {
             'price': 10,      # 价格数据10秒过期
@@ -37,10 +33,21 @@ class RealTimeDataManager:
             'signals': 300    # 交易信号5分钟过期
         }
         
+        # 数据缓存
+        self.price_cache = TTLCache('realtime.price', max_entries=1024, max_bytes=8 * 1024 * 1024,
+                                    ttl=self.cache_expiry['price'])
+        self.volume_cache = TTLCache('realtime.volume', max_entries=1024, max_bytes=8 * 1024 * 1024,
+                                     ttl=self.cache_expiry['volume'])
+        self.system_status_cache = {}
+        self.trading_signals_cache = []
+        
         # 初始化交易所连接
         self.exchanges = {}
         self._init_exchanges()
         
+        # MARKET_RECORDER=1 时录制从交易所取到的 ticker
+        self.recorder = get_market_recorder()
+        
         # 数据线程状态（默认不启动）
         self.is_running = False
         self.data_queue = queue.Queue()
@@ -50,6 +57,9 @@ class RealTimeDataManager:
     def _init_exchanges(self):
         """初始化交易所连接"""
         try:
+            # ccxt 导入较慢，只在创建连接时导入
+            import ccxt
+            
             # 初始化主要交易所
             exchange_configs = {
                 'binance': {
@@ -120,9 +130,11 @@ class RealTimeDataManager:
                 for exchange_name, exchange in self.exchanges.items():
                     try:
                         ticker = exchange.fetch_ticker(symbol)
+                        if self.recorder is not None:
+                            self.recorder.record_ticker(exchange_name, symbol, ticker)
                         
                         cache_key = f"{exchange_name}_{symbol}"
-                        self.price_cache[cache_key] = {
+                        self.price_cache.set(cache_key, {
                             'last': ticker['last'],
                             'bid': ticker['bid'],
                             'ask': ticker['ask'],
@@ -131,7 +143,7 @@ class RealTimeDataManager:
                             'change': ticker['percentage'],
                             'volume': ticker['baseVolume'],
                             'timestamp': datetime.now()
-                        }
+                        })
                         
                     except Exception as e:
                         self.logger.warning(f"⚠️ 获取 {exchange_name} {symbol} 价格失败: {e}")
@@ -151,6 +163,8 @@ class RealTimeDataManager:
                 for exchange_name, exchange in self.exchanges.items():
                     try:
                         ticker = exchange.fetch_ticker(symbol)
+                        if self.recorder is not None:
+                            self.recorder.record_ticker(exchange_name, symbol, ticker)
                         total_volume += ticker['baseVolume']
                         exchange_count += 1
                         
@@ -159,11 +173,11 @@ class RealTimeDataManager:
                 
                 if exchange_count > 0:
                     avg_volume = total_volume / exchange_count
-                    self.volume_cache[symbol] = {
+                    self.volume_cache.set(symbol, {
                         'volume': avg_volume,
                         'exchange_count': exchange_count,
                         'timestamp': datetime.now()
-                    }
+                    })
                     
         except Exception as e:
             self.logger.error(f"❌ 更新交易量数据失败: {e}")
@@ -217,16 +231,15 @@ class RealTimeDataManager:
         try:
             cache_key = f"{exchange}_{symbol}"
             
-            if cache_key in self.price_cache:
-                data = self.price_cache[cache_key]
-                
-                # 检查缓存是否过期
-                if (datetime.now() - data['timestamp']).seconds < self.cache_expiry['price']:
-                    return data
+            data = self.price_cache.get(cache_key)
+            if data is not None:
+                return data
             
             # 如果缓存过期或不存在，尝试获取新数据
             if exchange in self.exchanges:
                 ticker = self.exchanges[exchange].fetch_ticker(symbol)
+                if self.recorder is not None:
+                    self.recorder.record_ticker(exchange, symbol, ticker)
                 
                 data = {
                     'last': ticker['last'],
@@ -239,7 +252,7 @@ class RealTimeDataManager:
                     'timestamp': datetime.now()
                 }
                 
-                self.price_cache[cache_key] = data
+                self.price_cache.set(cache_key, data)
                 return data
             
             return None
@@ -262,6 +275,8 @@ class RealTimeDataManager:
                         self.logger.warning(f"⚠️ 获取 {exchange_name} {symbol} ticker数据为空")
                         prices[exchange_name] = None
                         continue
+                    if self.recorder is not None:
+                        self.recorder.record_ticker(exchange_name, symbol, ticker)
                     
                     # 检查必要的键是否存在
                     required_keys = ['last', 'bid', 'ask', 'baseVolume', 'percentage']
@@ -293,14 +308,7 @@ class RealTimeDataManager:
     def get_volume_data(self, symbol: str = 'BTC/USDT') -> Optional[Dict[str, Any]]:
         """获取交易量数据"""
         try:
-            if symbol in self.volume_cache:
-                data = self.volume_cache[symbol]
-                
-                # 检查缓存是否过期
-                if (datetime.now() - data['timestamp']).seconds < self.cache_expiry['volume']:
-                    return data
-            
-            return None
+            return self.volume_cache.get(symbol)
             
         except Exception as e:
             self.logger.error(f"❌ 获取交易量数据失败: {e}")